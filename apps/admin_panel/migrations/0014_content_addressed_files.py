@@ -0,0 +1,19 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:17
+
+import apps.uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0013_adminactionlog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='supportmessage',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.content_storage, upload_to='support_messages/'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from apps.uploads.storage import content_storage
 import secrets
 import string
 
@@ -86,7 +87,7 @@ class SupportMessage(models.Model):
     request = models.ForeignKey(SupportRequest, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     message = models.TextField(verbose_name='Сообщение')
-    file = models.FileField(upload_to='support_messages/', null=True, blank=True)
+    file = models.FileField(upload_to='support_messages/', storage=content_storage, max_length=255, null=True, blank=True)
     file_name = models.CharField(max_length=255, blank=True)
     file_size = models.PositiveIntegerField(default=0)
     is_admin = models.BooleanField(default=False)
@@ -0,0 +1,215 @@
+"""
+Лента арбитражного дела: сообщения дела, переписка по заказу и (по запросу)
+события дела, слитые в одну хронологию.
+
+Каждый источник — индексированный запрос, упорядоченный по
+``(created_at, id)``; ``heapq.merge`` сливает их без загрузки истории
+целиком. Страница ограничена ``limit``, позиция передаётся непрозрачным
+курсором ``(created_at, источник, id)`` — номер источника разрешает
+совпадения времени между таблицами, где id пересекаются.
+"""
+import base64
+import heapq
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+from apps.chat.models import Chat, Message as ChatMessage
+
+from .models import ArbitrationActivity, ArbitrationMessage
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+EXPORT_CHUNK_SIZE = 500
+
+# Порядок источников при равном времени.
+SOURCE_CASE_MESSAGES = 0
+SOURCE_ORDER_CHAT = 1
+SOURCE_ACTIVITIES = 2
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(key):
+    created_at, source, pk = key
+    raw = json.dumps([created_at.isoformat(), source, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        created_at, source, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(source), int(pk)
+    except (TypeError, ValueError):
+        raise InvalidCursor(value)
+
+
+def _sender(user):
+    return {
+        'id': user.id,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'username': user.username,
+        'display_username': getattr(user, 'display_username', ''),
+        'role': getattr(user, 'role', ''),
+    }
+
+
+def serialize_case_message(message):
+    return {
+        'kind': 'message',
+        'id': f'msg_{message.id}',
+        'sender': _sender(message.sender),
+        'text': message.text,
+        'message_type': message.message_type,
+        'is_internal': message.is_internal,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def serialize_chat_message(chat_message):
+    return {
+        'kind': 'message',
+        'id': f'chat_{chat_message.id}',
+        'sender': _sender(chat_message.sender),
+        'text': chat_message.text or '',
+        'message_type': chat_message.message_type,
+        'is_internal': False,
+        'source': 'order_chat',
+        'source_label': 'Переписка по заказу',
+        'chat_id': chat_message.chat_id,
+        'chat_context_title': chat_message.chat.context_title,
+        'file_name': chat_message.file_name,
+        'file_url': chat_message.file.url if chat_message.file else None,
+        'created_at': chat_message.created_at.isoformat(),
+    }
+
+
+def serialize_activity(activity):
+    return {
+        'kind': 'activity',
+        'id': f'act_{activity.id}',
+        'actor': _sender(activity.actor) if activity.actor else None,
+        'activity_type': activity.activity_type,
+        'description': activity.description,
+        'metadata': activity.metadata,
+        'created_at': activity.created_at.isoformat(),
+    }
+
+
+def order_chat_messages(case):
+    """Переписка сторон по заказу дела (или None, если её нет)."""
+    if not case.order_id or not case.order:
+        return None
+
+    client_id = case.order.client_id
+    expert_id = case.order.expert_id
+    participant_ids = {user_id for user_id in [client_id, expert_id] if user_id}
+    if len(participant_ids) < 2:
+        return None
+
+    related_chats = Chat.objects.filter(order_id=case.order_id).filter(
+        Q(client_id=client_id, expert_id=expert_id)
+        | Q(client_id=expert_id, expert_id=client_id)
+    )
+    return ChatMessage.objects.filter(
+        chat__in=related_chats,
+        sender_id__in=participant_ids,
+    ).select_related('sender', 'chat')
+
+
+def _seek(queryset, source, cursor, descending):
+    """Строки строго после (или до) курсора в порядке (created_at, source, id)."""
+    if cursor is None:
+        return queryset
+    created_at, cursor_source, pk = cursor
+    if descending:
+        if source < cursor_source:
+            return queryset.filter(created_at__lte=created_at)
+        if source > cursor_source:
+            return queryset.filter(created_at__lt=created_at)
+        return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    if source > cursor_source:
+        return queryset.filter(created_at__gte=created_at)
+    if source < cursor_source:
+        return queryset.filter(created_at__gt=created_at)
+    return queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+
+def _keyed(rows, source, serialize):
+    for row in rows:
+        yield (row.created_at, source, row.id), serialize, row
+
+
+class CaseFeed:
+    """Источники ленты дела с учётом прав пользователя."""
+
+    def __init__(self, case, user, *, include_activities=False):
+        is_admin = getattr(user, 'role', None) == 'admin'
+        self.sources = []
+
+        case_messages = ArbitrationMessage.objects.filter(case=case).select_related('sender')
+        if not is_admin:
+            case_messages = case_messages.filter(is_internal=False)
+        self.sources.append((SOURCE_CASE_MESSAGES, case_messages, serialize_case_message))
+
+        # Чат заказа и события дела видит только администратор.
+        if is_admin:
+            chat_messages = order_chat_messages(case)
+            if chat_messages is not None:
+                self.sources.append((SOURCE_ORDER_CHAT, chat_messages, serialize_chat_message))
+            if include_activities:
+                activities = ArbitrationActivity.objects.filter(case=case).select_related('actor')
+                self.sources.append((SOURCE_ACTIVITIES, activities, serialize_activity))
+
+    def _streams(self, cursor, descending, limit=None, chunk_size=EXPORT_CHUNK_SIZE):
+        order = ('-created_at', '-id') if descending else ('created_at', 'id')
+        streams = []
+        for source, queryset, serialize in self.sources:
+            rows = _seek(queryset, source, cursor, descending).order_by(*order)
+            rows = rows[:limit] if limit is not None else rows.iterator(chunk_size=chunk_size)
+            streams.append(_keyed(rows, source, serialize))
+        return heapq.merge(*streams, key=lambda item: item[0], reverse=descending)
+
+    def page(self, *, after=None, before=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Страница ленты в хронологическом порядке.
+
+        Без курсора — последние ``limit`` записей; ``before`` — более ранние,
+        ``after`` — более новые (для догрузки новых сообщений).
+        """
+        descending = after is None
+        cursor = after if after is not None else before
+        items = []
+        for key, serialize, row in self._streams(cursor, descending, limit=limit + 1):
+            items.append((key, serialize(row)))
+            if len(items) > limit:
+                break
+        has_more = len(items) > limit
+        items = items[:limit]
+        if descending:
+            items.reverse()
+        return {
+            'feed': [item for _, item in items],
+            'first_cursor': encode_cursor(items[0][0]) if items else None,
+            'last_cursor': encode_cursor(items[-1][0]) if items else None,
+            'has_more': has_more,
+        }
+
+    def iter_all(self):
+        """Вся лента от начала к концу, без загрузки в память (для экспорта)."""
+        for _key, serialize, row in self._streams(None, descending=False):
+            yield serialize(row)
+
+
+def stream_json(feed, header):
+    """Куски JSON-документа ``{**header, "feed": [...]}`` для StreamingHttpResponse."""
+    head = json.dumps(header, ensure_ascii=False)
+    yield head[:-1] + (', ' if header else '') + '"feed": ['
+    for index, item in enumerate(feed.iter_all()):
+        yield (',' if index else '') + json.dumps(item, ensure_ascii=False)
+    yield ']}'
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('arbitration', '0005_add_purchase_to_arbitrationcase'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='arbitrationactivity',
+            index=models.Index(fields=['case', 'created_at', 'id'], name='arbitration_case_id_a37b35_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='arbitrationmessage',
+            index=models.Index(fields=['case', 'created_at', 'id'], name='arbitration_case_id_e034de_idx'),
+        ),
+    ]
@@ -297,6 +297,9 @@ class ArbitrationMessage(models.Model):
     class Meta:
         db_table = 'arbitration_messages'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['case', 'created_at', 'id']),
+        ]
         verbose_name = 'Сообщение арбитража'
         verbose_name_plural = 'Сообщения арбитража'
     
@@ -352,6 +355,9 @@ class ArbitrationActivity(models.Model):
     class Meta:
         db_table = 'arbitration_activities'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['case', 'created_at', 'id']),
+        ]
         verbose_name = 'Активность арбитража'
         verbose_name_plural = 'Активности арбитража'
     
@@ -1,4 +1,5 @@
-﻿from datetime import timedelta
+﻿import json
+from datetime import timedelta
 
 from django.contrib.auth import get_user_model
 from django.test import TestCase
@@ -9,6 +10,7 @@ from rest_framework.test import APIClient
 from apps.arbitration.models import ArbitrationActivity, ArbitrationCase, ArbitrationMessage, Complaint
 from apps.catalog.models import Subject, WorkType
 from apps.chat.models import Message as ChatMessage
+from apps.chat.services import get_or_create_order_chat
 from apps.orders.models import Order
 from apps.wallet.services import WalletService
 
@@ -390,6 +392,96 @@ class ArbitrationCaseAPITests(TestCase):
         texts = [item['text'] for item in response.data['messages']]
         self.assertIn('Admin internal note', texts)
 
+    def _seed_feed(self, case):
+        chat = get_or_create_order_chat(self.order)
+        base = timezone.now() - timedelta(hours=1)
+        expected = []
+        # Сообщения дела и чата вперемешку, часть — с одинаковым временем.
+        for i in range(6):
+            created_at = base + timedelta(minutes=i // 2)
+            if i % 2:
+                row = ChatMessage.objects.create(chat=chat, sender=self.expert_user, text=f'chat {i}')
+                ChatMessage.objects.filter(pk=row.pk).update(created_at=created_at)
+                expected.append(f'chat_{row.pk}')
+            else:
+                row = ArbitrationMessage.objects.create(
+                    case=case, sender=self.client_user, message_type='plaintiff', text=f'case {i}',
+                )
+                ArbitrationMessage.objects.filter(pk=row.pk).update(created_at=created_at)
+                expected.append(f'msg_{row.pk}')
+        activity = ArbitrationActivity.objects.create(
+            case=case, actor=self.admin_user, activity_type='status_changed', description='Статус изменен',
+        )
+        ArbitrationActivity.objects.filter(pk=activity.pk).update(created_at=base + timedelta(minutes=10))
+        return expected, f'act_{activity.pk}'
+
+    def test_activity_feed_pages_backwards_through_merged_sources(self):
+        case = self._create_case()
+        expected, _ = self._seed_feed(case)
+        self.api_client.force_authenticate(user=self.admin_user)
+        url = f'/api/arbitration/cases/{case.id}/activity-feed/'
+
+        response = self.api_client.get(url, {'limit': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['has_more'])
+        seen = [item['id'] for item in response.data['feed']]
+        self.assertEqual(seen, expected[-4:])
+        self.assertEqual(
+            [item['id'] for item in response.data['order_chat_messages']],
+            [item_id for item_id in seen if item_id.startswith('chat_')],
+        )
+
+        older = self.api_client.get(url, {'limit': 4, 'before': response.data['first_cursor']})
+        self.assertFalse(older.data['has_more'])
+        self.assertEqual([item['id'] for item in older.data['feed']] + seen, expected)
+
+        newer = self.api_client.get(url, {'limit': 10, 'after': older.data['last_cursor']})
+        self.assertEqual([item['id'] for item in newer.data['feed']], seen)
+
+    def test_activity_feed_includes_activities_only_on_request(self):
+        case = self._create_case()
+        expected, activity_id = self._seed_feed(case)
+        self.api_client.force_authenticate(user=self.admin_user)
+        url = f'/api/arbitration/cases/{case.id}/activity-feed/'
+
+        default = self.api_client.get(url)
+        with_activities = self.api_client.get(url, {'include': 'activities'})
+
+        self.assertEqual([item['id'] for item in default.data['feed']], expected)
+        self.assertEqual([item['id'] for item in with_activities.data['feed']], expected + [activity_id])
+        self.assertEqual(len(with_activities.data['activities']), 1)
+
+    def test_activity_feed_rejects_malformed_cursor(self):
+        case = self._create_case()
+        self.api_client.force_authenticate(user=self.client_user)
+
+        response = self.api_client.get(f'/api/arbitration/cases/{case.id}/activity-feed/', {'before': 'garbage'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_activity_feed_export_streams_the_whole_history(self):
+        case = self._create_case()
+        expected, activity_id = self._seed_feed(case)
+        self.api_client.force_authenticate(user=self.admin_user)
+
+        response = self.api_client.get(f'/api/arbitration/cases/{case.id}/activity-feed/export/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        document = json.loads(b''.join(
+            chunk if isinstance(chunk, bytes) else chunk.encode() for chunk in response.streaming_content
+        ))
+        self.assertEqual(document['case_number'], case.case_number)
+        self.assertEqual([item['id'] for item in document['feed']], expected + [activity_id])
+
+    def test_activity_feed_export_requires_admin(self):
+        case = self._create_case()
+        self.api_client.force_authenticate(user=self.client_user)
+
+        response = self.api_client.get(f'/api/arbitration/cases/{case.id}/activity-feed/export/')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_stats_requires_admin(self):
         self._create_case(status='submitted')
         self.api_client.force_authenticate(user=self.client_user)
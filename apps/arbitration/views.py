@@ -7,7 +7,9 @@ from django.db import models
 from django.db.models import Q
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
 
+from .feed import CaseFeed, DEFAULT_PAGE_SIZE, InvalidCursor, MAX_PAGE_SIZE, decode_cursor, stream_json
 from .models import ArbitrationCase, ArbitrationMessage, ArbitrationActivity, Complaint
 from .serializers import (
     ArbitrationCaseSerializer,
@@ -295,54 +297,6 @@ def notify_case_participants(case, *, title, message_text, exclude_user_ids=None
             })
 
 
-def build_order_chat_feed(case):
-    """Собирает переписку по заказу для отображения администратору в арбитраже."""
-    if not case.order_id or not case.order:
-        return []
-
-    client_id = case.order.client_id
-    expert_id = case.order.expert_id
-    participant_ids = {user_id for user_id in [client_id, expert_id] if user_id}
-    if len(participant_ids) < 2:
-        return []
-
-    related_chats = Chat.objects.filter(order_id=case.order_id).filter(
-        Q(client_id=client_id, expert_id=expert_id)
-        | Q(client_id=expert_id, expert_id=client_id)
-    )
-
-    chat_messages = ChatMessage.objects.filter(
-        chat__in=related_chats,
-        sender_id__in=participant_ids,
-    ).select_related('sender', 'chat').order_by('created_at', 'id')
-
-    return [
-        {
-            'kind': 'message',
-            'id': f'chat_{chat_message.id}',
-            'sender': {
-                'id': chat_message.sender.id,
-                'first_name': chat_message.sender.first_name,
-                'last_name': chat_message.sender.last_name,
-                'username': chat_message.sender.username,
-                'display_username': getattr(chat_message.sender, 'display_username', ''),
-                'role': getattr(chat_message.sender, 'role', ''),
-            },
-            'text': chat_message.text or '',
-            'message_type': chat_message.message_type,
-            'is_internal': False,
-            'source': 'order_chat',
-            'source_label': 'Переписка по заказу',
-            'chat_id': chat_message.chat_id,
-            'chat_context_title': chat_message.chat.context_title,
-            'file_name': chat_message.file_name,
-            'file_url': chat_message.file.url if chat_message.file else None,
-            'created_at': chat_message.created_at.isoformat(),
-        }
-        for chat_message in chat_messages
-    ]
-
-
 class ArbitrationCaseViewSet(viewsets.ModelViewSet):
     """ViewSet для арбитражных дел"""
     queryset = ArbitrationCase.objects.all()
@@ -387,19 +341,22 @@ class ArbitrationCaseViewSet(viewsets.ModelViewSet):
             if assigned_to_me == 'true':
                 queryset = queryset.filter(assigned_admin=user)
             
-            return queryset.select_related(
+            queryset = queryset.select_related(
                 'plaintiff', 'defendant', 'assigned_admin', 'order',
                 'purchase', 'purchase__work', 'purchase__work__author', 'purchase__buyer',
             ).prefetch_related('assigned_users', 'messages', 'activities')
-        
-        # Обычные пользователи видят только свои дела (как истец или ответчик)
-        queryset = queryset.filter(
-            Q(plaintiff=user) | Q(defendant=user)
-        ).select_related(
-            'plaintiff', 'defendant', 'assigned_admin', 'order',
-            'purchase', 'purchase__work', 'purchase__work__author', 'purchase__buyer',
-        ).prefetch_related('messages')
-        
+        else:
+            # Обычные пользователи видят только свои дела (как истец или ответчик)
+            queryset = queryset.filter(
+                Q(plaintiff=user) | Q(defendant=user)
+            ).select_related(
+                'plaintiff', 'defendant', 'assigned_admin', 'order',
+                'purchase', 'purchase__work', 'purchase__work__author', 'purchase__buyer',
+            ).prefetch_related('messages')
+
+        if self.action in ['activity_feed', 'activity_feed_export']:
+            # Лента читает источники постранично — вся история дела не нужна.
+            queryset = queryset.prefetch_related(None)
         return queryset
     
     def perform_create(self, serializer):
@@ -1165,54 +1122,53 @@ class ArbitrationCaseViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'], url_path='activity-feed')
     def activity_feed(self, request, pk=None):
-        """Лента переписки дела: только сообщения арбитража и чат заказа.
+        """Лента переписки дела: сообщения арбитража и чат заказа, постранично.
 
-        Системные события (ArbitrationActivity) намеренно не включаются —
-        по требованию заказчика админ и стороны видят только переписку и
-        статус самого дела. Изменения статуса заказа/дела уже отражаются в
-        карточке дела, отдельные «activity»-сообщения показывать не нужно.
+        Системные события (ArbitrationActivity) по требованию заказчика в
+        ленту по умолчанию не входят — администратор может запросить их явно
+        через ``?include=activities``.
+
+        Без курсора отдаются последние ``limit`` записей; ``before`` / ``after``
+        (курсоры ``first_cursor`` / ``last_cursor`` из ответа) листают к более
+        ранним и более новым записям.
         """
         case = self.get_object()
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            before = request.query_params.get('before')
+            after = request.query_params.get('after')
+            page = CaseFeed(
+                case, request.user,
+                include_activities='activities' in request.query_params.get('include', '').split(','),
+            ).page(
+                before=decode_cursor(before) if before else None,
+                after=decode_cursor(after) if after else None,
+                limit=max(limit, 1),
+            )
+        except (ValueError, InvalidCursor):
+            return Response({'error': 'Некорректные параметры ленты'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Сообщения арбитража
-        messages = [
-            {
-                'kind': 'message',
-                'id': f'msg_{m.id}',
-                'sender': {
-                    'id': m.sender.id,
-                    'first_name': m.sender.first_name,
-                    'last_name': m.sender.last_name,
-                    'username': m.sender.username,
-                    'display_username': getattr(m.sender, 'display_username', ''),
-                    'role': getattr(m.sender, 'role', ''),
-                },
-                'text': m.text,
-                'message_type': m.message_type,
-                'is_internal': m.is_internal,
-                'created_at': m.created_at.isoformat(),
-            }
-            for m in case.messages.select_related('sender').all()
-            if not m.is_internal or request.user.role == 'admin'
-        ]
-
-        # Чат заказа — показываем только админу, как переписку сторон по сделке
-        order_chat_messages = []
-        if request.user.role == 'admin' and case.order_id:
-            order_chat_messages = build_order_chat_feed(case)
-
-        # Объединяем и сортируем по времени
-        feed = messages + order_chat_messages
-        feed.sort(key=lambda x: x['created_at'])
-
+        feed = page['feed']
         return Response({
-            'messages': messages,
-            'activities': [],  # оставлено для обратной совместимости с фронтом,
-                                # но фактически системные события в ленту не идут
-            'order_chat_messages': order_chat_messages,
-            'feed': feed,
+            **page,
+            # Разбивка по источникам — для обратной совместимости с фронтом.
+            'messages': [item for item in feed if item['id'].startswith('msg_')],
+            'activities': [item for item in feed if item['kind'] == 'activity'],
+            'order_chat_messages': [item for item in feed if item['id'].startswith('chat_')],
         })
 
+    @action(detail=True, methods=['get'], url_path='activity-feed/export')
+    def activity_feed_export(self, request, pk=None):
+        """Полная лента дела одним JSON-документом, отдаётся потоком."""
+        case = self.get_object()
+        feed = CaseFeed(case, request.user, include_activities=True)
+        response = StreamingHttpResponse(
+            stream_json(feed, {'case_id': case.id, 'case_number': case.case_number}),
+            content_type='application/json; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{case.case_number}-feed.json"'
+        return response
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -7,3 +7,11 @@ class ChatConfig(AppConfig):
     
     def ready(self):
         import apps.chat.signals  # noqa
+        from celery.signals import task_postrun
+        from django.core.signals import request_finished
+
+        from .realtime_outbox import finish
+
+        # Досылка отложенных real-time событий и учёт бюджета на запрос/задачу.
+        request_finished.connect(finish, dispatch_uid='realtime_outbox_request')
+        task_postrun.connect(finish, dispatch_uid='realtime_outbox_task', weak=False)
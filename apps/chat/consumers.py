@@ -6,17 +6,29 @@ WebSocket consumers для real-time обновлений.
 - user_{id} — персональные уведомления, обновления заказов, арбитража
 - order_{id} — обновления статуса заказа и отклики
 - arbitration_{id} — обновления арбитража
+
+MultiplexConsumer (``ws/stream/``) обслуживает все эти группы через один
+сокет с подпиской на топики (apps.chat.topics).
 """
 
 import json
+import time
+
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
 
+from apps.users import presence, ws_auth
+
+from . import typing_indicator
+from .topics import TopicError, can_subscribe, group_for, topic_for_group
+
 
 class AuthenticatedConsumer(AsyncJsonWebsocketConsumer):
     """Базовый consumer с аутентификацией через JWT token."""
 
     user = None
+    _presence_touched_at = 0.0
 
     async def connect(self):
         # Получаем токен из query string
@@ -28,30 +40,37 @@ class AuthenticatedConsumer(AsyncJsonWebsocketConsumer):
 
         if self.user and self.user.is_authenticated:
             await self.accept()
+            await self._touch_presence(force=True)
         else:
             await self.close(code=4001)
 
+    async def websocket_receive(self, message):
+        # Любое сообщение клиента (в т.ч. ping раз в 25 с) продлевает присутствие.
+        await self._touch_presence()
+        await super().websocket_receive(message)
+
+    async def websocket_disconnect(self, message):
+        await self._touch_presence(force=True)
+        await super().websocket_disconnect(message)
+
+    async def _touch_presence(self, force=False):
+        """Отметка в apps.users.presence не чаще PRESENCE_TOUCH_INTERVAL на сокет."""
+        if not self.user or not self.user.is_authenticated:
+            return
+        now = time.time()
+        if not force and now - self._presence_touched_at < presence.touch_interval():
+            return
+        self._presence_touched_at = now
+        await sync_to_async(presence.touch, thread_sensitive=False)(self.user.id, now=now)
+
     def _get_token_from_query(self, query_string: str) -> str | None:
         """Извлекает JWT токен из query string."""
         params = dict(param.split("=") for param in query_string.split("&") if "=" in param)
         return params.get("token")
 
-    @database_sync_to_async
-    def _get_user_from_token(self, token: str):
-        """Получает пользователя из JWT токена."""
-        from django.contrib.auth import get_user_model
-        from rest_framework_simplejwt.tokens import AccessToken
-        from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
-
-        User = get_user_model()
-        try:
-            access_token = AccessToken(token)
-            user_id = access_token.get("user_id")
-            if user_id:
-                return User.objects.get(id=user_id)
-        except (TokenError, InvalidToken, User.DoesNotExist):
-            pass
-        return None
+    async def _get_user_from_token(self, token: str):
+        """Пользователь из claims JWT без запроса к БД (apps.users.ws_auth)."""
+        return await ws_auth.aauthenticate(token)
 
 
 class ChatConsumer(AuthenticatedConsumer):
@@ -67,9 +86,11 @@ class ChatConsumer(AuthenticatedConsumer):
 
         # Присоединяемся к группе чата
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        typing_indicator.join(self.room_group_name, self)
 
     async def disconnect(self, close_code):
         if hasattr(self, "room_group_name"):
+            typing_indicator.leave(self.room_group_name, self)
             await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
     async def receive_json(self, content):
@@ -82,18 +103,12 @@ class ChatConsumer(AuthenticatedConsumer):
                 self.room_group_name,
                 {
                     "type": "chat_message_broadcast",
+                    "group": self.room_group_name,
                     "data": content.get("data", {}),
                 },
             )
         elif message_type == "typing":
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "typing_indicator",
-                    "user_id": self.user.id,
-                    "username": self.user.username,
-                },
-            )
+            await typing_indicator.typing(self.channel_layer, self.room_group_name, self.user)
 
     async def chat_message_broadcast(self, event):
         """Отправка нового сообщения всем участникам чата."""
@@ -114,6 +129,16 @@ class ChatConsumer(AuthenticatedConsumer):
             }
         )
 
+    async def typing_stopped(self, event):
+        """Пользователь перестал набирать текст."""
+        await self.send_json(
+            {
+                "type": "typing_stopped",
+                "user_id": event["user_id"],
+                "username": event["username"],
+            }
+        )
+
 
 class NotificationConsumer(AuthenticatedConsumer):
     """Consumer для real-time уведомлений."""
@@ -240,6 +265,7 @@ class ArbitrationConsumer(AuthenticatedConsumer):
                 self.room_group_name,
                 {
                     "type": "arbitration_message_broadcast",
+                    "group": self.room_group_name,
                     "data": content.get("data", {}),
                 },
             )
@@ -270,3 +296,100 @@ class ArbitrationConsumer(AuthenticatedConsumer):
                 "data": event["data"],
             }
         )
+
+
+class MultiplexConsumer(AuthenticatedConsumer):
+    """
+    Один сокет на клиента вместо отдельного на каждый чат/заказ/арбитраж.
+
+    Клиент управляет подписками сообщениями
+    ``{"action": "subscribe" | "unsubscribe", "topic": "chat:5"}`` и получает
+    ``subscribed``/``unsubscribed`` или ``error`` с кодом. События приходят в
+    виде ``{"topic": ..., "type": ..., ...}`` с теми же типами, что и у
+    отдельных consumers.
+    """
+
+    MAX_TOPICS = 50
+
+    # Тип события channel layer -> тип сообщения клиенту.
+    EVENT_TYPES = {
+        "chat_message_broadcast": "new_message",
+        "typing_indicator": "typing",
+        "typing_stopped": "typing_stopped",
+        "new_notification": "new_notification",
+        "notification_batch": "notification_batch",
+        "support_request_update": "support_request_update",
+        "order_status_update": "order_status_changed",
+        "new_bid": "new_bid",
+        "order_file_uploaded": "order_file_uploaded",
+        "arbitration_message_broadcast": "new_arbitration_message",
+        "arbitration_status_update": "arbitration_status_changed",
+        "arbitration_activity": "arbitration_activity",
+    }
+
+    async def connect(self):
+        self.subscriptions = {}
+        await super().connect()
+
+    async def disconnect(self, close_code):
+        for group in set(self.subscriptions.values()):
+            typing_indicator.leave(group, self)
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.subscriptions = {}
+
+    async def receive_json(self, content):
+        action = content.get("action") or content.get("type")
+        topic = content.get("topic")
+
+        if action == "ping":
+            await self.send_json({"type": "pong"})
+        elif action == "subscribe":
+            await self._subscribe(topic)
+        elif action == "unsubscribe":
+            await self._unsubscribe(topic)
+        elif action == "typing":
+            if topic not in self.subscriptions or not topic.startswith("chat:"):
+                await self._error(topic, "not_subscribed", "Нет подписки на чат")
+                return
+            await typing_indicator.typing(self.channel_layer, self.subscriptions[topic], self.user)
+        else:
+            await self._error(topic, "bad_action", f"Неизвестное действие: {action}")
+
+    async def _subscribe(self, topic):
+        if topic in self.subscriptions:
+            await self.send_json({"type": "subscribed", "topic": topic})
+            return
+        if len(self.subscriptions) >= self.MAX_TOPICS:
+            await self._error(topic, "too_many_topics", f"Не больше {self.MAX_TOPICS} подписок на сокет")
+            return
+        try:
+            allowed = await database_sync_to_async(can_subscribe)(self.user, topic)
+        except TopicError as exc:
+            await self._error(topic, exc.code, exc.detail)
+            return
+        if not allowed:
+            await self._error(topic, "forbidden", "Нет доступа")
+            return
+        group = group_for(topic, self.user)
+        self.subscriptions[topic] = group
+        await self.channel_layer.group_add(group, self.channel_name)
+        typing_indicator.join(group, self)
+        await self.send_json({"type": "subscribed", "topic": topic})
+
+    async def _unsubscribe(self, topic):
+        group = self.subscriptions.pop(topic, None)
+        if group and group not in self.subscriptions.values():
+            typing_indicator.leave(group, self)
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await self.send_json({"type": "unsubscribed", "topic": topic})
+
+    async def _error(self, topic, code, detail):
+        await self.send_json({"type": "error", "topic": topic, "code": code, "detail": detail})
+
+    async def dispatch(self, message):
+        client_type = self.EVENT_TYPES.get(message.get("type"))
+        if client_type is None:
+            await super().dispatch(message)
+            return
+        payload = {key: value for key, value in message.items() if key not in ("type", "group")}
+        await self.send_json({"topic": topic_for_group(message.get("group")), "type": client_type, **payload})
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:17
+
+import apps.chat.models
+import apps.uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0022_message_is_pinned'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.content_storage, upload_to=apps.chat.models.chat_message_file_path, verbose_name='Файл'),
+        ),
+        migrations.AlterField(
+            model_name='supportmessage',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.content_storage, upload_to='support_files/', verbose_name='Файл'),
+        ),
+    ]
@@ -6,6 +6,7 @@ from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
 from apps.orders.models import Order
+from apps.uploads.storage import content_storage
 
 
 def chat_message_file_path(instance, filename):
@@ -132,7 +133,7 @@ class Message(models.Model):
     chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name="messages")
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     text = models.TextField(blank=True)
-    file = models.FileField(upload_to=chat_message_file_path, blank=True, null=True, verbose_name="Файл")
+    file = models.FileField(upload_to=chat_message_file_path, storage=content_storage, max_length=255, blank=True, null=True, verbose_name="Файл")
     file_name = models.CharField(max_length=255, blank=True, verbose_name="Имя файла")
     
     MESSAGE_TYPES = [
@@ -278,6 +279,8 @@ class SupportMessage(models.Model):
     )
     file = models.FileField(
         upload_to='support_files/',
+        storage=content_storage,
+        max_length=255,
         null=True,
         blank=True,
         verbose_name='Файл'
@@ -0,0 +1,115 @@
+"""
+Транзакционный outbox real-time событий.
+
+``send_to_group``/``notify_*``, вызванные внутри ``transaction.atomic()``,
+не уходят в channel layer сразу: событие регистрируется через
+``transaction.on_commit`` (откат транзакции или savepoint'а его
+отбрасывает), а после коммита подтверждённые события отправляются одной
+пачкой (``send_many`` — один мост ``async_to_sync`` и параллельные
+``group_send``). Пачку отправляет последнее зарегистрированное
+подтверждение. Повторы одного события — та же группа, тип и
+``data["id"]`` — схлопываются, уходит последнее состояние.
+
+Если последнее подтверждение не выполнилось (его savepoint откатился или
+отправку прервало исключение в другом on_commit), подтверждённые события
+досылаются по окончании HTTP-запроса или Celery-задачи (``finish``).
+
+На каждый запрос считается число событий; при превышении
+``REALTIME_EVENT_BUDGET`` пишется предупреждение.
+"""
+import logging
+from collections import Counter
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_BUDGET = 50
+
+_state = Local()
+_stats = Counter()
+
+
+def _pending():
+    if not hasattr(_state, 'registered'):
+        _state.registered = 0
+        _state.ready = []
+        _state.request_events = 0
+    return _state
+
+
+def stats():
+    """Счётчики процесса: buffered / sent / collapsed / over_budget."""
+    return dict(_stats)
+
+
+def _key(event):
+    group_name, event_type, data = event
+    object_id = data.get('id') if isinstance(data, dict) else None
+    return (group_name, event_type, object_id) if object_id is not None else None
+
+
+def collapse(events):
+    """Оставляет последнее состояние каждого (группа, тип, id); порядок — по последнему вхождению."""
+    latest = {}
+    for index, event in enumerate(events):
+        latest[_key(event) or index] = (index, event)
+    return [event for _index, event in sorted(latest.values(), key=lambda item: item[0])]
+
+
+def enqueue(events, send):
+    """
+    Откладывает ``events`` до коммита текущей транзакции; вне транзакции —
+    отправляет сразу через ``send(events)``.
+    """
+    state = _pending()
+    state.request_events += len(events)
+    if not connection.in_atomic_block:
+        send(events)
+        return
+
+    _stats['buffered'] += len(events)
+    state.registered += 1
+    # Подтверждение привязано к текущим savepoint'ам: при их откате Django
+    # выбросит его вместе с событиями.
+    transaction.on_commit(_confirm(state.registered, events, send))
+
+
+def _confirm(sequence, events, send):
+    def confirm():
+        state = _pending()
+        state.ready.extend(events)
+        # on_commit выполняются в порядке регистрации: последнее
+        # подтверждение идёт после всех остальных и отправляет пачку.
+        if sequence >= state.registered:
+            flush(send)
+
+    return confirm
+
+
+def flush(send=None):
+    """Отправляет подтверждённые события одной пачкой."""
+    state = _pending()
+    events, state.ready, state.registered = state.ready, [], 0
+    if not events:
+        return
+    batch = collapse(events)
+    _stats['collapsed'] += len(events) - len(batch)
+    _stats['sent'] += len(batch)
+    if send is None:
+        from .websocket_utils import _send_now as send
+    send(batch)
+
+
+def finish(**kwargs):
+    """Конец запроса/задачи: досылает остатки и проверяет бюджет событий."""
+    state = _pending()
+    if state.ready and not connection.in_atomic_block:
+        flush()
+    budget = int(getattr(settings, 'REALTIME_EVENT_BUDGET', DEFAULT_EVENT_BUDGET))
+    if state.request_events > budget:
+        _stats['over_budget'] += 1
+        logger.warning("[WS] %d real-time событий за запрос (бюджет %d)", state.request_events, budget)
+    state.request_events = 0
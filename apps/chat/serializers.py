@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import Chat, Message, SupportChat, SupportMessage, ContactViolationLog, ChatPin
 from .services import readable_messages_for_chat, unread_messages_for_user
+from apps.uploads.serializers import ThumbnailURLField
+from apps.uploads.thumbnails import thumbnail_url
 from apps.users.serializers import PublicUserProfileSerializer
 
 
@@ -15,10 +17,11 @@ class MessageSerializer(serializers.ModelSerializer):
     sender = PublicUserProfileSerializer(read_only=True)
     is_mine = serializers.SerializerMethodField()
     file_url = serializers.FileField(source='file', read_only=True)
+    file_thumb_url = ThumbnailURLField('chat', source='file')
     
     class Meta:
         model = Message
-        fields = ['id', 'text', 'file', 'file_url', 'file_name', 'message_type', 'offer_data', 
+        fields = ['id', 'text', 'file', 'file_url', 'file_thumb_url', 'file_name', 'message_type', 'offer_data', 
                   'sender', 'created_at', 'is_read', 'is_pinned', 'is_mine']
     
     def get_is_mine(self, obj):
@@ -89,7 +92,8 @@ class ChatListSerializer(serializers.ModelSerializer):
                 'sender_id': last_message.sender.id,
                 'created_at': last_message.created_at,
                 'file_name': last_message.file_name,
-                'file_url': last_message.file.url if last_message.file else None
+                'file_url': last_message.file.url if last_message.file else None,
+                'file_thumb_url': thumbnail_url(last_message.file, 'chat'),
             }
         return None
     
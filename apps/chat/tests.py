@@ -7,18 +7,27 @@ a 400. After fixing the column default, accepting an individual offer must
 create the order and return 200.
 """
 
+import asyncio
 from datetime import timedelta
+from unittest import mock
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase, override_settings
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from apps.arbitration.models import ArbitrationCase
 from apps.catalog.models import Subject, WorkType
+from apps.chat.consumers import MultiplexConsumer
 from apps.chat.models import Chat, Message
+from apps.chat import realtime_outbox, typing_indicator, websocket_utils
+from apps.chat.websocket_utils import notify_chat_message, notify_new_notification
 from apps.chat.services import ContactDetectionService
 from apps.orders.models import Order, Transaction, TransactionType
 from apps.wallet.services import WalletService
@@ -679,3 +688,300 @@ class ArbitrationStatementModerationTests(TestCase):
         self.assertTrue(client.is_banned_for_contacts)
         self.assertTrue(chat.is_frozen)
         self.assertIn('контакт', chat.frozen_reason.lower())
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class MultiplexConsumerTests(TransactionTestCase):
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        self.client_user = User.objects.create_user(
+            username="mux_client", email="mux_client@example.com", password="pwd", role="client",
+        )
+        self.expert_user = User.objects.create_user(
+            username="mux_expert", email="mux_expert@example.com", password="pwd", role="expert",
+        )
+        self.stranger = User.objects.create_user(
+            username="mux_stranger", email="mux_stranger@example.com", password="pwd", role="client",
+        )
+        self.chat = Chat.objects.create(client=self.client_user, expert=self.expert_user)
+        self.chat.participants.set([self.client_user, self.expert_user])
+        self.token = str(AccessToken.for_user(self.client_user))
+        self.stranger_token = str(AccessToken.for_user(self.stranger))
+        # websocket_utils кэширует слой с момента импорта; берём слой из override_settings.
+        patcher = mock.patch.object(websocket_utils, "channel_layer", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _connect(self, token):
+        communicator = WebsocketCommunicator(MultiplexConsumer.as_asgi(), f"/ws/stream/?token={token}")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def test_one_socket_receives_events_for_all_subscribed_topics(self):
+        async def scenario():
+            communicator = await self._connect(self.token)
+            for topic in (f"chat:{self.chat.id}", "notifications"):
+                await communicator.send_json_to({"action": "subscribe", "topic": topic})
+                self.assertEqual(await communicator.receive_json_from(), {"type": "subscribed", "topic": topic})
+
+            layer = get_channel_layer()
+            await layer.group_send(f"chat_{self.chat.id}", {
+                "type": "chat_message_broadcast", "group": f"chat_{self.chat.id}", "data": {"id": 1},
+            })
+            await layer.group_send(f"user_{self.client_user.id}", {
+                "type": "new_notification", "group": f"user_{self.client_user.id}", "data": {"id": 2},
+            })
+            first = await communicator.receive_json_from()
+            second = await communicator.receive_json_from()
+
+            await communicator.send_json_to({"action": "unsubscribe", "topic": f"chat:{self.chat.id}"})
+            await communicator.receive_json_from()
+            await layer.group_send(f"chat_{self.chat.id}", {
+                "type": "chat_message_broadcast", "group": f"chat_{self.chat.id}", "data": {"id": 3},
+            })
+            silent = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return first, second, silent
+
+        first, second, silent = async_to_sync(scenario)()
+        self.assertEqual(first, {"topic": f"chat:{self.chat.id}", "type": "new_message", "data": {"id": 1}})
+        self.assertEqual(second, {"topic": "notifications", "type": "new_notification", "data": {"id": 2}})
+        self.assertTrue(silent)
+
+    def test_topics_are_authorized_on_the_server(self):
+        async def scenario():
+            communicator = await self._connect(self.stranger_token)
+            replies = []
+            for topic in (f"chat:{self.chat.id}", "order:999999", "chat:abc"):
+                await communicator.send_json_to({"action": "subscribe", "topic": topic})
+                replies.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return replies
+
+        replies = async_to_sync(scenario)()
+        self.assertEqual([reply["code"] for reply in replies], ["forbidden", "forbidden", "bad_topic"])
+
+    def test_send_helpers_tag_events_with_their_group(self):
+        async def scenario():
+            communicator = await self._connect(self.token)
+            await communicator.send_json_to({"action": "subscribe", "topic": "notifications"})
+            await communicator.receive_json_from()
+
+            await sync_to_async(notify_new_notification)(self.client_user.id, {"id": 5})
+            await sync_to_async(notify_chat_message)(self.chat.id, {"id": 6})  # нет подписки — не приходит
+            event = await communicator.receive_json_from()
+            silent = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return event, silent
+
+        event, silent = async_to_sync(scenario)()
+        self.assertEqual(event, {"topic": "notifications", "type": "new_notification", "data": {"id": 5}})
+        self.assertTrue(silent)
+
+    def test_messages_from_legacy_socket_reach_multiplex_with_topic(self):
+        from channels.routing import URLRouter
+
+        from apps.chat.routing import get_websocket_urlpatterns
+
+        async def scenario():
+            legacy = WebsocketCommunicator(
+                URLRouter(get_websocket_urlpatterns()), f"/ws/chat/{self.chat.id}/?token={self.token}",
+            )
+            connected, _ = await legacy.connect()
+            self.assertTrue(connected)
+            stream = await self._connect(self.token)
+            await stream.send_json_to({"action": "subscribe", "topic": f"chat:{self.chat.id}"})
+            await stream.receive_json_from()
+
+            await legacy.send_json_to({"type": "chat_message", "data": {"id": 7}})
+            event = await stream.receive_json_from()
+            await legacy.disconnect()
+            await stream.disconnect()
+            return event
+
+        event = async_to_sync(scenario)()
+        self.assertEqual(event, {"topic": f"chat:{self.chat.id}", "type": "new_message", "data": {"id": 7}})
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    TYPING_THROTTLE_SECONDS=0.2,
+    TYPING_STOP_SECONDS=0.5,
+)
+class TypingThrottleTests(TransactionTestCase):
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        self.client_user = User.objects.create_user(
+            username="typing_client", email="typing_client@example.com", password="pwd", role="client",
+        )
+        self.expert_user = User.objects.create_user(
+            username="typing_expert", email="typing_expert@example.com", password="pwd", role="expert",
+        )
+        self.chat = Chat.objects.create(client=self.client_user, expert=self.expert_user)
+        self.chat.participants.set([self.client_user, self.expert_user])
+        self.tokens = [str(AccessToken.for_user(u)) for u in (self.client_user, self.expert_user)]
+        self.topic = f"chat:{self.chat.id}"
+
+    async def _subscribed(self, token):
+        communicator = WebsocketCommunicator(MultiplexConsumer.as_asgi(), f"/ws/stream/?token={token}")
+        await communicator.connect()
+        await communicator.send_json_to({"action": "subscribe", "topic": self.topic})
+        await communicator.receive_json_from()
+        return communicator
+
+    async def _burst(self, typist, keystrokes):
+        for _ in range(keystrokes):
+            await typist.send_json_to({"action": "typing", "topic": self.topic})
+        await asyncio.sleep(0.05)
+
+    async def _drain(self, communicator, timeout=1.5):
+        events = []
+        while not await communicator.receive_nothing(timeout=0.7):
+            events.append((await communicator.receive_json_from(timeout))["type"])
+        return events
+
+    def test_burst_is_reduced_to_leading_trailing_and_stop(self):
+        async def scenario():
+            typist, reader = await self._subscribed(self.tokens[0]), await self._subscribed(self.tokens[1])
+            before = typing_indicator.stats()
+            await self._burst(typist, 10)
+            events = await self._drain(reader)
+            await typist.disconnect()
+            await reader.disconnect()
+            return events, before, typing_indicator.stats()
+
+        events, before, after = async_to_sync(scenario)()
+        self.assertEqual(events, ["typing", "typing", "typing_stopped"])
+        self.assertEqual(after.get("suppressed", 0) - before.get("suppressed", 0), 9)
+
+    def test_local_transport_skips_channel_layer(self):
+        from channels.layers import InMemoryChannelLayer
+
+        async def scenario():
+            typist, reader = await self._subscribed(self.tokens[0]), await self._subscribed(self.tokens[1])
+            with mock.patch.object(InMemoryChannelLayer, "group_send") as group_send:
+                await self._burst(typist, 1)
+                events = await self._drain(reader)
+            await typist.disconnect()
+            await reader.disconnect()
+            return events, group_send.call_count
+
+        with override_settings(TYPING_TRANSPORT="local"):
+            events, layer_sends = async_to_sync(scenario)()
+        self.assertEqual(events, ["typing", "typing_stopped"])
+        self.assertEqual(layer_sends, 0)
+
+
+class WebSocketSendTests(TestCase):
+    def setUp(self):
+        from channels.layers import InMemoryChannelLayer
+
+        self.layer = InMemoryChannelLayer()
+        patcher = mock.patch.object(websocket_utils, "channel_layer", self.layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _listen(self, *groups):
+        channel = await self.layer.new_channel()
+        for group in groups:
+            await self.layer.group_add(group, channel)
+        return channel
+
+    def test_async_helpers_send_without_bridge(self):
+        async def scenario():
+            channel = await self._listen("chat_1", "order_2")
+            with mock.patch.object(websocket_utils, "async_to_sync") as bridge:
+                await websocket_utils.anotify_chat_message(1, {"id": 10})
+                await websocket_utils.asend_many([("order_2", "new_bid", {"id": 11})])
+            received = [await self.layer.receive(channel) for _ in range(2)]
+            return received, bridge.call_count
+
+        received, bridges = async_to_sync(scenario)()
+        self.assertEqual(bridges, 0)
+        self.assertEqual(
+            sorted((m["group"], m["type"], m["data"]["id"]) for m in received),
+            [("chat_1", "chat_message_broadcast", 10), ("order_2", "new_bid", 11)],
+        )
+
+    def test_send_many_uses_one_bridge_for_the_batch(self):
+        channel = async_to_sync(self._listen)("user_1", "user_2", "user_3")
+        original = websocket_utils.async_to_sync
+        with mock.patch.object(websocket_utils, "async_to_sync", side_effect=original) as bridge, \
+                self.captureOnCommitCallbacks(execute=True):
+            websocket_utils.send_many([(f"user_{i}", "new_notification", {"id": i}) for i in (1, 2, 3)])
+
+        self.assertEqual(bridge.call_count, 1)
+        received = [async_to_sync(self.layer.receive)(channel) for _ in range(3)]
+        self.assertEqual(sorted(m["data"]["id"] for m in received), [1, 2, 3])
+        self.assertEqual(websocket_utils.anotify_new_notification.__name__, "anotify_new_notification")
+
+
+class RealtimeOutboxTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(websocket_utils, "_send_now")
+        self.send_now = patcher.start()
+        self.addCleanup(patcher.stop)
+        realtime_outbox.flush(send=lambda events: None)
+
+    def _sent(self):
+        return [event for call in self.send_now.call_args_list for event in call.args[0]]
+
+    def test_events_wait_for_commit_and_collapse(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            websocket_utils.notify_order_status(7, {"id": 7, "status": "in_progress"})
+            websocket_utils.notify_new_notification(3, {"id": 1})
+            websocket_utils.notify_order_status(7, {"id": 7, "status": "review"})
+            self.send_now.assert_not_called()
+
+        self.assertEqual(self.send_now.call_count, 1)
+        self.assertEqual(self._sent(), [
+            ("user_3", "new_notification", {"id": 1}),
+            ("order_7", "order_status_update", {"id": 7, "status": "review"}),
+        ])
+
+    def test_rolled_back_savepoint_drops_its_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    websocket_utils.notify_new_bid(5, {"id": 1})
+                    raise ValueError
+            except ValueError:
+                pass
+            websocket_utils.notify_new_bid(5, {"id": 2})
+
+        self.assertEqual(self._sent(), [("order_5", "new_bid", {"id": 2})])
+
+        # Последнее подтверждение откатилось вместе с savepoint'ом —
+        # подтверждённые события досылаются в конце запроса.
+        self.send_now.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            websocket_utils.notify_new_bid(6, {"id": 3})
+            try:
+                with transaction.atomic():
+                    websocket_utils.notify_new_bid(6, {"id": 4})
+                    raise ValueError
+            except ValueError:
+                pass
+        self.send_now.assert_not_called()
+        with mock.patch.object(realtime_outbox.connection, "in_atomic_block", False):
+            realtime_outbox.finish()
+        self.assertEqual(self._sent(), [("order_6", "new_bid", {"id": 3})])
+
+    def test_outbox_uses_only_public_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            websocket_utils.notify_new_bid(7, {"id": 1})
+            websocket_utils.notify_new_bid(7, {"id": 2})
+        # Ровно по одному transaction.on_commit на событие, без записей в run_on_commit в обход.
+        self.assertEqual(len(callbacks), 2)
+
+    @override_settings(REALTIME_EVENT_BUDGET=2)
+    def test_event_budget_is_reported_per_request(self):
+        before = realtime_outbox.stats().get("over_budget", 0)
+        for i in range(3):
+            websocket_utils.notify_user(1, "support_request_update", {"id": i})
+        with self.assertLogs("apps.chat.realtime_outbox", "WARNING"):
+            realtime_outbox.finish()
+        self.assertEqual(realtime_outbox.stats()["over_budget"], before + 1)
@@ -0,0 +1,59 @@
+"""WebSocket fan-out: cost of the async_to_sync bridge per event.
+
+The benchmark is opt-in:
+    WS_SEND_BENCHMARK=1 python manage.py test apps.chat.tests_benchmark -v2
+"""
+import os
+import time
+import unittest
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.test import SimpleTestCase
+
+from apps.chat import websocket_utils
+
+EVENTS = 2_000
+BATCH = 20
+
+
+@unittest.skipUnless(os.getenv('WS_SEND_BENCHMARK'), 'set WS_SEND_BENCHMARK=1 to run')
+class SendToGroupBenchmark(SimpleTestCase):
+    def setUp(self):
+        # Группы без участников: меряется накладная отправки, а не доставка.
+        patcher = mock.patch.object(websocket_utils, 'channel_layer', InMemoryChannelLayer())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _events(self):
+        return [(f'user_{i % 50}', 'new_notification', {'id': i}) for i in range(EVENTS)]
+
+    def test_bridge_overhead(self):
+        events = self._events()
+
+        started = time.perf_counter()
+        for event in events:
+            websocket_utils.send_to_group(*event)
+        per_event = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for start in range(0, EVENTS, BATCH):
+            websocket_utils.send_many(events[start:start + BATCH])
+        batched = time.perf_counter() - started
+
+        async def native():
+            started = time.perf_counter()
+            for event in events:
+                await websocket_utils.asend_to_group(*event)
+            return time.perf_counter() - started
+
+        native_time = async_to_sync(native)()
+
+        print(
+            f"\n{EVENTS} events: send_to_group {per_event / EVENTS * 1e6:.0f} µs/event, "
+            f"send_many(×{BATCH}) {batched / EVENTS * 1e6:.0f} µs/event, "
+            f"asend_to_group {native_time / EVENTS * 1e6:.0f} µs/event"
+        )
+        self.assertLess(batched, per_event)
+        self.assertLess(native_time, per_event)
@@ -0,0 +1,92 @@
+"""
+Топики мультиплексированного WebSocket (``ws/stream/``).
+
+Топик — то, на что клиент подписывается внутри одного сокета:
+
+- ``notifications`` — персональная группа ``user_{id}``
+- ``chat:<id>`` — группа ``chat_{id}``
+- ``order:<id>`` — группа ``order_{id}``
+- ``case:<id>`` — группа ``arbitration_{id}``
+
+Право на подписку проверяется на сервере так же, как доступ к объекту
+через REST API.
+"""
+from django.db.models import Q
+
+STAFF_ROLES = ('admin', 'director')
+
+_KIND_TO_PREFIX = {
+    'chat': 'chat',
+    'order': 'order',
+    'case': 'arbitration',
+}
+_PREFIX_TO_KIND = {prefix: kind for kind, prefix in _KIND_TO_PREFIX.items()}
+
+
+class TopicError(ValueError):
+    """Неизвестный или недоступный топик; ``code`` уходит клиенту."""
+
+    def __init__(self, code, detail):
+        super().__init__(detail)
+        self.code = code
+        self.detail = detail
+
+
+def parse_topic(topic):
+    """``'chat:5'`` -> ``('chat', 5)``, ``'notifications'`` -> ``('notifications', None)``."""
+    if topic == 'notifications':
+        return 'notifications', None
+    kind, _, raw_id = str(topic or '').partition(':')
+    if kind not in _KIND_TO_PREFIX or not raw_id.isdigit():
+        raise TopicError('bad_topic', f'Неизвестный топик: {topic}')
+    return kind, int(raw_id)
+
+
+def group_for(topic, user):
+    kind, object_id = parse_topic(topic)
+    if kind == 'notifications':
+        return f'user_{user.id}'
+    return f'{_KIND_TO_PREFIX[kind]}_{object_id}'
+
+
+def topic_for_group(group):
+    """Обратное преобразование для событий из channel layer."""
+    prefix, _, object_id = (group or '').rpartition('_')
+    if prefix == 'user':
+        return 'notifications'
+    kind = _PREFIX_TO_KIND.get(prefix)
+    return f'{kind}:{object_id}' if kind else None
+
+
+def _is_staff(user):
+    return getattr(user, 'role', None) in STAFF_ROLES or user.is_staff
+
+
+def can_subscribe(user, topic):
+    """
+    Синхронная проверка доступа (вызывать через database_sync_to_async).
+    ``user`` — модель или apps.users.ws_auth.SnapshotUser, поэтому фильтры по pk.
+    """
+    kind, object_id = parse_topic(topic)
+    if kind == 'notifications':
+        return True
+    if _is_staff(user):
+        return True
+    if kind == 'chat':
+        from .models import Chat
+
+        return Chat.objects.filter(
+            Q(participants=user.pk) | Q(client=user.pk) | Q(expert=user.pk), pk=object_id,
+        ).exists()
+    if kind == 'order':
+        from apps.orders.models import Order
+
+        return Order.objects.filter(
+            Q(client=user.pk) | Q(expert=user.pk) | Q(bids__expert=user.pk), pk=object_id,
+        ).exists()
+    from apps.arbitration.models import ArbitrationCase
+
+    return ArbitrationCase.objects.filter(
+        Q(plaintiff=user.pk) | Q(defendant=user.pk) | Q(assigned_admin=user.pk) | Q(assigned_users=user.pk),
+        pk=object_id,
+    ).exists()
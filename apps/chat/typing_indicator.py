@@ -0,0 +1,134 @@
+"""
+Индикатор набора текста: троттлинг и доставка эфемерных событий.
+
+Клиент шлёт ``typing`` на каждое нажатие клавиши, а участникам чата
+достаточно знать «печатает / перестал». На пару (пользователь, чат) в
+процессе держится окно ``TYPING_THROTTLE_SECONDS``:
+
+- первое событие окна уходит сразу (leading edge);
+- остальные подавляются, но если они были — по окончании окна уходит ещё
+  одно (trailing edge), и окно открывается заново;
+- через ``TYPING_STOP_SECONDS`` без событий уходит ``typing_stopped``.
+
+Эфемерные события не нужно ни сохранять, ни гарантированно доставлять. При
+``TYPING_TRANSPORT = 'local'`` (один ASGI-процесс) они раздаются
+consumers этого процесса напрямую, минуя Redis; при ``'layer'`` идут через
+channel layer, как остальные события.
+"""
+import asyncio
+import logging
+import weakref
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THROTTLE_SECONDS = 3
+DEFAULT_STOP_SECONDS = 6
+
+_stats = Counter()
+_local_members = {}
+_typists = {}
+
+
+def throttle_seconds():
+    return float(getattr(settings, 'TYPING_THROTTLE_SECONDS', DEFAULT_THROTTLE_SECONDS))
+
+
+def stop_seconds():
+    return float(getattr(settings, 'TYPING_STOP_SECONDS', DEFAULT_STOP_SECONDS))
+
+
+def local_transport():
+    return getattr(settings, 'TYPING_TRANSPORT', 'layer') == 'local'
+
+
+def stats():
+    """Счётчики процесса: received / sent / suppressed / stopped."""
+    return dict(_stats)
+
+
+def join(group, consumer):
+    """Consumer этого процесса слушает группу (для локальной доставки)."""
+    _local_members.setdefault(group, weakref.WeakSet()).add(consumer)
+
+
+def leave(group, consumer):
+    members = _local_members.get(group)
+    if members is not None:
+        members.discard(consumer)
+        if not members:
+            _local_members.pop(group, None)
+
+
+def event(group, event_type, user_id, username):
+    return {"type": event_type, "group": group, "user_id": user_id, "username": username}
+
+
+async def deliver(channel_layer, group, message):
+    _stats['sent'] += 1
+    if local_transport():
+        for consumer in list(_local_members.get(group, ())):
+            try:
+                await consumer.dispatch(message)
+            except Exception:
+                logger.debug("Не удалось доставить %s в %s", message["type"], group, exc_info=True)
+        return
+    await channel_layer.group_send(group, message)
+
+
+class _Typist:
+    def __init__(self, channel_layer, group, user_id, username):
+        self.channel_layer = channel_layer
+        self.group = group
+        self.user_id = user_id
+        self.username = username
+        self.pending = False
+        self.window = None
+        self.stop = None
+
+    def _later(self, delay, callback):
+        loop = asyncio.get_running_loop()
+        return loop.call_later(delay, lambda: asyncio.ensure_future(callback()))
+
+    async def _emit(self, event_type):
+        await deliver(self.channel_layer, self.group, event(self.group, event_type, self.user_id, self.username))
+
+    async def keystroke(self):
+        _stats['received'] += 1
+        if self.stop is not None:
+            self.stop.cancel()
+        self.stop = self._later(stop_seconds(), self._stopped)
+        if self.window is None:
+            await self._open_window()
+        else:
+            self.pending = True
+            _stats['suppressed'] += 1
+
+    async def _open_window(self):
+        self.pending = False
+        self.window = self._later(throttle_seconds(), self._window_closed)
+        await self._emit("typing_indicator")
+
+    async def _window_closed(self):
+        self.window = None
+        if self.pending:
+            await self._open_window()
+
+    async def _stopped(self):
+        if self.window is not None:
+            self.window.cancel()
+        _typists.pop((self.group, self.user_id), None)
+        _stats['stopped'] += 1
+        await self._emit("typing_stopped")
+
+
+async def typing(channel_layer, group, user):
+    """Событие набора текста от ``user`` в группе чата ``group``."""
+    key = (group, user.id)
+    typist = _typists.get(key)
+    if typist is None:
+        typist = _typists[key] = _Typist(channel_layer, group, user.id, user.username)
+    await typist.keystroke()
+
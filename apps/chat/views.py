@@ -6,6 +6,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db.models import Q, Max, Count, Sum, Prefetch
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction, IntegrityError
 from .models import Chat, Message, SupportChat, SupportMessage, ChatPin
 from .serializers import ChatListSerializer, ChatDetailSerializer, MessageSerializer, SupportChatSerializer, SupportMessageSerializer
@@ -14,7 +15,10 @@ from .websocket_utils import notify_chat_message, notify_typing
 from apps.orders.models import Order, OrderFile, Transaction, TransactionType
 from apps.notifications.models import NotificationType
 from apps.notifications.services import NotificationService
+from apps.core.file_delivery import serve_file
 from apps.core.safe_notify import safe_call
+from apps.uploads.models import UploadSession
+from apps.uploads.services import open_upload
 from apps.wallet.services import InsufficientFunds, WalletService
 from apps.wallet.policy import order_quote, money
 from decimal import Decimal, InvalidOperation
@@ -125,6 +129,17 @@ def _contact_ban_other_response(user, action_detail='Действие'):
     )
 
 
+def _uploaded_by_chunks(request):
+    """Файл, загруженный по частям (``upload_id`` из /api/uploads/), вместо multipart."""
+    upload_id = request.data.get('upload_id')
+    if not upload_id:
+        return None, None
+    try:
+        return open_upload(upload_id, request.user, UploadSession.Purpose.CHAT), None
+    except DjangoValidationError as exc:
+        return None, Response({'detail': ' '.join(exc.messages)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class ChatViewSet(viewsets.ModelViewSet):
     """
     ViewSet РґР»СЏ СѓРїСЂР°РІР»РµРЅРёСЏ РѕР±С‹С‡РЅС‹РјРё С‡Р°С‚Р°РјРё РјРµР¶РґСѓ РєР»РёРµРЅС‚Р°РјРё Рё СЌРєСЃРїРµСЂС‚Р°РјРё.
@@ -249,6 +264,20 @@ class ChatViewSet(viewsets.ModelViewSet):
         if order and order.expert:
             chat.participants.add(order.expert)
 
+    @action(detail=True, methods=['get'], url_path=r'messages/(?P<message_id>\d+)/file')
+    def message_file(self, request, pk=None, message_id=None):
+        """Вложение сообщения чата (только для участников чата)."""
+        chat = self.get_object()
+        message = get_object_or_404(Message, pk=message_id, chat=chat)
+        if not message.file:
+            return Response({'detail': 'Файл недоступен'}, status=status.HTTP_404_NOT_FOUND)
+        return serve_file(
+            request,
+            message.file,
+            filename=message.file_name or None,
+            as_attachment=request.query_params.get('inline') != '1',
+        )
+
     @action(detail=True, methods=['post'])
     def send_message(self, request, pk=None):
         """РћС‚РїСЂР°РІРєР° СЃРѕРѕР±С‰РµРЅРёСЏ РІ С‡Р°С‚ (С‚РµРєСЃС‚ Рё/РёР»Рё С„Р°Р№Р»). Р”Р»СЏ С„Р°Р№Р»Р° вЂ” multipart/form-data: text, file."""
@@ -322,6 +351,11 @@ class ChatViewSet(viewsets.ModelViewSet):
             message_type = request.data.get('message_type', 'text')
             offer_data = request.data.get('offer_data')
 
+        if not uploaded_file:
+            uploaded_file, error = _uploaded_by_chunks(request)
+            if error is not None:
+                return error
+
         if not text and not uploaded_file and not (message_type in ['offer', 'work_offer'] and offer_data):
             return Response(
                 {'detail': 'РЈРєР°Р¶РёС‚Рµ С‚РµРєСЃС‚ СЃРѕРѕР±С‰РµРЅРёСЏ, РїСЂРёРєСЂРµРїРёС‚Рµ С„Р°Р№Р» РёР»Рё СЃРѕР·РґР°Р№С‚Рµ РїСЂРµРґР»РѕР¶РµРЅРёРµ.'},
@@ -580,6 +614,11 @@ class ChatViewSet(viewsets.ModelViewSet):
             uploaded_file = None
             text = (request.data.get('text') or '').strip()
 
+        if not uploaded_file:
+            uploaded_file, error = _uploaded_by_chunks(request)
+            if error is not None:
+                return error
+
         if not uploaded_file:
             return Response({'detail': 'file РѕР±СЏР·Р°С‚РµР»РµРЅ'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1809,6 +1848,15 @@ class SupportChatViewSet(viewsets.ModelViewSet):
             })
         
         return Response(messages_data)
+
+    @action(detail=True, methods=['get'], url_path=r'messages/(?P<message_id>\d+)/file')
+    def message_file(self, request, pk=None, message_id=None):
+        """Вложение сообщения чата поддержки."""
+        chat = self.get_object()
+        message = get_object_or_404(SupportMessage, pk=message_id, chat=chat)
+        if not message.file:
+            return Response({'detail': 'Файл недоступен'}, status=status.HTTP_404_NOT_FOUND)
+        return serve_file(request, message.file, as_attachment=request.query_params.get('inline') != '1')
     
     @action(detail=True, methods=['post'])
     def create_ticket(self, request, pk=None):
@@ -2,12 +2,25 @@
 Утилиты для отправки WebSocket уведомлений.
 
 Используются в views, signals, services для real-time обновлений.
+
+У каждого ``notify_*`` есть асинхронная пара ``anotify_*`` — для consumers,
+бота и другого кода, уже работающего в event loop: она вызывает
+``group_send`` напрямую, без ``async_to_sync`` (переключения потока и нового
+моста в event loop на каждое событие). Несколько событий из синхронного
+кода лучше отправлять одним ``send_many`` — один мост на всю пачку.
+
+Синхронные отправки внутри транзакции откладываются до коммита и уходят
+пачкой (apps.chat.realtime_outbox); индикатор набора — эфемерный и идёт сразу.
 """
 
+import asyncio
 import logging
+
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
+from . import realtime_outbox
+
 logger = logging.getLogger(__name__)
 
 channel_layer = get_channel_layer()
@@ -22,104 +35,181 @@ def _ensure_channel_layer():
     return channel_layer
 
 
-def send_to_group(group_name: str, event_type: str, data: dict):
-    """Отправить событие в группу WebSocket."""
+def _message(group_name: str, event_type: str, data: dict):
+    return group_name, {"type": event_type, "group": group_name, "data": data}
+
+
+async def _asend_messages(messages):
     layer = _ensure_channel_layer()
     if not layer:
-        logger.error("[WS] channel_layer unavailable — cannot send to group %s", group_name)
+        logger.error("[WS] channel_layer unavailable — cannot send %d event(s)", len(messages))
         return
 
+    results = await asyncio.gather(
+        *(layer.group_send(group_name, message) for group_name, message in messages),
+        return_exceptions=True,
+    )
+    for (group_name, message), result in zip(messages, results):
+        if isinstance(result, Exception):
+            logger.error("[WS] Failed to send %s to group %s: %s", message["type"], group_name, result)
+        else:
+            logger.debug("[WS] Sent %s to group %s", message["type"], group_name)
+
+
+async def asend_to_group(group_name: str, event_type: str, data: dict):
+    """Отправить событие в группу WebSocket из асинхронного кода."""
+    await _asend_messages([_message(group_name, event_type, data)])
+
+
+async def asend_many(events):
+    """Отправить пачку событий ``(group_name, event_type, data)`` параллельно."""
+    await _asend_messages([_message(*event) for event in events])
+
+
+def send_many(events):
+    """
+    Синхронная отправка пачки событий ``(group_name, event_type, data)``.
+    Внутри транзакции события ждут коммита (apps.chat.realtime_outbox).
+    """
+    events = list(events)
+    if events:
+        realtime_outbox.enqueue(events, _send_now)
+
+
+def _send_now(events):
+    """Отправка одним вызовом ``async_to_sync``."""
+    messages = [_message(*event) for event in events]
+    if not messages:
+        return
+    if not _ensure_channel_layer():
+        logger.error("[WS] channel_layer unavailable — cannot send %d event(s)", len(messages))
+        return
     try:
-        async_to_sync(layer.group_send)(
-            group_name,
-            {
-                "type": event_type,
-                "data": data,
-            },
-        )
-        logger.debug("[WS] Sent %s to group %s", event_type, group_name)
+        async_to_sync(_asend_messages)(messages)
     except Exception as exc:
-        logger.error("[WS] Failed to send %s to group %s: %s", event_type, group_name, exc)
+        logger.error("[WS] Failed to send %d event(s): %s", len(messages), exc)
+
+
+def send_to_group(group_name: str, event_type: str, data: dict):
+    """Отправить событие в группу WebSocket."""
+    send_many([(group_name, event_type, data)])
 
 
 def notify_chat_message(chat_id: int, message_data: dict):
     """Отправить уведомление о новом сообщении в чате."""
-    send_to_group(
-        f"chat_{chat_id}",
-        "chat_message_broadcast",
-        message_data,
-    )
-
+    send_to_group(f"chat_{chat_id}", "chat_message_broadcast", message_data)
 
-def notify_typing(chat_id: int, user_id: int, username: str):
-    """Отправить индикатор набора текста."""
-    if not _ensure_channel_layer():
-        return
 
-    async_to_sync(channel_layer.group_send)(
-        f"chat_{chat_id}",
-        {
-            "type": "typing_indicator",
-            "user_id": user_id,
-            "username": username,
-        },
-    )
+async def anotify_chat_message(chat_id: int, message_data: dict):
+    """Асинхронный вариант notify_chat_message."""
+    await asend_to_group(f"chat_{chat_id}", "chat_message_broadcast", message_data)
 
 
 def notify_user(user_id: int, event_type: str, data: dict):
     """Отправить персональное уведомление пользователю."""
-    send_to_group(
-        f"user_{user_id}",
-        event_type,
-        data,
-    )
+    send_to_group(f"user_{user_id}", event_type, data)
+
+
+async def anotify_user(user_id: int, event_type: str, data: dict):
+    """Асинхронный вариант notify_user."""
+    await asend_to_group(f"user_{user_id}", event_type, data)
 
 
 def notify_new_notification(user_id: int, notification_data: dict):
     """Отправить уведомление о новом уведомлении."""
-    notify_user(user_id, "new_notification", notification_data)
+    send_to_group(f"user_{user_id}", "new_notification", notification_data)
+
+
+async def anotify_new_notification(user_id: int, notification_data: dict):
+    """Асинхронный вариант notify_new_notification."""
+    await asend_to_group(f"user_{user_id}", "new_notification", notification_data)
 
 
 def notify_order_status(order_id: int, order_data: dict):
     """Отправить уведомление об обновлении заказа."""
-    send_to_group(
-        f"order_{order_id}",
-        "order_status_update",
-        order_data,
-    )
+    send_to_group(f"order_{order_id}", "order_status_update", order_data)
+
+
+async def anotify_order_status(order_id: int, order_data: dict):
+    """Асинхронный вариант notify_order_status."""
+    await asend_to_group(f"order_{order_id}", "order_status_update", order_data)
 
 
 def notify_new_bid(order_id: int, bid_data: dict):
     """Отправить уведомление о новом отклике."""
-    send_to_group(
-        f"order_{order_id}",
-        "new_bid",
-        bid_data,
-    )
+    send_to_group(f"order_{order_id}", "new_bid", bid_data)
+
+
+async def anotify_new_bid(order_id: int, bid_data: dict):
+    """Асинхронный вариант notify_new_bid."""
+    await asend_to_group(f"order_{order_id}", "new_bid", bid_data)
 
 
 def notify_arbitration_message(case_id: int, message_data: dict):
     """Отправить уведомление о новом сообщении арбитража."""
-    send_to_group(
-        f"arbitration_{case_id}",
-        "arbitration_message_broadcast",
-        message_data,
-    )
+    send_to_group(f"arbitration_{case_id}", "arbitration_message_broadcast", message_data)
+
+
+async def anotify_arbitration_message(case_id: int, message_data: dict):
+    """Асинхронный вариант notify_arbitration_message."""
+    await asend_to_group(f"arbitration_{case_id}", "arbitration_message_broadcast", message_data)
 
 
 def notify_arbitration_status(case_id: int, case_data: dict):
     """Отправить уведомление об обновлении статуса арбитража."""
-    send_to_group(
-        f"arbitration_{case_id}",
-        "arbitration_status_update",
-        case_data,
-    )
+    send_to_group(f"arbitration_{case_id}", "arbitration_status_update", case_data)
+
+
+async def anotify_arbitration_status(case_id: int, case_data: dict):
+    """Асинхронный вариант notify_arbitration_status."""
+    await asend_to_group(f"arbitration_{case_id}", "arbitration_status_update", case_data)
 
 
 def notify_arbitration_activity(case_id: int, activity_data: dict):
     """Отправить уведомление об активности в арбитраже."""
-    send_to_group(
-        f"arbitration_{case_id}",
-        "arbitration_activity",
-        activity_data,
-    )
+    send_to_group(f"arbitration_{case_id}", "arbitration_activity", activity_data)
+
+
+async def anotify_arbitration_activity(case_id: int, activity_data: dict):
+    """Асинхронный вариант notify_arbitration_activity."""
+    await asend_to_group(f"arbitration_{case_id}", "arbitration_activity", activity_data)
+
+
+def _typing_allowed(chat_id: int, user_id: int):
+    """Троттлинг по кэшу: не чаще раза в TYPING_THROTTLE_SECONDS на пару (пользователь, чат)."""
+    from django.core.cache import cache
+
+    from .typing_indicator import _stats, throttle_seconds
+
+    _stats['received'] += 1
+    if not cache.add(f"typing:{chat_id}:{user_id}", 1, max(int(throttle_seconds()), 1)):
+        _stats['suppressed'] += 1
+        return False
+    _stats['sent'] += 1
+    return True
+
+
+def _typing_message(chat_id: int, user_id: int, username: str):
+    group_name = f"chat_{chat_id}"
+    return group_name, {
+        "type": "typing_indicator",
+        "group": group_name,
+        "user_id": user_id,
+        "username": username,
+    }
+
+
+def notify_typing(chat_id: int, user_id: int, username: str):
+    """Отправить индикатор набора текста из HTTP-кода (с троттлингом)."""
+    if not _typing_allowed(chat_id, user_id) or not _ensure_channel_layer():
+        return
+    async_to_sync(_asend_messages)([_typing_message(chat_id, user_id, username)])
+
+
+async def anotify_typing(chat_id: int, user_id: int, username: str):
+    """Асинхронный вариант notify_typing (троттлинг — через кэш в пуле потоков)."""
+    from asgiref.sync import sync_to_async
+
+    if not await sync_to_async(_typing_allowed, thread_sensitive=False)(chat_id, user_id):
+        return
+    await _asend_messages([_typing_message(chat_id, user_id, username)])
@@ -5,3 +5,8 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'Основное'
+
+    def ready(self):
+        from . import profiling
+
+        profiling.start_publisher()
@@ -0,0 +1,264 @@
+"""
+Бенчмарк горячих endpoint'ов API на данных ``seed_benchmark_data``.
+
+Запросы идут либо внутри процесса (``django.test.Client``, весь стек
+middleware, число SQL считает ``profiling.record()``), либо по HTTP к
+запущенному серверу. По HTTP число SQL известно только для персонала — из
+заголовка ``Server-Timing`` (ProfilingMiddleware).
+
+Каждый endpoint запрашивается от имени нескольких пользователей своей роли
+по кругу, первые ``warmup`` запросов не учитываются. Итог по endpoint'у —
+p50/p95/p99 и среднее время в мс, максимум SQL за запрос и число ошибок.
+
+``compare()`` сверяет итог с сохранённым baseline: регрессия — рост p95
+больше допуска (и больше ``min_ms``) или любой рост числа SQL.
+
+Обычный порядок (команда ``benchmark_api``)::
+
+    python manage.py seed_benchmark_data --reset
+    python manage.py benchmark_api --output baseline.json
+    # ...изменения...
+    python manage.py benchmark_api --baseline baseline.json
+"""
+import json
+import re
+import time
+from typing import NamedTuple, Optional
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import profiling
+
+PREFIX = 'bench_'
+PERIOD = 'start_date=2000-01-01&end_date=2100-01-01'
+
+
+class Endpoint(NamedTuple):
+    name: str
+    role: Optional[str]  # None — анонимный запрос
+    path: str  # {chat}, {order} — подставляются для пользователя
+
+
+ENDPOINTS = (
+    Endpoint('public.works', None, '/api/shop/works/'),
+    Endpoint('client.chats', 'client', '/api/chat/chats/'),
+    Endpoint('client.chat_detail', 'client', '/api/chat/chats/{chat}/'),
+    Endpoint('client.chat_unread', 'client', '/api/chat/chats/unread_count/'),
+    Endpoint('client.orders', 'client', '/api/orders/orders/'),
+    Endpoint('client.order_detail', 'client', '/api/orders/orders/{order}/'),
+    Endpoint('client.notifications', 'client', '/api/notifications/notifications/'),
+    Endpoint('client.wallet', 'client', '/api/wallet/me/'),
+    Endpoint('client.transactions', 'client', '/api/wallet/transactions/'),
+    Endpoint('expert.chats', 'expert', '/api/chat/chats/'),
+    Endpoint('expert.available_orders', 'expert', '/api/orders/orders/available/'),
+    Endpoint('expert.active_orders', 'expert', '/api/experts/dashboard/active_orders/'),
+    Endpoint('expert.statistics', 'expert', '/api/experts/dashboard/statistics/'),
+    Endpoint('admin.orders', 'admin', '/api/admin-panel/orders/'),
+    Endpoint('admin.users', 'admin', '/api/admin-panel/users/'),
+    Endpoint('admin.user_chats', 'admin', '/api/admin-panel/user-chats/'),
+    Endpoint('director.kpi', 'director', f'/api/director/statistics/kpi/?{PERIOD}'),
+    Endpoint('director.summary', 'director', f'/api/director/statistics/summary/?{PERIOD}'),
+)
+
+
+def select(endpoints, names):
+    """Endpoint'ы, чьё имя совпадает с одним из ``names`` или начинается с ``name.``."""
+    if not names:
+        return list(endpoints)
+    return [
+        endpoint for endpoint in endpoints
+        if any(endpoint.name == name or endpoint.name.startswith(f'{name}.') for name in names)
+    ]
+
+
+def percentile(values, pct):
+    """Перцентиль с линейной интерполяцией между соседними значениями."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(timings, queries, errors):
+    counted = [count for count in queries if count is not None]
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'p50': _round(percentile(timings, 50)),
+        'p95': _round(percentile(timings, 95)),
+        'p99': _round(percentile(timings, 99)),
+        'mean': _round(sum(timings) / len(timings)) if timings else None,
+        'queries': max(counted) if counted else None,
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+class Actor(NamedTuple):
+    user: object
+    token: Optional[str]
+    context: dict
+
+
+def actors(per_role):
+    """До ``per_role`` пользователей набора на роль, с токеном и id их объектов."""
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from apps.chat.models import Chat
+    from apps.orders.models import Order
+
+    User = get_user_model()
+    result = {None: [Actor(None, None, {})]}
+    for role in ('client', 'expert', 'admin', 'director'):
+        users = User.objects.filter(username__startswith=PREFIX, role=role).order_by('id')[:per_role]
+        result[role] = [
+            Actor(user, str(AccessToken.for_user(user)), {
+                'chat': Chat.objects.filter(participants=user).order_by('id').values_list('id', flat=True).first(),
+                'order': Order.objects.filter(client=user).order_by('id').values_list('id', flat=True).first(),
+            })
+            for user in users
+        ]
+    return result
+
+
+def _placeholders(path):
+    return set(re.findall(r'{(\w+)}', path))
+
+
+class InProcessDriver:
+    mode = 'inprocess'
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client(raise_request_exception=False)
+
+    def get(self, path, token):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        with profiling.record() as profile:
+            response = self.client.get(path, secure=True, **headers)
+        return response.status_code, profile.wall_ms, profile.sql_count
+
+
+_SQL_COUNT = re.compile(r'desc="SQL x(\d+)"')
+
+
+class HttpDriver:
+    mode = 'http'
+
+    def __init__(self, base_url, timeout=30):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def get(self, path, token):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        started = time.perf_counter()
+        response = self.session.get(self.base_url + path, headers=headers, timeout=self.timeout)
+        elapsed = (time.perf_counter() - started) * 1000
+        match = _SQL_COUNT.search(response.headers.get('Server-Timing', ''))
+        return response.status_code, elapsed, int(match.group(1)) if match else None
+
+
+def run(driver, endpoints, actors_by_role, *, iterations=30, warmup=3, cold=False, progress=None):
+    """``{name: summary}`` по каждому endpoint'у (без пользователей роли — пропуск)."""
+    results = {}
+    for endpoint in endpoints:
+        needed = _placeholders(endpoint.path)
+        candidates = [
+            actor for actor in actors_by_role.get(endpoint.role, [])
+            if all(actor.context.get(key) is not None for key in needed)
+        ]
+        if not candidates:
+            continue
+        timings, queries, errors = [], [], 0
+        for index in range(warmup + iterations):
+            actor = candidates[index % len(candidates)]
+            if cold:
+                cache.clear()
+            status, elapsed, sql_count = driver.get(endpoint.path.format(**actor.context), actor.token)
+            if index < warmup:
+                continue
+            timings.append(elapsed)
+            queries.append(sql_count)
+            errors += status >= 400
+        results[endpoint.name] = dict(summarize(timings, queries, errors), path=endpoint.path, role=endpoint.role)
+        if progress:
+            progress(endpoint.name, results[endpoint.name])
+    return results
+
+
+def dataset():
+    """Размер набора — чтобы не сравнивать прогоны на разных данных."""
+    from apps.chat.models import Message
+    from apps.orders.models import Order
+
+    return {
+        'users': get_user_model().objects.filter(username__startswith=PREFIX).count(),
+        'orders': Order.objects.filter(client__username__startswith=PREFIX).count(),
+        'messages': Message.objects.filter(sender__username__startswith=PREFIX).count(),
+    }
+
+
+def report(driver, results, *, iterations, warmup, cold):
+    return {
+        'meta': {
+            'mode': driver.mode,
+            'created_at': timezone.now().isoformat(),
+            'iterations': iterations,
+            'warmup': warmup,
+            'cold_cache': cold,
+            'dataset': dataset(),
+        },
+        'endpoints': results,
+    }
+
+
+def save(path, data):
+    with open(path, 'w', encoding='utf-8') as target:
+        json.dump(data, target, ensure_ascii=False, indent=2, sort_keys=True)
+        target.write('\n')
+
+
+def load(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+def compare(current, baseline, *, tolerance=0.25, min_ms=5.0):
+    """
+    Строки сравнения ``{name, p95, base_p95, queries, base_queries, regressions}``
+    по endpoint'ам текущего прогона. Endpoint'ы без baseline не сравниваются.
+    """
+    rows = []
+    for name, now in sorted(current['endpoints'].items()):
+        base = baseline['endpoints'].get(name)
+        row = {
+            'name': name,
+            'p95': now['p95'],
+            'base_p95': base and base['p95'],
+            'queries': now['queries'],
+            'base_queries': base and base['queries'],
+            'regressions': [],
+        }
+        rows.append(row)
+        if base is None:
+            continue
+        if now['p95'] is not None and base['p95'] is not None:
+            slower = now['p95'] - base['p95']
+            if now['p95'] > base['p95'] * (1 + tolerance) and slower > min_ms:
+                row['regressions'].append(f'p95 {base["p95"]} → {now["p95"]} ms')
+        if now['queries'] is not None and base['queries'] is not None and now['queries'] > base['queries']:
+            row['regressions'].append(f'SQL {base["queries"]} → {now["queries"]}')
+        if now['errors'] > base['errors']:
+            row['regressions'].append(f'ошибок {base["errors"]} → {now["errors"]}')
+    return rows
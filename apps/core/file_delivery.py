@@ -0,0 +1,156 @@
+"""
+Отдача защищённых файлов (файлы заказов, покупки магазина, вложения чатов).
+
+Django только проверяет права и отмечает скачивание, а сами байты при
+``FILE_DELIVERY_ACCEL_REDIRECT = True`` отдаёт nginx: ответ содержит
+``X-Accel-Redirect`` на internal-location (``FILE_DELIVERY_ACCEL_PREFIX``),
+и воркер освобождается сразу, не дожидаясь окончания передачи. Range,
+sendfile и докачку в этом режиме обеспечивает nginx.
+
+Без nginx (dev, тесты) файл стримится из процесса через ``FileResponse``
+с поддержкой одиночного ``Range: bytes=…`` — этого достаточно для
+докачки и перемотки видео/PDF в браузере.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import content_disposition_header, http_date
+
+DEFAULT_ACCEL_PREFIX = '/protected-media/'
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _content_type(name):
+    content_type, _ = mimetypes.guess_type(name)
+    return content_type or 'application/octet-stream'
+
+
+def _local_path(field_file):
+    """Путь файла в MEDIA_ROOT или None для удалённых хранилищ."""
+    try:
+        return field_file.path
+    except (NotImplementedError, AttributeError, ValueError):
+        return None
+
+
+def accel_redirect_enabled():
+    return getattr(settings, 'FILE_DELIVERY_ACCEL_REDIRECT', False)
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` включительно для одиночного диапазона, ``None`` — отдать
+    файл целиком (заголовка нет, он кривой или диапазонов несколько), ``False``
+    — диапазон невыполним (416).
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N — последние N байт
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class _RangeReader:
+    """Итератор по байтам ``[start, end]`` открытого файла."""
+
+    def __init__(self, handle, start, end, chunk_size=STREAM_CHUNK_SIZE):
+        self.handle = handle
+        self.remaining = end - start + 1
+        self.chunk_size = chunk_size
+        handle.seek(start)
+
+    def __iter__(self):
+        while self.remaining > 0:
+            chunk = self.handle.read(min(self.chunk_size, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.handle.close()
+
+
+def _accel_response(field_file, content_type):
+    prefix = getattr(settings, 'FILE_DELIVERY_ACCEL_PREFIX', DEFAULT_ACCEL_PREFIX)
+    response = HttpResponse(content_type=content_type)
+    # Путь относительно MEDIA_ROOT: у контентно-адресуемого хранилища
+    # (apps.uploads.storage) он отличается от имени в FileField.
+    relative = os.path.relpath(field_file.path, settings.MEDIA_ROOT).replace(os.sep, '/')
+    response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative)
+    # Не буферизовать ответ nginx'ом целиком перед отправкой клиенту.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _stream_response(request, field_file, content_type):
+    try:
+        size = field_file.size
+        handle = field_file.open('rb')
+    except (FileNotFoundError, OSError):
+        raise Http404('Файл не найден')
+
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range is False:
+        handle.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(_RangeReader(handle, start, end), content_type=content_type, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_file(request, field_file, *, filename=None, as_attachment=True):
+    """
+    Ответ с содержимым ``field_file`` (FieldFile модели).
+
+    Права доступа проверяет вызывающий view — сюда приходят только
+    разрешённые запросы.
+    """
+    if not field_file:
+        raise Http404('Файл не найден')
+    filename = filename or field_file.name.rsplit('/', 1)[-1]
+    content_type = _content_type(field_file.name)
+
+    if accel_redirect_enabled() and _local_path(field_file) is not None:
+        response = _accel_response(field_file, content_type)
+    else:
+        response = _stream_response(request, field_file, content_type)
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    # Защищённые файлы не должны оседать в общих кэшах.
+    response['Cache-Control'] = 'private, no-cache'
+    if response.status_code != 416:
+        try:
+            response['Last-Modified'] = http_date(field_file.storage.get_modified_time(field_file.name).timestamp())
+        except (NotImplementedError, OSError):
+            pass
+    return response
@@ -1,8 +1,192 @@
+"""
+Проверки состояния для балансировщика и оркестратора.
+
+- ``/api/health/`` и ``/api/health/live/`` — liveness: процесс жив и отвечает,
+  зависимости не трогаются (на них основан перезапуск воркеров).
+- ``/api/health/ready/`` — readiness: ``SELECT 1`` в PostgreSQL, PING кэша и
+  channel layer в Redis, соединение с брокером Celery. Проверки идут
+  параллельно, каждая ограничена ``HEALTH_CHECK_TIMEOUT``; в ответе —
+  задержка каждой зависимости и длина очередей Celery (для автоскейлинга).
+  Результат кэшируется в процессе на ``HEALTH_CACHE_SECONDS``: при частых
+  опросах зависимости проверяет один запрос, остальные ждут его результата.
+  Анонимный ответ — только статус; проверки (с текстом ошибок) и очереди
+  видны персоналу или по ``METRICS_TOKEN``, как ``/api/metrics/``.
+
+Проверки идут в одном общем пуле потоков. Зависшая проверка (например, на
+недоступной БД) не запускается повторно, пока не завершится прежний вызов, —
+до тех пор она считается превысившей таймаут, и потоки не копятся.
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 
+from .profiling import metrics_allowed
+
+DEFAULT_CHECK_TIMEOUT = 2.0
+DEFAULT_CACHE_SECONDS = 1.0
+
+_lock = threading.Lock()
+_last = {'at': None, 'result': None}
+
+
+def _check_timeout():
+    return float(getattr(settings, 'HEALTH_CHECK_TIMEOUT', DEFAULT_CHECK_TIMEOUT))
+
+
+def check_database():
+    from django.db import connection
+
+    if connection.vendor == 'postgresql':
+        # Соединение у потока пула своё: таймаут подключения только для проверки.
+        options = connection.settings_dict.get('OPTIONS') or {}
+        if 'connect_timeout' not in options:
+            connection.settings_dict = {
+                **connection.settings_dict,
+                'OPTIONS': {**options, 'connect_timeout': max(1, math.ceil(_check_timeout()))},
+            }
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        # Между проверками соединение потока пула не держим.
+        connection.close()
+
+
+def check_cache():
+    from django.core.cache import cache
+
+    client = getattr(cache, 'client', None)
+    if hasattr(client, 'get_client'):
+        client.get_client(write=False).ping()
+    else:
+        cache.get('health:ping')
+
+
+def check_channel_layer():
+    layer = getattr(settings, 'CHANNEL_LAYERS', {}).get('default', {})
+    hosts = layer.get('CONFIG', {}).get('hosts') or []
+    if 'redis' not in layer.get('BACKEND', '') or not hosts:
+        return
+    import redis
+
+    host = hosts[0]
+    timeout = _check_timeout()
+    if isinstance(host, str):
+        client = redis.Redis.from_url(host, socket_timeout=timeout, socket_connect_timeout=timeout)
+    else:
+        address = host.get('address') if isinstance(host, dict) else None
+        if isinstance(address, str):
+            client = redis.Redis.from_url(address, socket_timeout=timeout, socket_connect_timeout=timeout)
+        else:
+            host_name, port = address or host
+            client = redis.Redis(host=host_name, port=port, socket_timeout=timeout, socket_connect_timeout=timeout)
+    try:
+        client.ping()
+    finally:
+        client.close()
+
+
+def _queue_names(app):
+    names = {app.conf.task_default_queue}
+    for route in (getattr(settings, 'CELERY_TASK_ROUTES', None) or {}).values():
+        if isinstance(route, dict) and route.get('queue'):
+            names.add(route['queue'])
+    return sorted(names)
+
+
+def check_broker():
+    """Соединение с брокером; возвращает длину очередей Celery."""
+    from config.celery import app
+
+    depth = {}
+    with app.connection_for_read() as conn:
+        conn.ensure_connection(max_retries=1, timeout=_check_timeout())
+        for name in _queue_names(app):
+            try:
+                with conn.channel() as channel:
+                    depth[name] = channel.queue_declare(queue=name, passive=True).message_count
+            except conn.channel_errors:
+                # Очередь ещё не объявлена (или пуста в Redis) — задач в ней нет.
+                depth[name] = 0
+    return depth
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'channel_layer': check_channel_layer,
+    'broker': check_broker,
+}
+
+
+_executor = ThreadPoolExecutor(max_workers=len(CHECKS), thread_name_prefix='health')
+_running = {}
+
+
+def _timed(check):
+    started = time.perf_counter()
+    check_result = check()
+    return check_result, round((time.perf_counter() - started) * 1000, 1)
+
+
+def run_checks():
+    """Выполняет CHECKS параллельно; ``{'ready', 'checks', 'queues'}``."""
+    timeout = _check_timeout()
+    futures = {}
+    for name, check in CHECKS.items():
+        previous = _running.get(name)
+        # Прошлый вызов ещё висит — новый поток не занимаем.
+        futures[name] = previous if previous and not previous.done() else _executor.submit(_timed, check)
+    _running.update(futures)
+    wait(futures.values(), timeout=timeout)
+
+    checks, queues = {}, {}
+    for name, future in futures.items():
+        if not future.done():
+            checks[name] = {'ok': False, 'error': f'timeout after {timeout:g}s'}
+            continue
+        try:
+            check_result, latency_ms = future.result()
+        except Exception as exc:
+            checks[name] = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+            continue
+        checks[name] = {'ok': True, 'latency_ms': latency_ms}
+        if name == 'broker' and check_result:
+            queues = check_result
+    return {
+        'ready': all(check['ok'] for check in checks.values()),
+        'checks': checks,
+        'queues': queues,
+    }
+
+
+def readiness_result():
+    """Результат run_checks, не старше HEALTH_CACHE_SECONDS."""
+    max_age = float(getattr(settings, 'HEALTH_CACHE_SECONDS', DEFAULT_CACHE_SECONDS))
+    with _lock:
+        if _last['at'] is None or time.monotonic() - _last['at'] >= max_age:
+            _last['result'] = run_checks()
+            _last['at'] = time.monotonic()
+        return _last['result']
+
 
 @require_http_methods(["GET"])
 def health_check(request):
-    """Health check endpoint for Render"""
+    """Liveness: процесс отвечает (без проверки зависимостей)."""
     return JsonResponse({"status": "healthy"})
+
+
+@require_http_methods(["GET"])
+def readiness_check(request):
+    """Readiness: 200, если все зависимости доступны, иначе 503."""
+    result = readiness_result()
+    body = {"status": "ready" if result['ready'] else "unavailable"}
+    if metrics_allowed(request):
+        body.update(checks=result['checks'], queues=result['queues'])
+    return JsonResponse(body, status=200 if result['ready'] else 503)
@@ -0,0 +1,107 @@
+"""
+Бенчмарк API (apps.core.benchmark) на данных ``seed_benchmark_data``.
+
+Без ``--base-url`` запросы идут внутри процесса, с ним — по HTTP к
+запущенному серверу (токены выпускаются здесь же, как в
+scripts/load_test.sh, поэтому нужна та же БД). ``--output`` сохраняет
+результат в JSON; ``--baseline`` сравнивает с сохранённым и завершается с
+ошибкой при регрессии.
+"""
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Замеряет p50/p95/p99 и число SQL горячих endpoint\'ов и сравнивает с baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='Адрес сервера, например http://localhost:8000 (иначе — в процессе)')
+        parser.add_argument('--iterations', type=int, default=30, help='Замеров на endpoint')
+        parser.add_argument('--warmup', type=int, default=3, help='Прогревочных запросов на endpoint')
+        parser.add_argument('--users', type=int, default=10, help='Пользователей на роль (запросы идут по кругу)')
+        parser.add_argument('--endpoint', action='append', default=[],
+                            help='Только эти endpoint\'ы: имя (client.chats) или роль (client); можно повторять')
+        parser.add_argument('--cold', action='store_true', help='Очищать кэш Django перед каждым запросом')
+        parser.add_argument('--timeout', type=float, default=30, help='Таймаут HTTP-запроса, с')
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+        parser.add_argument('--baseline', help='Сравнить с сохранённым результатом')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Допустимый рост p95 (0.25 — 25%%)')
+        parser.add_argument('--min-ms', type=float, default=5.0, help='Рост p95 меньше этого не считается регрессией')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть не меньше 1')
+        endpoints = benchmark.select(benchmark.ENDPOINTS, options['endpoint'])
+        if not endpoints:
+            raise CommandError('Нет endpoint\'ов с такими именами: ' + ', '.join(options['endpoint']))
+        baseline = benchmark.load(options['baseline']) if options['baseline'] else None
+
+        actors = benchmark.actors(options['users'])
+        if not any(actors[role] for role in actors if role):
+            raise CommandError('Нет данных бенчмарка. Сначала выполните seed_benchmark_data.')
+
+        if options['base_url']:
+            driver = benchmark.HttpDriver(options['base_url'], timeout=options['timeout'])
+        else:
+            driver = benchmark.InProcessDriver()
+
+        # Предупреждения ProfilingMiddleware (N+1, медленные запросы) повторялись бы
+        # на каждом замере; число SQL и так есть в таблице.
+        profiling_logger = logging.getLogger('oko.profiling')
+        level = profiling_logger.level
+        if options['verbosity'] < 2:
+            profiling_logger.setLevel(logging.ERROR)
+        try:
+            results = self._run(driver, endpoints, actors, options)
+        finally:
+            profiling_logger.setLevel(level)
+
+        current = benchmark.report(
+            driver, results, iterations=options['iterations'], warmup=options['warmup'], cold=options['cold'],
+        )
+        if options['output']:
+            benchmark.save(options['output'], current)
+            self.stdout.write(f'Результат сохранён в {options["output"]}')
+        if baseline is not None:
+            self._compare(current, baseline, options)
+
+    def _run(self, driver, endpoints, actors, options):
+        self.stdout.write(f'{"endpoint":<28} {"p50":>8} {"p95":>8} {"p99":>8} {"SQL":>5} {"ошибки":>7}')
+        return benchmark.run(
+            driver, endpoints, actors,
+            iterations=options['iterations'], warmup=options['warmup'], cold=options['cold'],
+            progress=self._print_row,
+        )
+
+    def _print_row(self, name, result):
+        queries = '—' if result['queries'] is None else result['queries']
+        line = f'{name:<28} {result["p50"]:>8} {result["p95"]:>8} {result["p99"]:>8} {queries:>5} {result["errors"]:>7}'
+        self.stdout.write(self.style.ERROR(line) if result['errors'] else line)
+
+    def _compare(self, current, baseline, options):
+        if baseline['meta']['mode'] != current['meta']['mode']:
+            raise CommandError(
+                f'Baseline снят в режиме {baseline["meta"]["mode"]}, текущий прогон — {current["meta"]["mode"]}'
+            )
+        if baseline['meta'].get('dataset') != current['meta']['dataset']:
+            self.stdout.write(self.style.WARNING(
+                f'Набор данных отличается от baseline: {baseline["meta"].get("dataset")} → {current["meta"]["dataset"]}'
+            ))
+
+        rows = benchmark.compare(current, baseline, tolerance=options['tolerance'], min_ms=options['min_ms'])
+        self.stdout.write(f'\nСравнение с {options["baseline"]}:')
+        regressed = [row for row in rows if row['regressions']]
+        for row in rows:
+            if row['base_p95'] is None:
+                self.stdout.write(f'  {row["name"]}: нет в baseline')
+            elif row['regressions']:
+                self.stdout.write(self.style.ERROR(f'  {row["name"]}: ' + '; '.join(row['regressions'])))
+            else:
+                self.stdout.write(f'  {row["name"]}: p95 {row["base_p95"]} → {row["p95"]} ms, '
+                                  f'SQL {row["base_queries"]} → {row["queries"]}')
+        if regressed:
+            raise CommandError(f'Регрессия в {len(regressed)} endpoint\'ах')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,328 @@
+"""
+Набор данных для бенчмарка API (``benchmark_api``).
+
+Создаёт пользователей всех ролей, заказы во всех статусах с откликами,
+чаты с историей сообщений, уведомления, операции кошелька и готовые
+работы. Объём задаёт ``--scale`` (1.0 — около 250 пользователей и 1000
+заказов), содержимое — ``--seed``: при одинаковых параметрах данные
+совпадают, поэтому результаты бенчмарка сравнимы между прогонами.
+
+Все пользователи — с префиксом ``bench_``; ``--reset`` удаляет их вместе с
+зависимыми строками перед созданием новых. Комиссии платформы, как в
+WalletService, зачисляются на системные счета комиссии
+(``SYSTEM_COMMISSION_USERNAME`` и его шарды); при ``--reset`` их баланс
+уменьшается на комиссии удаляемых заказов.
+"""
+import os
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from apps.catalog.models import Subject, WorkType
+from apps.chat.models import Chat, Message
+from apps.core.benchmark import PREFIX
+from apps.experts.models import Specialization
+from apps.notifications.models import Notification, NotificationType
+from apps.orders.models import Bid, Order, Transaction, TransactionType
+from apps.shop.models import ReadyWork
+from apps.wallet.services import (
+    DEFAULT_COMMISSION_PERCENT, commission_accounts, commission_shard, get_system_account,
+)
+
+User = get_user_model()
+
+PASSWORD = 'bench-pass-123'
+
+# Количество при --scale 1.0.
+BASE_COUNTS = {
+    'client': 200,
+    'expert': 50,
+    'admin': 3,
+    'director': 1,
+    'orders': 1000,
+}
+NOTIFICATIONS_PER_USER = (5, 30)
+MESSAGES_PER_CHAT = (5, 40)
+BIDS_PER_NEW_ORDER = (0, 5)
+
+SUBJECTS = ['Математика', 'Физика', 'Программирование', 'Экономика', 'История', 'Английский язык']
+WORK_TYPES = ['Контрольная', 'Курсовая', 'Реферат', 'Решение задач']
+
+# Статус заказа -> доля в выборке. Все статусы Order.STATUS_CHOICES.
+STATUS_WEIGHTS = {
+    'new': 25,
+    'awaiting_expert_acceptance': 5,
+    'waiting_payment': 5,
+    'in_progress': 15,
+    'review': 8,
+    'revision': 5,
+    'completed': 27,
+    'cancelled': 6,
+    'expired': 4,
+}
+WITH_EXPERT = {'awaiting_expert_acceptance', 'waiting_payment', 'in_progress', 'review', 'revision', 'completed'}
+FUNDED = {'in_progress', 'review', 'revision', 'completed'}
+
+PHRASES = [
+    'Здравствуйте! Посмотрите, пожалуйста, условия.',
+    'Добрый день, могу взяться за работу.',
+    'Какой срок сдачи?',
+    'Нужно оформить по методичке, прикладываю её.',
+    'Отправил первую часть, проверьте.',
+    'Спасибо, всё понятно.',
+    'Поправьте, пожалуйста, третий пункт.',
+    'Готово, жду подтверждения.',
+]
+
+
+def _count(name, scale):
+    return max(1, round(BASE_COUNTS[name] * scale))
+
+
+class Command(BaseCommand):
+    help = 'Создаёт воспроизводимый набор данных для бенчмарка API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Множитель объёма (1.0 — около 1000 заказов)')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора: одинаковое зерно — одинаковые данные')
+        parser.add_argument('--reset', action='store_true', help='Удалить прежние данные бенчмарка')
+        parser.add_argument('--force', action='store_true', help='Разрешить запуск при DJANGO_ENV=production')
+
+    def handle(self, *args, **options):
+        if not options['force'] and not settings.DEBUG and os.getenv('DJANGO_ENV', 'production') == 'production':
+            raise CommandError('Похоже на production (DJANGO_ENV=production, DEBUG=False). Для запуска укажите --force.')
+        if options['scale'] <= 0:
+            raise CommandError('--scale должен быть больше нуля')
+
+        with transaction.atomic():
+            existing = User.objects.filter(username__startswith=PREFIX)
+            if existing.exists():
+                if not options['reset']:
+                    raise CommandError('Данные бенчмарка уже есть. Укажите --reset, чтобы пересоздать их.')
+                # Чаты — раньше пользователей: иначе каскад сначала обнулит Chat.order,
+                # и чаты одной пары столкнутся на unique_direct_chat_pair.
+                _revert_commissions()
+                deleted, _ = Chat.objects.filter(client__username__startswith=PREFIX).delete()
+                deleted += existing.delete()[0]
+                self.stdout.write(f'Удалено строк прежнего набора: {deleted}')
+            totals = Seeder(random.Random(options['seed']), options['scale']).run()
+
+        self.stdout.write(self.style.SUCCESS(
+            'Готово: ' + ', '.join(f'{name} {count}' for name, count in totals.items())
+        ))
+        self.stdout.write(f'Пароль пользователей {PREFIX}*: {PASSWORD}')
+
+
+def _revert_commissions():
+    """Снимает с системных счетов комиссии заказов набора (их проводки удалит каскад)."""
+    rows = (
+        Transaction.objects.filter(
+            type=TransactionType.COMMISSION,
+            order__client__username__startswith=PREFIX,
+            user__in=commission_accounts(),
+        )
+        .values('user_id').annotate(total=Sum('amount'))
+    )
+    for row in rows:
+        User.objects.filter(pk=row['user_id']).update(balance=F('balance') - row['total'])
+
+
+class Seeder:
+    def __init__(self, rng, scale):
+        self.rng = rng
+        self.scale = scale
+        self.now = timezone.now()
+        self.totals = {}
+
+    def run(self):
+        # Имя — сразу в виде, к которому его приводит save() (capitalize).
+        self.subjects = [Subject.objects.get_or_create(name=f'Бенчмарк: {name.lower()}')[0] for name in SUBJECTS]
+        self.work_types = [WorkType.objects.get_or_create(name=f'Бенчмарк: {name.lower()}')[0] for name in WORK_TYPES]
+        self._users()
+        self._orders()
+        self._chats()
+        self._notifications()
+        self._ledger()
+        self._ready_works()
+        return self.totals
+
+    def _bulk(self, model, objects, name):
+        created = model.objects.bulk_create(objects, batch_size=1000)
+        self.totals[name] = self.totals.get(name, 0) + len(created)
+        return created
+
+    def _users(self):
+        password = make_password(PASSWORD)
+        self.users = {}
+        for role in ('client', 'expert', 'admin', 'director'):
+            self.users[role] = self._bulk(User, [
+                User(
+                    username=f'{PREFIX}{role}_{index}',
+                    email=f'{PREFIX}{role}_{index}@example.com',
+                    first_name=f'{role.capitalize()} {index}',
+                    password=password,
+                    role=role,
+                    is_staff=role == 'admin',
+                    email_verified=True,
+                )
+                for index in range(_count(role, self.scale))
+            ], 'users')
+        self._bulk(Specialization, [
+            Specialization(expert=expert, subject=subject, is_verified=True)
+            for expert in self.users['expert']
+            for subject in self.rng.sample(self.subjects, 2)
+        ], 'specializations')
+
+    def _orders(self):
+        rng = self.rng
+        statuses = list(STATUS_WEIGHTS)
+        weights = list(STATUS_WEIGHTS.values())
+        orders = []
+        # Первые заказы проходят все статусы по разу, дальше — по весам.
+        for index in range(_count('orders', self.scale)):
+            status = statuses[index] if index < len(statuses) else rng.choices(statuses, weights)[0]
+            days = rng.randint(-20, -1) if status == 'expired' else rng.randint(1, 30)
+            orders.append(Order(
+                client=rng.choice(self.users['client']),
+                expert=rng.choice(self.users['expert']) if status in WITH_EXPERT else None,
+                subject=rng.choice(self.subjects),
+                work_type=rng.choice(self.work_types),
+                title=f'Заказ {index + 1}',
+                description=rng.choice(PHRASES),
+                budget=Decimal(rng.randrange(500, 15000, 100)),
+                deadline=self.now + timedelta(days=days),
+                status=status,
+            ))
+        self.orders = self._bulk(Order, orders, 'orders')
+
+        bids = []
+        for order in self.orders:
+            if order.status != 'new':
+                continue
+            for expert in rng.sample(self.users['expert'], min(rng.randint(*BIDS_PER_NEW_ORDER), len(self.users['expert']))):
+                bids.append(Bid(order=order, expert=expert, amount=order.budget * Decimal('0.9')))
+        self._bulk(Bid, bids, 'bids')
+
+    def _chats(self):
+        rng = self.rng
+        orders = [order for order in self.orders if order.expert_id]
+        chats = self._bulk(Chat, [
+            Chat(order=order, client_id=order.client_id, expert_id=order.expert_id) for order in orders
+        ], 'chats')
+        Participant = Chat.participants.through
+        self._bulk(Participant, [
+            Participant(chat_id=chat.id, user_id=user_id)
+            for chat in chats
+            for user_id in (chat.client_id, chat.expert_id)
+        ], 'chat_participants')
+
+        messages = []
+        for chat in chats:
+            count = rng.randint(*MESSAGES_PER_CHAT)
+            for index in range(count):
+                sender = chat.client_id if index % 2 == 0 else chat.expert_id
+                messages.append(Message(
+                    chat=chat,
+                    sender_id=sender,
+                    text=rng.choice(PHRASES),
+                    is_read=index < count - 2 or rng.random() < 0.5,
+                ))
+        self._bulk(Message, messages, 'messages')
+
+    def _notifications(self):
+        rng = self.rng
+        types = [choice for choice, _label in NotificationType.choices]
+        notifications = []
+        for user in self.users['client'] + self.users['expert']:
+            for _ in range(rng.randint(*NOTIFICATIONS_PER_USER)):
+                kind = rng.choice(types)
+                notifications.append(Notification(
+                    recipient=user,
+                    type=kind,
+                    title=NotificationType(kind).label,
+                    message=rng.choice(PHRASES),
+                    is_read=rng.random() < 0.6,
+                ))
+        self._bulk(Notification, notifications, 'notifications')
+
+    def _ledger(self):
+        """Пополнение, резерв и выплата — как их проводит WalletService."""
+        rng = self.rng
+        balances = {user.pk: Decimal('0') for role in self.users.values() for user in role}
+        frozen = dict.fromkeys(balances, Decimal('0'))
+        # Системные счета комиссии уже могут иметь баланс — копим только прирост.
+        systems, fees = {}, {}
+        funded = {}
+        for order in self.orders:
+            if order.status in FUNDED:
+                funded.setdefault(order.client_id, []).append(order)
+
+        transactions = []
+
+        def entry(user_id, amount, kind, order=None, description=''):
+            transactions.append(Transaction(
+                user_id=user_id, order=order, amount=amount, type=kind,
+                description=description, balance_after=balances[user_id],
+            ))
+
+        for client in self.users['client']:
+            orders = funded.get(client.pk, [])
+            topup = sum((order.budget for order in orders), Decimal('0')) + Decimal(rng.randrange(0, 5000, 100))
+            if topup <= 0:
+                continue
+            balances[client.pk] += topup
+            entry(client.pk, topup, TransactionType.TOPUP, description='Пополнение баланса')
+            for order in orders:
+                frozen[client.pk] += order.budget
+                entry(client.pk, order.budget, TransactionType.HOLD, order, f'Заморозка по заказу #{order.id}')
+                if order.status != 'completed':
+                    continue
+                fee = (order.budget * DEFAULT_COMMISSION_PERCENT / 100).quantize(Decimal('0.01'))
+                frozen[client.pk] -= order.budget
+                balances[client.pk] -= order.budget
+                balances[order.expert_id] += order.budget - fee
+                entry(client.pk, order.budget, TransactionType.RELEASE, order, f'Списание по заказу #{order.id}')
+                entry(order.expert_id, order.budget - fee, TransactionType.PAYOUT, order, f'Выплата по заказу #{order.id}')
+                if fee > 0:
+                    shard = commission_shard(client.pk)
+                    if shard not in systems:
+                        system = get_system_account(shard)
+                        systems[shard] = system.pk
+                        balances[system.pk] = system.balance
+                    system_id = systems[shard]
+                    balances[system_id] += fee
+                    fees[system_id] = fees.get(system_id, Decimal('0')) + fee
+                    entry(system_id, fee, TransactionType.COMMISSION, order, f'Комиссия платформы по заказу #{order.id}')
+        self._bulk(Transaction, transactions, 'transactions')
+        for system_id, total in fees.items():
+            User.objects.filter(pk=system_id).update(balance=F('balance') + total)
+
+        users = [user for role in self.users.values() for user in role]
+        for user in users:
+            user.balance = balances[user.pk]
+            user.frozen_balance = frozen[user.pk]
+        User.objects.bulk_update(users, ['balance', 'frozen_balance'], batch_size=1000)
+
+    def _ready_works(self):
+        rng = self.rng
+        self._bulk(ReadyWork, [
+            ReadyWork(
+                title=f'Готовая работа {index + 1}',
+                description=rng.choice(PHRASES),
+                price=Decimal(rng.randrange(200, 3000, 50)),
+                subject=rng.choice(self.subjects),
+                work_type=rng.choice(self.work_types),
+                author=expert,
+                moderation_status='approved',
+                is_active=True,
+            )
+            for index, expert in enumerate(self.users['expert'])
+        ], 'ready_works')
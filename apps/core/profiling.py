@@ -0,0 +1,411 @@
+"""
+Профилирование запросов: SQL, кэш, время и гистограммы по view.
+
+``record()`` — контекст, в котором считаются запросы к БД (через
+``connection.execute_wrapper``) и обращения к кэшу (hit/miss). Его
+использует ProfilingMiddleware; годится и для задач, команд и тестов.
+
+Итоги запросов копятся в гистограммах процесса по ключу «view.action» и
+отдаются в формате Prometheus на ``/api/metrics/`` (персонал или
+``Authorization: Bearer <METRICS_TOKEN>``). Метрики у каждого процесса
+свои — метка ``pid`` различает воркеры. Запрос к ``/api/metrics/`` попадает
+в один случайный воркер gunicorn, поэтому при ``METRICS_DIR`` каждый процесс
+(воркеры gunicorn и daphne) раз в ``METRICS_FLUSH_SECONDS`` сохраняет свои
+счётчики в ``<METRICS_DIR>/<pid>.json``, а ответ собирается из файлов всех
+живых процессов — по аналогии с multiprocess-режимом prometheus_client.
+
+``repeated_queries()`` ищет N+1: один и тот же «вид» SQL (литералы и
+списки IN свёрнуты), выполненный много раз за запрос.
+"""
+import contextvars
+import heapq
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger('oko.profiling')
+
+DEFAULT_FLUSH_SECONDS = 10
+
+# Границы корзин гистограммы времени ответа, мс.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+STAFF_ROLES = ('admin', 'director')
+
+_current = contextvars.ContextVar('profiling_current', default=None)
+
+
+class Profile:
+    """Счётчики одного запроса (задачи, блока кода)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall_ms = 0.0
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.queries = []
+
+    def add_query(self, sql, duration_ms):
+        self.sql_count += 1
+        self.sql_ms += duration_ms
+        self.queries.append((duration_ms, sql))
+
+    def top_queries(self, limit=5):
+        return heapq.nlargest(limit, self.queries, key=lambda item: item[0])
+
+    def finish(self):
+        self.wall_ms = (time.perf_counter() - self.started) * 1000
+        return self
+
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|\d+|\'[^\']*\')\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w."])-?\b\d+(?:\.\d+)?\b')
+
+
+def query_shape(sql):
+    """SQL без значений: ``WHERE id = 5`` и ``WHERE id = 7`` дают один вид."""
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return shape.replace('%s', '?')
+
+
+def repeated_queries(queries, threshold):
+    """``[(count, shape)]`` видов SQL, выполненных не меньше ``threshold`` раз."""
+    counts = Counter(query_shape(sql) for sql in queries)
+    return sorted(
+        ((count, shape) for shape, count in counts.items() if count >= threshold),
+        reverse=True,
+    )
+
+
+def _sql_wrapper(profile):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            profile.add_query(sql, (time.perf_counter() - started) * 1000)
+
+    return wrapper
+
+
+@contextmanager
+def record():
+    """Считает SQL и обращения к кэшу внутри блока; отдаёт Profile."""
+    install_cache_counters()
+    profile = Profile()
+    token = _current.set(profile)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_sql_wrapper(profile)))
+            yield profile
+    finally:
+        _current.reset(token)
+        profile.finish()
+
+
+def _count_get(get):
+    @wraps(get)
+    def counted_get(self, key, default=None, *args, **kwargs):
+        value = get(self, key, default, *args, **kwargs)
+        profile = _current.get()
+        if profile is not None:
+            if value is default:
+                profile.cache_misses += 1
+            else:
+                profile.cache_hits += 1
+        return value
+
+    return counted_get
+
+
+def _count_get_many(get_many):
+    @wraps(get_many)
+    def counted_get_many(self, keys, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return get_many(self, keys, *args, **kwargs)
+        keys = list(keys)
+        # Базовый get_many вызывает get по ключу — не считаем их повторно.
+        token = _current.set(None)
+        try:
+            values = get_many(self, keys, *args, **kwargs)
+        finally:
+            _current.reset(token)
+        profile.cache_hits += len(values)
+        profile.cache_misses += max(len(keys) - len(values), 0)
+        return values
+
+    return counted_get_many
+
+
+_installed = set()
+_install_lock = threading.Lock()
+
+
+def install_cache_counters():
+    """
+    Оборачивает get/get_many класса используемых кэш-бэкендов (один раз на
+    класс). Вне ``record()`` обёртка только проверяет contextvar.
+    """
+    from django.core.cache import caches
+
+    for alias in settings.CACHES:
+        backend_class = type(caches[alias])
+        if backend_class in _installed:
+            continue
+        with _install_lock:
+            if backend_class in _installed:
+                continue
+            backend_class.get = _count_get(backend_class.get)
+            backend_class.get_many = _count_get_many(backend_class.get_many)
+            _installed.add(backend_class)
+
+
+class ViewStats:
+    __slots__ = ('count', 'wall_ms', 'sql_count', 'sql_ms', 'sql_max', 'cache_hits', 'cache_misses',
+                 'response_bytes', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.wall_ms = 0.0
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.sql_max = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_bytes = 0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, profile, response_bytes):
+        self.count += 1
+        self.wall_ms += profile.wall_ms
+        self.sql_count += profile.sql_count
+        self.sql_ms += profile.sql_ms
+        self.sql_max = max(self.sql_max, profile.sql_count)
+        self.cache_hits += profile.cache_hits
+        self.cache_misses += profile.cache_misses
+        self.response_bytes += response_bytes
+        for index, bound in enumerate(BUCKETS_MS):
+            if profile.wall_ms <= bound:
+                self.buckets[index] += 1
+
+
+_views = {}
+_views_lock = threading.Lock()
+
+
+def observe(view, profile, response_bytes=0):
+    """Добавляет итог запроса в гистограмму ``view``."""
+    with _views_lock:
+        stats = _views.get(view)
+        if stats is None:
+            stats = _views[view] = ViewStats()
+        stats.add(profile, response_bytes)
+
+
+def snapshot():
+    """Копия накопленной статистики ``{view: ViewStats}``."""
+    with _views_lock:
+        copies = {}
+        for view, stats in _views.items():
+            copy = ViewStats()
+            for field in ViewStats.__slots__:
+                value = getattr(stats, field)
+                setattr(copy, field, list(value) if field == 'buckets' else value)
+            copies[view] = copy
+        return copies
+
+
+def reset():
+    with _views_lock:
+        _views.clear()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _state():
+    """Счётчики процесса в виде, пригодном для JSON."""
+    from apps.chat import realtime_outbox, typing_indicator
+
+    return {
+        'views': {
+            view: {field: getattr(stats, field) for field in ViewStats.__slots__}
+            for view, stats in snapshot().items()
+        },
+        'typing': typing_indicator.stats(),
+        'outbox': realtime_outbox.stats(),
+    }
+
+
+def _metrics_dir():
+    return getattr(settings, 'METRICS_DIR', '')
+
+
+def publish():
+    """Сохраняет счётчики процесса в METRICS_DIR (атомарной заменой файла)."""
+    directory = _metrics_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as target:
+        json.dump(_state(), target)
+    os.replace(f'{path}.tmp', path)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """``[(pid, state)]`` всех процессов из METRICS_DIR или только текущего."""
+    if not _metrics_dir():
+        return [(os.getpid(), _state())]
+    publish()
+    directory = _metrics_dir()
+    states = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext != '.json' or not stem.isdigit():
+            continue
+        path = os.path.join(directory, name)
+        if not _alive(int(stem)):
+            # Воркер завершился (max_requests, перезагрузка) — его ряды исчезают.
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path, encoding='utf-8') as source:
+                states.append((int(stem), json.load(source)))
+        except (OSError, ValueError):
+            continue
+    return states
+
+
+_publisher = {'started': False}
+_publisher_lock = threading.Lock()
+
+
+def start_publisher():
+    """Фоновый поток, сохраняющий счётчики процесса раз в METRICS_FLUSH_SECONDS."""
+    if not _metrics_dir():
+        return
+    with _publisher_lock:
+        if _publisher['started']:
+            return
+        _publisher['started'] = True
+    interval = float(getattr(settings, 'METRICS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS))
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                publish()
+            except Exception:
+                # Метрики не должны ронять процесс; следующая попытка — через interval.
+                logger.warning("Не удалось сохранить метрики процесса", exc_info=True)
+
+    threading.Thread(target=loop, name='metrics-publisher', daemon=True).start()
+
+
+def _counter_lines(name, help_text, states, key):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    for pid, state in states:
+        for event, value in sorted(state[key].items()):
+            lines.append(f'{name}{{pid="{pid}",event="{_label(event)}"}} {value}')
+    return lines
+
+
+def render_prometheus(states=None):
+    """Метрики в текстовом формате Prometheus (по умолчанию — collect())."""
+    states = collect() if states is None else states
+    lines = [
+        '# HELP http_request_duration_ms Время ответа по view, мс.',
+        '# TYPE http_request_duration_ms histogram',
+    ]
+    for pid, state in states:
+        for view, stats in sorted(state['views'].items()):
+            labels = f'pid="{pid}",view="{_label(view)}"'
+            for bound, count in zip(BUCKETS_MS, stats['buckets']):
+                lines.append(f'http_request_duration_ms_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'http_request_duration_ms_bucket{{{labels},le="+Inf"}} {stats["count"]}')
+            lines.append(f'http_request_duration_ms_sum{{{labels}}} {stats["wall_ms"]:.3f}')
+            lines.append(f'http_request_duration_ms_count{{{labels}}} {stats["count"]}')
+
+    totals = (
+        ('http_request_sql_queries_total', 'SQL-запросы по view.', 'sql_count', 'counter'),
+        ('http_request_sql_ms_total', 'Время в SQL по view, мс.', 'sql_ms', 'counter'),
+        ('http_request_sql_queries_max', 'Максимум SQL-запросов за один запрос.', 'sql_max', 'gauge'),
+        ('http_request_cache_hits_total', 'Попадания в кэш по view.', 'cache_hits', 'counter'),
+        ('http_request_cache_misses_total', 'Промахи кэша по view.', 'cache_misses', 'counter'),
+        ('http_response_bytes_total', 'Размер ответов по view, байт.', 'response_bytes', 'counter'),
+    )
+    for name, help_text, field, kind in totals:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for pid, state in states:
+            for view, stats in sorted(state['views'].items()):
+                value = stats[field]
+                value = f'{value:.3f}' if isinstance(value, float) else value
+                lines.append(f'{name}{{pid="{pid}",view="{_label(view)}"}} {value}')
+
+    lines += _counter_lines('ws_typing_events_total', 'Индикатор набора (apps.chat.typing_indicator).',
+                            states, 'typing')
+    lines += _counter_lines('ws_outbox_events_total', 'Outbox real-time событий (apps.chat.realtime_outbox).',
+                            states, 'outbox')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_allowed(request):
+    """Персонал или ``Authorization: Bearer <METRICS_TOKEN>``."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    supplied = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+        return True
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        from apps.users.cookie_auth import CookieJWTAuthentication
+
+        try:
+            authenticated = CookieJWTAuthentication().authenticate(request)
+        except Exception:
+            authenticated = None
+        user = authenticated[0] if authenticated else None
+    return is_staff(user)
+
+
+def is_staff(user):
+    return bool(user is not None and user.is_authenticated
+                and (user.is_staff or getattr(user, 'role', None) in STAFF_ROLES))
+
+
+def metrics(request):
+    """Экспорт метрик процесса (Prometheus)."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
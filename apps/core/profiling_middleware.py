@@ -0,0 +1,118 @@
+"""
+Middleware профилирования запросов (apps.core.profiling).
+
+Для каждого запроса — время ответа, число и время SQL, попадания и промахи
+кэша, размер ответа; итог уходит в гистограмму по «view.action».
+Персоналу добавляется заголовок ``Server-Timing`` (виден во вкладке
+Network браузера). Запросы дольше ``PROFILING_SLOW_MS`` с вероятностью
+``PROFILING_SLOW_SAMPLE_RATE`` пишутся в лог вместе с самыми долгими SQL.
+
+Детектор N+1 (``NPLUSONE_MODE``: ``off`` / ``log`` / ``raise``) отмечает
+запросы, где один вид SQL повторился ``NPLUSONE_THRESHOLD`` раз и больше.
+"""
+
+import logging
+import random
+
+from django.conf import settings
+
+from . import profiling
+
+logger = logging.getLogger("oko.profiling")
+
+
+class NPlusOneError(RuntimeError):
+    """Повторяющиеся одинаковые SQL за запрос (NPLUSONE_MODE='raise')."""
+
+
+def view_key(request):
+    """``apps.orders.views.OrderViewSet.list`` / ``apps.core.health.health_check.GET``."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    func = match.func
+    view = getattr(func, "cls", None) or getattr(func, "view_class", None)
+    # У @api_view класс-обёртка WrappedAPIView, имя функции — только в __name__.
+    path = f"{view.__module__}.{view.__name__}" if view else match._func_path
+    actions = getattr(func, "actions", None) or {}
+    return f"{path}.{actions.get(request.method.lower(), request.method)}"
+
+
+def _response_size(response):
+    if getattr(response, "streaming", False):
+        return int(response.get("Content-Length") or 0)
+    return len(response.content)
+
+
+def _server_timing(profile):
+    app_ms = max(profile.wall_ms - profile.sql_ms, 0)
+    return ", ".join([
+        f'db;dur={profile.sql_ms:.1f};desc="SQL x{profile.sql_count}"',
+        f'app;dur={app_ms:.1f}',
+        f'cache;desc="hit {profile.cache_hits} / miss {profile.cache_misses}"',
+        f"total;dur={profile.wall_ms:.1f}",
+    ])
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "PROFILING_ENABLED", True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        with profiling.record() as profile:
+            response = self.get_response(request)
+        view = view_key(request)
+        size = _response_size(response)
+        profiling.observe(view, profile, size)
+
+        if profiling.is_staff(getattr(request, "user", None)):
+            response["Server-Timing"] = _server_timing(profile)
+        self._log_if_slow(request, view, profile, size)
+        self._check_repeated(request, view, profile)
+        return response
+
+    def _check_repeated(self, request, view, profile):
+        mode = getattr(settings, "NPLUSONE_MODE", "off")
+        if mode == "off":
+            return
+        repeated = profiling.repeated_queries(
+            (sql for _duration, sql in profile.queries), getattr(settings, "NPLUSONE_THRESHOLD", 5),
+        )
+        if not repeated:
+            return
+        message = "[Profiling] N+1 в %s %s (%s):\n%s" % (
+            request.method,
+            request.path,
+            view,
+            "\n".join(f"  x{count}  {shape[:300]}" for count, shape in repeated),
+        )
+        if mode == "raise":
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+    def _log_if_slow(self, request, view, profile, size):
+        if profile.wall_ms < getattr(settings, "PROFILING_SLOW_MS", 1000):
+            return
+        if random.random() >= getattr(settings, "PROFILING_SLOW_SAMPLE_RATE", 1.0):
+            return
+        top = "\n".join(
+            f"  {duration:.1f} ms  {sql[:300]}"
+            for duration, sql in profile.top_queries(getattr(settings, "PROFILING_TOP_QUERIES", 5))
+        )
+        logger.warning(
+            "[Profiling] Медленный запрос %s %s (%s): %.0f ms, SQL x%d за %.0f ms, кэш %d/%d, %d байт\n%s",
+            request.method,
+            request.path,
+            view,
+            profile.wall_ms,
+            profile.sql_count,
+            profile.sql_ms,
+            profile.cache_hits,
+            profile.cache_misses,
+            size,
+            top,
+        )
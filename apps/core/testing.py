@@ -0,0 +1,84 @@
+"""
+Помощники тестов: бюджет SQL-запросов.
+
+``assert_max_queries(n, per_item=0, items=0)`` — контекстный менеджер и
+декоратор: блок должен уложиться в ``n + per_item * items`` запросов. При
+превышении в сообщении — повторяющиеся виды SQL (кандидаты в N+1) и сами
+запросы.
+
+``QueryBudgetMixin.assertListQueryBudget`` проверяет, что список не делает
+запросов на каждую строку: endpoint запрашивается с одной строкой и с
+полной страницей (кэш перед каждым запросом очищается), обе выдачи
+должны уложиться в один и тот же бюджет.
+"""
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from .profiling import repeated_queries
+
+
+class assert_max_queries(ContextDecorator):
+    def __init__(self, n, *, per_item=0, items=0, using='default'):
+        self.budget = n + per_item * items
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self.context
+
+    def __exit__(self, exc_type, exc, tb):
+        self.context.__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return False
+        executed = [query['sql'] for query in self.context.captured_queries]
+        if len(executed) > self.budget:
+            raise AssertionError(_budget_message(len(executed), self.budget, executed))
+        return False
+
+
+def _budget_message(count, budget, executed):
+    lines = [f'{count} SQL-запросов при бюджете {budget}.']
+    repeated = repeated_queries(executed, 2)
+    if repeated:
+        lines.append('Повторяющиеся запросы:')
+        lines += [f'  x{times}  {shape[:300]}' for times, shape in repeated]
+    lines.append('Запросы:')
+    lines += [f'  {index}. {sql[:300]}' for index, sql in enumerate(executed, 1)]
+    return '\n'.join(lines)
+
+
+def page_size():
+    return settings.REST_FRAMEWORK.get('PAGE_SIZE') or 10
+
+
+class QueryBudgetMixin:
+    """Для APIClient-тестов: ``self.api`` — клиент, под которым делается запрос."""
+
+    def assertListQueryBudget(self, path, n, make_item, *, rows=None, per_item=0):
+        """
+        ``make_item(index)`` создаёт одну строку выдачи. Сначала endpoint
+        запрашивается с одной строкой, затем с ``rows`` (по умолчанию —
+        размер страницы); оба раза — не больше ``n + per_item * строк``.
+        """
+        rows = rows or page_size()
+        make_item(0)
+        self._assert_page(path, n, per_item, 1)
+        for index in range(1, rows):
+            make_item(index)
+        self._assert_page(path, n, per_item, rows)
+
+    def _assert_page(self, path, n, per_item, items):
+        # Бюджет — для холодного кэша: закэшированный ответ не прячет запросы.
+        cache.clear()
+        try:
+            with assert_max_queries(n, per_item=per_item, items=items):
+                response = self.api.get(path)
+        except AssertionError as exc:
+            raise AssertionError(f'GET {path} ({items} строк): {exc}') from None
+        self.assertEqual(response.status_code, 200, f'GET {path}: {response.status_code}')
+        return response
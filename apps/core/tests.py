@@ -0,0 +1,369 @@
+import io
+import threading
+import time
+from concurrent.futures import wait
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import benchmark, health, profiling
+from .profiling_middleware import NPlusOneError
+from .testing import assert_max_queries
+
+User = get_user_model()
+
+
+@override_settings(HEALTH_CHECK_TIMEOUT=0.2, HEALTH_CACHE_SECONDS=60, METRICS_TOKEN="probe-token")
+class HealthCheckTests(SimpleTestCase):
+    AUTH = {"Authorization": "Bearer probe-token"}
+
+    def setUp(self):
+        health._last.update(at=None, result=None)
+        self.addCleanup(health._last.update, at=None, result=None)
+        self.addCleanup(health._running.clear)
+        # Отпускаем «зависшие» проверки и ждём их до очистки _running.
+        self.release = threading.Event()
+        self.addCleanup(lambda: wait(health._running.values(), timeout=5))
+        self.addCleanup(self.release.set)
+
+    def _hung(self):
+        self.release.wait(5)
+
+    def _checks(self, **overrides):
+        checks = {name: (lambda: None) for name in health.CHECKS}
+        checks.update(overrides)
+        return mock.patch.dict(health.CHECKS, checks)
+
+    def test_liveness_does_not_touch_dependencies(self):
+        with self._checks(database=mock.Mock(side_effect=AssertionError)):
+            response = self.client.get("/api/health/live/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "healthy"})
+
+    def test_ready_reports_latency_and_queue_depth(self):
+        with self._checks(broker=lambda: {"celery": 7, "payments": 0}):
+            response = self.client.get("/api/health/ready/", headers=self.AUTH)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["status"], "ready")
+        self.assertEqual(set(body["checks"]), set(health.CHECKS))
+        self.assertTrue(all("latency_ms" in check for check in body["checks"].values()))
+        self.assertEqual(body["queues"], {"celery": 7, "payments": 0})
+
+    def test_failed_or_slow_dependency_makes_node_unready(self):
+        def broken():
+            raise ConnectionError("refused")
+
+        with self._checks(cache=broken, broker=self._hung):
+            started = time.monotonic()
+            response = self.client.get("/api/health/ready/", headers=self.AUTH)
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual(response.status_code, 503)
+        checks = response.json()["checks"]
+        self.assertTrue(checks["database"]["ok"])
+        self.assertEqual(checks["cache"], {"ok": False, "error": "ConnectionError: refused"})
+        self.assertIn("timeout", checks["broker"]["error"])
+
+    def test_result_is_cached_between_probes(self):
+        database = mock.Mock(return_value=None)
+        with self._checks(database=database):
+            for _ in range(3):
+                self.assertEqual(self.client.get("/api/health/ready/").status_code, 200)
+        database.assert_called_once()
+
+    def test_hung_check_is_not_resubmitted(self):
+        broker = mock.Mock(side_effect=self._hung)
+        with self._checks(broker=broker):
+            first = health.run_checks()
+            second = health.run_checks()
+        broker.assert_called_once()
+        self.assertIn("timeout", first["checks"]["broker"]["error"])
+        self.assertIn("timeout", second["checks"]["broker"]["error"])
+        self.assertTrue(second["checks"]["database"]["ok"])
+
+        self.release.set()
+        wait([health._running["broker"]], timeout=5)
+        with self._checks(broker=broker):
+            self.assertTrue(health.run_checks()["ready"])
+        self.assertEqual(broker.call_count, 2)
+
+    def test_anonymous_probe_gets_only_status(self):
+        def broken():
+            raise ConnectionError("redis://:secret@10.0.0.5:6379 refused")
+
+        with self._checks(cache=broken):
+            response = self.client.get("/api/health/ready/", headers={"Authorization": "Bearer wrong"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {"status": "unavailable"})
+
+
+class _TestClientConnection:
+    """http.client.HTTPConnection поверх тестового клиента Django."""
+
+    def __init__(self, host, port, timeout=None):
+        self.response = None
+
+    def request(self, method, path, headers=None):
+        from django.test import Client
+
+        self.response = Client().generic(method, path, headers=headers)
+
+    def getresponse(self):
+        return mock.Mock(status=self.response.status_code)
+
+    def close(self):
+        pass
+
+
+# Как в продакшне (config/settings.py, DEBUG=False), но без исключения для /api/health/.
+PRODUCTION_SECURITY = dict(
+    SECURE_SSL_REDIRECT=True,
+    SECURE_PROXY_SSL_HEADER=("HTTP_X_FORWARDED_PROTO", "https"),
+    SECURE_REDIRECT_EXEMPT=[],
+    ALLOWED_HOSTS=["okoznaniy.ru", "127.0.0.1"],
+)
+
+
+class WebSocketWorkerProbeTests(SimpleTestCase):
+    def _probe(self):
+        from config import serve
+
+        worker = serve.WebSocketWorker.__new__(serve.WebSocketWorker)
+        worker.health_port = 9100
+        with mock.patch("config.serve.http.client.HTTPConnection", _TestClientConnection):
+            return worker.healthy()
+
+    @override_settings(**PRODUCTION_SECURITY)
+    def test_probe_passes_with_production_ssl_redirect(self):
+        self.assertEqual(self.client.get("/api/health/live/", headers={"Host": "127.0.0.1"}).status_code, 301)
+        self.assertTrue(self._probe())
+
+    @override_settings(**dict(PRODUCTION_SECURITY, SECURE_PROXY_SSL_HEADER=None, SECURE_REDIRECT_EXEMPT=[r"^api/health/"]))
+    def test_health_paths_are_exempt_from_ssl_redirect(self):
+        response = self.client.get("/api/health/live/", headers={"Host": "127.0.0.1"})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SLOW_MS=10_000, METRICS_TOKEN="scrape-token")
+class ProfilingTests(TestCase):
+    def setUp(self):
+        profiling.reset()
+        self.addCleanup(profiling.reset)
+        self.client = APIClient()
+
+    def _login(self, user):
+        # Настоящий JWT: пользователь загружается из БД внутри запроса.
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    def test_record_counts_sql_and_cache(self):
+        cache.set("profiling:hit", 1)
+        with profiling.record() as profile:
+            list(User.objects.all())
+            cache.get("profiling:hit")
+            cache.get("profiling:miss")
+            cache.get_many(["profiling:hit", "profiling:miss"])
+        self.assertEqual(profile.sql_count, 1)
+        self.assertEqual((profile.cache_hits, profile.cache_misses), (2, 2))
+        self.assertIn("users_user", profile.top_queries(1)[0][1].lower())
+
+    def test_staff_gets_server_timing_and_view_is_aggregated(self):
+        self._login(User.objects.create_user(username="ops", password="x", is_staff=True))
+        response = self.client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+        stats = profiling.snapshot()["apps.users.views.UserViewSet.me"]
+        self.assertEqual(stats.count, 1)
+        self.assertGreater(stats.sql_count, 0)
+        self.assertEqual(stats.response_bytes, len(response.content))
+
+    def test_api_view_functions_get_their_own_keys(self):
+        self.client.get("/api/users/telegram_auth_status/auth_1/")
+        self.client.get("/api/users/max_auth_status/auth_1/")
+        self.assertLessEqual(
+            {"apps.users.views.telegram_auth_status.GET", "apps.users.views.max_auth_status.GET"},
+            set(profiling.snapshot()),
+        )
+
+    def test_regular_user_gets_no_server_timing(self):
+        self._login(User.objects.create_user(username="client", password="x"))
+        response = self.client.get("/api/users/me/")
+        self.assertNotIn("Server-Timing", response)
+
+    def test_metrics_endpoint_requires_token_or_staff(self):
+        self.client.get("/api/health/")
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+
+        response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('view="apps.core.health.health_check.GET",le="+Inf"} 1', body)
+        self.assertIn("ws_outbox_events_total", body)
+
+    def test_metrics_are_collected_from_all_worker_processes(self):
+        import json
+        import os
+        import tempfile
+
+        directory = tempfile.mkdtemp(prefix="metrics_")
+        other = {"views": {"other.view": {
+            "count": 2, "wall_ms": 30.0, "sql_count": 4, "sql_ms": 1.5, "sql_max": 2, "cache_hits": 0,
+            "cache_misses": 1, "response_bytes": 10, "buckets": [0, 0, 2] + [2] * (len(profiling.BUCKETS_MS) - 3),
+        }}, "typing": {}, "outbox": {"sent": 3}}
+        # Родительский процесс жив — его файл учитывается; файл завершённого процесса удаляется.
+        for pid in (os.getppid(), 999_999):
+            with open(os.path.join(directory, f"{pid}.json"), "w") as target:
+                json.dump(other, target)
+
+        with override_settings(METRICS_DIR=directory):
+            self.client.get("/api/health/")
+            body = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer scrape-token").content.decode()
+
+        self.assertIn(f'http_request_duration_ms_count{{pid="{os.getppid()}",view="other.view"}} 2', body)
+        self.assertIn(f'ws_outbox_events_total{{pid="{os.getppid()}",event="sent"}} 3', body)
+        self.assertIn(f'pid="{os.getpid()}",view="apps.core.health.health_check.GET"', body)
+        self.assertNotIn('pid="999999"', body)
+        self.assertEqual(sorted(os.listdir(directory)), sorted([f"{os.getppid()}.json", f"{os.getpid()}.json"]))
+
+    def test_metrics_token_must_match_exactly(self):
+        response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer scrape-token-extra")
+        self.assertEqual(response.status_code, 403)
+
+    def test_slow_request_is_logged_with_top_queries(self):
+        self._login(User.objects.create_user(username="slow", password="x"))
+        with override_settings(PROFILING_SLOW_MS=0), self.assertLogs("oko.profiling", "WARNING") as logs:
+            self.client.get("/api/users/me/")
+        self.assertIn("UserViewSet.me", logs.output[0])
+        self.assertIn("ms  SELECT", logs.output[0])
+
+
+class NPlusOneDetectionTests(TestCase):
+    def test_query_shape_ignores_values(self):
+        self.assertEqual(
+            profiling.query_shape("SELECT * FROM t WHERE id = 5 AND name = 'x' AND k IN (%s, %s)"),
+            profiling.query_shape("SELECT * FROM t WHERE id = 7 AND name = 'y' AND k IN (%s)"),
+        )
+
+    def test_assert_max_queries_reports_repeated_shapes(self):
+        users = [User.objects.create_user(username=f"n{i}", password="x") for i in range(3)]
+        with assert_max_queries(3):
+            for user in users:
+                User.objects.get(pk=user.pk)
+
+        with self.assertRaises(AssertionError) as raised:
+            with assert_max_queries(1, per_item=0, items=3):
+                for user in users:
+                    User.objects.get(pk=user.pk)
+        self.assertIn("3 SQL-запросов при бюджете 1", str(raised.exception))
+        self.assertIn("x3  SELECT", str(raised.exception))
+
+    @override_settings(NPLUSONE_MODE="raise", NPLUSONE_THRESHOLD=3, PROFILING_ENABLED=True)
+    def test_middleware_flags_repeated_queries(self):
+        from django.test import RequestFactory
+
+        from .profiling_middleware import ProfilingMiddleware
+
+        for i in range(3):
+            User.objects.create_user(username=f"row{i}", password="x")
+
+        def per_row_view(request):
+            for user in User.objects.all():
+                User.objects.filter(pk=user.pk).exists()
+            return profiling.HttpResponse("ok")
+
+        middleware = ProfilingMiddleware(per_row_view)
+        with self.assertRaises(NPlusOneError):
+            middleware(RequestFactory().get("/rows/"))
+
+        with override_settings(NPLUSONE_MODE="log"), self.assertLogs("oko.profiling", "WARNING") as logs:
+            middleware(RequestFactory().get("/rows/"))
+        self.assertIn("N+1", logs.output[0])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NPLUSONE_MODE="off")
+class BenchmarkTests(TestCase):
+    def _seed(self, **options):
+        from django.core.management import call_command
+
+        call_command("seed_benchmark_data", scale=0.02, seed=7, force=True, stdout=io.StringIO(), **options)
+
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50.5)
+        self.assertAlmostEqual(benchmark.percentile(values, 95), 95.05)
+        self.assertEqual(benchmark.percentile([3.0], 99), 3.0)
+        self.assertIsNone(benchmark.percentile([], 50))
+
+    def test_compare_flags_slower_p95_and_more_queries(self):
+        def result(p95, queries, errors=0):
+            return {"p95": p95, "queries": queries, "errors": errors}
+
+        baseline = {"endpoints": {"a": result(100, 5), "b": result(100, 5), "c": result(2, 1)}}
+        current = {"endpoints": {"a": result(140, 5), "b": result(110, 6), "c": result(6, 1), "new": result(1, 1)}}
+        rows = {row["name"]: row["regressions"] for row in benchmark.compare(current, baseline, tolerance=0.25, min_ms=5)}
+
+        self.assertEqual(rows["a"], ["p95 100 → 140 ms"])
+        self.assertEqual(rows["b"], ["SQL 5 → 6"])
+        self.assertEqual(rows["c"], [])  # +4 мс — меньше min_ms
+        self.assertEqual(rows["new"], [])
+
+    def test_seed_is_reproducible_and_covers_every_status(self):
+        from apps.orders.models import Order
+
+        def snapshot():
+            return list(
+                Order.objects.filter(client__username__startswith=benchmark.PREFIX)
+                .order_by("id").values_list("status", "budget", "client__username", "expert__username")
+            )
+
+        self._seed()
+        first = snapshot()
+        self.assertEqual({status for status, *_ in first}, {status for status, _ in Order.STATUS_CHOICES})
+
+        from django.core.management.base import CommandError
+
+        with self.assertRaises(CommandError):
+            self._seed()
+        self._seed(reset=True)
+        self.assertEqual(snapshot(), first)
+
+    @override_settings(WALLET_COMMISSION_SHARDS=2)
+    def test_seed_posts_commissions_to_system_accounts(self):
+        from decimal import Decimal
+
+        from django.db.models import Sum
+
+        from apps.core.management.commands import seed_benchmark_data
+        from apps.orders.models import Transaction, TransactionType
+        from apps.wallet.services import commission_accounts, commission_balance
+
+        with mock.patch.object(seed_benchmark_data, "DEFAULT_COMMISSION_PERCENT", Decimal("10")):
+            self._seed()
+            commissions = Transaction.objects.filter(type=TransactionType.COMMISSION)
+            total = commissions.aggregate(s=Sum("amount"))["s"]
+            self.assertGreater(total, 0)
+            self.assertFalse(commissions.exclude(user__in=commission_accounts()).exists())
+            self.assertEqual(commission_balance(), total)
+            self.assertFalse(User.objects.filter(username__startswith=benchmark.PREFIX, role="director", balance__gt=0).exists())
+
+            # Пересоздание не удваивает баланс системных счетов.
+            self._seed(reset=True)
+        self.assertEqual(commission_balance(), total)
+
+    def test_inprocess_run_reports_latency_and_queries(self):
+        self._seed()
+        endpoints = benchmark.select(benchmark.ENDPOINTS, ["client", "public"])
+        results = benchmark.run(
+            benchmark.InProcessDriver(), endpoints, benchmark.actors(2), iterations=2, warmup=1,
+        )
+
+        self.assertEqual(set(results), {endpoint.name for endpoint in endpoints})
+        for name, result in results.items():
+            self.assertEqual(result["errors"], 0, name)
+            self.assertEqual(result["requests"], 2)
+            self.assertLessEqual(result["p50"], result["p99"])
+            self.assertGreater(result["queries"], 0, name)
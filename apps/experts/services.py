@@ -3,6 +3,7 @@ from django.utils import timezone
 from datetime import timedelta
 from .models import ExpertStatistics, Specialization
 from apps.orders.models import Order
+from apps.users import presence
 
 
 class ExpertMatchingService:
@@ -72,7 +73,7 @@ class ExpertMatchingService:
         ).count()
         
         # Проверяем последнюю активность
-        last_activity = expert.last_activity if hasattr(expert, 'last_activity') else None
+        last_activity = presence.last_activity(expert)
         is_recently_active = (
             last_activity and 
             (current_time - last_activity) < timedelta(hours=24)
@@ -274,27 +275,20 @@ class ExpertFinanceService:
         Returns:
             dict: Словарь с финансовой информацией
         """
-        from apps.orders.models import Transaction
-        from decimal import Decimal
+        from apps.wallet.services import aggregate_transactions
         
         # Текущий баланс
         current_balance = expert.balance
         frozen_balance = expert.frozen_balance
         available_balance = current_balance - frozen_balance
         
-        # Общий заработок
-        total_earnings = Transaction.objects.filter(
-            user=expert,
-            type='payout'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # Заработок за текущий месяц
+        # Общий заработок и заработок за текущий месяц — одним запросом
         current_month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_earnings = Transaction.objects.filter(
-            user=expert,
-            type='payout',
-            timestamp__gte=current_month_start
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+        totals = aggregate_transactions(
+            expert.pk, types=['payout'], periods={'month': current_month_start},
+        )
+        total_earnings = totals['total_earned']
+        monthly_earnings = totals['periods']['month']['total_earned']
         
         # Ожидающие выплаты (замороженные средства)
         pending_payouts = frozen_balance
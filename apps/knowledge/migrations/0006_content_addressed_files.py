@@ -0,0 +1,20 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:17
+
+import apps.knowledge.models
+import apps.uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge', '0005_alter_answer_content'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='articlefile',
+            name='file',
+            field=models.FileField(max_length=255, storage=apps.uploads.storage.content_storage, upload_to=apps.knowledge.models.article_file_upload_to, verbose_name='Файл'),
+        ),
+    ]
@@ -3,6 +3,8 @@ import uuid
 from django.db import models
 from django.conf import settings
 
+from apps.uploads.storage import content_storage
+
 
 def article_file_upload_to(instance, filename):
     ext = os.path.splitext(filename)[1]
@@ -50,7 +52,7 @@ class ArticleFile(models.Model):
         related_name='files',
         verbose_name='Статья',
     )
-    file = models.FileField('Файл', upload_to=article_file_upload_to)
+    file = models.FileField('Файл', upload_to=article_file_upload_to, storage=content_storage, max_length=255)
     original_name = models.CharField('Имя файла', max_length=300)
     file_size = models.PositiveIntegerField('Размер', default=0)
     uploaded_at = models.DateTimeField('Дата загрузки', auto_now_add=True)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.16 on 2026-10-19 15:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_alter_notification_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['type', 'is_read', 'created_at'], name='notificatio_type_a1514c_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_type_5ae648_idx',
+        ),
+    ]
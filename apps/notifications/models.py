@@ -88,7 +88,7 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', '-created_at']),
-            models.Index(fields=['type', 'is_read']),
+            models.Index(fields=['type', 'is_read', 'created_at']),
             models.Index(fields=['expires_at']),
             models.Index(fields=['is_read', 'created_at']),
             models.Index(fields=['related_object_type', 'related_object_id']),
@@ -0,0 +1,155 @@
+"""
+Пакетная очистка уведомлений по срокам хранения.
+
+Вместо одного большого ``DELETE`` на каждый тип уведомлений строки удаляются
+диапазонами первичных ключей ограниченного размера, каждый пакет — в своей
+короткой транзакции, с паузой между пакетами. Прерывание (лимит времени
+задачи, остановка воркера) теряет не более одного пакета: уже удалённые
+строки закоммичены, а следующий запуск просто продолжит с оставшихся.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationType
+
+logger = logging.getLogger(__name__)
+
+# Сроки хранения прочитанных уведомлений (в днях) по типам.
+# Переопределяются через settings.NOTIFICATION_RETENTION_DAYS.
+DEFAULT_RETENTION_DAYS = {
+    NotificationType.NEW_ORDER: 30,
+    NotificationType.ORDER_TAKEN: 90,
+    NotificationType.ORDER_COMPLETED: 180,
+    NotificationType.REVIEW_RECEIVED: 365,
+    'default': 30,
+}
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_BATCH_SLEEP = 0.1
+
+
+def get_retention_days():
+    periods = dict(DEFAULT_RETENTION_DAYS)
+    periods.update(getattr(settings, 'NOTIFICATION_RETENTION_DAYS', None) or {})
+    return periods
+
+
+@dataclass
+class SweepStats:
+    label: str
+    deleted: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    interrupted: bool = False
+
+    @property
+    def rows_per_second(self):
+        if self.elapsed <= 0:
+            return float(self.deleted)
+        return self.deleted / self.elapsed
+
+
+class RetentionSweeper:
+    """
+    Удаляет строки queryset'а пакетами по диапазонам первичного ключа.
+
+    ``max_runtime`` (секунды) ограничивает общее время работы: по его
+    истечении очистка останавливается между пакетами и помечается как
+    прерванная.
+    """
+
+    def __init__(self, batch_size=None, batch_sleep=None, max_runtime=None):
+        self.batch_size = int(batch_size or getattr(
+            settings, 'NOTIFICATION_CLEANUP_BATCH_SIZE', DEFAULT_BATCH_SIZE
+        ))
+        if batch_sleep is None:
+            batch_sleep = getattr(settings, 'NOTIFICATION_CLEANUP_BATCH_SLEEP', DEFAULT_BATCH_SLEEP)
+        self.batch_sleep = float(batch_sleep)
+        if max_runtime is None:
+            max_runtime = getattr(settings, 'NOTIFICATION_CLEANUP_MAX_RUNTIME', None)
+        self.deadline = time.monotonic() + max_runtime if max_runtime else None
+
+    def _out_of_time(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def sweep(self, label, queryset):
+        stats = SweepStats(label=label)
+        started = time.monotonic()
+        last_pk = 0
+
+        while True:
+            if self._out_of_time():
+                stats.interrupted = True
+                break
+
+            pks = list(
+                queryset.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:self.batch_size]
+            )
+            if not pks:
+                break
+
+            # Условия фильтра повторяются внутри диапазона, поэтому строки,
+            # изменившиеся между выборкой и удалением, не пострадают.
+            with transaction.atomic():
+                deleted, _ = queryset.filter(pk__gte=pks[0], pk__lte=pks[-1]).delete()
+
+            stats.deleted += deleted
+            stats.batches += 1
+            last_pk = pks[-1]
+
+            if len(pks) < self.batch_size:
+                break
+            if self.batch_sleep:
+                time.sleep(self.batch_sleep)
+
+        stats.elapsed = time.monotonic() - started
+        logger.info(
+            f"Очистка уведомлений [{label}]: удалено {stats.deleted} "
+            f"за {stats.batches} пакетов, {stats.elapsed:.2f} с "
+            f"({stats.rows_per_second:.0f} строк/с)"
+            f"{', прервано по лимиту времени' if stats.interrupted else ''}"
+        )
+        return stats
+
+    def run(self, now=None):
+        """Полный проход: по типам, остальные прочитанные и истекшие."""
+        now = now or timezone.now()
+        periods = get_retention_days()
+        default_days = periods.pop('default')
+        results = []
+
+        for notification_type, days in periods.items():
+            results.append(self.sweep(
+                notification_type,
+                Notification.objects.filter(
+                    type=notification_type,
+                    is_read=True,
+                    created_at__lt=now - timedelta(days=days),
+                ),
+            ))
+            if results[-1].interrupted:
+                return results
+
+        results.append(self.sweep(
+            'default',
+            Notification.objects.filter(
+                is_read=True,
+                created_at__lt=now - timedelta(days=default_days),
+            ).exclude(type__in=list(periods.keys())),
+        ))
+        if results[-1].interrupted:
+            return results
+
+        results.append(self.sweep(
+            'expired',
+            Notification.objects.filter(expires_at__lt=now),
+        ))
+        return results
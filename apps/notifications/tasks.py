@@ -4,7 +4,8 @@ from django.utils import timezone
 from datetime import timedelta
 from django.db.models import Q
 from apps.orders.models import Order
-from .models import Notification
+from .models import NotificationType
+from .retention import RetentionSweeper
 from .services import NotificationService
 
 logger = logging.getLogger(__name__)
@@ -52,50 +53,23 @@ def check_deadlines():
 @shared_task
 def cleanup_old_notifications():
     """
-    Удаляет старые прочитанные уведомления и истекшие уведомления
+    Удаляет старые прочитанные уведомления и истекшие уведомления.
+
+    Удаление идёт пакетами (см. apps.notifications.retention), сроки
+    хранения и размер пакета настраиваются в settings.
     """
-    now = timezone.now()
-    
-    # Настройки хранения для разных типов уведомлений
-    retention_periods = {
-        NotificationType.NEW_ORDER: 30,  # 30 дней для новых заказов
-        NotificationType.ORDER_TAKEN: 90,  # 90 дней для принятых заказов
-        NotificationType.ORDER_COMPLETED: 180,  # 180 дней для завершенных заказов
-        NotificationType.REVIEW_RECEIVED: 365,  # 365 дней для отзывов
-        'default': 30  # По умолчанию храним 30 дней
-    }
-    
-    total_deleted = 0
-    
-    # Удаляем по типам уведомлений
-    for notification_type, days in retention_periods.items():
-        cutoff_date = now - timedelta(days=days)
-        deleted_count, _ = Notification.objects.filter(
-            type=notification_type,
-            is_read=True,
-            created_at__lt=cutoff_date
-        ).delete()
-        total_deleted += deleted_count
-        logger.info(f"Удалено {deleted_count} уведомлений типа {notification_type}")
-    
-    # Удаляем остальные старые прочитанные уведомления
-    default_cutoff = now - timedelta(days=retention_periods['default'])
-    deleted_default, _ = Notification.objects.filter(
-        is_read=True,
-        created_at__lt=default_cutoff
-    ).exclude(
-        type__in=retention_periods.keys()
-    ).delete()
-    total_deleted += deleted_default
-    
-    # Удаляем истекшие уведомления
-    deleted_expired, _ = Notification.objects.filter(
-        expires_at__lt=now
-    ).delete()
-    total_deleted += deleted_expired
-    
+    results = RetentionSweeper().run()
+
+    total_deleted = sum(stats.deleted for stats in results)
+    deleted_expired = sum(stats.deleted for stats in results if stats.label == 'expired')
+    elapsed = sum(stats.elapsed for stats in results)
+    rate = total_deleted / elapsed if elapsed > 0 else total_deleted
+    interrupted = any(stats.interrupted for stats in results)
+
     logger.info(
         f"Всего удалено {total_deleted} уведомлений "
-        f"(по типам: {total_deleted - deleted_expired}, истекших: {deleted_expired})"
+        f"(по типам: {total_deleted - deleted_expired}, истекших: {deleted_expired}), "
+        f"{rate:.0f} строк/с"
+        f"{', остаток будет удалён при следующем запуске' if interrupted else ''}"
     )
-    return f"Удалено {total_deleted} старых уведомлений" 
\ No newline at end of file
+    return f"Удалено {total_deleted} старых уведомлений"
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:17
+
+import apps.orders.utils
+import apps.uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0035_orderfile_client_downloaded_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderfile',
+            name='file',
+            field=models.FileField(max_length=255, storage=apps.uploads.storage.content_storage, upload_to=apps.orders.utils.get_file_path, validators=[apps.orders.utils.FileValidator()], verbose_name='Файл'),
+        ),
+    ]
@@ -5,6 +5,7 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from apps.catalog.models import Subject, Topic, WorkType, Complexity, DiscountRule
+from apps.uploads.storage import content_storage
 from .utils import FileValidator, get_file_path
 import os
 
@@ -318,6 +319,8 @@ class OrderFile(models.Model):
     )
     file = models.FileField(
         upload_to=get_file_path,
+        storage=content_storage,
+        max_length=255,
         validators=[FileValidator()],
         verbose_name="Файл"
     )
@@ -4,7 +4,10 @@ from .services import OrderActionService
 from apps.catalog.models import Subject, Topic, WorkType, Complexity
 from apps.catalog.serializers import SubjectSerializer, TopicSerializer, WorkTypeSerializer, ComplexitySerializer
 from apps.catalog.services import PricingService
+from apps.uploads.models import UploadSession
+from apps.uploads.services import open_upload
 from apps.users.serializers import PublicUserProfileSerializer
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
 from rest_framework.reverse import reverse
 from decimal import Decimal
@@ -19,17 +22,32 @@ class OrderFileSerializer(serializers.ModelSerializer):
     download_url = serializers.SerializerMethodField()
     filename = serializers.SerializerMethodField()
     file_size = serializers.SerializerMethodField()
+    # Файл, загруженный по частям через /api/uploads/ (вместо multipart file).
+    upload_id = serializers.UUIDField(write_only=True, required=False)
 
     def get_filename(self, obj):
         return obj.filename() if obj.file else ''
 
+    def validate(self, attrs):
+        upload_id = attrs.pop('upload_id', None)
+        if upload_id and not attrs.get('file'):
+            try:
+                attrs['file'] = open_upload(upload_id, self.context['request'].user, UploadSession.Purpose.ORDER_FILE)
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError({'upload_id': exc.messages})
+        if not attrs.get('file') and not self.instance:
+            raise serializers.ValidationError({'file': 'Обязательное поле.'})
+        return attrs
+
     class Meta:
         model = OrderFile
         fields = [
             'id', 'file', 'file_type', 'file_type_display', 'uploaded_by',
-            'created_at', 'expert_viewed_at', 'client_downloaded_at', 'description', 'file_url', 'view_url', 'download_url', 'filename', 'file_size'
+            'created_at', 'expert_viewed_at', 'client_downloaded_at', 'description', 'file_url', 'view_url', 'download_url', 'filename', 'file_size',
+            'upload_id',
         ]
         read_only_fields = ['uploaded_by', 'created_at', 'expert_viewed_at']
+        extra_kwargs = {'file': {'required': False}}
 
     def get_file_url(self, obj):
         if obj.file:
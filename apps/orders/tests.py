@@ -12,6 +12,9 @@ Covers the production bugs where:
    ``apps/chat/tests.py``; this module only verifies the order endpoint.
 """
 
+import hashlib
+import shutil
+import tempfile
 from datetime import timedelta
 from decimal import Decimal
 
@@ -31,6 +34,13 @@ from apps.wallet.policy import order_quote
 
 User = get_user_model()
 
+# Файлы тестов — во временном MEDIA_ROOT, не в media/ репозитория.
+MEDIA = tempfile.mkdtemp(prefix="orders_media_")
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA, ignore_errors=True)
+
 
 @override_settings(SECURE_SSL_REDIRECT=False)
 class OrderCreationRegressionTests(TestCase):
@@ -122,7 +132,7 @@ class OrderCreationRegressionTests(TestCase):
         self.assertIsNotNone(order.pk)
 
 
-@override_settings(SECURE_SSL_REDIRECT=False)
+@override_settings(SECURE_SSL_REDIRECT=False, MEDIA_ROOT=MEDIA)
 class OrderReviewLifecycleTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -556,3 +566,92 @@ class OrderChatBootstrapTests(TestCase):
         )
         self.assertEqual(bid_response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertTrue(bid_response.json()["frozen"])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, MEDIA_ROOT=MEDIA)
+class OrderFileDeliveryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subject = Subject.objects.create(name="File delivery subject")
+        cls.work_type = WorkType.objects.create(name="File delivery work type")
+        cls.client_user = User.objects.create_user(
+            username="file_delivery_client",
+            email="file_delivery_client@example.com",
+            password="testpass123",
+            role="client",
+        )
+        cls.expert_user = User.objects.create_user(
+            username="file_delivery_expert",
+            email="file_delivery_expert@example.com",
+            password="testpass123",
+            role="expert",
+        )
+
+    def setUp(self):
+        self.api_client = APIClient()
+        self.order = Order.objects.create(
+            client=self.client_user,
+            expert=self.expert_user,
+            subject=self.subject,
+            work_type=self.work_type,
+            title="File delivery order",
+            description="Order for file delivery tests",
+            budget=Decimal("5000"),
+            deadline=timezone.now() + timedelta(days=5),
+            status="review",
+        )
+        self.order_file = OrderFile.objects.create(
+            order=self.order,
+            file=ContentFile(b"0123456789" * 10, name="solution.txt"),
+            file_type="solution",
+            uploaded_by=self.expert_user,
+        )
+        self.url = f"/api/orders/orders/{self.order.id}/files/{self.order_file.id}/download/"
+
+    def test_download_streams_file_and_marks_client_download(self):
+        self.api_client.force_authenticate(user=self.client_user)
+
+        response = self.api_client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789" * 10)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        self.order_file.refresh_from_db()
+        self.assertIsNotNone(self.order_file.client_downloaded_at)
+
+    def test_range_request_returns_partial_content(self):
+        self.api_client.force_authenticate(user=self.client_user)
+
+        response = self.api_client.get(self.url, HTTP_RANGE="bytes=10-19")
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+        response = self.api_client.get(self.url, HTTP_RANGE="bytes=500-")
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response["Content-Range"], "bytes */100")
+
+    @override_settings(FILE_DELIVERY_ACCEL_REDIRECT=True, FILE_DELIVERY_ACCEL_PREFIX="/protected-media/")
+    def test_accel_redirect_hands_transfer_to_nginx(self):
+        self.api_client.force_authenticate(user=self.client_user)
+
+        response = self.api_client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sha256 = hashlib.sha256(b"0123456789" * 10).hexdigest()
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/cas/{sha256[:2]}/{sha256[2:4]}/{sha256}.txt")
+        self.assertEqual(response.content, b"")
+        self.order_file.refresh_from_db()
+        self.assertIsNotNone(self.order_file.client_downloaded_at)
+
+    def test_view_is_inline_and_does_not_mark_download(self):
+        self.api_client.force_authenticate(user=self.client_user)
+
+        response = self.api_client.get(self.url.replace("/download/", "/view/"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("inline;", response["Content-Disposition"])
+        self.order_file.refresh_from_db()
+        self.assertIsNone(self.order_file.client_downloaded_at)
@@ -28,7 +28,7 @@ from apps.payments.services import PaymentService
 from apps.shop.models import ReadyWork
 from apps.users.models import PartnerEarning
 from apps.wallet.models import WithdrawalRequest
-from apps.wallet.services import WalletService, InsufficientFunds, get_system_account
+from apps.wallet.services import WalletService, InsufficientFunds, commission_balance
 
 User = get_user_model()
 
@@ -146,16 +146,13 @@ class WalletServiceTests(TestCase):
         )
         self.user.refresh_from_db()
         self.expert.refresh_from_db()
-        system = get_system_account()
-        system.refresh_from_db()
-
         fee = Decimal('0.00')
         payout = Decimal('1000.00')
 
         self.assertEqual(self.user.balance, Decimal('0.00'))
         self.assertEqual(self.user.frozen_balance, Decimal('0.00'))
         self.assertEqual(self.expert.balance, payout)
-        self.assertEqual(system.balance, fee)
+        self.assertEqual(commission_balance(), fee)
         self.assertEqual(result['payout'], payout)
         self.assertEqual(result['fee'], fee)
 
@@ -859,15 +856,12 @@ class FullE2EFlowTests(TestCase):
         client_u.refresh_from_db()
         expert.refresh_from_db()
         order.refresh_from_db()
-        system = get_system_account()
-        system.refresh_from_db()
-
         self.assertEqual(order.status, 'completed')
         self.assertEqual(client_u.balance, Decimal('2500.00'))
         self.assertEqual(client_u.frozen_balance, Decimal('0.00'))
         # Author gets base, directors get the 25% client service fee.
         self.assertEqual(expert.balance, Decimal('2000.00'))
-        self.assertEqual(system.balance, Decimal('500.00'))
+        self.assertEqual(commission_balance(), Decimal('500.00'))
 
         # Verify transactions
         self.assertTrue(Transaction.objects.filter(order=order, type=TransactionType.HOLD).exists())
@@ -14,12 +14,12 @@ from .serializers import OrderSerializer, AvailableOrderSerializer, TransactionS
 from .services import OrderActionService
 from apps.chat.services import ensure_order_chat_started
 from apps.notifications.services import NotificationService
+from apps.core.file_delivery import serve_file
 from apps.core.safe_notify import safe_call
 from apps.wallet.policy import order_quote, money
 from apps.wallet.services import InsufficientFunds, WalletService
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.http import FileResponse, Http404
-import mimetypes
+from django.http import Http404
 import logging
 import json
 
@@ -1480,37 +1480,14 @@ class OrderFileViewSet(viewsets.ModelViewSet):
         ):
             order_file.client_downloaded_at = timezone.now()
             order_file.save(update_fields=['client_downloaded_at'])
-        file_handle = order_file.file.open()
-        
-        # Получаем MIME-тип файла
-        content_type, _ = mimetypes.guess_type(order_file.file.name)
-        if not content_type:
-            content_type = 'application/octet-stream'
-            
-        # Создаем HTTP-ответ с файлом
-        response = FileResponse(file_handle, content_type=content_type)
-        response['Content-Length'] = order_file.file.size
-        response['Content-Disposition'] = f'attachment; filename="{order_file.filename()}"'
-        
-        return response
+        return serve_file(request, order_file.file, filename=order_file.filename())
 
     @action(detail=True, methods=['get'])
     def view(self, request, order_pk=None, pk=None):
         order_file = self.get_object()
         self._mark_expert_view(request, order_file)
-        file_handle = order_file.file.open()
-
-        # Получаем MIME-тип файла
-        content_type, _ = mimetypes.guess_type(order_file.file.name)
-        if not content_type:
-            content_type = 'application/octet-stream'
-
         # Inline просмотр в браузере (если браузер умеет отображать данный тип)
-        response = FileResponse(file_handle, content_type=content_type)
-        response['Content-Length'] = order_file.file.size
-        response['Content-Disposition'] = f'inline; filename="{order_file.filename()}"'
-
-        return response
+        return serve_file(request, order_file.file, filename=order_file.filename(), as_attachment=False)
 
 class OrderCommentViewSet(viewsets.ModelViewSet):
     serializer_class = OrderCommentSerializer
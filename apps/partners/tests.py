@@ -1,6 +1,9 @@
+import shutil
+import tempfile
+
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APIClient
 
@@ -8,7 +11,15 @@ from apps.partners.models import PartnerChatMessage, PartnerChatRoom
 
 User = get_user_model()
 
+# Файлы тестов — во временном MEDIA_ROOT, не в media/ репозитория.
+MEDIA = tempfile.mkdtemp(prefix="partners_media_")
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA, ignore_errors=True)
+
 
+@override_settings(MEDIA_ROOT=MEDIA)
 class PartnerChatRoomViewSetTests(TestCase):
     @staticmethod
     def _items(payload):
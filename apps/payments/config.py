@@ -16,6 +16,27 @@ SBP_SETTINGS = {
     'TEST_MODE': getattr(settings, 'SBP_TEST_MODE', True),
 }
 
+# Настройки для классического эквайринга Сбербанка
+SBERBANK_SETTINGS = {
+    'API_URL': getattr(settings, 'SBERBANK_API_URL', 'https://securepayments.sberbank.ru/payment/rest/'),
+    'USERNAME': getattr(settings, 'SBERBANK_USERNAME', ''),
+    'PASSWORD': getattr(settings, 'SBERBANK_PASSWORD', ''),
+    'TEST_MODE': getattr(settings, 'SBERBANK_TEST_MODE', True),
+}
+
+# Настройки для SberPay QR (mTLS, см. docs/SBERPAY_QR_SETUP.md)
+SBERPAY_QR_SETTINGS = {
+    'API_URL': getattr(settings, 'SBERPAY_QR_API_URL', 'https://mc.api.sberbank.ru/prod'),
+    'TID': getattr(settings, 'SBERPAY_QR_TID', ''),
+    'QR_ID': getattr(settings, 'SBERPAY_QR_QR_ID', ''),
+    'MEMBER_ID': getattr(settings, 'SBERPAY_QR_MEMBER_ID', ''),
+    'MERCHANT_NAME': getattr(settings, 'SBERPAY_QR_MERCHANT_NAME', ''),
+    'TEST_MODE': getattr(settings, 'SBERPAY_QR_TEST_MODE', True),
+    'CERT_PATH': getattr(settings, 'SBERPAY_QR_CERT_PATH', ''),
+    'KEY_PATH': getattr(settings, 'SBERPAY_QR_KEY_PATH', ''),
+    'CA_PATH': getattr(settings, 'SBERPAY_QR_CA_PATH', ''),
+}
+
 # Общие настройки
 PAYMENT_SETTINGS = {
     'SUCCESS_URL': getattr(settings, 'PAYMENT_SUCCESS_URL', '/payment/success/'),
@@ -0,0 +1,142 @@
+"""
+Очередь входящих уведомлений платёжных систем (callback inbox).
+
+Webhook проверяет подпись, сохраняет сырой payload в ``PaymentCallback`` и
+сразу отвечает банку — вся работа с платежом, заказом и кошельком делается
+воркером Celery (очередь ``payments``):
+
+* повторная доставка того же уведомления упирается в уникальный ключ
+  (provider, external_id, event) и ничего не создаёт;
+* уведомления одного платежа применяются строго по порядку поступления под
+  блокировкой строки ``Payment``, поэтому параллельные воркеры не обгоняют
+  друг друга;
+* упавшее уведомление помечается ``failed`` и останавливает более поздние
+  уведомления того же платежа до повтора (``drain_payment_callbacks``) или
+  ручного replay (``manage.py replay_payment_callbacks``).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Payment, PaymentCallback
+
+logger = logging.getLogger('oko.payments')
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Поля payload, из которых складывается тип события: Status у Т-Банка,
+# operation/status у Альфа-Банка и СБП.
+EVENT_FIELDS = ('Status', 'operation', 'status')
+
+
+def max_attempts():
+    return int(getattr(settings, 'PAYMENT_CALLBACK_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+
+
+def callback_event(data):
+    parts = [str(data[field]) for field in EVENT_FIELDS if data.get(field) not in (None, '')]
+    return ':'.join(parts)[:100] or 'callback'
+
+
+def _plain(data):
+    # request.data бывает QueryDict (form-urlencoded уведомления Альфа-Банка).
+    return data.dict() if hasattr(data, 'dict') else dict(data)
+
+
+def record_callback(provider, external_id, data):
+    """
+    Сохраняет уведомление и ставит его в очередь после коммита.
+
+    Возвращает ``(callback, created)``; ``created=False`` — это повторная
+    доставка уже сохранённого уведомления.
+    """
+    payload = _plain(data)
+    key = {'provider': provider, 'external_id': external_id, 'event': callback_event(payload)}
+    try:
+        with transaction.atomic():
+            callback = PaymentCallback.objects.create(payload=payload, **key)
+    except IntegrityError:
+        logger.info("Повторное уведомление %s:%s:%s пропущено", provider, external_id, key['event'])
+        return PaymentCallback.objects.get(**key), False
+
+    transaction.on_commit(lambda: enqueue(callback.pk))
+    return callback, True
+
+
+def enqueue(callback_id):
+    from .tasks import apply_payment_callback
+
+    try:
+        apply_payment_callback.delay(callback_id)
+    except Exception:  # noqa: BLE001 — уведомление уже сохранено, его подберёт drain
+        logger.warning("Не удалось поставить уведомление %s в очередь", callback_id, exc_info=True)
+
+
+def pending_callbacks():
+    return PaymentCallback.objects.filter(
+        status__in=[PaymentCallback.Status.RECEIVED, PaymentCallback.Status.FAILED],
+        attempts__lt=max_attempts(),
+    )
+
+
+def _apply(callback):
+    from .services import PaymentService
+
+    callback.attempts += 1
+    try:
+        with transaction.atomic():
+            # Копия: провайдеры меняют переданный dict (СБП удаляет signature).
+            applied = PaymentService.process_payment_callback(callback.external_id, dict(callback.payload))
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Уведомление %s не применено: %s", callback.pk, exc, exc_info=True)
+        callback.status = PaymentCallback.Status.FAILED
+        callback.last_error = f'{type(exc).__name__}: {exc}'
+    else:
+        callback.status = PaymentCallback.Status.APPLIED if applied else PaymentCallback.Status.IGNORED
+        callback.last_error = ''
+        callback.processed_at = timezone.now()
+    callback.save(update_fields=['status', 'attempts', 'last_error', 'processed_at'])
+    return callback.status != PaymentCallback.Status.FAILED
+
+
+def apply_pending(external_id):
+    """
+    Применяет все необработанные уведомления платежа в порядке поступления.
+
+    Возвращает число обработанных уведомлений. На первой ошибке останавливается,
+    чтобы более поздние события не применились раньше упавшего.
+    """
+    processed = 0
+    with transaction.atomic():
+        # Блокировка платежа сериализует воркеров, взявших один и тот же платёж.
+        list(Payment.objects.select_for_update().filter(payment_id=external_id).values_list('pk', flat=True))
+        callbacks = list(
+            pending_callbacks().select_for_update().filter(external_id=external_id).order_by('id')
+        )
+        for callback in callbacks:
+            processed += 1
+            if not _apply(callback):
+                break
+    return processed
+
+
+def drain(limit=None, grace_seconds=0):
+    """
+    Подбирает уведомления, которые не дошли до воркера или упали.
+
+    ``grace_seconds`` не трогает совсем свежие уведомления, которые ещё
+    обрабатываются штатной задачей.
+    """
+    qs = pending_callbacks().filter(
+        received_at__lte=timezone.now() - timedelta(seconds=grace_seconds),
+    )
+    external_ids = []
+    for external_id in qs.order_by('id').values_list('external_id', flat=True).iterator():
+        if external_id not in external_ids:
+            external_ids.append(external_id)
+            if limit and len(external_ids) >= limit:
+                break
+    return sum(apply_pending(external_id) for external_id in external_ids)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.payments.transport import histogram_quantile, latency_histogram
+
+PROVIDERS = ('tbank', 'alfabank', 'sbp', 'sberbank', 'sberpay_qr')
+
+
+class Command(BaseCommand):
+    help = 'Показывает гистограммы задержек запросов к платёжным системам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('providers', nargs='*', default=PROVIDERS)
+
+    def handle(self, *args, **options):
+        for provider in options['providers']:
+            histogram = latency_histogram(provider)
+            if not histogram['count']:
+                self.stdout.write(f'{provider}: запросов не было')
+                continue
+            average = histogram['sum_ms'] / histogram['count']
+            self.stdout.write(self.style.SUCCESS(
+                f"{provider}: {histogram['count']} запросов, среднее {average:.0f} мс, "
+                f"p50 ≤ {histogram_quantile(histogram, 0.5)} с, "
+                f"p95 ≤ {histogram_quantile(histogram, 0.95)} с, "
+                f"p99 ≤ {histogram_quantile(histogram, 0.99)} с"
+            ))
+            for label, count in histogram['buckets'].items():
+                self.stdout.write(f'  ≤ {label:>5} с: {count}')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.payments.reconciliation import PaymentReconciler
+
+
+class Command(BaseCommand):
+    help = 'Сверяет зависшие платежи со статусами у платёжных систем'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только запросить статусы, ничего не менять')
+        parser.add_argument('--limit', type=int, help='Максимум платежей за запуск')
+        parser.add_argument('--concurrency', type=int, help='Параллельных запросов на провайдера')
+
+    def handle(self, *args, **options):
+        stats = PaymentReconciler(
+            dry_run=options['dry_run'],
+            limit=options['limit'],
+            concurrency=options['concurrency'],
+        ).run()
+        verb = 'будет ' if stats.dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Проверено: {stats.checked} за {stats.elapsed:.2f} с "
+            f"({stats.checks_per_second:.1f} проверок/с); {verb}оплачено: {stats.completed}, "
+            f"{verb}отклонено: {stats.failed}, ожидают: {stats.pending}, "
+            f"пропущено: {stats.skipped}, ошибок: {stats.errors}"
+        ))
+        for provider, count in sorted(stats.by_provider.items()):
+            self.stdout.write(f'  {provider}: {count}')
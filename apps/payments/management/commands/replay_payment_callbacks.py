@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payments.inbox import apply_pending
+from apps.payments.models import PaymentCallback
+
+
+class Command(BaseCommand):
+    help = 'Повторно применяет сохранённые уведомления платёжных систем'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='ID уведомлений')
+        parser.add_argument('--payment', help='ID платежа в платежной системе')
+        parser.add_argument(
+            '--status', default=PaymentCallback.Status.FAILED,
+            choices=PaymentCallback.Status.values,
+            help='Какие уведомления повторять (по умолчанию failed)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет повторено')
+
+    def handle(self, *args, **options):
+        qs = PaymentCallback.objects.order_by('id')
+        if options['ids']:
+            qs = qs.filter(pk__in=options['ids'])
+        else:
+            qs = qs.filter(status=options['status'])
+        if options['payment']:
+            qs = qs.filter(external_id=options['payment'])
+
+        callbacks = list(qs)
+        if not callbacks:
+            raise CommandError('Уведомления для повтора не найдены')
+
+        for callback in callbacks:
+            self.stdout.write(
+                f"{callback.pk:<8} {callback.provider:<8} {callback.external_id:<40} "
+                f"{callback.event:<20} {callback.status:<10} {callback.last_error[:60]}"
+            )
+        if options['dry_run']:
+            return
+
+        PaymentCallback.objects.filter(pk__in=[c.pk for c in callbacks]).update(
+            status=PaymentCallback.Status.RECEIVED, attempts=0,
+        )
+        processed = 0
+        for external_id in dict.fromkeys(c.external_id for c in callbacks):
+            processed += apply_pending(external_id)
+
+        failed = PaymentCallback.objects.filter(
+            pk__in=[c.pk for c in callbacks], status=PaymentCallback.Status.FAILED,
+        ).count()
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f'Обработано: {processed}, с ошибкой: {failed}'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.16 on 2026-10-19 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_alter_payment_payment_method'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCallback',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20, verbose_name='Платёжная система')),
+                ('external_id', models.CharField(max_length=255, verbose_name='ID платежа в платежной системе')),
+                ('event', models.CharField(max_length=100, verbose_name='Событие')),
+                ('payload', models.JSONField(default=dict, verbose_name='Данные уведомления')),
+                ('status', models.CharField(choices=[('received', 'Получено'), ('applied', 'Применено'), ('ignored', 'Без изменений'), ('failed', 'Ошибка')], default='received', max_length=20, verbose_name='Статус обработки')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток обработки')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Последняя ошибка')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Получено')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Обработано')),
+            ],
+            options={
+                'verbose_name': 'Уведомление платёжной системы',
+                'verbose_name_plural': 'Уведомления платёжных систем',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='payments_pa_status_8d30f0_idx'), models.Index(fields=['external_id', 'status'], name='payments_pa_externa_e256e6_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'external_id', 'event'), name='uniq_payment_callback_event')],
+            },
+        ),
+    ]
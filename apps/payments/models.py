@@ -123,3 +123,52 @@ class Payment(models.Model):
             return {}
         crypto = PaymentCrypto()
         return crypto.decrypt_data(self.encrypted_data)
+
+
+class PaymentCallback(models.Model):
+    """
+    Входящее уведомление платёжной системы (inbox).
+
+    Webhook только сохраняет сырой payload и сразу отвечает банку; применение
+    к платежу делает воркер (apps.payments.inbox). Уникальный ключ
+    (provider, external_id, event) превращает повторные доставки банка в no-op.
+    """
+
+    class Status(models.TextChoices):
+        RECEIVED = 'received', 'Получено'
+        APPLIED = 'applied', 'Применено'
+        IGNORED = 'ignored', 'Без изменений'
+        FAILED = 'failed', 'Ошибка'
+
+    provider = models.CharField(max_length=20, verbose_name="Платёжная система")
+    external_id = models.CharField(max_length=255, verbose_name="ID платежа в платежной системе")
+    event = models.CharField(max_length=100, verbose_name="Событие")
+    payload = models.JSONField(default=dict, verbose_name="Данные уведомления")
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.RECEIVED,
+        verbose_name="Статус обработки"
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток обработки")
+    last_error = models.TextField(blank=True, default='', verbose_name="Последняя ошибка")
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name="Получено")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Обработано")
+
+    class Meta:
+        verbose_name = "Уведомление платёжной системы"
+        verbose_name_plural = "Уведомления платёжных систем"
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['provider', 'external_id', 'event'],
+                name='uniq_payment_callback_event',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'received_at']),
+            models.Index(fields=['external_id', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.provider}:{self.external_id}:{self.event} ({self.get_status_display()})"
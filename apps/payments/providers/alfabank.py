@@ -1,11 +1,11 @@
 import uuid
 import hashlib
-import requests
 from typing import Dict, Any, Optional
 from decimal import Decimal
 from django.urls import reverse
 from ..config import ALFABANK_SETTINGS, PAYMENT_SETTINGS
 from ..models import Payment
+from ..transport import get_transport
 
 
 def _pref(payment):
@@ -25,7 +25,7 @@ class AlfaBankClient:
         self.password = ALFABANK_SETTINGS['PASSWORD']
         self.test_mode = ALFABANK_SETTINGS['TEST_MODE']
 
-    def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _make_request(self, endpoint: str, data: Dict[str, Any], idempotent: bool = False) -> Dict[str, Any]:
         """
         Выполняет запрос к API Альфа-Банка
         """
@@ -35,8 +35,9 @@ class AlfaBankClient:
             'Authorization': self._get_auth_token()
         }
         
-        response = requests.post(url, json=data, headers=headers, timeout=20)
-        response.raise_for_status()
+        response = get_transport('alfabank').request(
+            'POST', url, json=data, headers=headers, idempotent=idempotent,
+        )
         return response.json()
 
     def _get_auth_token(self) -> str:
@@ -120,7 +121,7 @@ class AlfaBankClient:
             'orderId': payment.payment_id,
         }
 
-        response = self._make_request('getOrderStatus.do', data)
+        response = self._make_request('getOrderStatus.do', data, idempotent=True)
 
         if response.get('errorCode'):
             raise ValueError(f"Ошибка проверки статуса: {response.get('errorMessage')}")
@@ -1,10 +1,10 @@
 import uuid
 import logging
-import requests
 from typing import Dict, Any, Optional
 from django.utils import timezone
 from ..config import SBERBANK_SETTINGS, PAYMENT_SETTINGS
 from ..models import Payment
+from ..transport import get_transport
 
 logger = logging.getLogger('oko.payments')
 
@@ -16,18 +16,18 @@ class SberbankClient:
         self.password = SBERBANK_SETTINGS['PASSWORD']
         self.test_mode = SBERBANK_SETTINGS['TEST_MODE']
 
-    def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _make_request(self, endpoint: str, data: Dict[str, Any], idempotent: bool = False) -> Dict[str, Any]:
         url = f"{self.api_url}{endpoint}"
         data['userName'] = self.username
         data['password'] = self.password
 
-        response = requests.post(
+        response = get_transport('sberbank').request(
+            'POST',
             url,
             data=data,
             headers={'Content-Type': 'application/x-www-form-urlencoded'},
-            timeout=30,
+            idempotent=idempotent,
         )
-        response.raise_for_status()
         return response.json()
 
     def register_payment(self, payment: Payment) -> Dict[str, Any]:
@@ -68,7 +68,7 @@ class SberbankClient:
             'language': 'ru',
         }
 
-        response = self._make_request('getOrderStatusExtended.do', data)
+        response = self._make_request('getOrderStatusExtended.do', data, idempotent=True)
 
         error_code = response.get('errorCode')
         if error_code and str(error_code) != '0':
@@ -17,11 +17,11 @@ import uuid
 from decimal import Decimal
 from typing import Any, Dict, Optional
 
-import requests
 from django.utils import timezone
 
 from ..config import SBERPAY_QR_SETTINGS
 from ..models import Payment, PaymentStatus
+from ..transport import get_transport
 
 logger = logging.getLogger('oko.payments.sberpay_qr')
 
@@ -39,8 +39,6 @@ class SberPayQRClient:
     REVOKE_ORDER_PATH = '/qr/order/v3/revoke'
     REFUND_ORDER_PATH = '/qr/order/v3/refund'
 
-    DEFAULT_TIMEOUT = 30
-
     def __init__(self) -> None:
         self.api_url: str = SBERPAY_QR_SETTINGS['API_URL'].rstrip('/')
         self.tid: str = SBERPAY_QR_SETTINGS['TID']
@@ -55,6 +53,12 @@ class SberPayQRClient:
         self._cert = (cert_path, key_path) if cert_path and key_path else cert_path
         self._ca = ca_path or True  # True -> use system CA bundle
 
+    @property
+    def _transport(self):
+        # Сертификат задаётся на сессии: mTLS-соединения из пула переживают
+        # отдельные вызовы, и опрос статуса не повторяет рукопожатие.
+        return get_transport('sberpay_qr', cert=self._cert, verify=self._ca)
+
     # ---------- low-level ----------
     def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         if not self._cert:
@@ -69,15 +73,7 @@ class SberPayQRClient:
             'rqUid': uuid.uuid4().hex,
         }
         logger.info("SberPay QR POST %s payload_keys=%s", path, list(payload.keys()))
-        response = requests.post(
-            url,
-            json=payload,
-            headers=headers,
-            cert=self._cert,
-            verify=self._ca,
-            timeout=self.DEFAULT_TIMEOUT,
-        )
-        response.raise_for_status()
+        response = self._transport.post(url, json=payload, headers=headers)
         return response.json()
 
     def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -90,15 +86,7 @@ class SberPayQRClient:
             'Accept': 'application/json',
             'rqUid': uuid.uuid4().hex,
         }
-        response = requests.get(
-            url,
-            params=params,
-            headers=headers,
-            cert=self._cert,
-            verify=self._ca,
-            timeout=self.DEFAULT_TIMEOUT,
-        )
-        response.raise_for_status()
+        response = self._transport.get(url, params=params, headers=headers)
         return response.json()
 
     # ---------- public ----------
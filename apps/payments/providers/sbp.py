@@ -3,12 +3,12 @@ import hmac
 import hashlib
 import base64
 import json
-import requests
 from typing import Dict, Any, Optional
 from decimal import Decimal
 from django.utils import timezone
 from ..config import SBP_SETTINGS, PAYMENT_SETTINGS
 from ..models import Payment
+from ..transport import get_transport
 
 
 def _pref(payment):
@@ -39,7 +39,7 @@ class SBPClient:
         ).digest()
         return base64.b64encode(signature).decode()
 
-    def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _make_request(self, endpoint: str, data: Dict[str, Any], idempotent: bool = False) -> Dict[str, Any]:
         """
         Выполняет запрос к API СБП
         """
@@ -51,8 +51,9 @@ class SBPClient:
             'X-Request-Signature': self._sign_request(data)
         }
         
-        response = requests.post(url, json=data, headers=headers, timeout=20)
-        response.raise_for_status()
+        response = get_transport('sbp').request(
+            'POST', url, json=data, headers=headers, idempotent=idempotent,
+        )
         return response.json()
 
     def register_payment(self, payment: Payment) -> Dict[str, Any]:
@@ -105,7 +106,7 @@ class SBPClient:
             'merchantId': self.merchant_id
         }
 
-        response = self._make_request('qr/status', data)
+        response = self._make_request('qr/status', data, idempotent=True)
 
         if response.get('errorCode'):
             raise ValueError(f"Ошибка проверки статуса: {response.get('errorMessage')}")
@@ -1,9 +1,9 @@
 """T-Bank acquiring adapter. Disabled until TERMINAL_KEY and PASSWORD are set."""
 import hashlib
-import requests
 from django.utils import timezone
 from apps.payments.models import Payment, PaymentStatus
 from ..config import TBANK_SETTINGS
+from ..transport import get_transport
 
 
 class TBankClient:
@@ -23,13 +23,14 @@ class TBankClient:
         raw = ''.join(str(values[k]) for k in sorted(values))
         return hashlib.sha256(raw.encode('utf-8')).hexdigest()
 
-    def _post(self, method, payload):
+    def _post(self, method, payload, idempotent=False):
         if not self.configured:
             raise ValueError('Т-Банк не настроен: задайте TBANK_TERMINAL_KEY и TBANK_PASSWORD')
         data = {**payload, 'TerminalKey': self.terminal_key}
         data['Token'] = self._token(data)
-        response = requests.post(f'{self.api_url}/{method}', json=data, timeout=20)
-        response.raise_for_status()
+        response = get_transport('tbank').request(
+            'POST', f'{self.api_url}/{method}', json=data, idempotent=idempotent,
+        )
         body = response.json()
         if not body.get('Success'):
             raise ValueError(body.get('Message') or body.get('Details') or 'Ошибка Т-Банка')
@@ -48,6 +49,11 @@ class TBankClient:
         payment.save(update_fields=['metadata', 'updated_at'])
         return {'formUrl': body['PaymentURL']}
 
+    def get_state(self, payment):
+        """Текущий статус платежа в Т-Банке (CONFIRMED, REJECTED, ...)."""
+        body = self._post('GetState', {'PaymentId': payment.metadata['tbank_payment_id']}, idempotent=True)
+        return body.get('Status')
+
     def verify_callback(self, data):
         supplied = data.get('Token', '')
         return bool(supplied) and supplied == self._token(data)
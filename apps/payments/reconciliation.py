@@ -0,0 +1,209 @@
+"""
+Сверка зависших платежей с платёжными системами.
+
+Платёж в статусе pending/processing, по которому давно не пришёл callback,
+проверяется запросом статуса у провайдера. Запросы идут параллельно в пуле
+потоков с ограничением одновременных запросов на каждого провайдера; в
+потоках выполняется только HTTP, а результат применяется в основном потоке
+через тот же путь, что и callback (``PaymentService.complete_payment``),
+под блокировкой строки платежа.
+
+Платежи выбираются страницами по первичному ключу, так что один запуск
+обходит очередь целиком, не держа её в памяти.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Payment, PaymentStatus
+
+logger = logging.getLogger('oko.payments')
+
+DEFAULT_STALE_MINUTES = 15
+DEFAULT_MAX_AGE_DAYS = 3
+DEFAULT_PAGE_SIZE = 200
+DEFAULT_CONCURRENCY = 4
+
+PAID, FAILED, PENDING = 'paid', 'failed', 'pending'
+
+TBANK_STATES = {
+    'CONFIRMED': PAID, 'AUTHORIZED': PAID,
+    'REJECTED': FAILED, 'CANCELED': FAILED, 'DEADLINE_EXPIRED': FAILED, 'REVERSED': FAILED,
+}
+# orderStatus Альфа-Банка: 2 — оплачен, 3 — отменён, 6 — отклонён.
+ALFABANK_STATES = {'2': PAID, '3': FAILED, '6': FAILED}
+SBP_STATES = {'PAID': PAID, 'REJECTED': FAILED, 'EXPIRED': FAILED, 'CANCELED': FAILED}
+
+
+def _option(name, default):
+    return getattr(settings, f'PAYMENT_RECONCILE_{name}', default)
+
+
+def _check_tbank(payment):
+    from .providers.tbank import TBankClient
+    return TBANK_STATES.get(TBankClient().get_state(payment), PENDING)
+
+
+def _check_alfabank(payment):
+    from .providers.alfabank import AlfaBankClient
+    return ALFABANK_STATES.get(str(AlfaBankClient().check_payment_status(payment)), PENDING)
+
+
+def _check_sbp(payment):
+    from .providers.sbp import SBPClient
+    return SBP_STATES.get(SBPClient().check_payment_status(payment), PENDING)
+
+
+def _checker(payment):
+    """Функция проверки статуса или None, если спросить провайдера нечего."""
+    from .config import ALFABANK_SETTINGS, SBP_SETTINGS, TBANK_SETTINGS
+    from .services import PaymentService
+
+    rail = PaymentService._NORMALIZE_METHOD.get(payment.payment_method)
+    if rail == 'tbank':
+        if TBANK_SETTINGS.get('TERMINAL_KEY') and (payment.metadata or {}).get('tbank_payment_id'):
+            return rail, _check_tbank
+        return rail, None
+    # tmp-… — платёж так и не зарегистрировали у провайдера.
+    if payment.payment_id.startswith('tmp-'):
+        return rail, None
+    if rail == 'card' and ALFABANK_SETTINGS.get('USERNAME'):
+        return rail, _check_alfabank
+    if rail == 'sbp' and SBP_SETTINGS.get('MERCHANT_ID'):
+        return rail, _check_sbp
+    return rail, None
+
+
+@dataclass
+class ReconcileStats:
+    checked: int = 0
+    completed: int = 0
+    failed: int = 0
+    pending: int = 0
+    skipped: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    dry_run: bool = False
+    by_provider: Counter = field(default_factory=Counter)
+
+    @property
+    def checks_per_second(self):
+        if self.elapsed <= 0:
+            return float(self.checked)
+        return self.checked / self.elapsed
+
+
+class PaymentReconciler:
+    def __init__(self, *, dry_run=False, page_size=None, concurrency=None, limit=None):
+        self.dry_run = dry_run
+        self.page_size = int(page_size or _option('PAGE_SIZE', DEFAULT_PAGE_SIZE))
+        self.concurrency = int(concurrency or _option('CONCURRENCY', DEFAULT_CONCURRENCY))
+        self.limit = limit
+        self._semaphores = {}
+        self._semaphores_lock = threading.Lock()
+
+    def stale_payments(self, now=None):
+        now = now or timezone.now()
+        return Payment.objects.filter(
+            status__in=[PaymentStatus.PENDING, PaymentStatus.PROCESSING],
+            created_at__lte=now - timedelta(minutes=int(_option('STALE_MINUTES', DEFAULT_STALE_MINUTES))),
+            created_at__gte=now - timedelta(days=int(_option('MAX_AGE_DAYS', DEFAULT_MAX_AGE_DAYS))),
+        )
+
+    def _semaphore(self, rail):
+        with self._semaphores_lock:
+            if rail not in self._semaphores:
+                self._semaphores[rail] = threading.BoundedSemaphore(self.concurrency)
+            return self._semaphores[rail]
+
+    def _query(self, rail, check, payment):
+        with self._semaphore(rail):
+            try:
+                return check(payment), None
+            except Exception as exc:  # noqa: BLE001
+                return None, exc
+
+    def _apply(self, payment_pk, outcome):
+        from .services import PaymentService
+
+        with transaction.atomic():
+            payment = Payment.objects.select_for_update().get(pk=payment_pk)
+            if payment.status not in (PaymentStatus.PENDING, PaymentStatus.PROCESSING):
+                return False  # callback успел раньше
+            if outcome == PAID:
+                PaymentService.complete_payment(payment)
+            else:
+                payment.status = PaymentStatus.FAILED
+                payment.save(update_fields=['status', 'updated_at'])
+        return True
+
+    def _process_page(self, pool, payments, stats):
+        jobs = []
+        for payment in payments:
+            rail, check = _checker(payment)
+            if check is None:
+                stats.skipped += 1
+                continue
+            jobs.append((payment, rail, pool.submit(self._query, rail, check, payment)))
+
+        for payment, rail, future in jobs:
+            outcome, error = future.result()
+            stats.checked += 1
+            stats.by_provider[rail] += 1
+            if error is not None:
+                stats.errors += 1
+                logger.warning("Сверка платежа %s: ошибка провайдера %s: %s", payment.payment_id, rail, error)
+                continue
+            if outcome == PENDING:
+                stats.pending += 1
+                continue
+            if self.dry_run:
+                logger.info("Сверка (dry-run): платёж %s → %s", payment.payment_id, outcome)
+            else:
+                try:
+                    if not self._apply(payment.pk, outcome):
+                        continue
+                except Exception:  # noqa: BLE001
+                    stats.errors += 1
+                    logger.exception("Сверка платежа %s: не удалось применить статус", payment.payment_id)
+                    continue
+            if outcome == PAID:
+                stats.completed += 1
+            else:
+                stats.failed += 1
+
+    def run(self, now=None):
+        stats = ReconcileStats(dry_run=self.dry_run)
+        started = time.monotonic()
+        queryset = self.stale_payments(now)
+        last_pk = 0
+        seen = 0
+        # Потоков хватает, чтобы каждый провайдер мог выбрать свой лимит.
+        with ThreadPoolExecutor(max_workers=self.concurrency * 3) as pool:
+            while not self.limit or seen < self.limit:
+                size = self.page_size if not self.limit else min(self.page_size, self.limit - seen)
+                page = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:size])
+                if not page:
+                    break
+                self._process_page(pool, page, stats)
+                seen += len(page)
+                last_pk = page[-1].pk
+                if len(page) < size:
+                    break
+
+        stats.elapsed = time.monotonic() - started
+        logger.info(
+            f"Сверка платежей{' (dry-run)' if self.dry_run else ''}: проверено {stats.checked} "
+            f"({dict(stats.by_provider)}), оплачено {stats.completed}, отклонено {stats.failed}, "
+            f"ожидают {stats.pending}, пропущено {stats.skipped}, ошибок {stats.errors}, "
+            f"{stats.elapsed:.2f} с ({stats.checks_per_second:.1f} проверок/с)"
+        )
+        return stats
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Payment
+from .utils import qr_version
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -11,6 +12,7 @@ class PaymentSerializer(serializers.ModelSerializer):
         source='get_status_display',
         read_only=True
     )
+    qr_version = serializers.SerializerMethodField()
 
     class Meta:
         model = Payment
@@ -18,9 +20,12 @@ class PaymentSerializer(serializers.ModelSerializer):
             'id', 'order', 'amount', 'payment_method',
             'payment_method_display', 'status', 'status_display',
             'payment_id', 'created_at', 'updated_at',
-            'paid_at', 'refunded_at', 'metadata'
+            'paid_at', 'refunded_at', 'metadata', 'qr_version'
         ]
         read_only_fields = [
             'payment_id', 'created_at', 'updated_at',
             'paid_at', 'refunded_at', 'status'
-        ] 
\ No newline at end of file
+        ]
+
+    def get_qr_version(self, obj):
+        return qr_version(obj) 
\ No newline at end of file
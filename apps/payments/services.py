@@ -77,21 +77,31 @@ class PaymentService:
                 result = None
 
             if result:
-                if payment.status != PaymentStatus.COMPLETED:
-                    payment.status = PaymentStatus.COMPLETED
-                    payment.paid_at = timezone.now()
-                    payment.save(update_fields=['status', 'paid_at', 'updated_at'])
-                if payment.order_id:
-                    PaymentService._reserve_order_payment(payment)
-                    order = payment.order
-                    order.status = 'in_progress'
-                    order.save(update_fields=['status'])
+                PaymentService.complete_payment(payment)
                 return True
                 
             return False
         except Payment.DoesNotExist:
             return False
 
+    @staticmethod
+    def complete_payment(payment: Payment) -> None:
+        """
+        Отмечает платёж оплаченным и применяет его к заказу/кошельку.
+
+        Общий путь для callback'ов и сверки статусов: повторный вызов для уже
+        оплаченного платежа ничего не начисляет повторно.
+        """
+        if payment.status != PaymentStatus.COMPLETED:
+            payment.status = PaymentStatus.COMPLETED
+            payment.paid_at = timezone.now()
+            payment.save(update_fields=['status', 'paid_at', 'updated_at'])
+        if payment.order_id:
+            PaymentService._reserve_order_payment(payment)
+            order = payment.order
+            order.status = 'in_progress'
+            order.save(update_fields=['status'])
+
     @staticmethod
     def _reserve_order_payment(payment: Payment) -> None:
         """Reflect a successful external order payment in the wallet ledger."""
@@ -0,0 +1,46 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+logger = logging.getLogger('oko.payments')
+
+
+@shared_task
+def apply_payment_callback(callback_id):
+    """Применяет уведомление и все более ранние необработанные уведомления того же платежа."""
+    from .inbox import apply_pending
+    from .models import PaymentCallback
+
+    external_id = PaymentCallback.objects.filter(pk=callback_id).values_list('external_id', flat=True).first()
+    if external_id is None:
+        return 0
+    return apply_pending(external_id)
+
+
+@shared_task
+def drain_payment_callbacks():
+    """Повторяет упавшие и потерянные уведомления (страховка для очереди)."""
+    from .inbox import drain
+
+    processed = drain(
+        limit=getattr(settings, 'PAYMENT_CALLBACK_DRAIN_LIMIT', 100),
+        grace_seconds=getattr(settings, 'PAYMENT_CALLBACK_GRACE_SECONDS', 60),
+    )
+    if processed:
+        logger.info(f"Дообработано уведомлений платёжных систем: {processed}")
+    return processed
+
+
+@shared_task
+def reconcile_pending_payments():
+    """Сверяет зависшие платежи со статусами у платёжных систем."""
+    from .reconciliation import PaymentReconciler
+
+    stats = PaymentReconciler(limit=getattr(settings, 'PAYMENT_RECONCILE_MAX_PER_RUN', None)).run()
+    return {
+        'checked': stats.checked,
+        'completed': stats.completed,
+        'failed': stats.failed,
+        'errors': stats.errors,
+    }
@@ -0,0 +1,430 @@
+import json
+import socket
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest.mock import patch
+
+import requests
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.orders.models import Transaction, TransactionType
+from apps.payments.inbox import apply_pending, drain, record_callback
+from apps.payments.models import Payment, PaymentCallback, PaymentStatus
+from apps.payments.providers.tbank import TBankClient
+from apps.payments.reconciliation import PaymentReconciler
+from apps.payments.transport import (
+    ProviderUnavailable, get_transport, histogram_quantile, latency_histogram, reset_transports,
+)
+from apps.payments import utils as qr_utils
+from apps.payments.utils import qr_version
+
+User = get_user_model()
+
+TBANK_CALLBACK_URL = '/api/payments/payments/tbank/callback/'
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PaymentCallbackInboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='inbox_client', password='pwd', role='client')
+        self.payment = Payment.objects.create(
+            user=self.user,
+            amount=Decimal('300.00'),
+            payment_method='tbank',
+            purpose=Payment.Purpose.TOPUP,
+            status=PaymentStatus.PENDING,
+            payment_id='inbox-topup-1',
+        )
+
+    def _signed(self, status='CONFIRMED', **extra):
+        data = {'OrderId': self.payment.payment_id, 'Status': status, 'PaymentId': '42', **extra}
+        data['Token'] = TBankClient()._token(data)
+        return data
+
+    def test_webhook_stores_callback_and_acknowledges_before_applying(self):
+        api = APIClient()
+        with patch('apps.payments.tasks.apply_payment_callback.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                first = api.post(TBANK_CALLBACK_URL, self._signed(), format='json')
+            with self.captureOnCommitCallbacks(execute=True):
+                retry = api.post(TBANK_CALLBACK_URL, self._signed(), format='json')
+
+        self.assertEqual(first.status_code, 200, first.content)
+        self.assertEqual(retry.status_code, 200, retry.content)
+        callback = PaymentCallback.objects.get()
+        self.assertEqual((callback.provider, callback.event), ('tbank', 'CONFIRMED'))
+        delay.assert_called_once_with(callback.pk)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentStatus.PENDING)
+
+    def test_webhook_rejects_invalid_token(self):
+        data = self._signed()
+        data['Token'] = 'forged'
+        response = APIClient().post(TBANK_CALLBACK_URL, data, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentCallback.objects.exists())
+
+    def test_process_callback_rejects_unsigned_tbank_notification(self):
+        url = f'/api/payments/payments/{self.payment.pk}/process_callback/'
+        forged = {'OrderId': self.payment.payment_id, 'Status': 'CONFIRMED', 'PaymentId': '42'}
+        response = APIClient().post(url, forged, format='json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PaymentCallback.objects.exists())
+
+        with patch('apps.payments.tasks.apply_payment_callback.delay'):
+            response = APIClient().post(url, self._signed(), format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(PaymentCallback.objects.get().provider, 'tbank')
+
+    def test_process_callback_rejects_unknown_method(self):
+        Payment.objects.filter(pk=self.payment.pk).update(payment_method='crypto')
+        response = APIClient().post(
+            f'/api/payments/payments/{self.payment.pk}/process_callback/', self._signed(), format='json',
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PaymentCallback.objects.exists())
+
+    def test_apply_credits_wallet_once(self):
+        callback, created = record_callback('tbank', self.payment.payment_id, self._signed())
+        self.assertTrue(created)
+        self.assertFalse(record_callback('tbank', self.payment.payment_id, self._signed())[1])
+
+        self.assertEqual(apply_pending(self.payment.payment_id), 1)
+        self.assertEqual(apply_pending(self.payment.payment_id), 0)
+
+        callback.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(callback.status, PaymentCallback.Status.APPLIED)
+        self.assertEqual(callback.attempts, 1)
+        self.assertEqual(self.user.balance, Decimal('300.00'))
+        self.assertEqual(
+            Transaction.objects.filter(payment=self.payment, type=TransactionType.TOPUP).count(), 1,
+        )
+
+    def test_non_final_status_is_ignored(self):
+        callback, _ = record_callback('tbank', self.payment.payment_id, self._signed(status='NEW'))
+        apply_pending(self.payment.payment_id)
+
+        callback.refresh_from_db()
+        self.assertEqual(callback.status, PaymentCallback.Status.IGNORED)
+
+    def test_failure_holds_back_later_events_of_the_same_payment(self):
+        early, _ = record_callback('tbank', self.payment.payment_id, self._signed(status='AUTHORIZED'))
+        late, _ = record_callback('tbank', self.payment.payment_id, self._signed())
+
+        with patch(
+            'apps.payments.services.PaymentService.process_payment_callback',
+            side_effect=RuntimeError('bank timeout'),
+        ) as process:
+            apply_pending(self.payment.payment_id)
+        self.assertEqual(process.call_count, 1)
+
+        early.refresh_from_db()
+        late.refresh_from_db()
+        self.assertEqual(early.status, PaymentCallback.Status.FAILED)
+        self.assertIn('bank timeout', early.last_error)
+        self.assertEqual(late.status, PaymentCallback.Status.RECEIVED)
+
+        with patch('apps.payments.services.PaymentService.process_payment_callback', return_value=True) as process:
+            self.assertEqual(drain(), 2)
+        self.assertEqual(
+            [call.args[1]['Status'] for call in process.call_args_list], ['AUTHORIZED', 'CONFIRMED'],
+        )
+
+    @override_settings(PAYMENT_CALLBACK_MAX_ATTEMPTS=1)
+    def test_replay_command_retries_exhausted_callbacks(self):
+        callback, _ = record_callback('tbank', self.payment.payment_id, self._signed())
+        with patch(
+            'apps.payments.services.PaymentService.process_payment_callback',
+            side_effect=RuntimeError('boom'),
+        ):
+            apply_pending(self.payment.payment_id)
+        self.assertEqual(drain(), 0)
+
+        out = StringIO()
+        call_command('replay_payment_callbacks', stdout=out)
+
+        callback.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(callback.status, PaymentCallback.Status.APPLIED)
+        self.assertEqual(self.user.balance, Decimal('300.00'))
+        self.assertIn('Обработано: 1', out.getvalue())
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        server = self.server
+        server.requests.append((self.command, self.path, self.client_address[1], body))
+        status_code, payload = server.responses.pop(0) if server.responses else (200, {'ok': True})
+        data = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(
+    PAYMENT_HTTP_BACKOFF=0, PAYMENT_HTTP_RETRIES=2,
+    PAYMENT_HTTP_BREAKER_THRESHOLD=3, PAYMENT_HTTP_BREAKER_COOLDOWN=60,
+)
+class ProviderTransportTests(TestCase):
+    def setUp(self):
+        reset_transports()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.requests = []
+        self.server.responses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def tearDown(self):
+        reset_transports()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_session_reuses_keep_alive_connection(self):
+        transport = get_transport('stub')
+        for _ in range(3):
+            transport.get(f'{self.base_url}/status')
+
+        self.assertIs(get_transport('stub'), transport)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len({port for _, _, port, _ in self.server.requests}), 1)
+
+    def test_idempotent_call_retries_server_errors(self):
+        self.server.responses = [(503, {}), (200, {'status': 'PAID'})]
+
+        response = get_transport('stub').get(f'{self.base_url}/status')
+
+        self.assertEqual(response.json(), {'status': 'PAID'})
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_non_idempotent_call_is_not_retried_after_reaching_the_bank(self):
+        self.server.responses = [(503, {})]
+
+        with self.assertRaises(requests.HTTPError):
+            get_transport('stub').post(f'{self.base_url}/register', json={})
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_connection_failures_are_retried_even_for_post(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            closed_port = sock.getsockname()[1]
+        transport = get_transport('stub-down')
+
+        with self.assertRaises(requests.ConnectionError):
+            transport.post(f'http://127.0.0.1:{closed_port}/register', json={})
+        self.assertEqual(transport.breaker.failures, 3)
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        self.server.responses = [(502, {})] * 3
+        transport = get_transport('stub')
+
+        with self.assertRaises(requests.HTTPError):
+            transport.get(f'{self.base_url}/status')
+        self.assertTrue(transport.breaker.is_open)
+        with self.assertRaises(ProviderUnavailable):
+            transport.get(f'{self.base_url}/status')
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_errors_do_not_trip_the_breaker(self):
+        self.server.responses = [(400, {})] * 5
+        transport = get_transport('stub')
+
+        for _ in range(5):
+            with self.assertRaises(requests.HTTPError):
+                transport.post(f'{self.base_url}/register', json={})
+        self.assertFalse(transport.breaker.is_open)
+
+    def test_latency_histogram_is_recorded_per_provider(self):
+        before = latency_histogram('stub-metrics')['count']
+        for _ in range(4):
+            get_transport('stub-metrics').get(f'{self.base_url}/status')
+
+        histogram = latency_histogram('stub-metrics')
+        self.assertEqual(histogram['count'] - before, 4)
+        self.assertEqual(sum(histogram['buckets'].values()), histogram['count'])
+        self.assertLessEqual(histogram_quantile(histogram, 0.5), 1.0)
+
+    def test_tbank_client_goes_through_the_pooled_transport(self):
+        self.server.responses = [(200, {'Success': True, 'PaymentURL': 'https://pay.example/1', 'PaymentId': 7})]
+        user = User.objects.create_user(username='transport_client', password='pwd', role='client')
+        payment = Payment.objects.create(
+            user=user, amount=Decimal('10.00'), payment_method='tbank',
+            purpose=Payment.Purpose.TOPUP, payment_id='transport-1',
+        )
+        client = TBankClient()
+        client.api_url, client.terminal_key, client.password = self.base_url, 'terminal', 'secret'
+
+        self.assertEqual(client.register_payment(payment), {'formUrl': 'https://pay.example/1'})
+        method, path, _, body = self.server.requests[0]
+        self.assertEqual((method, path), ('POST', '/Init'))
+        self.assertEqual(json.loads(body)['OrderId'], 'transport-1')
+
+
+@patch.dict('apps.payments.config.TBANK_SETTINGS', {'TERMINAL_KEY': 'terminal'})
+class PaymentReconciliationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reconcile_client', password='pwd', role='client')
+
+    def _payment(self, payment_id, *, minutes_ago=60, **fields):
+        fields.setdefault('metadata', {'tbank_payment_id': f'tb-{payment_id}'})
+        payment = Payment.objects.create(
+            user=self.user,
+            amount=Decimal('100.00'),
+            payment_method='tbank',
+            purpose=Payment.Purpose.TOPUP,
+            status=PaymentStatus.PENDING,
+            payment_id=payment_id,
+            **fields,
+        )
+        Payment.objects.filter(pk=payment.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return payment
+
+    def _states(self, states):
+        return patch.object(
+            TBankClient, 'get_state', autospec=True,
+            side_effect=lambda client, payment: states[payment.payment_id],
+        )
+
+    def test_paid_payments_complete_through_the_callback_path(self):
+        paid = self._payment('rc-paid')
+        rejected = self._payment('rc-rejected')
+        waiting = self._payment('rc-waiting')
+        fresh = self._payment('rc-fresh', minutes_ago=1)
+        states = {'rc-paid': 'CONFIRMED', 'rc-rejected': 'REJECTED', 'rc-waiting': 'FORM_SHOWED'}
+
+        with self._states(states):
+            stats = PaymentReconciler().run()
+            again = PaymentReconciler().run()
+
+        self.assertEqual((stats.checked, stats.completed, stats.failed, stats.pending), (3, 1, 1, 1))
+        self.assertEqual(again.checked, 1)
+        for payment in (paid, rejected, waiting, fresh):
+            payment.refresh_from_db()
+        self.assertEqual(paid.status, PaymentStatus.COMPLETED)
+        self.assertEqual(rejected.status, PaymentStatus.FAILED)
+        self.assertEqual(waiting.status, PaymentStatus.PENDING)
+        self.assertEqual(fresh.status, PaymentStatus.PENDING)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('100.00'))
+
+    def test_dry_run_reports_without_changing_payments(self):
+        payment = self._payment('rc-dry')
+
+        with self._states({'rc-dry': 'CONFIRMED'}):
+            stats = PaymentReconciler(dry_run=True).run()
+
+        self.assertEqual(stats.completed, 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, PaymentStatus.PENDING)
+        self.assertFalse(Transaction.objects.filter(payment=payment).exists())
+
+    def test_unregistered_payments_are_skipped_and_errors_counted(self):
+        self._payment('rc-unregistered', metadata={})
+        self._payment('rc-broken')
+
+        with patch.object(TBankClient, 'get_state', side_effect=ValueError('Ошибка Т-Банка')):
+            stats = PaymentReconciler().run()
+
+        self.assertEqual((stats.skipped, stats.checked, stats.errors), (1, 1, 1))
+
+    def test_pages_cover_the_whole_queue_with_capped_concurrency(self):
+        for i in range(7):
+            self._payment(f'rc-page-{i}')
+        in_flight, peak, lock = [0], [0], threading.Lock()
+
+        def slow_state(client, payment):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return 'NEW'
+
+        with patch.object(TBankClient, 'get_state', autospec=True, side_effect=slow_state):
+            stats = PaymentReconciler(page_size=3, concurrency=2).run()
+
+        self.assertEqual(stats.checked, 7)
+        self.assertEqual(stats.pending, 7)
+        self.assertLessEqual(peak[0], 2)
+        self.assertEqual(stats.by_provider['tbank'], 7)
+
+    def test_limit_bounds_a_single_run(self):
+        for i in range(5):
+            self._payment(f'rc-limit-{i}')
+
+        with self._states({f'rc-limit-{i}': 'NEW' for i in range(5)}):
+            stats = PaymentReconciler(page_size=2, limit=3).run()
+
+        self.assertEqual(stats.checked, 3)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PaymentQRCodeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='qr_client', password='pwd', role='client')
+        self.payment = Payment.objects.create(
+            user=self.user, amount=Decimal('50.00'), payment_method='sbp',
+            purpose=Payment.Purpose.TOPUP, payment_id='QR-qr-1',
+            metadata={'payload': 'https://qr.nspk.ru/AS1000TEST'},
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.url = f'/api/payments/payments/{self.payment.pk}/qr_code/'
+
+    def test_png_is_rendered_once_and_revalidated_by_etag(self):
+        with patch.object(qr_utils, '_render', wraps=qr_utils._render) as render:
+            first = self.api.get(self.url, {'size': 200})
+            second = self.api.get(self.url, {'size': 200})
+            not_modified = self.api.get(self.url, {'size': 200}, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Content-Type'], 'image/png')
+        self.assertTrue(first.content.startswith(b'\x89PNG'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+
+    def test_svg_variant_with_version_is_immutable(self):
+        response = self.api.get(self.url, {'fmt': 'svg', 'size': 400, 'v': qr_version(self.payment)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'width="400" height="400"', response.content)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(qr_version(self.payment), response['ETag'])
+
+    def test_unsupported_variants_are_rejected(self):
+        self.assertEqual(self.api.get(self.url, {'fmt': 'gif'}).status_code, 400)
+        self.assertEqual(self.api.get(self.url, {'size': 'huge'}).status_code, 400)
+        self.assertEqual(self.api.get(self.url, {'size': 1000}).status_code, 400)
+
+    def test_serializer_exposes_qr_version(self):
+        response = self.api.get(f'/api/payments/payments/{self.payment.pk}/')
+        self.assertEqual(response.json()['qr_version'], qr_version(self.payment))
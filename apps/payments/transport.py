@@ -0,0 +1,232 @@
+"""
+Общий HTTP-транспорт для клиентов эквайринга (apps.payments.providers).
+
+На каждого провайдера — один ``requests.Session`` на процесс: пул
+keep-alive соединений (и для SberPay QR — однажды поднятый mTLS-контекст)
+переиспользуется между запросами вместо нового TCP/TLS-рукопожатия на
+каждый вызов.
+
+Поверх сессии:
+
+* раздельные таймауты на соединение и чтение;
+* повтор с экспоненциальной задержкой и jitter. Запросы, которые могли
+  дойти до банка (таймаут чтения, 5xx), повторяются только для
+  идемпотентных вызовов — проверки статуса; регистрацию платежа
+  повторяем, лишь если соединение так и не установилось;
+* circuit breaker: после серии сбоев подряд запросы к провайдеру сразу
+  отклоняются ``ProviderUnavailable`` до истечения паузы, затем
+  пропускается один пробный запрос;
+* гистограмма задержек по провайдеру в общем кэше — её показывает
+  ``manage.py payment_provider_stats``.
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('oko.payments')
+
+DEFAULTS = {
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 15,
+    'RETRIES': 2,
+    'BACKOFF': 0.3,
+    'BACKOFF_MAX': 5,
+    'POOL_SIZE': 10,
+    'BREAKER_THRESHOLD': 5,
+    'BREAKER_COOLDOWN': 30,
+}
+
+# Верхние границы корзин гистограммы, секунды.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+METRICS_TTL = 7 * 24 * 3600
+
+
+class ProviderUnavailable(Exception):
+    """Провайдер временно отключён circuit breaker'ом."""
+
+
+def _option(name):
+    return getattr(settings, f'PAYMENT_HTTP_{name}', DEFAULTS[name])
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # Полуоткрытое состояние: пропускаем один пробный запрос и
+                # сдвигаем окно, чтобы остальные подождали его результата.
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def _metric_key(provider, suffix):
+    return f'payments:http:{provider}:{suffix}'
+
+
+def _incr(key, delta=1):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, METRICS_TTL)
+        cache.incr(key, delta)
+
+
+def observe_latency(provider, seconds):
+    bucket = next((str(b) for b in LATENCY_BUCKETS if seconds <= b), 'inf')
+    try:
+        _incr(_metric_key(provider, f'le:{bucket}'))
+        _incr(_metric_key(provider, 'count'))
+        _incr(_metric_key(provider, 'sum_ms'), int(seconds * 1000))
+    except Exception:  # noqa: BLE001 — метрики не должны ломать платежи
+        logger.debug('Не удалось записать метрику задержки %s', provider, exc_info=True)
+
+
+def latency_histogram(provider):
+    """Счётчики по корзинам (не накопительные), число запросов и сумма в мс."""
+    labels = [str(b) for b in LATENCY_BUCKETS] + ['inf']
+    keys = [_metric_key(provider, f'le:{label}') for label in labels]
+    values = cache.get_many(keys + [_metric_key(provider, 'count'), _metric_key(provider, 'sum_ms')])
+    return {
+        'buckets': {label: values.get(key, 0) for label, key in zip(labels, keys)},
+        'count': values.get(_metric_key(provider, 'count'), 0),
+        'sum_ms': values.get(_metric_key(provider, 'sum_ms'), 0),
+    }
+
+
+def histogram_quantile(histogram, q):
+    """Верхняя граница корзины, в которую попадает квантиль ``q``."""
+    total = histogram['count']
+    if not total:
+        return None
+    seen = 0
+    for label, count in histogram['buckets'].items():
+        seen += count
+        if seen >= q * total:
+            return float(label)
+    return float('inf')
+
+
+def _never_sent(exc):
+    """Соединение не установлено — банк запрос точно не получил."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+        return type(reason).__name__ == 'NewConnectionError'
+    return False
+
+
+class ProviderTransport:
+    RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+    def __init__(self, provider, *, cert=None, verify=True):
+        self.provider = provider
+        self.timeout = (float(_option('CONNECT_TIMEOUT')), float(_option('READ_TIMEOUT')))
+        self.retries = int(_option('RETRIES'))
+        self.backoff = float(_option('BACKOFF'))
+        self.backoff_max = float(_option('BACKOFF_MAX'))
+        self.breaker = CircuitBreaker(int(_option('BREAKER_THRESHOLD')), float(_option('BREAKER_COOLDOWN')))
+
+        pool_size = int(_option('POOL_SIZE'))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if cert:
+            self.session.cert = cert
+        self.session.verify = verify
+
+    def _delay(self, attempt):
+        # Full jitter: равномерно от нуля до экспоненциальной границы.
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, *, idempotent=False, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise ProviderUnavailable(f'{self.provider}: провайдер временно недоступен')
+
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as exc:
+                observe_latency(self.provider, time.monotonic() - started)
+                self.breaker.record_failure()
+                retryable = idempotent or _never_sent(exc)
+                if not retryable or attempt >= self.retries:
+                    raise
+                logger.warning('%s %s: %s, повтор %s', self.provider, url, exc, attempt + 1)
+            else:
+                observe_latency(self.provider, time.monotonic() - started)
+                if response.status_code not in self.RETRY_STATUSES:
+                    self.breaker.record_success()
+                    response.raise_for_status()
+                    return response
+                self.breaker.record_failure()
+                if not idempotent or attempt >= self.retries:
+                    response.raise_for_status()
+                logger.warning('%s %s: HTTP %s, повтор %s', self.provider, url, response.status_code, attempt + 1)
+
+            time.sleep(self._delay(attempt))
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, idempotent=True, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(provider, **options):
+    """Транспорт провайдера, общий для всех клиентов в процессе."""
+    transport = _transports.get(provider)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(provider)
+            if transport is None:
+                transport = _transports[provider] = ProviderTransport(provider, **options)
+    return transport
+
+
+def reset_transports():
+    """Закрывает сессии (после смены настроек и в тестах)."""
+    with _transports_lock:
+        for transport in _transports.values():
+            transport.session.close()
+        _transports.clear()
@@ -0,0 +1,92 @@
+"""
+QR-коды для оплаты через СБП / SberPay QR.
+
+Картинка зависит только от payload'а платежа, формата и размера, поэтому
+рендерится один раз и кладётся в кэш под ключом с хэшем содержимого. Тот же
+хэш служит ETag'ом: клиент, опрашивающий платёж, получает 304 без рендера,
+а по ссылке с ``v=<хэш>`` картинку можно кэшировать навсегда.
+"""
+import hashlib
+import io
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image
+import qrcode
+import qrcode.image.svg
+
+QR_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+QR_SIZES = (200, 300, 400, 600)
+DEFAULT_QR_SIZE = 300
+QR_BORDER = 2
+QR_CACHE_TTL = 24 * 3600
+
+# Ключи metadata, в которых провайдеры сохраняют содержимое QR (payload СБП
+# или ссылка на оплату).
+PAYLOAD_KEYS = ('payload', 'qr_url', 'form_url')
+
+_SVG_SIZE_RE = re.compile(rb'width="[^"]*" height="[^"]*"')
+
+
+def qr_payload(payment):
+    metadata = payment.metadata or {}
+    for key in PAYLOAD_KEYS:
+        if metadata.get(key):
+            return str(metadata[key])
+    return None
+
+
+def qr_version(payment):
+    """Хэш payload'а — меняется, только если платёж перерегистрировали."""
+    payload = qr_payload(payment)
+    if payload is None:
+        return None
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def qr_etag(payment, fmt, size):
+    version = qr_version(payment)
+    if version is None:
+        return None
+    return f'{version}-{fmt}-{size}'
+
+
+def _render(payload, fmt, size):
+    code = qrcode.QRCode(border=QR_BORDER, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    code.add_data(payload)
+    code.make(fit=True)
+
+    if fmt == 'svg':
+        svg = code.make_image(image_factory=qrcode.image.svg.SvgPathImage).to_string()
+        return _SVG_SIZE_RE.sub(f'width="{size}" height="{size}"'.encode(), svg, count=1)
+
+    modules = code.modules_count + 2 * QR_BORDER
+    code.box_size = max(1, size // modules)
+    image = code.make_image().get_image()
+    if image.size[0] != size:
+        image = image.resize((size, size), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def generate_qr_code(payment, fmt='png', size=DEFAULT_QR_SIZE):
+    """Картинка QR-кода платежа (bytes); повторные вызовы берутся из кэша."""
+    if fmt not in QR_FORMATS:
+        raise ValueError(f'Неподдерживаемый формат QR-кода: {fmt}')
+    if size not in QR_SIZES:
+        raise ValueError(f'Неподдерживаемый размер QR-кода: {size}')
+    etag = qr_etag(payment, fmt, size)
+    if etag is None:
+        raise ValueError('У платежа нет данных для QR-кода')
+
+    key = f'payments:qr:{etag}'
+    content = cache.get(key)
+    if content is None:
+        content = _render(qr_payload(payment), fmt, size)
+        cache.set(key, content, getattr(settings, 'PAYMENT_QR_CACHE_TTL', QR_CACHE_TTL))
+    return content
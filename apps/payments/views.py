@@ -6,14 +6,12 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponse
+from .inbox import record_callback
 from .models import Payment, PaymentMethod
+from .providers.tbank import TBankClient
 from .serializers import PaymentSerializer
 from .services import PaymentService
-try:
-    from .utils import generate_qr_code
-except ImportError:
-    def generate_qr_code(payment):
-        raise NotImplementedError("QR code generation not configured")
+from .utils import DEFAULT_QR_SIZE, QR_FORMATS, QR_SIZES, generate_qr_code, qr_etag, qr_version
 from apps.orders.models import Order
 
 logger = logging.getLogger('oko.payments')
@@ -76,17 +74,46 @@ class PaymentViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def qr_code(self, request, pk=None):
+        """
+        QR-код платежа: ?fmt=png|svg, ?size=200|300|400|600.
+
+        Ответ отдаётся с ETag; с ``v`` = ``qr_version`` платежа картинка
+        кэшируется клиентом навсегда.
+        """
         payment = self.get_object()
+        fmt = request.query_params.get('fmt', 'png')
         try:
-            qr_code = generate_qr_code(payment)
-            return HttpResponse(qr_code, content_type='image/png')
-        except Exception as e:
-            logger.error("QR code generation failed for payment %s: %s", pk, e, exc_info=True)
+            size = int(request.query_params.get('size', DEFAULT_QR_SIZE))
+        except ValueError:
+            size = None
+        if fmt not in QR_FORMATS or size not in QR_SIZES:
             return Response(
-                {'error': 'Ошибка генерации QR-кода'},
+                {'error': 'Неподдерживаемый формат или размер QR-кода'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        etag = qr_etag(payment, fmt, size)
+        known = [tag.strip().removeprefix('W/').strip('"') for tag in request.headers.get('If-None-Match', '').split(',')]
+        if etag and etag in known:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            try:
+                content = generate_qr_code(payment, fmt=fmt, size=size)
+            except Exception as e:
+                logger.error("QR code generation failed for payment %s: %s", pk, e, exc_info=True)
+                return Response(
+                    {'error': 'Ошибка генерации QR-кода'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            response = HttpResponse(content, content_type=QR_FORMATS[fmt])
+
+        response['ETag'] = f'"{etag}"'
+        if request.query_params.get('v') == qr_version(payment):
+            response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.AllowAny])
     def process_callback(self, request, pk=None):
         payment = get_object_or_404(Payment, pk=pk)
@@ -102,23 +129,19 @@ class PaymentViewSet(viewsets.ModelViewSet):
             if not SBPClient().verify_callback_signature(request.data):
                 logger.warning("Invalid SBP callback signature for payment %s", pk)
                 return Response({'status': 'invalid_signature'}, status=status.HTTP_403_FORBIDDEN)
+        elif rail == PaymentMethod.TBANK:
+            if not TBankClient().verify_callback(request.data):
+                logger.warning("Invalid T-Bank callback token for payment %s", pk)
+                return Response({'status': 'invalid_signature'}, status=status.HTTP_403_FORBIDDEN)
+        else:
+            # Неизвестный способ оплаты — проверить подпись нечем, ничего не сохраняем.
+            logger.warning("Callback for payment %s with unsupported method %s", pk, payment.payment_method)
+            return Response({'status': 'unsupported_method'}, status=status.HTTP_403_FORBIDDEN)
 
-        try:
-            with transaction.atomic():
-                success = PaymentService.process_payment_callback(
-                    payment.payment_id,
-                    request.data
-                )
-        except Exception as e:
-            logger.error("Payment callback failed for %s: %s", pk, e, exc_info=True)
-            return Response({'status': 'failed'}, status=status.HTTP_400_BAD_REQUEST)
-
-        if success:
-            return Response({'status': 'success'})
-        return Response(
-            {'status': 'failed'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        # Подпись проверена — сохраняем уведомление и сразу отвечаем банку,
+        # применение к платежу делает воркер (apps.payments.inbox).
+        record_callback(rail, payment.payment_id, request.data)
+        return Response({'status': 'accepted'})
 
 
 @api_view(['POST'])
@@ -128,9 +151,8 @@ def tbank_callback(request):
     order_id = request.data.get('OrderId')
     if not order_id:
         return Response('ERROR', status=status.HTTP_400_BAD_REQUEST)
-    try:
-        success = PaymentService.process_payment_callback(order_id, request.data)
-    except Exception:
-        logger.exception('T-Bank callback failed for OrderId=%s', order_id)
+    if not TBankClient().verify_callback(request.data):
+        logger.warning('Invalid T-Bank callback token for OrderId=%s', order_id)
         return Response('ERROR', status=status.HTTP_400_BAD_REQUEST)
-    return Response('OK' if success else 'ERROR', status=status.HTTP_200_OK if success else status.HTTP_400_BAD_REQUEST)
+    record_callback('tbank', order_id, request.data)
+    return Response('OK')
@@ -0,0 +1,92 @@
+"""Tests for the batched notification retention sweeper."""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.notifications.models import Notification, NotificationType
+from apps.notifications.retention import RetentionSweeper
+from apps.notifications.tasks import cleanup_old_notifications
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_CLEANUP_BATCH_SLEEP=0)
+class NotificationRetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='retention_user',
+            email='retention_user@example.com',
+            password='testpass123',
+            role='client',
+        )
+
+    def _make(self, type, days_ago, is_read=True, expires_at=None):
+        return Notification.objects.create(
+            recipient=self.user,
+            type=type,
+            title='t',
+            message='m',
+            is_read=is_read,
+            created_at=timezone.now() - timedelta(days=days_ago),
+            expires_at=expires_at,
+        )
+
+    def test_sweep_deletes_in_bounded_batches(self):
+        for _ in range(7):
+            self._make(NotificationType.NEW_BID, days_ago=40)
+        keep = self._make(NotificationType.NEW_BID, days_ago=1)
+
+        stats = RetentionSweeper(batch_size=3, batch_sleep=0).sweep(
+            'new_bid',
+            Notification.objects.filter(created_at__lt=timezone.now() - timedelta(days=30)),
+        )
+
+        self.assertEqual(stats.deleted, 7)
+        self.assertEqual(stats.batches, 3)
+        self.assertFalse(stats.interrupted)
+        self.assertEqual(list(Notification.objects.values_list('id', flat=True)), [keep.id])
+
+    def test_run_applies_per_type_retention_and_expiry(self):
+        old_review = self._make(NotificationType.REVIEW_RECEIVED, days_ago=200)
+        old_new_order = self._make(NotificationType.NEW_ORDER, days_ago=40)
+        unread = self._make(NotificationType.NEW_ORDER, days_ago=400, is_read=False)
+        old_other = self._make(NotificationType.NEW_BID, days_ago=40)
+        expired = self._make(
+            NotificationType.NEW_BID, days_ago=1, is_read=False,
+            expires_at=timezone.now() - timedelta(hours=1),
+        )
+
+        cleanup_old_notifications()
+
+        remaining = set(Notification.objects.values_list('id', flat=True))
+        self.assertEqual(remaining, {old_review.id, unread.id})
+        self.assertNotIn(old_new_order.id, remaining)
+        self.assertNotIn(old_other.id, remaining)
+        self.assertNotIn(expired.id, remaining)
+
+    @override_settings(NOTIFICATION_RETENTION_DAYS={'new_bid': 60, 'default': 30})
+    def test_retention_periods_come_from_settings(self):
+        kept = self._make(NotificationType.NEW_BID, days_ago=40)
+        dropped = self._make(NotificationType.NEW_ORDER, days_ago=40)
+
+        RetentionSweeper(batch_sleep=0).run()
+
+        self.assertTrue(Notification.objects.filter(id=kept.id).exists())
+        self.assertFalse(Notification.objects.filter(id=dropped.id).exists())
+
+    def test_sweep_stops_between_batches_when_out_of_time(self):
+        for _ in range(4):
+            self._make(NotificationType.NEW_BID, days_ago=40)
+        sweeper = RetentionSweeper(batch_size=2, batch_sleep=0)
+
+        with mock.patch.object(sweeper, '_out_of_time', side_effect=[False, True]):
+            stats = sweeper.sweep('new_bid', Notification.objects.all())
+
+        self.assertTrue(stats.interrupted)
+        self.assertEqual(stats.deleted, 2)
+        self.assertEqual(Notification.objects.count(), 2)
@@ -0,0 +1,229 @@
+"""Query budgets for the busiest list endpoints.
+
+Each test fills the endpoint with one row and then with a full page
+(``PAGE_SIZE``) and checks both responses against the same budget
+``n + per_item * rows`` (``apps.core.testing``). A new per-row query in a
+serializer or view makes the full page exceed the budget and fails CI.
+
+``per_item`` > 0 marks an N+1 that already exists; the number is the current
+cost per row. Lower it together with the fix, never raise it.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.catalog.models import Subject, WorkType
+from apps.chat.models import Chat, Message
+from apps.core.testing import QueryBudgetMixin
+from apps.experts.models import Specialization
+from apps.notifications.models import Notification
+from apps.orders.models import Bid, Order
+from apps.shop.models import Purchase, ReadyWork
+
+User = get_user_model()
+
+PERIOD = "start_date=2000-01-01&end_date=2100-01-01"
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NPLUSONE_MODE="off")
+class ListEndpointQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subject = Subject.objects.create(name="Бюджет — Алгебра")
+        cls.work_type = WorkType.objects.create(name="Бюджет — Контрольная")
+        cls.client_user = cls._user("client")
+        cls.expert = cls._user("expert")
+        cls.admin = cls._user("admin", is_staff=True)
+        cls.director = cls._user("director")
+        Specialization.objects.create(expert=cls.expert, subject=cls.subject, is_verified=True)
+
+    _numbers = count()
+
+    @classmethod
+    def _user(cls, role, **extra):
+        number = next(cls._numbers)
+        return User.objects.create_user(
+            username=f"budget_{role}_{number}",
+            email=f"budget_{role}_{number}@example.com",
+            password="testpass123",
+            role=role,
+            **extra,
+        )
+
+    def _as(self, user):
+        self.api = APIClient()
+        self.api.force_authenticate(user=user)
+
+    def _order(self, **overrides):
+        values = {
+            "client": self.client_user,
+            "subject": self.subject,
+            "work_type": self.work_type,
+            "title": "Заказ",
+            "description": "Описание",
+            "budget": 1000,
+            "deadline": timezone.now() + timedelta(days=5),
+            "status": "new",
+        }
+        values.update(overrides)
+        return Order.objects.create(**values)
+
+    def _order_with_bid(self, **overrides):
+        order = self._order(**overrides)
+        Bid.objects.create(order=order, expert=self._user("expert"), amount=Decimal("500"))
+        return order
+
+    def _chat(self, client=None):
+        client = client or self.client_user
+        expert = self._user("expert")
+        chat = Chat.objects.create(
+            client=client, expert=expert, order=self._order(client=client, expert=expert, status="in_progress"),
+        )
+        chat.participants.set([client, expert])
+        Message.objects.create(chat=chat, sender=expert, text="Здравствуйте")
+        return chat
+
+    def _ready_work(self, author=None):
+        return ReadyWork.objects.create(
+            title="Готовая работа",
+            description="Описание",
+            price=Decimal("300"),
+            subject=self.subject,
+            work_type=self.work_type,
+            author=author or self._user("expert"),
+            moderation_status="approved",
+            is_active=True,
+        )
+
+    # Клиент
+
+    def test_chat_list(self):
+        self._as(self.client_user)
+        self.assertListQueryBudget("/api/chat/chats/", 6, lambda i: self._chat(), per_item=15)
+
+    def test_client_orders(self):
+        self._as(self.client_user)
+        self.assertListQueryBudget("/api/orders/orders/", 8, lambda i: self._order_with_bid(), per_item=6)
+
+    def test_order_bids(self):
+        self._as(self.client_user)
+        order = self._order()
+        self.assertListQueryBudget(
+            f"/api/orders/orders/{order.id}/bids/", 3,
+            lambda i: Bid.objects.create(order=order, expert=self._user("expert"), amount=Decimal("500")),
+            per_item=1,
+        )
+
+    def test_notifications(self):
+        self._as(self.client_user)
+        self.assertListQueryBudget(
+            "/api/notifications/notifications/", 2,
+            lambda i: Notification.objects.create(recipient=self.client_user, type="new_bid", title="t", message="m"),
+        )
+
+    def test_ready_works(self):
+        self._as(self.client_user)
+        self.assertListQueryBudget("/api/shop/works/", 3, lambda i: self._ready_work())
+
+    def test_purchases(self):
+        self._as(self.client_user)
+        self.assertListQueryBudget(
+            "/api/shop/purchases/", 2,
+            lambda i: Purchase.objects.create(
+                work=self._ready_work(), buyer=self.client_user, price_paid=Decimal("300"),
+                hold_until=timezone.now() + timedelta(days=3),
+            ),
+            per_item=2,
+        )
+
+    # Специалист
+
+    def test_available_orders(self):
+        self._as(self.expert)
+        self.assertListQueryBudget(
+            "/api/orders/orders/available/", 4, lambda i: self._order_with_bid(client=self._user("client")),
+            per_item=2,
+        )
+
+    def test_expert_active_orders(self):
+        self._as(self.expert)
+        self.assertListQueryBudget(
+            "/api/experts/dashboard/active_orders/", 1,
+            lambda i: self._order(expert=self.expert, status="in_progress"),
+        )
+
+    def test_expert_available_orders(self):
+        self._as(self.expert)
+        self.assertListQueryBudget(
+            "/api/experts/dashboard/available_orders/", 1, lambda i: self._order(client=self._user("client")),
+        )
+
+    def test_expert_recent_orders(self):
+        self._as(self.expert)
+        self.assertListQueryBudget(
+            "/api/experts/dashboard/recent_orders/", 1, lambda i: self._order(expert=self.expert, status="completed"),
+        )
+
+    def test_expert_statistics(self):
+        self._as(self.expert)
+        self.assertListQueryBudget(
+            "/api/experts/dashboard/statistics/", 17, lambda i: self._order(expert=self.expert, status="completed"),
+        )
+
+    def test_expert_own_works(self):
+        self._as(self.expert)
+        self.assertListQueryBudget(
+            "/api/shop/works/my_works/", 1, lambda i: self._ready_work(author=self.expert), per_item=3,
+        )
+
+    # Администратор
+
+    def test_admin_user_chats(self):
+        self._as(self.admin)
+        self.assertListQueryBudget("/api/admin-panel/user-chats/", 4, lambda i: self._chat(), per_item=2)
+
+    def test_admin_orders(self):
+        self._as(self.admin)
+        self.assertListQueryBudget("/api/admin-panel/orders/", 1, lambda i: self._order_with_bid(), per_item=13)
+
+    def test_admin_users(self):
+        self._as(self.admin)
+        self.assertListQueryBudget("/api/admin-panel/users/", 2, lambda i: self._user("client"))
+
+    def test_admin_support_chats(self):
+        support = User.objects.create_user(username="support", password="x", is_staff=True)
+
+        def support_chat(index):
+            client = self._user("client")
+            chat = Chat.objects.create(client=client)
+            chat.participants.set([client, support])
+            Message.objects.create(chat=chat, sender=client, text="Помогите")
+
+        self._as(self.admin)
+        self.assertListQueryBudget("/api/admin-panel/support-chats/", 5, support_chat, per_item=3)
+
+    # Директор
+
+    def test_director_personnel(self):
+        self._as(self.director)
+        self.assertListQueryBudget("/api/director/personnel/", 2, lambda i: self._user("expert"))
+
+    def test_director_kpi(self):
+        self._as(self.director)
+        self.assertListQueryBudget(f"/api/director/statistics/kpi/?{PERIOD}", 20, lambda i: self._order_with_bid())
+
+    def test_director_summary(self):
+        self._as(self.director)
+        self.assertListQueryBudget(f"/api/director/statistics/summary/?{PERIOD}", 12, lambda i: self._order_with_bid())
+
+    def test_director_finance_summary(self):
+        self._as(self.director)
+        self.assertListQueryBudget(
+            f"/api/director/finance/finance-summary/?{PERIOD}", 8, lambda i: self._order_with_bid(),
+        )
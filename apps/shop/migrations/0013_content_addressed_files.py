@@ -0,0 +1,24 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:17
+
+import apps.uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_alter_purchase_delivered_file_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='purchase',
+            name='delivered_file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.content_storage, upload_to='purchases/', verbose_name='Файл работы'),
+        ),
+        migrations.AlterField(
+            model_name='readyworkfile',
+            name='file',
+            field=models.FileField(max_length=255, storage=apps.uploads.storage.content_storage, upload_to='ready_works/', verbose_name='Файл'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.conf import settings
 from django.db import models
 
 from apps.catalog.models import Subject, WorkType
+from apps.uploads.storage import content_storage
 
 
 class ReadyWork(models.Model):
@@ -62,7 +63,7 @@ class ReadyWorkFile(models.Model):
         verbose_name="Работа",
     )
     name = models.CharField("Название файла", max_length=255)
-    file = models.FileField("Файл", upload_to="ready_works/")
+    file = models.FileField("Файл", upload_to="ready_works/", storage=content_storage, max_length=255)
     file_type = models.CharField("Тип файла", max_length=255, blank=True)
     file_size = models.PositiveIntegerField("Размер файла", default=0)
     created_at = models.DateTimeField("Создано", auto_now_add=True)
@@ -101,7 +102,9 @@ class Purchase(models.Model):
         db_index=True,
     )
     price_paid = models.DecimalField("Оплаченная цена", max_digits=10, decimal_places=2)
-    delivered_file = models.FileField("Файл работы", upload_to="purchases/", blank=True, null=True)
+    delivered_file = models.FileField(
+        "Файл работы", upload_to="purchases/", storage=content_storage, max_length=255, blank=True, null=True
+    )
     delivered_file_name = models.CharField("Имя файла", max_length=255, blank=True, default="")
     delivered_file_type = models.CharField("Тип файла", max_length=255, blank=True, default="")
     delivered_file_size = models.PositiveIntegerField("Размер файла", default=0)
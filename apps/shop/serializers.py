@@ -1,8 +1,14 @@
+import mimetypes
+
 from rest_framework import serializers
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils.html import strip_tags
 from django.conf import settings
 
 from apps.catalog.serializers import SubjectSerializer, WorkTypeSerializer
+from apps.uploads.models import UploadSession
+from apps.uploads.serializers import ThumbnailURLField
+from apps.uploads.services import open_upload
 from .models import Purchase, ReadyWork, ReadyWorkFile
 
 
@@ -11,13 +17,14 @@ class AuthorSerializer(serializers.ModelSerializer):
     display_username = serializers.CharField(read_only=True)
     rating = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
+    avatar_thumb_url = ThumbnailURLField('avatar', source='avatar')
 
     class Meta:
         from django.contrib.auth import get_user_model
 
         User = get_user_model()
         model = User
-        fields = ['id', 'username', 'display_username', 'name', 'rating', 'avatar']
+        fields = ['id', 'username', 'display_username', 'name', 'rating', 'avatar', 'avatar_thumb_url']
 
     def get_name(self, obj):
         return obj.display_username
@@ -48,6 +55,7 @@ class ReadyWorkSerializer(serializers.ModelSerializer):
     author = AuthorSerializer(read_only=True)
     author_avatar = serializers.SerializerMethodField()
     preview = serializers.SerializerMethodField()
+    preview_thumb_url = ThumbnailURLField('preview', source='preview')
     rating = serializers.SerializerMethodField()
     reviewsCount = serializers.SerializerMethodField()
     purchasesCount = serializers.SerializerMethodField()
@@ -59,7 +67,7 @@ class ReadyWorkSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'price', 'subject', 'work_type',
             'subject_name', 'work_type_name', 'author',
-            'author_name', 'author_avatar', 'preview', 'rating',
+            'author_name', 'author_avatar', 'preview', 'preview_thumb_url', 'rating',
             'reviewsCount', 'viewsCount', 'purchasesCount', 'is_favorite',
             'moderation_status', 'is_active', 'created_at', 'updated_at', 'files',
         ]
@@ -118,19 +126,35 @@ class CreateReadyWorkSerializer(serializers.ModelSerializer):
         required=False,
         write_only=True,
     )
+    # Файлы, загруженные по частям через /api/uploads/.
+    work_upload_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        write_only=True,
+    )
 
     class Meta:
         model = ReadyWork
         fields = [
             'title', 'description', 'price', 'subject', 'work_type',
-            'preview', 'work_files',
+            'preview', 'work_files', 'work_upload_ids',
         ]
 
     def validate_description(self, value):
         return strip_tags(value or '')
 
+    def validate_work_upload_ids(self, value):
+        user = self.context['request'].user
+        files = []
+        for upload_id in value:
+            try:
+                files.append(open_upload(upload_id, user, UploadSession.Purpose.READY_WORK))
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError(exc.messages)
+        return files
+
     def create(self, validated_data):
-        work_files = validated_data.pop('work_files', [])
+        work_files = validated_data.pop('work_files', []) + validated_data.pop('work_upload_ids', [])
         validated_data['author'] = self.context['request'].user
         moderation_enabled = getattr(settings, 'READY_WORK_MODERATION_ENABLED', False)
         validated_data['moderation_status'] = (
@@ -147,7 +171,7 @@ class CreateReadyWorkSerializer(serializers.ModelSerializer):
                 work=work,
                 name=file.name,
                 file=file,
-                file_type=file.content_type or '',
+                file_type=getattr(file, 'content_type', None) or mimetypes.guess_type(file.name)[0] or '',
                 file_size=file.size,
             )
 
@@ -13,6 +13,8 @@ suite locks in the expected backend contract:
   message instead of a generic 'something went wrong'.
 """
 
+import shutil
+import tempfile
 from decimal import Decimal
 from datetime import timedelta
 
@@ -29,8 +31,15 @@ from apps.shop.models import Purchase, ReadyWork, ReadyWorkFile
 
 User = get_user_model()
 
+# Файлы тестов — во временном MEDIA_ROOT, не в media/ репозитория.
+MEDIA = tempfile.mkdtemp(prefix="shop_media_")
 
-@override_settings(SECURE_SSL_REDIRECT=False)
+
+def tearDownModule():
+    shutil.rmtree(MEDIA, ignore_errors=True)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, MEDIA_ROOT=MEDIA)
 class ReadyWorkCreationRegressionTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -136,7 +145,7 @@ class ReadyWorkCreationRegressionTests(TestCase):
         self.assertIn("description", body)
 
 
-@override_settings(SECURE_SSL_REDIRECT=False)
+@override_settings(SECURE_SSL_REDIRECT=False, MEDIA_ROOT=MEDIA)
 class ReadyWorkPurchaseWalletTests(TestCase):
     @classmethod
     def setUpTestData(cls):
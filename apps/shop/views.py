@@ -1,17 +1,16 @@
-import mimetypes
 from datetime import timedelta
 from decimal import Decimal
 
 from django.conf import settings
 from django.db import transaction
 from django.db.models import Avg, Count, Exists, OuterRef, Q
-from django.http import FileResponse
 from django.utils import timezone
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 
+from apps.core.file_delivery import serve_file
 from apps.wallet.services import InsufficientFunds, WalletService
 from .models import FavoriteWork, Purchase, ReadyWork, ReadyWorkFile
 from .serializers import CreateReadyWorkSerializer, PurchaseSerializer, ReadyWorkSerializer
@@ -342,13 +341,5 @@ class PurchaseViewSet(viewsets.ReadOnlyModelViewSet):
         if not purchase.delivered_file:
             return Response({'detail': 'Файл недоступен'}, status=status.HTTP_404_NOT_FOUND)
 
-        file_handle = purchase.delivered_file.open()
-        content_type, _ = mimetypes.guess_type(purchase.delivered_file.name)
-        if not content_type:
-            content_type = 'application/octet-stream'
-
         filename = purchase.delivered_file_name or purchase.delivered_file.name.split('/')[-1]
-        response = FileResponse(file_handle, content_type=content_type)
-        response['Content-Length'] = purchase.delivered_file.size
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        return serve_file(request, purchase.delivered_file, filename=filename)
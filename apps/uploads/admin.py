@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import UploadSession
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'owner', 'purpose', 'filename', 'size', 'received', 'status', 'deduplicated', 'created_at']
+    list_filter = ['status', 'purpose', 'deduplicated']
+    search_fields = ['filename', 'sha256', 'owner__username']
+    raw_id_fields = ['owner']
+    readonly_fields = ['sha256', 'blob', 'received', 'completed_at', 'consumed_at']
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class UploadsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.uploads'
+    verbose_name = 'Загрузка файлов'
+
+    def ready(self):
+        import apps.uploads.signals  # noqa
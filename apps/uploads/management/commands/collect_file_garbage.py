@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.uploads.storage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Удаляет из контентно-адресуемого хранилища файлы, на которые не ссылается ни одна запись'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, ничего не удалять')
+        parser.add_argument('--grace-hours', type=int, help='Не трогать файлы моложе N часов')
+
+    def handle(self, *args, **options):
+        stats = collect_garbage(grace_hours=options['grace_hours'], dry_run=options['dry_run'])
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb}: ссылок {stats['links']}, файлов {stats['blobs']} "
+            f"({stats['bytes'] / 1024 / 1024:.1f} МБ)"
+        ))
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.uploads.thumbnails import TARGETS, ensure_thumbnail, is_image, target_model
+
+CHECKPOINT_KEY = 'thumbnails:backfill:{}'
+CHECKPOINT_TTL = 7 * 24 * 3600
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для уже загруженных аватаров, превью работ и картинок в чатах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f'Что обработать: {", ".join(TARGETS)} (по умолчанию всё)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Записей за один запрос')
+        parser.add_argument('--restart', action='store_true', help='Начать сначала, игнорируя сохранённую позицию')
+        parser.add_argument('--force', action='store_true', help='Перестроить уже существующие миниатюры')
+        parser.add_argument('--async', dest='use_async', action='store_true', help='Ставить задачи в Celery вместо обработки здесь')
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or list(TARGETS)
+        unknown = set(targets) - set(TARGETS)
+        if unknown:
+            raise CommandError(f'Неизвестные цели: {", ".join(sorted(unknown))}')
+        for target in targets:
+            self._backfill(target, options)
+
+    def _backfill(self, target, options):
+        from apps.uploads.tasks import generate_thumbnail
+
+        model = target_model(target)
+        field_name = TARGETS[target][1]
+        key = CHECKPOINT_KEY.format(target)
+        last_pk = 0 if options['restart'] else cache.get(key, 0)
+        if last_pk:
+            self.stdout.write(f'{target}: продолжаем после id={last_pk}')
+
+        queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+        built = skipped = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:options['batch_size']])
+            if not batch:
+                break
+            for instance in batch:
+                if not is_image(getattr(instance, field_name).name):
+                    skipped += 1
+                elif options['use_async']:
+                    generate_thumbnail.delay(target, instance.pk)
+                    built += 1
+                elif ensure_thumbnail(target, instance, force=options['force']):
+                    built += 1
+                else:
+                    skipped += 1
+            last_pk = batch[-1].pk
+            # Позиция сохраняется после каждой пачки: прерванный запуск продолжится с неё.
+            cache.set(key, last_pk, CHECKPOINT_TTL)
+
+        cache.delete(key)
+        verb = 'поставлено в очередь' if options['use_async'] else 'готово'
+        self.stdout.write(self.style.SUCCESS(f'{target}: {verb} {built}, пропущено {skipped}'))
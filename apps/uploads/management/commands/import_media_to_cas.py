@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.uploads.storage import import_legacy_files
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые файлы заказов, чатов, магазина и базы знаний в контентно-адресуемое хранилище'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать файлы, ничего не переносить')
+        parser.add_argument('--limit', type=int, help='Максимум файлов за запуск')
+
+    def handle(self, *args, **options):
+        stats = import_legacy_files(limit=options['limit'], dry_run=options['dry_run'])
+        verb = 'Будет перенесено' if options['dry_run'] else 'Перенесено'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} файлов: {stats['files']} ({stats['bytes_before'] / 1024 / 1024:.1f} МБ), "
+            f"дубликатов: {stats['bytes_saved'] / 1024 / 1024:.1f} МБ, "
+            f"отсутствуют на диске: {stats['missing']}"
+        ))
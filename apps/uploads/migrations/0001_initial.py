@@ -0,0 +1,43 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:11
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('purpose', models.CharField(choices=[('order_file', 'Файл заказа'), ('ready_work', 'Файл готовой работы'), ('chat', 'Вложение чата')], max_length=20, verbose_name='Назначение')),
+                ('filename', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('size', models.BigIntegerField(verbose_name='Размер')),
+                ('received', models.BigIntegerField(default=0, verbose_name='Получено байт')),
+                ('sha256', models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='SHA-256')),
+                ('blob', models.CharField(blank=True, default='', max_length=255, verbose_name='Файл в хранилище')),
+                ('deduplicated', models.BooleanField(default=False, verbose_name='Совпал с уже загруженным')),
+                ('status', models.CharField(choices=[('uploading', 'Загружается'), ('completed', 'Загружен'), ('consumed', 'Использован')], default='uploading', max_length=20, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлена')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Собрана')),
+                ('consumed_at', models.DateTimeField(blank=True, null=True, verbose_name='Использована')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Владелец')),
+            ],
+            options={
+                'verbose_name': 'Сессия загрузки',
+                'verbose_name_plural': 'Сессии загрузки',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='uploads_upl_status_f5aba7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('ext', models.CharField(blank=True, default='', max_length=20, verbose_name='Расширение')),
+                ('size', models.BigIntegerField(verbose_name='Размер')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+            ],
+            options={
+                'verbose_name': 'Содержимое файла',
+                'verbose_name_plural': 'Содержимое файлов',
+                'constraints': [models.UniqueConstraint(fields=('sha256', 'ext'), name='uniq_blob_content')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Имя файла')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stored_files', to='uploads.blob', verbose_name='Содержимое')),
+            ],
+            options={
+                'verbose_name': 'Ссылка на файл',
+                'verbose_name_plural': 'Ссылки на файлы',
+            },
+        ),
+    ]
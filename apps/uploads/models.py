@@ -0,0 +1,107 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class UploadSession(models.Model):
+    """
+    Сессия загрузки файла по частям.
+
+    Клиент создаёт сессию с именем и размером файла, затем отправляет части
+    запросами ``PUT`` с заголовком ``Content-Range``. Части дописываются в
+    файл ``<UPLOAD_PARTIAL_DIR>/<id>.part``, так что оборванную загрузку
+    можно продолжить с ``received``. После сборки файл проверяется и кладётся
+    в хранилище под SHA-256 содержимого (``blob``); одинаковые файлы хранятся
+    один раз. Заказы, готовые работы и чаты принимают ``upload_id`` вместо
+    multipart-файла (apps.uploads.services.open_upload).
+    """
+
+    class Purpose(models.TextChoices):
+        ORDER_FILE = 'order_file', 'Файл заказа'
+        READY_WORK = 'ready_work', 'Файл готовой работы'
+        CHAT = 'chat', 'Вложение чата'
+
+    class Status(models.TextChoices):
+        UPLOADING = 'uploading', 'Загружается'
+        COMPLETED = 'completed', 'Загружен'
+        CONSUMED = 'consumed', 'Использован'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name="Владелец"
+    )
+    purpose = models.CharField(max_length=20, choices=Purpose.choices, verbose_name="Назначение")
+    filename = models.CharField(max_length=255, verbose_name="Имя файла")
+    size = models.BigIntegerField(verbose_name="Размер")
+    received = models.BigIntegerField(default=0, verbose_name="Получено байт")
+    sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True, verbose_name="SHA-256")
+    blob = models.CharField(max_length=255, blank=True, default='', verbose_name="Файл в хранилище")
+    deduplicated = models.BooleanField(default=False, verbose_name="Совпал с уже загруженным")
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.UPLOADING,
+        verbose_name="Статус"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создана")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлена")
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Собрана")
+    consumed_at = models.DateTimeField(null=True, blank=True, verbose_name="Использована")
+
+    class Meta:
+        verbose_name = "Сессия загрузки"
+        verbose_name_plural = "Сессии загрузки"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+
+class Blob(models.Model):
+    """
+    Содержимое файла в контентно-адресуемом хранилище
+    (apps.uploads.storage.ContentAddressedStorage): ``cas/ab/cd/<sha256><ext>``.
+    """
+
+    sha256 = models.CharField(max_length=64, verbose_name="SHA-256")
+    ext = models.CharField(max_length=20, blank=True, default='', verbose_name="Расширение")
+    size = models.BigIntegerField(verbose_name="Размер")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создан")
+
+    class Meta:
+        verbose_name = "Содержимое файла"
+        verbose_name_plural = "Содержимое файлов"
+        constraints = [
+            models.UniqueConstraint(fields=['sha256', 'ext'], name='uniq_blob_content'),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256}{self.ext}"
+
+
+class StoredFile(models.Model):
+    """
+    Имя файла в FileField (``<каталог>/<sha256>/<имя>``) → содержимое.
+
+    Строки — ссылки на Blob: пока на имя ссылается хоть одно FileField,
+    содержимое живо; остальное удаляет mark-and-sweep
+    (apps.uploads.storage.collect_garbage).
+    """
+
+    name = models.CharField(max_length=255, unique=True, verbose_name="Имя файла")
+    blob = models.ForeignKey(Blob, on_delete=models.CASCADE, related_name='stored_files', verbose_name="Содержимое")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создан")
+
+    class Meta:
+        verbose_name = "Ссылка на файл"
+        verbose_name_plural = "Ссылки на файлы"
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,43 @@
+from rest_framework import serializers
+
+from .models import UploadSession
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'purpose', 'filename', 'size', 'offset', 'sha256',
+            'status', 'deduplicated', 'created_at', 'completed_at',
+        ]
+        read_only_fields = fields
+
+
+class StartUploadSerializer(serializers.Serializer):
+    purpose = serializers.ChoiceField(choices=UploadSession.Purpose.choices)
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+
+
+class ThumbnailURLField(serializers.Field):
+    """
+    URL миниатюры изображения (apps.uploads.thumbnails); пока миниатюра не
+    готова — URL оригинала, для не-изображений — None.
+    """
+
+    def __init__(self, spec, **kwargs):
+        kwargs['read_only'] = True
+        self.spec = spec
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        from .thumbnails import thumbnail_url
+
+        url = thumbnail_url(value, self.spec)
+        request = self.context.get('request')
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
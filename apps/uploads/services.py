@@ -0,0 +1,291 @@
+"""
+Загрузка файлов по частям: запись частей, сборка, дедупликация и очистка.
+"""
+import hashlib
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from apps.orders.utils import FileValidator
+
+from .models import UploadSession
+from .storage import content_storage
+
+logger = logging.getLogger('oko.uploads')
+
+DEFAULT_CHUNK_SIZE = 5 * 1024 * 1024
+DEFAULT_SESSION_TTL_HOURS = 24
+DEFAULT_BLOB_RETENTION_DAYS = 7
+READ_BUFFER = 64 * 1024
+UPLOAD_DIR = 'uploads'
+
+
+class UploadError(Exception):
+    """Ошибка протокола загрузки (ответ 4xx)."""
+
+    status_code = 400
+
+    def __init__(self, detail, *, offset=None):
+        super().__init__(detail)
+        self.detail = detail
+        self.offset = offset
+
+
+class OffsetMismatch(UploadError):
+    status_code = 409
+
+
+class ChunkTooLarge(UploadError):
+    status_code = 413
+
+
+def _option(name, default):
+    return getattr(settings, f'UPLOAD_{name}', default)
+
+
+def chunk_size():
+    return int(_option('CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+
+
+def partial_dir():
+    return str(_option('PARTIAL_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads', 'partial')))
+
+
+def partial_path(session):
+    return os.path.join(partial_dir(), f'{session.pk}.part')
+
+
+def upload_name(filename):
+    return f'{UPLOAD_DIR}/{filename}'
+
+
+def validate_upload(filename, size):
+    """Те же ограничения, что и у обычной загрузки (FileValidator)."""
+    stub = File(None, name=filename)
+    stub.size = size
+    FileValidator()(stub)
+
+
+def _existing_blob(sha256, size, filename):
+    """Имя уже сохранённого содержимого с тем же SHA-256 и размером."""
+    name = content_storage().link(sha256, upload_name(filename))
+    if name and content_storage().size(name) == size:
+        return name
+    return None
+
+
+def _uploaded_by(owner, sha256, size):
+    """Загружал ли ``owner`` эти байты сам (сессия прошла complete_upload)."""
+    return UploadSession.objects.filter(
+        owner=owner, sha256=sha256, size=size,
+        status__in=[UploadSession.Status.COMPLETED, UploadSession.Status.CONSUMED],
+    ).exists()
+
+
+def start_upload(owner, *, purpose, filename, size, sha256=''):
+    """
+    Создаёт сессию. Если клиент прислал SHA-256 файла, который он сам уже
+    загружал, и содержимое ещё в хранилище, сессия сразу считается
+    загруженной. Чужие файлы так не подхватываются: хэш и размер не
+    доказывают, что байты у клиента есть (хэш виден в CAS-ссылках), —
+    такие загрузки дедуплицирует complete_upload после хэширования.
+    """
+    filename = os.path.basename(str(filename or '')).strip()[:255]
+    if not filename:
+        raise ValidationError('Не указано имя файла')
+    validate_upload(filename, size)
+    session = UploadSession(owner=owner, purpose=purpose, filename=filename, size=size)
+
+    sha256 = (sha256 or '').lower()
+    existing = None
+    if len(sha256) == 64 and _uploaded_by(owner, sha256, size):
+        existing = _existing_blob(sha256, size, filename)
+    if existing:
+        session.sha256 = sha256
+        session.blob = existing
+        session.received = size
+        session.deduplicated = True
+        session.status = UploadSession.Status.COMPLETED
+        session.completed_at = timezone.now()
+    session.save()
+    return session
+
+
+def parse_content_range(header):
+    """``bytes start-end/total`` -> (start, end, total)."""
+    try:
+        unit, spec = header.strip().split(' ', 1)
+        span, total = spec.split('/', 1)
+        start, end = span.split('-', 1)
+        start, end, total = int(start), int(end), int(total)
+    except (AttributeError, ValueError):
+        raise UploadError('Некорректный заголовок Content-Range')
+    if unit != 'bytes' or start < 0 or end < start:
+        raise UploadError('Некорректный заголовок Content-Range')
+    return start, end, total
+
+
+def write_chunk(session_id, owner, content_range, stream):
+    """
+    Дописывает часть в файл сессии. Части принимаются строго по порядку:
+    при расхождении смещения клиент получает текущее ``received`` и
+    продолжает с него.
+    """
+    start, end, total = parse_content_range(content_range)
+    length = end - start + 1
+    if length > chunk_size():
+        raise ChunkTooLarge(f'Часть больше {chunk_size()} байт')
+
+    with transaction.atomic():
+        session = (
+            UploadSession.objects.select_for_update()
+            .filter(pk=session_id, owner=owner)
+            .first()
+        )
+        if session is None:
+            raise UploadError('Сессия загрузки не найдена')
+        if session.status != UploadSession.Status.UPLOADING:
+            raise OffsetMismatch('Файл уже загружен', offset=session.received)
+        if total != session.size or end >= session.size:
+            raise UploadError('Размер части не совпадает с размером файла', offset=session.received)
+        if start != session.received:
+            raise OffsetMismatch('Неверное смещение части', offset=session.received)
+
+        os.makedirs(partial_dir(), exist_ok=True)
+        written = 0
+        with open(partial_path(session), 'ab') as part:
+            # Обрезаем хвост от оборванной ранее записи.
+            part.truncate(session.received)
+            while written < length:
+                data = stream.read(min(READ_BUFFER, length - written))
+                if not data:
+                    break
+                part.write(data)
+                written += len(data)
+        if written != length:
+            raise UploadError('Часть получена не полностью', offset=session.received)
+
+        session.received += written
+        session.save(update_fields=['received', 'updated_at'])
+    return session
+
+
+class _PartFile(File):
+    """Собранный файл: хранилище переносит его, а не копирует."""
+
+    def __init__(self, file, name=None, sha256=None):
+        super().__init__(file, name)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class _BlobFile(File):
+    """Загруженный файл с известным SHA-256: при сохранении в FileField байты не копируются."""
+
+    def __init__(self, file, name, sha256):
+        super().__init__(file, name)
+        self.sha256 = sha256
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(READ_BUFFER), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete_upload(session_id, owner):
+    """Проверяет собранный файл и переносит его в хранилище под SHA-256."""
+    with transaction.atomic():
+        session = (
+            UploadSession.objects.select_for_update()
+            .filter(pk=session_id, owner=owner)
+            .first()
+        )
+        if session is None:
+            raise UploadError('Сессия загрузки не найдена')
+        if session.status != UploadSession.Status.UPLOADING:
+            return session
+        if session.received != session.size:
+            raise UploadError('Файл загружен не полностью', offset=session.received)
+
+        path = partial_path(session)
+        actual_size = os.path.getsize(path) if os.path.exists(path) else 0
+        if actual_size != session.size:
+            raise UploadError('Размер собранного файла не совпадает с заявленным', offset=0)
+        validate_upload(session.filename, actual_size)
+
+        session.sha256 = _sha256(path)
+        existing = _existing_blob(session.sha256, session.size, session.filename)
+        if existing:
+            session.blob = existing
+            session.deduplicated = True
+        else:
+            with open(path, 'rb') as handle:
+                session.blob = content_storage().save(
+                    upload_name(session.filename), _PartFile(handle),
+                )
+        if os.path.exists(path):
+            os.remove(path)
+        session.status = UploadSession.Status.COMPLETED
+        session.completed_at = timezone.now()
+        session.save()
+    return session
+
+
+def open_upload(upload_id, owner, purpose):
+    """
+    Загруженный файл для сохранения в FileField модели (``File`` с исходным
+    именем). Бросает ValidationError, если сессия чужая или не завершена.
+    """
+    try:
+        session = UploadSession.objects.get(pk=upload_id, owner=owner, purpose=purpose)
+    except (UploadSession.DoesNotExist, ValueError, ValidationError):
+        raise ValidationError('Загрузка не найдена')
+    if session.status == UploadSession.Status.UPLOADING or not session.blob:
+        raise ValidationError('Файл ещё не загружен полностью')
+    UploadSession.objects.filter(pk=session.pk).update(
+        status=UploadSession.Status.CONSUMED,
+        consumed_at=timezone.now(),
+    )
+    return _BlobFile(content_storage().open(session.blob, 'rb'), session.filename, session.sha256)
+
+
+def abort_upload(session):
+    path = partial_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+    session.delete()
+
+
+def cleanup_uploads(now=None):
+    """
+    Удаляет брошенные сессии (нет частей дольше UPLOAD_SESSION_TTL_HOURS) и
+    старые завершённые. Собранные файлы становятся мусором для
+    apps.uploads.storage.collect_garbage, если на них больше никто не ссылается.
+    """
+    now = now or timezone.now()
+    stale_uploading = UploadSession.objects.filter(
+        status=UploadSession.Status.UPLOADING,
+        updated_at__lt=now - timedelta(hours=int(_option('SESSION_TTL_HOURS', DEFAULT_SESSION_TTL_HOURS))),
+    )
+    expired_done = UploadSession.objects.filter(
+        status__in=[UploadSession.Status.COMPLETED, UploadSession.Status.CONSUMED],
+        updated_at__lt=now - timedelta(days=int(_option('BLOB_RETENTION_DAYS', DEFAULT_BLOB_RETENTION_DAYS))),
+    )
+
+    removed = 0
+    for session in stale_uploading.iterator():
+        abort_upload(session)
+        removed += 1
+    removed += expired_done.delete()[0]
+    return removed
@@ -0,0 +1,29 @@
+from functools import partial
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .thumbnails import TARGETS, is_image, targets_for, thumbnail_name
+
+
+def enqueue_thumbnails(sender, instance, update_fields=None, raw=False, **kwargs):
+    """После сохранения записи с изображением ставит построение миниатюры в очередь."""
+    if raw:
+        return
+    from .tasks import generate_thumbnail
+
+    for target in targets_for(sender):
+        field_name = TARGETS[target][1]
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        field_file = getattr(instance, field_name)
+        if not field_file or not is_image(field_file.name):
+            continue
+        if default_storage.exists(thumbnail_name(field_file.name, TARGETS[target][2])):
+            continue
+        transaction.on_commit(partial(generate_thumbnail.delay, target, instance.pk))
+
+
+for _model_label in {model_label for model_label, _field, _spec in TARGETS.values()}:
+    post_save.connect(enqueue_thumbnails, sender=_model_label, dispatch_uid=f'thumbnails:{_model_label}')
@@ -0,0 +1,378 @@
+"""
+Контентно-адресуемое хранилище файлов.
+
+Одни и те же PDF загружаются в заказы, чаты, магазин и базу знаний под
+разными путями. Хранилище кладёт содержимое один раз —
+``cas/ab/cd/<sha256><ext>`` (Blob) — а FileField получает имя вида
+``<каталог upload_to>/<sha256>/<исходное имя>``. Путь к содержимому
+вычисляется из имени без запросов к БД, поэтому ``url``/``open``/``path``
+стоят столько же, сколько у FileSystemStorage.
+
+Каждое имя записывается в StoredFile (ссылка на Blob). ``delete()`` для
+таких имён ничего не удаляет — одно содержимое может быть у нескольких
+записей (покупка ссылается на файл сообщения, заказ — на файл чата).
+Неиспользуемые ссылки и содержимое убирает ``collect_garbage``
+(mark-and-sweep по всем FileField с этим хранилищем). Запись ссылки и
+удаление содержимого идут под ``select_for_update`` строки Blob, поэтому
+сборщик не удаляет содержимое, на которое в этот момент ставится ссылка.
+
+Имена, сохранённые до перехода (без ``<sha256>/``), обслуживаются как
+обычные файлы в MEDIA_ROOT; перенести их можно командой
+``manage.py import_media_to_cas``.
+"""
+import glob
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger('oko.uploads')
+
+CAS_DIR = 'cas'
+MAX_NAME_LENGTH = 255
+MAX_EXT_LENGTH = 20
+HASH_BUFFER = 64 * 1024
+DEFAULT_GC_GRACE_HOURS = 24
+
+_CAS_NAME_RE = re.compile(r'(?:^|/)([0-9a-f]{64})/([^/]+)$')
+
+
+def _ext(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return ext if len(ext) <= MAX_EXT_LENGTH else ''
+
+
+def blob_path(sha256, ext):
+    return f'{CAS_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}'
+
+
+def parse_name(name):
+    """(sha256, ext) для имени в хранилище или None для старых имён."""
+    match = _CAS_NAME_RE.search(name or '')
+    if not match:
+        return None
+    return match.group(1), _ext(match.group(2))
+
+
+def _logical_name(dirname, sha256, basename):
+    prefix = f'{dirname}/{sha256}/' if dirname else f'{sha256}/'
+    room = MAX_NAME_LENGTH - len(prefix)
+    if len(basename) > room:
+        stem, ext = os.path.splitext(basename)
+        basename = stem[:max(room - len(ext), 1)] + ext
+    return prefix + basename
+
+
+class _HashingWriter:
+    def __init__(self, handle):
+        self.handle = handle
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.handle.write(data)
+        self.size += len(data)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def _resolve(self, name):
+        parsed = parse_name(name)
+        return blob_path(*parsed) if parsed else name
+
+    def path(self, name):
+        return super().path(self._resolve(name))
+
+    def url(self, name):
+        return super().url(self._resolve(name))
+
+    def _open(self, name, mode='rb'):
+        return super()._open(self._resolve(name), mode)
+
+    def exists(self, name):
+        return super().exists(self._resolve(name))
+
+    def size(self, name):
+        return super().size(self._resolve(name))
+
+    def delete(self, name):
+        if parse_name(name):
+            # Содержимое может быть общим — его удаляет collect_garbage.
+            return
+        super().delete(name)
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя содержит хэш; уникальность исходного имени не нужна.
+        return name
+
+    def _store_blob(self, content, ext):
+        """
+        Кладёт содержимое в cas/, хэшируя его по ходу записи: (sha256, size).
+        """
+        hint = getattr(content, 'sha256', None)
+        if hint and super().exists(blob_path(hint, ext)):
+            # Содержимое уже известно (файл из apps.uploads) — байты не читаем.
+            return hint, content.size
+
+        if hasattr(content, 'temporary_file_path'):
+            # Файл уже на диске (большая загрузка): хэшируем на месте и переносим.
+            source = content.temporary_file_path()
+            digest = hashlib.sha256()
+            with open(source, 'rb') as handle:
+                for block in iter(lambda: handle.read(HASH_BUFFER), b''):
+                    digest.update(block)
+            sha256 = digest.hexdigest()
+            self._place(source, sha256, ext, temporary=False)
+            return sha256, os.path.getsize(self.path(blob_path(sha256, ext)))
+
+        tmp_dir = os.path.join(self.location, CAS_DIR, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                writer = _HashingWriter(handle)
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    writer.write(chunk)
+            sha256 = writer.digest.hexdigest()
+            self._place(tmp_path, sha256, ext, temporary=True)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return sha256, writer.size
+
+    def _place(self, source, sha256, ext, *, temporary):
+        target = super().path(blob_path(sha256, ext))
+        if os.path.exists(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if temporary:
+            os.replace(source, target)
+        else:
+            file_move_safe(source, target, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(target, self.file_permissions_mode)
+
+    def _save(self, name, content):
+        dirname, basename = os.path.split(name)
+        ext = _ext(basename)
+        sha256, size = self._store_blob(content, ext)
+        logical = _logical_name(dirname, sha256, basename)
+        with transaction.atomic():
+            blob = _lock_blob(sha256, ext, size)
+            if not super().exists(blob_path(sha256, ext)):
+                # collect_garbage удалил содержимое между записью и блокировкой.
+                self._store_blob(content, ext)
+            _link(logical, blob)
+        return logical
+
+    def delete_blob(self, blob):
+        super().delete(blob_path(blob.sha256, blob.ext))
+        # Миниатюры содержимого (apps.uploads.thumbnails) удаляются вместе с ним.
+        thumbs = os.path.join(self.location, CAS_DIR, 'thumbs', blob.sha256[:2], f'{blob.sha256}-*')
+        for path in glob.glob(thumbs):
+            os.remove(path)
+
+    def link(self, sha256, name):
+        """Имя для уже сохранённого содержимого без чтения байтов (или None)."""
+        from .models import Blob
+
+        dirname, basename = os.path.split(name)
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(sha256=sha256, ext=_ext(basename)).first()
+            if blob is None or not super().exists(blob_path(sha256, blob.ext)):
+                return None
+            logical = _logical_name(dirname, sha256, basename)
+            _link(logical, blob)
+        return logical
+
+
+def _lock_blob(sha256, ext, size):
+    """Blob содержимого (создаётся при отсутствии) под select_for_update."""
+    from .models import Blob
+
+    blob = Blob.objects.select_for_update().filter(sha256=sha256, ext=ext).first()
+    if blob is None:
+        _get_or_create(Blob, sha256=sha256, ext=ext, defaults={'size': size})
+        blob = Blob.objects.select_for_update().get(sha256=sha256, ext=ext)
+    return blob
+
+
+def _link(name, blob):
+    """
+    Ссылка ``name`` → ``blob``. Уже существующая ссылка считается новой:
+    сборщик мог отметить её как неиспользуемую до того, как её взяли снова.
+    """
+    from .models import StoredFile
+
+    now = timezone.now()
+    stored = _get_or_create(StoredFile, name=name, defaults={'blob': blob})
+    if stored.created_at < now:
+        StoredFile.objects.filter(pk=stored.pk).update(created_at=now)
+    return stored
+
+
+def _get_or_create(model, defaults=None, **lookup):
+    try:
+        with transaction.atomic():
+            return model.objects.get_or_create(defaults=defaults, **lookup)[0]
+    except IntegrityError:
+        return model.objects.get(**lookup)
+
+
+_storage = ContentAddressedStorage()
+
+
+def content_storage():
+    """Хранилище для ``FileField(storage=content_storage)``."""
+    return _storage
+
+
+def content_fields():
+    """(модель, имя поля) всех FileField, хранящихся в content_storage."""
+    result = []
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and field.storage is _storage:
+                result.append((model, field.name))
+    return result
+
+
+def _referenced_names():
+    from .models import UploadSession
+
+    names = set()
+    for model, field_name in content_fields():
+        names.update(
+            model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            .values_list(field_name, flat=True).iterator()
+        )
+    names.update(UploadSession.objects.exclude(blob='').values_list('blob', flat=True).iterator())
+    return names
+
+
+def collect_garbage(*, grace_hours=None, dry_run=False, now=None):
+    """
+    Mark-and-sweep: ссылки StoredFile, на которые не указывает ни одно
+    FileField, удаляются; Blob без ссылок удаляется вместе с файлом.
+    Свежие записи (моложе ``grace_hours``) не трогаются — их модель могла
+    ещё не сохраниться.
+    """
+    from .models import Blob, StoredFile
+
+    if grace_hours is None:
+        grace_hours = getattr(settings, 'CONTENT_STORAGE_GC_GRACE_HOURS', DEFAULT_GC_GRACE_HOURS)
+    cutoff = (now or timezone.now()) - timedelta(hours=grace_hours)
+
+    referenced = _referenced_names()
+    orphan_links = [
+        pk for pk, name in
+        StoredFile.objects.filter(created_at__lt=cutoff).values_list('pk', 'name').iterator()
+        if name not in referenced
+    ]
+    stats = {'links': len(orphan_links), 'blobs': 0, 'bytes': 0}
+
+    if dry_run:
+        orphan_set = set(orphan_links)
+        live = {
+            blob_id for pk, blob_id in StoredFile.objects.values_list('pk', 'blob_id').iterator()
+            if pk not in orphan_set
+        }
+        for blob_id, size in Blob.objects.filter(created_at__lt=cutoff).values_list('pk', 'size').iterator():
+            if blob_id not in live:
+                stats['blobs'] += 1
+                stats['bytes'] += size
+        return stats
+
+    for start in range(0, len(orphan_links), 1000):
+        # created_at проверяется повторно: ссылку могли взять снова (_link).
+        StoredFile.objects.filter(pk__in=orphan_links[start:start + 1000], created_at__lt=cutoff).delete()
+
+    for pk in _unreferenced_blob_ids(cutoff):
+        with transaction.atomic():
+            # _save/link ставят ссылку под той же блокировкой: после неё либо
+            # ссылка уже видна, либо они дождутся удаления и запишут заново.
+            blob = Blob.objects.select_for_update().filter(pk=pk).first()
+            if blob is None or blob.stored_files.exists():
+                continue
+            try:
+                _storage.delete_blob(blob)
+            except OSError:
+                logger.warning("Не удалось удалить содержимое %s", blob, exc_info=True)
+                continue
+            blob.delete()
+        stats['blobs'] += 1
+        stats['bytes'] += blob.size
+    return stats
+
+
+def _unreferenced_blob_ids(cutoff):
+    from .models import Blob
+
+    return list(
+        Blob.objects.filter(created_at__lt=cutoff)
+        .annotate(refs=models.Count('stored_files')).filter(refs=0)
+        .values_list('pk', flat=True)
+    )
+
+
+def import_legacy_files(*, limit=None, dry_run=False):
+    """
+    Переносит файлы, сохранённые до перехода на content_storage, в cas/ и
+    переписывает имена во всех FileField, которые на них ссылаются.
+    Прерванный запуск можно повторить: перенесённые имена уже с хэшем.
+    """
+    fields = content_fields()
+    legacy = set()
+    for model, field_name in fields:
+        for name in (
+            model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            .values_list(field_name, flat=True).iterator()
+        ):
+            if not parse_name(name):
+                legacy.add(name)
+
+    stats = {'files': 0, 'missing': 0, 'bytes_before': 0, 'bytes_saved': 0}
+    for name in sorted(legacy)[:limit]:
+        if not FileSystemStorage.exists(_storage, name):
+            stats['missing'] += 1
+            continue
+        size = FileSystemStorage.size(_storage, name)
+        stats['files'] += 1
+        stats['bytes_before'] += size
+        if dry_run:
+            continue
+        with FileSystemStorage._open(_storage, name, 'rb') as handle:
+            duplicate = _blob_exists_for(handle)
+            new_name = _storage.save(name, handle)
+        if duplicate:
+            stats['bytes_saved'] += size
+        with transaction.atomic():
+            for model, field_name in fields:
+                model.objects.filter(**{field_name: name}).update(**{field_name: new_name})
+        FileSystemStorage.delete(_storage, name)
+    return stats
+
+
+def _blob_exists_for(handle):
+    """Было ли такое содержимое в cas/ до переноса (для статистики экономии)."""
+    from .models import Blob
+
+    digest = hashlib.sha256()
+    for block in iter(lambda: handle.read(HASH_BUFFER), b''):
+        digest.update(block)
+    handle.seek(0)
+    return Blob.objects.filter(sha256=digest.hexdigest()).exists()
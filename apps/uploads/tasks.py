@@ -0,0 +1,40 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger('oko.uploads')
+
+
+@shared_task
+def cleanup_upload_sessions():
+    """Удаляет брошенные и устаревшие сессии загрузки."""
+    from .services import cleanup_uploads
+
+    sessions = cleanup_uploads()
+    if sessions:
+        logger.info(f"Очистка загрузок: удалено сессий {sessions}")
+    return sessions
+
+
+@shared_task
+def collect_content_garbage():
+    """Mark-and-sweep контентно-адресуемого хранилища."""
+    from .storage import collect_garbage
+
+    stats = collect_garbage()
+    if stats['blobs'] or stats['links']:
+        logger.info(
+            f"Очистка хранилища: ссылок {stats['links']}, файлов {stats['blobs']}, "
+            f"освобождено {stats['bytes'] / 1024 / 1024:.1f} МБ"
+        )
+    return stats
+
+
+@shared_task(ignore_result=True)
+def generate_thumbnail(target, pk):
+    """Строит миниатюру изображения записи (apps.uploads.thumbnails.TARGETS)."""
+    from .thumbnails import ensure_thumbnail, target_model
+
+    instance = target_model(target).objects.filter(pk=pk).first()
+    if instance is not None:
+        ensure_thumbnail(target, instance)
@@ -0,0 +1,361 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.catalog.models import Subject, WorkType
+from apps.orders.models import Order, OrderFile
+from apps.shop.models import ReadyWork, ReadyWorkFile
+
+from .models import Blob, StoredFile, UploadSession
+from .services import cleanup_uploads, partial_path
+from .serializers import ThumbnailURLField
+from .storage import blob_path, collect_garbage, content_storage, import_legacy_files
+from .thumbnails import ensure_thumbnail, thumbnail_name
+
+User = get_user_model()
+
+MEDIA = tempfile.mkdtemp(prefix="uploads_media_")
+CAS_MEDIA = tempfile.mkdtemp(prefix="cas_media_")
+THUMBS_MEDIA = tempfile.mkdtemp(prefix="thumbs_media_")
+
+
+def tearDownModule():
+    for path in (MEDIA, CAS_MEDIA, THUMBS_MEDIA):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    MEDIA_ROOT=MEDIA,
+    UPLOAD_PARTIAL_DIR=os.path.join(MEDIA, "partial"),
+    UPLOAD_CHUNK_SIZE=16,
+)
+class ChunkedUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="uploads_client", email="uploads_client@example.com", password="x", role="client",
+        )
+        cls.other = User.objects.create_user(
+            username="uploads_other", email="uploads_other@example.com", password="x", role="client",
+        )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.user)
+
+    def _start(self, content, filename="thesis.pdf", **extra):
+        response = self.api.post("/api/uploads/", {
+            "purpose": "order_file", "filename": filename, "size": len(content), **extra,
+        }, format="json")
+        return response
+
+    def _put(self, upload_id, content, start):
+        end = start + len(content) - 1
+        total = UploadSession.objects.get(pk=upload_id).size
+        return self.api.generic(
+            "PUT", f"/api/uploads/{upload_id}/chunk/", content,
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{total}",
+        )
+
+    def _upload(self, content, **extra):
+        upload_id = self._start(content, **extra).data["id"]
+        for start in range(0, len(content), 16):
+            self.assertEqual(self._put(upload_id, content[start:start + 16], start).status_code, 200)
+        return upload_id, self.api.post(f"/api/uploads/{upload_id}/complete/")
+
+    def test_chunks_are_assembled_and_stored_by_hash(self):
+        content = b"chunked thesis content " * 3
+        upload_id, response = self._upload(content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sha = hashlib.sha256(content).hexdigest()
+        self.assertEqual(response.data["sha256"], sha)
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual(session.status, UploadSession.Status.COMPLETED)
+        with content_storage().open(session.blob) as stored:
+            self.assertEqual(stored.read(), content)
+        self.assertFalse(os.path.exists(partial_path(session)))
+
+    def test_out_of_order_chunk_reports_offset_for_resume(self):
+        content = b"x" * 40
+        upload_id = self._start(content).data["id"]
+        self.assertEqual(self._put(upload_id, content[:16], 0).status_code, 200)
+
+        response = self._put(upload_id, content[32:], 32)
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["offset"], 16)
+        self.assertEqual(self.api.get(f"/api/uploads/{upload_id}/").data["offset"], 16)
+
+    def test_oversized_chunk_and_bad_extension_are_rejected(self):
+        content = b"y" * 40
+        upload_id = self._start(content).data["id"]
+        self.assertEqual(self._put(upload_id, content[:32], 0).status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        self.assertEqual(self._start(b"z" * 10, filename="virus.exe").status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(MAX_UPLOAD_SIZE=20):
+            self.assertEqual(self._start(b"z" * 40).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_identical_content_is_deduplicated(self):
+        content = b"same pdf bytes " * 4
+        first_id, _ = self._upload(content)
+        second_id, response = self._upload(content)
+
+        self.assertTrue(response.data["deduplicated"])
+        first, second = UploadSession.objects.get(pk=first_id), UploadSession.objects.get(pk=second_id)
+        self.assertEqual(first.blob, second.blob)
+
+        # Клиент, знающий хэш, не загружает байты повторно.
+        instant = self._start(content, sha256=hashlib.sha256(content).hexdigest())
+        self.assertEqual(instant.data["status"], UploadSession.Status.COMPLETED)
+        self.assertTrue(instant.data["deduplicated"])
+
+    def test_hash_alone_does_not_grant_other_users_content(self):
+        content = b"someone else's thesis " * 3
+        self._upload(content)
+
+        self.api.force_authenticate(user=self.other)
+        response = self._start(content, sha256=hashlib.sha256(content).hexdigest())
+
+        self.assertEqual(response.data["status"], UploadSession.Status.UPLOADING)
+        self.assertFalse(response.data["deduplicated"])
+        self.assertEqual(response.data["offset"], 0)
+        session = UploadSession.objects.get(pk=response.data["id"])
+        self.assertFalse(session.blob)
+
+    def test_upload_is_private_to_owner(self):
+        upload_id, _ = self._upload(b"private data 1234")
+        self.api.force_authenticate(user=self.other)
+        self.assertEqual(self.api.get(f"/api/uploads/{upload_id}/").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self._put(upload_id, b"a", 0).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_order_file_can_be_created_from_upload(self):
+        subject = Subject.objects.create(name="Uploads subject")
+        work_type = WorkType.objects.create(name="Uploads work type")
+        order = Order.objects.create(
+            client=self.user, subject=subject, work_type=work_type, title="Uploads order",
+            description="Order for upload tests", budget=Decimal("1000"),
+            deadline=timezone.now() + timedelta(days=3), status="new",
+        )
+        content = b"%PDF-1.4 task description"
+        upload_id, _ = self._upload(content)
+
+        response = self.api.post(
+            f"/api/orders/orders/{order.id}/files/",
+            {"upload_id": upload_id, "file_type": "task"},
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        order_file = OrderFile.objects.get(order=order)
+        self.assertEqual(order_file.file.read(), content)
+        self.assertTrue(order_file.file.name.endswith(".pdf"))
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).status, UploadSession.Status.CONSUMED)
+
+    def test_cleanup_removes_abandoned_sessions_and_unused_blobs(self):
+        stale_id = self._start(b"q" * 40).data["id"]
+        self._put(stale_id, b"q" * 16, 0)
+        done_id, _ = self._upload(b"finished file content")
+        session = UploadSession.objects.get(pk=done_id)
+
+        later = timezone.now() + timedelta(days=30)
+        self.assertEqual(cleanup_uploads(now=later), 2)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.path.exists(partial_path(UploadSession(pk=stale_id))))
+
+        stats = collect_garbage(now=later)
+        self.assertEqual(stats["blobs"], 1)
+        self.assertFalse(content_storage().exists(session.blob))
+
+
+@override_settings(MEDIA_ROOT=CAS_MEDIA)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="cas_expert", email="cas_expert@example.com", password="x", role="expert",
+        )
+        cls.subject = Subject.objects.create(name="CAS subject")
+        cls.work_type = WorkType.objects.create(name="CAS work type")
+
+    def _order(self):
+        return Order.objects.create(
+            client=self.user, subject=self.subject, work_type=self.work_type, title="CAS order",
+            description="Order for storage tests", budget=Decimal("1000"),
+            deadline=timezone.now() + timedelta(days=3), status="new",
+        )
+
+    def _work(self):
+        return ReadyWork.objects.create(
+            title="CAS work", description="d", price=Decimal("100"),
+            subject=self.subject, work_type=self.work_type, author=self.user,
+        )
+
+    def test_identical_files_share_one_blob(self):
+        content = b"%PDF-1.4 the same thesis"
+        order_file = OrderFile.objects.create(
+            order=self._order(), file=ContentFile(content, name="thesis.pdf"),
+            file_type="task", uploaded_by=self.user,
+        )
+        work_file = ReadyWorkFile.objects.create(
+            work=self._work(), name="thesis.pdf", file=ContentFile(content, name="thesis.pdf"),
+        )
+
+        sha256 = hashlib.sha256(content).hexdigest()
+        self.assertEqual(Blob.objects.count(), 1)
+        self.assertEqual(StoredFile.objects.count(), 2)
+        self.assertEqual(order_file.file.path, work_file.file.path)
+        self.assertTrue(order_file.file.url.endswith(blob_path(sha256, ".pdf")))
+        self.assertEqual(order_file.filename(), "thesis.pdf")
+        with work_file.file.open("rb") as handle:
+            self.assertEqual(handle.read(), content)
+
+    def test_garbage_collection_keeps_referenced_content(self):
+        order = self._order()
+        kept = OrderFile.objects.create(
+            order=order, file=ContentFile(b"kept", name="kept.txt"), file_type="task", uploaded_by=self.user,
+        )
+        dropped = OrderFile.objects.create(
+            order=order, file=ContentFile(b"dropped", name="dropped.txt"), file_type="task", uploaded_by=self.user,
+        )
+        dropped_path = dropped.file.path
+        # delete() хранилища не удаляет общее содержимое сразу.
+        dropped.file.delete(save=False)
+        dropped.delete()
+        self.assertTrue(os.path.exists(dropped_path))
+
+        self.assertEqual(collect_garbage(grace_hours=24)["blobs"], 0)  # ещё свежие
+        stats = collect_garbage(grace_hours=0, now=timezone.now() + timedelta(seconds=1))
+
+        self.assertEqual((stats["links"], stats["blobs"]), (1, 1))
+        self.assertFalse(os.path.exists(dropped_path))
+        self.assertTrue(os.path.exists(kept.file.path))
+
+    def test_garbage_collection_skips_content_linked_during_sweep(self):
+        from . import storage
+
+        dropped = OrderFile.objects.create(
+            order=self._order(), file=ContentFile(b"relinked", name="old.txt"), file_type="task", uploaded_by=self.user,
+        )
+        path = dropped.file.path
+        dropped.delete()
+        sha256 = hashlib.sha256(b"relinked").hexdigest()
+        select = storage._unreferenced_blob_ids
+
+        def link_after_selection(cutoff):
+            ids = select(cutoff)
+            # Ссылка появляется уже после того, как содержимое отобрано к удалению.
+            content_storage().link(sha256, "orders/files/new.txt")
+            return ids
+
+        with patch.object(storage, "_unreferenced_blob_ids", side_effect=link_after_selection):
+            stats = collect_garbage(grace_hours=0, now=timezone.now() + timedelta(seconds=1))
+
+        self.assertEqual(stats["blobs"], 0)
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(StoredFile.objects.filter(name=f"orders/files/{sha256}/new.txt").exists())
+
+    def test_legacy_files_are_imported_and_deduplicated(self):
+        legacy = FileSystemStorage()
+        first = legacy.save("orders/legacy/a.pdf", ContentFile(b"legacy bytes"))
+        second = legacy.save("ready_works/a.pdf", ContentFile(b"legacy bytes"))
+        order = self._order()
+        OrderFile.objects.bulk_create([OrderFile(order=order, file=first, file_type="task", uploaded_by=self.user)])
+        ReadyWorkFile.objects.bulk_create([ReadyWorkFile(work=self._work(), name="a.pdf", file=second)])
+
+        self.assertEqual(import_legacy_files(dry_run=True)["files"], 2)
+        stats = import_legacy_files()
+
+        self.assertEqual((stats["files"], stats["bytes_saved"]), (2, len(b"legacy bytes")))
+        self.assertEqual(Blob.objects.count(), 1)
+        self.assertFalse(legacy.exists(first))
+        order_file = OrderFile.objects.get(order=order)
+        self.assertEqual(order_file.file.read(), b"legacy bytes")
+        self.assertEqual(import_legacy_files()["files"], 0)
+
+
+def _png(width, height, color="red"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=THUMBS_MEDIA, THUMBNAIL_FORMAT="WEBP")
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subject = Subject.objects.create(name="Thumbs subject")
+        cls.work_type = WorkType.objects.create(name="Thumbs work type")
+
+    def setUp(self):
+        cache.clear()
+
+    def _user(self, username):
+        return User.objects.create_user(
+            username=username, email=f"{username}@example.com", password="x", role="client",
+        )
+
+    def test_thumbnail_is_built_after_commit(self):
+        user = self._user("thumbs_avatar")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.avatar.save("me.png", ContentFile(_png(600, 400)))
+
+        name = thumbnail_name(user.avatar.name, "avatar")
+        self.assertTrue(default_storage.exists(name))
+        with default_storage.open(name) as handle, Image.open(handle) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ("WEBP", (128, 128)))
+
+    def test_field_falls_back_to_original_until_ready(self):
+        author = self._user("thumbs_author")
+        work = ReadyWork.objects.create(
+            title="Thumbs work", description="d", price=Decimal("100"),
+            subject=self.subject, work_type=self.work_type, author=author,
+        )
+        work.preview.save("cover.png", ContentFile(_png(1200, 900)))
+        field = ThumbnailURLField("preview")
+
+        self.assertEqual(field.to_representation(work.preview), work.preview.url)
+        ensure_thumbnail("ready_work_preview", work)
+        self.assertEqual(
+            field.to_representation(work.preview),
+            default_storage.url(thumbnail_name(work.preview.name, "preview")),
+        )
+
+        work.preview.save("cover.pdf", ContentFile(b"%PDF-1.4"))
+        self.assertIsNone(field.to_representation(work.preview))
+        self.assertIsNone(ensure_thumbnail("ready_work_preview", work))
+
+    def test_backfill_command_resumes_from_checkpoint(self):
+        users = [self._user(f"thumbs_backfill_{i}") for i in range(3)]
+        # bulk_update не вызывает сигналы — как у записей, загруженных до пайплайна.
+        for i, user in enumerate(users):
+            user.avatar = default_storage.save(f"avatars/old_{i}.png", ContentFile(_png(300, 300)))
+        User.objects.bulk_update(users, ["avatar"])
+
+        cache.set("thumbnails:backfill:avatar", users[0].pk)
+        call_command("generate_thumbnails", "avatar", "--batch-size", "1", stdout=io.StringIO())
+
+        built = [default_storage.exists(thumbnail_name(u.avatar.name, "avatar")) for u in users]
+        self.assertEqual(built, [False, True, True])
+        self.assertIsNone(cache.get("thumbnails:backfill:avatar"))
+
+        call_command("generate_thumbnails", "avatar", "--restart", stdout=io.StringIO())
+        self.assertTrue(default_storage.exists(thumbnail_name(users[0].avatar.name, "avatar")))
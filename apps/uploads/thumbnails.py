@@ -0,0 +1,135 @@
+"""
+Миниатюры изображений: аватары, превью готовых работ, картинки в чатах.
+
+Миниатюра строится в фоне (задача ``generate_thumbnail``) после сохранения
+записи и кладётся рядом с оригиналом под предсказуемым именем — сериализатор
+вычисляет её URL без обращения к БД (``ThumbnailURLField``), а пока
+миниатюры нет, отдаёт оригинал. Для файлов контентно-адресуемого хранилища
+миниатюра привязана к хэшу содержимого и общая для одинаковых картинок.
+"""
+import io
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .storage import CAS_DIR, parse_name
+
+logger = logging.getLogger('oko.uploads')
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+
+DEFAULT_SPECS = {
+    'avatar': {'size': (128, 128), 'crop': True},
+    'preview': {'size': (480, 360), 'crop': True},
+    'chat': {'size': (320, 320), 'crop': False},
+}
+DEFAULT_QUALITY = 80
+
+# Цель → (модель, поле, размер).
+TARGETS = {
+    'avatar': ('users.User', 'avatar', 'avatar'),
+    'ready_work_preview': ('shop.ReadyWork', 'preview', 'preview'),
+    'chat_image': ('chat.Message', 'file', 'chat'),
+}
+
+
+def specs():
+    return {**DEFAULT_SPECS, **getattr(settings, 'THUMBNAIL_SPECS', {})}
+
+
+def _format():
+    fmt = getattr(settings, 'THUMBNAIL_FORMAT', 'WEBP').upper()
+    if fmt == 'WEBP' and not features.check('webp'):
+        fmt = 'JPEG'
+    return fmt
+
+
+def is_image(name):
+    return os.path.splitext(name or '')[1].lower() in IMAGE_EXTENSIONS
+
+
+def thumbnail_name(name, spec):
+    ext = 'webp' if _format() == 'WEBP' else 'jpg'
+    parsed = parse_name(name)
+    if parsed:
+        sha256 = parsed[0]
+        return f'{CAS_DIR}/thumbs/{sha256[:2]}/{sha256}-{spec}.{ext}'
+    stem = os.path.splitext(name)[0]
+    return f'{stem}.{spec}.{ext}'
+
+
+def thumbnail_url(field_file, spec):
+    """
+    URL миниатюры, если она уже готова, иначе URL оригинала; None, если файл
+    не изображение.
+    """
+    if not field_file or not is_image(field_file.name):
+        return None
+    name = thumbnail_name(field_file.name, spec)
+    if default_storage.exists(name):
+        return default_storage.url(name)
+    return field_file.url
+
+
+def render(source, spec):
+    """Байты миниатюры для открытого файла изображения."""
+    options = specs()[spec]
+    size = tuple(options['size'])
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        fmt = _format()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        if fmt == 'JPEG' and image.mode == 'RGBA':
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        if options.get('crop'):
+            image = ImageOps.fit(image, size, Image.LANCZOS)
+        else:
+            image.thumbnail(size, Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt, quality=getattr(settings, 'THUMBNAIL_QUALITY', DEFAULT_QUALITY), optimize=True)
+    return buffer.getvalue()
+
+
+def target_field(target, instance):
+    _model, field_name, spec = TARGETS[target]
+    return getattr(instance, field_name), spec
+
+
+def ensure_thumbnail(target, instance, *, force=False):
+    """
+    Строит миниатюру, если её ещё нет. Возвращает имя миниатюры или None,
+    если у записи нет изображения.
+    """
+    field_file, spec = target_field(target, instance)
+    if not field_file or not is_image(field_file.name):
+        return None
+    name = thumbnail_name(field_file.name, spec)
+    if not force and default_storage.exists(name):
+        return name
+    try:
+        with field_file.open('rb') as source:
+            content = render(source, spec)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        logger.warning("Не удалось построить миниатюру %s для %s: %s", spec, field_file.name, exc)
+        return None
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+    return name
+
+
+def target_model(target):
+    return apps.get_model(TARGETS[target][0])
+
+
+def targets_for(model):
+    label = model._meta.label
+    return [target for target, (model_label, _field, _spec) in TARGETS.items() if model_label == label]
@@ -0,0 +1,75 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import services
+from .models import UploadSession
+from .serializers import StartUploadSerializer, UploadSessionSerializer
+
+
+def _error_response(exc):
+    data = {'detail': exc.detail}
+    if exc.offset is not None:
+        data['offset'] = exc.offset
+    return Response(data, status=exc.status_code)
+
+
+def _validation_response(exc):
+    return Response({'detail': ' '.join(exc.messages)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UploadSessionViewSet(mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Загрузка больших файлов по частям.
+
+    1. ``POST /api/uploads/`` — {purpose, filename, size[, sha256]} → сессия.
+    2. ``PUT /api/uploads/<id>/chunk/`` — тело части, заголовок
+       ``Content-Range: bytes <start>-<end>/<size>``; ответ содержит offset.
+    3. ``GET /api/uploads/<id>/`` — текущий offset для докачки.
+    4. ``POST /api/uploads/<id>/complete/`` — проверка и сборка файла.
+
+    Готовый ``id`` передаётся как ``upload_id`` при создании файла заказа,
+    готовой работы или сообщения чата.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(owner=self.request.user)
+
+    def create(self, request):
+        serializer = StartUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = services.start_upload(request.user, **serializer.validated_data)
+        except DjangoValidationError as exc:
+            return _validation_response(exc)
+        data = UploadSessionSerializer(session).data
+        data['chunk_size'] = services.chunk_size()
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        content_range = request.META.get('HTTP_CONTENT_RANGE')
+        if not content_range:
+            return Response({'detail': 'Нужен заголовок Content-Range'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Тело читается напрямую из потока, не через парсеры DRF.
+            session = services.write_chunk(pk, request.user, content_range, request._request)
+        except services.UploadError as exc:
+            return _error_response(exc)
+        return Response({'offset': session.received, 'size': session.size})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        try:
+            session = services.complete_upload(pk, request.user)
+        except services.UploadError as exc:
+            return _error_response(exc)
+        except DjangoValidationError as exc:
+            return _validation_response(exc)
+        return Response(UploadSessionSerializer(session).data)
+
+    def perform_destroy(self, instance):
+        services.abort_upload(instance)
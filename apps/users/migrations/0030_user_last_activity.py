@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-19 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0029_user_debt_balance_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='last_activity',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Переносится из Redis пачками (apps.users.presence)', null=True, verbose_name='Последняя активность'),
+        ),
+    ]
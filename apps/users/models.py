@@ -45,6 +45,11 @@ class User(AbstractUser):
     frozen_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     debt_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Задолженность по возвратам")
     email_verified = models.BooleanField(default=False, verbose_name="Email подтвержден")
+    last_activity = models.DateTimeField(
+        null=True, blank=True, db_index=True,
+        verbose_name="Последняя активность",
+        help_text="Переносится из Redis пачками (apps.users.presence)",
+    )
 
     class Meta:
         constraints = [
@@ -7,7 +7,7 @@ seconds and redirect with an opaque one-time code instead.
 import secrets
 
 from django.core.cache import cache
-from rest_framework_simplejwt.tokens import RefreshToken
+from apps.users.tokens import RefreshToken
 
 PREFIX = "oauth_exchange:"
 TTL_SECONDS = 90
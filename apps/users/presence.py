@@ -0,0 +1,211 @@
+"""
+Присутствие пользователей онлайн.
+
+Время последней активности хранится в Redis: sorted set
+``presence:last_seen`` (user_id → unix-время). Отметки приходят от
+WebSocket-consumer'ов (подключение, входящие сообщения/ping, отключение) и
+HTTP-heartbeat'ов; «сколько онлайн» и статус пользователя — это ZCOUNT/ZSCORE
+за O(log n), без запросов к БД.
+
+В ``User.last_activity`` отметки попадают пачками (задача
+``flush_presence``): изменившиеся id копятся в множестве ``presence:dirty``.
+Без Redis (dev, тесты на locmem-кэше) используется хранилище в памяти
+процесса с тем же поведением.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+logger = logging.getLogger(__name__)
+
+SEEN_KEY = 'presence:last_seen'
+DIRTY_KEY = 'presence:dirty'
+
+DEFAULT_ONLINE_SECONDS = 15 * 60
+DEFAULT_TOUCH_INTERVAL = 30
+DEFAULT_FLUSH_BATCH = 1000
+DEFAULT_RETENTION_HOURS = 24
+
+
+def online_seconds():
+    return int(getattr(settings, 'PRESENCE_ONLINE_SECONDS', DEFAULT_ONLINE_SECONDS))
+
+
+def touch_interval():
+    return int(getattr(settings, 'PRESENCE_TOUCH_INTERVAL', DEFAULT_TOUCH_INTERVAL))
+
+
+def _to_datetime(score):
+    return datetime.fromtimestamp(float(score), tz=dt_timezone.utc)
+
+
+class RedisPresence:
+    """Хранилище отметок в Redis (соединение кэша django-redis)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def touch(self, user_ids, now):
+        mapping = {str(user_id): now for user_id in user_ids}
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zadd(SEEN_KEY, mapping)
+        pipe.sadd(DIRTY_KEY, *mapping)
+        pipe.execute()
+
+    def scores(self, user_ids):
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.zscore(SEEN_KEY, str(user_id))
+        return {
+            user_id: score for user_id, score in zip(user_ids, pipe.execute())
+            if score is not None
+        }
+
+    def count_since(self, since):
+        return self.client.zcount(SEEN_KEY, since, '+inf')
+
+    def pop_dirty(self, count):
+        return [int(user_id) for user_id in self.client.spop(DIRTY_KEY, count) or []]
+
+    def prune(self, before):
+        return self.client.zremrangebyscore(SEEN_KEY, '-inf', f'({before}')
+
+
+class LocalPresence:
+    """Хранилище в памяти процесса — для окружений без Redis."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seen = {}
+        self.dirty = set()
+
+    def touch(self, user_ids, now):
+        with self.lock:
+            for user_id in user_ids:
+                self.seen[int(user_id)] = now
+                self.dirty.add(int(user_id))
+
+    def scores(self, user_ids):
+        with self.lock:
+            return {user_id: self.seen[int(user_id)] for user_id in user_ids if int(user_id) in self.seen}
+
+    def count_since(self, since):
+        with self.lock:
+            return sum(1 for score in self.seen.values() if score >= since)
+
+    def pop_dirty(self, count):
+        with self.lock:
+            popped = [self.dirty.pop() for _ in range(min(count, len(self.dirty)))]
+        return popped
+
+    def prune(self, before):
+        with self.lock:
+            stale = [user_id for user_id, score in self.seen.items() if score < before]
+            for user_id in stale:
+                del self.seen[user_id]
+        return len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.seen.clear()
+            self.dirty.clear()
+
+
+_local = LocalPresence()
+
+
+def backend():
+    try:
+        from django_redis import get_redis_connection
+        return RedisPresence(get_redis_connection('default'))
+    except (ImportError, NotImplementedError):
+        return _local
+
+
+def touch(user_id, *, now=None):
+    """Отмечает активность пользователя. Ошибки Redis не ломают запрос."""
+    if not user_id:
+        return
+    try:
+        backend().touch([user_id], now if now is not None else time.time())
+    except Exception:
+        logger.warning("Не удалось обновить присутствие пользователя %s", user_id, exc_info=True)
+
+
+def last_seen(user_ids):
+    """{user_id: datetime} по данным Redis (без обращения к БД)."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    try:
+        scores = backend().scores(user_ids)
+    except Exception:
+        logger.warning("Не удалось прочитать присутствие", exc_info=True)
+        return {}
+    return {user_id: _to_datetime(score) for user_id, score in scores.items()}
+
+
+def statuses(user_ids):
+    """{user_id: {'is_online': bool, 'last_seen': datetime | None}}."""
+    seen = last_seen(user_ids)
+    threshold = time.time() - online_seconds()
+    return {
+        user_id: {
+            'is_online': user_id in seen and seen[user_id].timestamp() >= threshold,
+            'last_seen': seen.get(user_id),
+        }
+        for user_id in user_ids
+    }
+
+
+def is_online(user_id):
+    return statuses([user_id])[user_id]['is_online']
+
+
+def online_count():
+    """Сколько пользователей было активно за PRESENCE_ONLINE_SECONDS."""
+    try:
+        return backend().count_since(time.time() - online_seconds())
+    except Exception:
+        logger.warning("Не удалось посчитать пользователей онлайн", exc_info=True)
+        return 0
+
+
+def last_activity(user):
+    """Последняя активность: свежая отметка из Redis, иначе ``User.last_activity``."""
+    seen = last_seen([user.pk]).get(user.pk)
+    stored = getattr(user, 'last_activity', None)
+    if seen and (stored is None or seen > stored):
+        return seen
+    return stored
+
+
+def flush_to_db(*, batch_size=None, now=None):
+    """
+    Переносит накопленные отметки в ``User.last_activity`` пачками и убирает
+    из Redis отметки старше PRESENCE_RETENTION_HOURS. Возвращает число
+    обновлённых пользователей.
+    """
+    batch_size = batch_size or int(getattr(settings, 'PRESENCE_FLUSH_BATCH', DEFAULT_FLUSH_BATCH))
+    User = get_user_model()
+    store = backend()
+    updated = 0
+    while True:
+        user_ids = store.pop_dirty(batch_size)
+        if not user_ids:
+            break
+        scores = store.scores(user_ids)
+        users = [User(pk=user_id, last_activity=_to_datetime(score)) for user_id, score in scores.items()]
+        # Несуществующие id bulk_update просто пропускает.
+        User.objects.bulk_update(users, ['last_activity'], batch_size=batch_size)
+        updated += len(users)
+        if len(user_ids) < batch_size:
+            break
+
+    retention = timedelta(hours=int(getattr(settings, 'PRESENCE_RETENTION_HOURS', DEFAULT_RETENTION_HOURS)))
+    store.prune((now if now is not None else time.time()) - retention.total_seconds())
+    return updated
@@ -2,7 +2,9 @@ from django.utils import timezone
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 # from dj_rest_auth.registration.serializers import RegisterSerializer
+from apps.uploads.serializers import ThumbnailURLField
 from .models import User, ImprovementSuggestion
+from .tokens import RefreshToken
 
 
 class CustomRegisterSerializer(serializers.ModelSerializer):
@@ -132,13 +134,14 @@ class UserSerializer(serializers.ModelSerializer):
     is_blocked = serializers.SerializerMethodField()
     email = serializers.SerializerMethodField()
     display_username = serializers.CharField(read_only=True)
+    avatar_thumb_url = ThumbnailURLField('avatar', source='avatar')
     
     class Meta:
         model = User
         fields = [
             'id', 'username', 'display_username', 'email', 'first_name', 'last_name',
             'role', 'phone', 'balance', 'frozen_balance',
-            'avatar', 'bio', 'experience_years', 'hourly_rate',
+            'avatar', 'avatar_thumb_url', 'bio', 'experience_years', 'hourly_rate',
             'education', 'skills', 'portfolio_url', 'is_verified',
             'referral_code', 'partner_commission_rate',
             'total_referrals', 'active_referrals', 'total_earnings',
@@ -284,6 +287,8 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Кастомный serializer для получения токена с дополнительными данными пользователя"""
     
+    token_class = RefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -343,16 +348,18 @@ class ExpertApplicationSerializer(serializers.Serializer):
 class SimpleUserSerializer(serializers.ModelSerializer):
     """Упрощенный serializer для пользователя (без email для приватности)"""
     display_username = serializers.CharField(read_only=True)
+    avatar_thumb_url = ThumbnailURLField('avatar', source='avatar')
     
     class Meta:
         model = User
-        fields = ['id', 'username', 'display_username', 'role', 'avatar']
+        fields = ['id', 'username', 'display_username', 'role', 'avatar', 'avatar_thumb_url']
 
 
 class PublicUserProfileSerializer(serializers.ModelSerializer):
     """Serializer для публичного профиля пользователя"""
     display_username = serializers.CharField(read_only=True)
     average_rating = serializers.SerializerMethodField()
+    avatar_thumb_url = ThumbnailURLField('avatar', source='avatar')
 
     def get_average_rating(self, obj):
         if getattr(obj, 'role', None) == 'client':
@@ -367,7 +374,7 @@ class PublicUserProfileSerializer(serializers.ModelSerializer):
         model = User
         fields = [
             'id', 'username', 'display_username', 'first_name', 'last_name', 'role',
-            'avatar', 'bio', 'experience_years', 'hourly_rate',
+            'avatar', 'avatar_thumb_url', 'bio', 'experience_years', 'hourly_rate',
             'education', 'skills', 'portfolio_url', 'is_verified', 'city',
             'average_rating'
         ]
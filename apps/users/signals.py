@@ -2,7 +2,7 @@ import logging
 from decimal import Decimal
 
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 
 from .models import PartnerEarning, User
@@ -71,9 +71,12 @@ def create_registration_bonus_for_partner(sender, instance, created, **kwargs):
 
 
 def _add_pending_balance(partner, earning):
+    from apps.wallet.cache import invalidate_on_commit
+
     User.objects.filter(pk=partner.pk).update(
         pending_balance=models.F('pending_balance') + earning.amount
     )
+    invalidate_on_commit(partner.pk)
 
 
 def update_partner_statistics(partner):
@@ -91,3 +94,41 @@ def update_partner_statistics(partner):
     partner.active_referrals = active_referrals
     partner.total_earnings = total_earnings
     partner.save(update_fields=['total_referrals', 'active_referrals', 'total_earnings'])
+
+
+WS_SNAPSHOT_FIELDS = {'username', 'role', 'is_staff', 'is_active', 'is_banned_for_contacts'}
+WS_PRIVILEGE_FIELDS = ('role', 'is_staff', 'is_active')
+
+
+@receiver(pre_save, sender=User)
+def detect_ws_privilege_change(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Запоминает, меняются ли роль/staff/активность — от них зависят права в WebSocket."""
+    instance._ws_privileges_changed = False
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(WS_PRIVILEGE_FIELDS) & set(update_fields):
+        return
+    stored = User.objects.filter(pk=instance.pk).values_list(*WS_PRIVILEGE_FIELDS).first()
+    current = tuple(getattr(instance, field) for field in WS_PRIVILEGE_FIELDS)
+    instance._ws_privileges_changed = stored is not None and stored != current
+
+
+@receiver(post_save, sender=User)
+def refresh_ws_auth_snapshot(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Держит снимок для WebSocket-авторизации (apps.users.ws_auth) актуальным."""
+    if raw or (update_fields is not None and not WS_SNAPSHOT_FIELDS & set(update_fields)):
+        return
+    from django.db import transaction
+
+    from . import ws_auth
+
+    # Выданные токены несут прежние claims (и refresh копирует их в новые
+    # access) — при смене прав отзываем их, а не только при блокировке.
+    privileges_changed = getattr(instance, '_ws_privileges_changed', False)
+
+    def _apply():
+        ws_auth.remember(instance)
+        if privileges_changed or not instance.is_active:
+            ws_auth.revoke(instance.pk)
+
+    transaction.on_commit(_apply)
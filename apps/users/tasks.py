@@ -0,0 +1,16 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def flush_presence():
+    """Переносит отметки присутствия из Redis в User.last_activity."""
+    from .presence import flush_to_db
+
+    updated = flush_to_db()
+    if updated:
+        logger.info(f"Присутствие: обновлена активность {updated} пользователей")
+    return updated
@@ -6,7 +6,7 @@ import hmac
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken
+from apps.users.tokens import RefreshToken
 
 User = get_user_model()
 
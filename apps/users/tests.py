@@ -8,6 +8,11 @@ from rest_framework import status
 from decimal import Decimal
 
 from apps.orders.models import Order
+from django.core.cache import cache
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users import presence, ws_auth
+from apps.users.tokens import RefreshToken
 from apps.users.models import PartnerEarning
 
 User = get_user_model()
@@ -251,3 +256,144 @@ class PartnerReferralFlowTests(APITestCase):
 
         self.assertEqual(admin_partners.status_code, status.HTTP_200_OK)
         self.assertEqual(admin_earnings.status_code, status.HTTP_200_OK)
+
+
+class PresenceTests(APITestCase):
+    def setUp(self):
+        presence._local.clear()
+        self.user = User.objects.create_user(
+            username='presence_user', email='presence_user@example.com', password='x', role='expert',
+        )
+        self.other = User.objects.create_user(
+            username='presence_other', email='presence_other@example.com', password='x', role='client',
+        )
+
+    def test_heartbeat_marks_user_online_without_db_write(self):
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('presence_heartbeat'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        states = self.client.get(reverse('presence_status'), {'ids': f'{self.user.id},{self.other.id}'}).data
+        self.assertTrue(states[str(self.user.id)]['is_online'])
+        self.assertFalse(states[str(self.other.id)]['is_online'])
+        self.assertEqual(presence.online_count(), 1)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_activity)
+
+    def test_stale_marks_are_not_online(self):
+        presence.touch(self.user.id, now=(timezone.now() - timedelta(hours=1)).timestamp())
+        self.assertFalse(presence.is_online(self.user.id))
+        self.assertEqual(presence.online_count(), 0)
+
+    def test_flush_persists_last_activity_in_batches(self):
+        presence.touch(self.user.id)
+        presence.touch(self.other.id)
+
+        self.assertEqual(presence.flush_to_db(batch_size=1), 2)
+        self.assertEqual(presence.flush_to_db(), 0)
+        self.user.refresh_from_db()
+        self.assertAlmostEqual(self.user.last_activity.timestamp(), timezone.now().timestamp(), delta=5)
+        self.assertEqual(presence.last_activity(self.user), presence.last_seen([self.user.id])[self.user.id])
+
+    def test_public_stats_counts_online_from_presence(self):
+        self.client.force_authenticate(user=None)
+        presence.touch(self.other.id)
+        response = self.client.get('/api/public/stats/')
+        self.assertEqual(response.data['online_users'], 1)
+
+    def test_user_lists_are_ordered_by_last_activity(self):
+        viewer = User.objects.create_user(
+            username='presence_viewer', email='presence_viewer@example.com', password='x', role='client',
+        )
+        now = timezone.now()
+        User.objects.filter(pk=self.user.pk).update(last_activity=now - timedelta(hours=2), last_login=now)
+        User.objects.filter(pk=self.other.pk).update(last_activity=now, last_login=now - timedelta(days=1))
+        self.client.force_authenticate(user=viewer)
+
+        recent = [item['id'] for item in self.client.get('/api/users/recent_users/').data]
+        everyone = [item['id'] for item in self.client.get('/api/users/all_users/').data]
+
+        self.assertEqual(recent, [self.other.id, self.user.id])
+        self.assertEqual(everyone[:2], [self.other.id, self.user.id])
+
+
+class WebSocketAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        ws_auth._local.clear()
+        self.user = User.objects.create_user(
+            username='ws_auth_expert', email='ws_auth_expert@example.com', password='x', role='expert',
+        )
+        cache.clear()  # снимок из post_save — проверяем путь через claims
+
+    def test_claims_authenticate_without_queries(self):
+        refresh = RefreshToken.for_user(self.user)
+        # Access из refresh (как в /token/refresh/) копирует claims.
+        token = str(RefreshToken(str(refresh)).access_token)
+
+        with self.assertNumQueries(0):
+            ws_user = ws_auth.authenticate(token)
+
+        self.assertEqual((ws_user.id, ws_user.role, ws_user.is_staff), (self.user.id, 'expert', False))
+        self.assertTrue(ws_user.is_authenticated)
+        self.assertIsNone(ws_auth.authenticate('not-a-token'))
+
+    def test_blocking_revokes_issued_tokens(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        self.assertIsNotNone(ws_auth.authenticate(token))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save(update_fields=['is_active'])
+
+        self.assertIsNone(ws_auth.authenticate(token))
+
+    def _access_after_revocation(self, refresh):
+        """Access из ``refresh``, выпущенный позже отзыва (как при /token/refresh/)."""
+        key = ws_auth.REVOKED_KEY.format(self.user.pk)
+        cache.set(key, cache.get(key) - 10)  # отзыв — «раньше», чем выпуск нового access
+        ws_auth._local.clear()
+        return str(refresh.access_token)
+
+    def test_role_change_revokes_tokens_and_reaches_sockets_through_snapshot(self):
+        refresh = RefreshToken.for_user(self.user)
+        token = str(refresh.access_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = 'admin'
+            self.user.save(update_fields=['role'])
+
+        self.assertIsNone(ws_auth.authenticate(token))
+        self.assertEqual(ws_auth.authenticate(self._access_after_revocation(refresh)).role, 'admin')
+
+    def test_demoted_staff_does_not_regain_rights_after_snapshot_expiry(self):
+        self.user.role, self.user.is_staff = 'admin', True
+        self.user.save()
+        refresh = RefreshToken.for_user(self.user)  # claims: admin, staff
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role, self.user.is_staff = 'client', False
+            self.user.save()
+
+        cache.delete(ws_auth.SNAPSHOT_KEY.format(self.user.pk))  # снимок истёк / вытеснен
+        ws_auth._local.clear()
+        ws_user = ws_auth.authenticate(self._access_after_revocation(refresh))
+
+        self.assertEqual((ws_user.role, ws_user.is_staff), ('client', False))
+
+    def test_save_without_privilege_change_keeps_tokens(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Иван'
+            self.user.save()
+
+        self.assertIsNotNone(ws_auth.authenticate(token))
+        self.assertIsNone(cache.get(ws_auth.REVOKED_KEY.format(self.user.pk)))
+
+    def test_legacy_token_is_loaded_once(self):
+        token = str(AccessToken.for_user(self.user))
+
+        with self.assertNumQueries(1):
+            ws_auth.authenticate(token)
+        ws_auth._local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(ws_auth.authenticate(token).role, 'expert')
@@ -0,0 +1,57 @@
+"""WebSocket auth throughput: JWT claims vs. a User lookup per connect.
+
+The benchmark is opt-in:
+    WS_AUTH_BENCHMARK=1 python manage.py test apps.users.tests_benchmark -v2
+"""
+import os
+import time
+import unittest
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users import ws_auth
+from apps.users.models import User
+from apps.users.tokens import RefreshToken
+
+CONNECTS = 5_000
+USERS = 200
+
+
+def _legacy_authenticate(token):
+    """Pre-snapshot implementation: decode, then ``User.objects.get``."""
+    access_token = AccessToken(token)
+    return User.objects.get(id=access_token.get('user_id'))
+
+
+@unittest.skipUnless(os.getenv('WS_AUTH_BENCHMARK'), 'set WS_AUTH_BENCHMARK=1 to run')
+class WebSocketAuthBenchmark(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create([
+            User(username=f'ws-bench-{i}', role='client' if i % 3 else 'expert') for i in range(USERS)
+        ])
+        cls.users = list(User.objects.filter(username__startswith='ws-bench-'))
+
+    def _rate(self, authenticate, tokens):
+        started = time.perf_counter()
+        for i in range(CONNECTS):
+            self.assertIsNotNone(authenticate(tokens[i % len(tokens)]))
+        return CONNECTS / (time.perf_counter() - started)
+
+    def test_connects_per_second(self):
+        cache.clear()
+        ws_auth._local.clear()
+        snapshot_tokens = [str(RefreshToken.for_user(user).access_token) for user in self.users]
+        legacy_tokens = [str(AccessToken.for_user(user)) for user in self.users]
+
+        legacy = self._rate(_legacy_authenticate, legacy_tokens)
+        cold = self._rate(ws_auth.authenticate, snapshot_tokens)
+        warm = self._rate(ws_auth.authenticate, snapshot_tokens)
+
+        print(
+            f"\n{CONNECTS} connects, {USERS} users: "
+            f"DB lookup {legacy:,.0f}/s, claims {cold:,.0f}/s, claims + warm LRU {warm:,.0f}/s"
+        )
+        self.assertGreater(warm, legacy)
@@ -0,0 +1,29 @@
+"""
+JWT с «снимком» пользователя в claims.
+
+Роль, флаги staff/активности и бан за контакты записываются в токен при
+выдаче, поэтому WebSocket-подключение (apps.users.ws_auth) авторизуется
+без запроса к БД. Access-токен, полученный через refresh, копирует claims
+refresh-токена. Изменения после выдачи (блокировка) доходят через кэш
+снимков и denylist в ws_auth.
+"""
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+
+def snapshot_claims(user):
+    return {
+        'username': user.username,
+        'role': user.role,
+        'is_staff': bool(user.is_staff),
+        'is_active': bool(user.is_active),
+        'contact_ban': bool(getattr(user, 'is_banned_for_contacts', False)),
+    }
+
+
+class RefreshToken(BaseRefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in snapshot_claims(user).items():
+            token[claim] = value
+        return token
@@ -60,6 +60,8 @@ urlpatterns = [
     path('directors/', views.UserViewSet.as_view({'get': 'directors'}), name='directors'),
     path('contact_banned_users/', views.UserViewSet.as_view({'get': 'contact_banned_users'}), name='contact_banned_users'),
     path('me/', views.UserViewSet.as_view({'get': 'me'}), name='user_me'),
+    path('presence/', views.presence_status, name='presence_status'),
+    path('presence/heartbeat/', views.presence_heartbeat, name='presence_heartbeat'),
 
     # VK bot endpoints
     path('vk/link/', views.UserViewSet.as_view({'post': 'vk_link'}), name='vk_link'),
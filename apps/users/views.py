@@ -16,7 +16,7 @@ from rest_framework.permissions import AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from apps.users.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from django.contrib.auth.tokens import default_token_generator
@@ -27,6 +27,7 @@ from django.utils.dateparse import parse_datetime
 logger = logging.getLogger(__name__)
 from apps.orders.models import Order, Transaction
 from .models import PartnerEarning, ImprovementSuggestion
+from . import presence
 from apps.wallet.services import WalletService
 from apps.orders.serializers import OrderSerializer, TransactionSerializer
 from .serializers import (
@@ -966,10 +967,10 @@ class UserViewSet(viewsets.ModelViewSet):
         """Получение последних активных пользователей для раздела 'Мои друзья'"""
         recent = User.objects.filter(
             is_active=True,
-            last_login__isnull=False
+            last_activity__isnull=False
         ).exclude(
             id=request.user.id
-        ).order_by('-last_login')[:20]
+        ).order_by('-last_activity')[:20]
         
         serializer = self.get_serializer(recent, many=True)
         return Response(serializer.data)
@@ -986,7 +987,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 models.Q(first_name__icontains=search) |
                 models.Q(last_name__icontains=search)
             )
-        users = users.order_by('-last_login')[:50]
+        users = users.order_by(models.F('last_activity').desc(nulls_last=True))[:50]
         serializer = self.get_serializer(users, many=True)
         friend_ids = set(Friendship.objects.filter(from_user=request.user).values_list('to_user_id', flat=True))
         data = serializer.data
@@ -999,7 +1000,9 @@ class UserViewSet(viewsets.ModelViewSet):
         """Список друзей текущего пользователя"""
         from apps.users.models import Friendship
         friend_ids = Friendship.objects.filter(from_user=request.user).values_list('to_user_id', flat=True)
-        friends = User.objects.filter(id__in=friend_ids, is_active=True).order_by('-last_login')
+        friends = User.objects.filter(id__in=friend_ids, is_active=True).order_by(
+            models.F('last_activity').desc(nulls_last=True)
+        )
         serializer = self.get_serializer(friends, many=True)
         data = serializer.data
         for item in data:
@@ -1535,14 +1538,10 @@ def public_stats_view(request):
         except Exception as e:
             logger.warning(f"[PublicStats] Token validation failed: {e}")
     
-    # Обновляем last_login для текущего пользователя (если удалось аутентифицировать)
+    # Запрос футера служит heartbeat'ом: отметка в Redis, без записи в БД
     if user and user.is_active:
-        user.last_login = timezone.now()
-        user.save(update_fields=['last_login'])
-        logger.info(f"[PublicStats] Updated last_login for user {user.id} ({user.username})")
-    else:
-        logger.info("[PublicStats] No authenticated user - NOT updating last_login")
-    
+        presence.touch(user.id)
+
     # Общее количество пользователей (только эксперты и клиенты)
     total_experts = User.objects.filter(role='expert').count()
     total_clients = User.objects.filter(role='client').count()
@@ -1562,20 +1561,10 @@ def public_stats_view(request):
     # Заказы за 24 часа
     orders_today = Order.objects.filter(created_at__gte=yesterday).count()
     
-    # Активные пользователи (за последние 15 минут)
-    fifteen_minutes_ago = timezone.now() - timedelta(minutes=15)
-    online_users = User.objects.filter(last_login__gte=fifteen_minutes_ago).count()
-    
-    # Логирование для отладки
-    logger.info(f"[PublicStats] Query: last_login >= {fifteen_minutes_ago}")
+    # Активные пользователи (окно PRESENCE_ONLINE_SECONDS)
+    online_users = presence.online_count()
     logger.info(f"[PublicStats] online_users={online_users}, total_users={total_users}")
-    
-    # Отладка: покажем последних 5 заходов
-    recent_logins = User.objects.filter(last_login__isnull=False).order_by('-last_login')[:5]
-    for u in recent_logins:
-        minutes_ago = (timezone.now() - u.last_login).total_seconds() / 60
-        logger.info(f"[PublicStats] Recent login: user {u.id} ({u.username}) - {minutes_ago:.1f} min ago")
-    
+
     return Response({
         'total_experts': total_experts,
         'total_clients': total_clients,
@@ -1588,6 +1577,31 @@ def public_stats_view(request):
     })
 
 
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def presence_heartbeat(request):
+    """Heartbeat вкладки без WebSocket: отметка присутствия в Redis."""
+    presence.touch(request.user.id)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def presence_status(request):
+    """Статус онлайн для ``?ids=1,2,3`` (не больше 100 пользователей)."""
+    try:
+        user_ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()][:100]
+    except ValueError:
+        return Response({'detail': 'ids должен быть списком чисел через запятую'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        str(user_id): {
+            'is_online': state['is_online'],
+            'last_seen': state['last_seen'].isoformat() if state['last_seen'] else None,
+        }
+        for user_id, state in presence.statuses(user_ids).items()
+    })
+
 # Telegram Auth Status Check
 from rest_framework.decorators import api_view, permission_classes
 # AllowAny imported at top of file
@@ -0,0 +1,210 @@
+"""
+Авторизация WebSocket-подключений без обращения к БД.
+
+Пользователь восстанавливается из подписанных claims access-токена
+(apps.users.tokens). Поверх claims — более свежий снимок из Redis
+(``ws_auth:snapshot:<id>``, обновляется при сохранении пользователя) и
+denylist (``ws_auth:revoked:<id>`` — время отзыва: токены, выданные раньше,
+отклоняются). Отзыв ставится при блокировке и при смене роли/staff; пока он
+жив, claims токена для авторизации не используются — access-токены,
+выпущенные старым refresh, несут прежнюю роль. Без снимка такой
+пользователь читается из БД. Оба ключа читаются одним ``get_many`` и кэшируются в LRU
+процесса на ``WS_AUTH_LOCAL_TTL`` секунд, так что при волне переподключений
+после деплоя Redis видит по одному запросу на пользователя, а PostgreSQL —
+только токены старого формата без claims.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .tokens import snapshot_claims
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'ws_auth:snapshot:{}'
+REVOKED_KEY = 'ws_auth:revoked:{}'
+
+DEFAULT_LOCAL_TTL = 5
+DEFAULT_LOCAL_SIZE = 10_000
+DEFAULT_SNAPSHOT_TTL = 600
+
+
+class SnapshotUser:
+    """Пользователь WebSocket-сессии: поля снимка без модели и запросов к БД."""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, snapshot):
+        self.id = self.pk = int(user_id)
+        self.username = snapshot.get('username')
+        self.role = snapshot.get('role')
+        self.is_staff = bool(snapshot.get('is_staff'))
+        self.is_active = bool(snapshot.get('is_active', True))
+        self.is_banned_for_contacts = bool(snapshot.get('contact_ban'))
+
+    def __repr__(self):
+        return f'<SnapshotUser {self.id} {self.role}>'
+
+
+class _LocalLRU:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.data[key] = (time.monotonic() + ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+_local = _LocalLRU(int(getattr(settings, 'WS_AUTH_LOCAL_SIZE', DEFAULT_LOCAL_SIZE)))
+
+
+def _local_ttl():
+    return int(getattr(settings, 'WS_AUTH_LOCAL_TTL', DEFAULT_LOCAL_TTL))
+
+
+def _revocation_ttl():
+    lifetime = settings.SIMPLE_JWT.get('REFRESH_TOKEN_LIFETIME') if hasattr(settings, 'SIMPLE_JWT') else None
+    return int(lifetime.total_seconds()) if lifetime else 24 * 3600
+
+
+def decode(token):
+    """Проверяет подпись и срок access-токена; payload или None."""
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    try:
+        return AccessToken(token).payload
+    except TokenError:
+        return None
+
+
+def _user_id(payload):
+    # simplejwt пишет id строкой; ключи LRU и Redis — по int.
+    try:
+        return int(payload.get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id')))
+    except (TypeError, ValueError):
+        return None
+
+
+def _from_state(payload, state):
+    snapshot, revoked_at = state
+    if revoked_at and payload.get('iat', 0) <= revoked_at:
+        return None
+    if not snapshot.get('is_active', True):
+        return None
+    return SnapshotUser(_user_id(payload), snapshot)
+
+
+def _snapshot_ttl():
+    # Не короче жизни refresh-токена: иначе после истечения снимка остались бы
+    # только claims, скопированные из refresh до изменения пользователя.
+    return max(int(getattr(settings, 'WS_AUTH_SNAPSHOT_TTL', DEFAULT_SNAPSHOT_TTL)), _revocation_ttl())
+
+
+def _claims_snapshot(payload):
+    if 'role' not in payload or 'is_active' not in payload:
+        return None
+    return {claim: payload.get(claim) for claim in ('username', 'role', 'is_staff', 'is_active', 'contact_ban')}
+
+
+def _cached_state(payload):
+    """(снимок или None, время отзыва) из Redis и claims — без БД."""
+    user_id = _user_id(payload)
+    values = cache.get_many([SNAPSHOT_KEY.format(user_id), REVOKED_KEY.format(user_id)])
+    snapshot = values.get(SNAPSHOT_KEY.format(user_id))
+    revoked_at = values.get(REVOKED_KEY.format(user_id))
+    if snapshot is None and revoked_at is None:
+        snapshot = _claims_snapshot(payload)
+    return snapshot, revoked_at
+
+
+def _db_snapshot(payload):
+    """Снимок для старых токенов без claims."""
+    from django.contrib.auth import get_user_model
+
+    user = get_user_model().objects.filter(pk=_user_id(payload)).first()
+    return remember(user) if user is not None else None
+
+
+def authenticate(token):
+    """Синхронный вариант (HTTP, management-команды, тесты)."""
+    payload = decode(token)
+    if not payload or _user_id(payload) is None:
+        return None
+    state = _local.get(_user_id(payload))
+    if state is None:
+        snapshot, revoked_at = _cached_state(payload)
+        snapshot = snapshot or _db_snapshot(payload)
+        if snapshot is None:
+            return None
+        state = (snapshot, revoked_at)
+        _local.set(_user_id(payload), state, _local_ttl())
+    return _from_state(payload, state)
+
+
+async def aauthenticate(token):
+    """
+    Для consumers: при попадании в локальный LRU — без переключения потока,
+    иначе один поход в Redis в пуле потоков (БД — только для старых токенов).
+    """
+    from channels.db import database_sync_to_async
+
+    payload = decode(token)
+    if not payload or _user_id(payload) is None:
+        return None
+    state = _local.get(_user_id(payload))
+    if state is None:
+        snapshot, revoked_at = await sync_to_async(_cached_state, thread_sensitive=False)(payload)
+        if snapshot is None:
+            snapshot = await database_sync_to_async(_db_snapshot)(payload)
+        if snapshot is None:
+            return None
+        state = (snapshot, revoked_at)
+        _local.set(_user_id(payload), state, _local_ttl())
+    return _from_state(payload, state)
+
+
+def remember(user):
+    """Кладёт актуальный снимок пользователя в Redis; возвращает его."""
+    snapshot = snapshot_claims(user)
+    cache.set(SNAPSHOT_KEY.format(user.pk), snapshot, _snapshot_ttl())
+    _local.pop(user.pk)
+    return snapshot
+
+
+def revoke(user_id):
+    """Отзывает все выданные пользователю токены для WebSocket-подключений."""
+    cache.set(REVOKED_KEY.format(user_id), int(time.time()), _revocation_ttl())
+    _local.pop(user_id)
+    logger.info("WS-токены пользователя %s отозваны", user_id)
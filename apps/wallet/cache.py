@@ -0,0 +1,92 @@
+"""
+Per-user wallet snapshot cache.
+
+Snapshots (balances, lifetime totals) are stored under versioned keys:
+``wallet:<user_id>:<kind>:<version>``. Every balance-changing WalletService
+call bumps the user's version after its transaction commits, so readers
+never see a snapshot older than the last committed write and stale entries
+simply age out.
+
+The version is also bumped immediately inside the transaction: that keeps
+reads made later in the same transaction (or request) consistent, while the
+post-commit bump discards anything a concurrent reader cached from the
+pre-commit state.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_TTL = 300
+
+
+def _enabled() -> bool:
+    return getattr(settings, 'WALLET_CACHE_ENABLED', True)
+
+
+def _ttl() -> int:
+    return int(getattr(settings, 'WALLET_CACHE_TTL', SNAPSHOT_TTL))
+
+
+def _version_key(user_id: int) -> str:
+    return f'wallet:{user_id}:ver'
+
+
+def _fresh_version() -> int:
+    # Never reuse a small counter after the version key is evicted:
+    # an old snapshot could still live under the same number.
+    return time.time_ns()
+
+
+def _get_version(user_id: int) -> int:
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version or 0
+
+
+def get_snapshot(user_id: int, kind: str, loader: Callable[[], dict]) -> dict:
+    """Return the cached ``kind`` snapshot for the user, loading it on a miss."""
+    if not _enabled():
+        return loader()
+    version = _get_version(user_id)
+    if not version:
+        # Cache backend is unavailable — go straight to the database.
+        return loader()
+    key = f'wallet:{user_id}:{kind}:{version}'
+    data = cache.get(key)
+    if data is None:
+        data = loader()
+        cache.set(key, data, _ttl())
+    return data
+
+
+def invalidate(*user_ids: int) -> None:
+    if not _enabled():
+        return
+    for user_id in set(user_ids):
+        key = _version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+        except Exception:  # noqa: BLE001 — cache outages must not break money flows
+            log.warning('Wallet cache invalidation failed for user %s', user_id, exc_info=True)
+
+
+def invalidate_on_commit(*user_ids: int) -> None:
+    """Invalidate now and once more after the surrounding transaction commits."""
+    if not _enabled() or not user_ids:
+        return
+    invalidate(*user_ids)
+    transaction.on_commit(lambda: invalidate(*user_ids))
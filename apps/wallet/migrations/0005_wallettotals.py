@@ -0,0 +1,30 @@
+# Generated by Django 5.2.16 on 2026-10-19 15:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0029_user_debt_balance_and_more'),
+        ('wallet', '0004_settlement_funded_base_settlement_funded_service_fee_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletTotals',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='wallet_totals', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('total_topup', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Всего пополнено')),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Всего потрачено')),
+                ('total_earned', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Всего заработано')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Итоги кошелька',
+                'verbose_name_plural': 'Итоги кошельков',
+            },
+        ),
+    ]
@@ -65,3 +65,26 @@ class Settlement(models.Model):
             check=(models.Q(order__isnull=False, purchase__isnull=True) | models.Q(order__isnull=True, purchase__isnull=False)),
             name='settlement_exactly_one_source',
         )]
+
+
+class WalletTotals(models.Model):
+    """Running lifetime totals per user, maintained by WalletService.
+
+    Updated in the same transaction as the ledger entry that changes them, so
+    wallet stats never need to sum the user's full Transaction history.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+        related_name='wallet_totals', verbose_name='Пользователь',
+    )
+    total_topup = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Всего пополнено')
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Всего потрачено')
+    total_earned = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Всего заработано')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Итоги кошелька'
+        verbose_name_plural = 'Итоги кошельков'
+
+    def __str__(self):
+        return f'Итоги кошелька — {self.user_id}'
@@ -9,6 +9,9 @@ auditable code path. We reuse the existing ``User.balance`` /
 Concurrency model: each balance-changing call wraps a row-level
 ``select_for_update`` on the affected user(s) inside an atomic block.
 That gives us serialisable behaviour for hot users even under load.
+Locking an account also schedules invalidation of its cached wallet
+snapshot (see ``cache.py``), and every ledger entry keeps the user's running
+``WalletTotals`` in step, so reads never have to scan the full history.
 
 All API is intentionally tiny — call sites read like accounting entries.
 """
@@ -22,13 +25,16 @@ from typing import Iterable, Optional
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Q, Sum
+from django.db.models import F, Q, Sum
 from django.utils import timezone
 from datetime import timedelta
 from .policy import (EXPERT_WITHDRAWAL_FEE_PERCENT, ACQUIRING_FEE_PERCENT, REFERRAL_LIFETIME_DAYS, money, percent, withdrawal_quote)
 
 from apps.orders.models import Transaction, TransactionType
 
+from . import cache as wallet_cache
+from .models import WalletTotals
+
 log = logging.getLogger(__name__)
 User = get_user_model()
 
@@ -52,24 +58,222 @@ def _q(amount) -> Decimal:
     return amount.quantize(Decimal('0.01'))
 
 
-def _lock_user(user_id: int) -> User:
-    return User.objects.select_for_update().get(pk=user_id)
+def commission_shards() -> int:
+    return max(1, int(getattr(settings, 'WALLET_COMMISSION_SHARDS', 1)))
+
+
+def commission_shard(key: int) -> int:
+    """Commission sub-account index for a payer / settlement key."""
+    return key % commission_shards()
+
+
+def _commission_username(shard: int) -> str:
+    return SYSTEM_COMMISSION_USERNAME if shard == 0 else f'{SYSTEM_COMMISSION_USERNAME}_{shard}'
+
 
+def get_system_account(shard: int = 0) -> User:
+    """Lazy-create a system commission account.
 
-def get_system_account() -> User:
-    """Lazy-create the system commission account."""
+    Platform fees are spread over ``WALLET_COMMISSION_SHARDS`` sub-accounts so
+    that concurrent settlements do not all queue on one row; shard 0 is the
+    original ``_system_commission`` account. Use :func:`commission_balance`
+    for the platform total.
+    """
     user, _ = User.objects.get_or_create(
-        username=SYSTEM_COMMISSION_USERNAME,
+        username=_commission_username(shard),
         defaults={
             'first_name': 'Система',
-            'last_name': 'Комиссия',
-            'email': 'system@okoznaniy.local',
+            'last_name': 'Комиссия' if shard == 0 else f'Комиссия {shard}',
+            'email': 'system@okoznaniy.local' if shard == 0 else f'system+{shard}@okoznaniy.local',
             'is_active': False,  # never logs in
         },
     )
     return user
 
 
+def commission_accounts():
+    """All commission sub-accounts, including shards no longer in use."""
+    return User.objects.filter(username__startswith=SYSTEM_COMMISSION_USERNAME, is_active=False)
+
+
+def commission_balance() -> Decimal:
+    """Platform commission balance summed over every sub-account."""
+    return commission_accounts().aggregate(s=Sum('balance'))['s'] or ZERO
+
+
+_system_account_ids: dict = {}
+
+
+def get_system_account_id(shard: int = 0, *, refresh: bool = False) -> int:
+    """Process-wide cached id of a system commission account."""
+    if shard not in _system_account_ids or refresh:
+        _system_account_ids[shard] = get_system_account(shard).pk
+    return _system_account_ids[shard]
+
+
+class LockedAccounts(dict):
+    """``{pk: user}`` of rows locked by :func:`lock_accounts`."""
+
+    system_id: Optional[int] = None
+
+    @property
+    def system(self) -> User:
+        return self[self.system_id]
+
+
+def _select_for_update(ids) -> dict:
+    # ORDER BY pk makes PostgreSQL take the row locks in a global order, so
+    # concurrent settlements over overlapping accounts cannot deadlock.
+    qs = User.objects.select_for_update().filter(pk__in=sorted(ids)).order_by('pk')
+    return {u.pk: u for u in qs}
+
+
+def lock_accounts(*user_ids: int, commission_for: Optional[int] = None) -> LockedAccounts:
+    """Lock every account a money movement touches in one ordered query.
+
+    ``commission_for`` adds the commission sub-account picked for that key
+    (normally the payer's id), available afterwards as ``locked.system``.
+
+    All balance-changing paths take their user locks through here (or
+    ``_lock_user`` for a single account), once per transaction and before
+    any settlement row, so every operation acquires locks in the same order:
+    accounts by primary key, then the settlement.
+    """
+    requested = {pk for pk in user_ids if pk is not None}
+    shard = commission_shard(commission_for) if commission_for is not None else None
+    system_id = get_system_account_id(shard) if shard is not None else None
+    ids = requested | ({system_id} if system_id is not None else set())
+    rows = _select_for_update(ids)
+    if system_id is not None and getattr(rows.get(system_id), 'username', None) != _commission_username(shard):
+        # Cached id went stale (account recreated, test database rollback);
+        # the row is already in hand, so checking it costs nothing.
+        system_id = get_system_account_id(shard, refresh=True)
+        ids = requested | {system_id}
+        rows = _select_for_update(ids)
+    missing = ids - rows.keys()
+    if missing:
+        raise User.DoesNotExist(f'Accounts not found: {sorted(missing)}')
+    wallet_cache.invalidate_on_commit(*ids)
+    locked = LockedAccounts(rows)
+    locked.system_id = system_id
+    return locked
+
+
+def _lock_user(user_id: int) -> User:
+    return lock_accounts(user_id)[user_id]
+
+
+def _lock_settlement(settlement_pk: int):
+    """Lock a settlement's parties, then the settlement row itself.
+
+    Returns ``(settlement, locked_accounts)`` with ``client``, ``expert`` and
+    ``fee_recipient`` on the settlement pointing at the locked rows.
+    """
+    from apps.wallet.models import Settlement
+
+    for _ in range(3):
+        parties = (
+            Settlement.objects.filter(pk=settlement_pk)
+            .values_list('client_id', 'expert_id', 'fee_recipient_id')
+            .get()
+        )
+        locked = lock_accounts(*parties)
+        st = Settlement.objects.select_for_update().get(pk=settlement_pk)
+        if (st.client_id, st.expert_id, st.fee_recipient_id) == parties:
+            st.client, st.expert, st.fee_recipient = (locked[pk] for pk in parties)
+            return st, locked
+    raise RuntimeError(f'Settlement #{settlement_pk} parties keep changing')
+
+
+# Transaction types that feed the lifetime totals shown in wallet stats.
+TOTALS_FIELD_BY_TYPE = {
+    TransactionType.TOPUP: 'total_topup',
+    TransactionType.PURCHASE: 'total_spent',
+    TransactionType.RELEASE: 'total_spent',
+    TransactionType.PAYOUT: 'total_earned',
+}
+
+
+def aggregate_transactions(
+    user_id: int, *, types: Optional[Iterable[str]] = None, periods: Optional[dict] = None,
+) -> dict:
+    """Per-type and lifetime totals for a user in a single query.
+
+    Rows are grouped by ``type`` (one pass over the user's history, backed by
+    the ``(user, type, -timestamp)`` index); ``types`` narrows the scan to the
+    types the caller needs. ``periods`` maps a name to a start datetime and
+    each period is a conditional ``Sum`` in the same query.
+    """
+    totals_types = {}
+    for tx_type, field in TOTALS_FIELD_BY_TYPE.items():
+        totals_types.setdefault(field, []).append(tx_type)
+
+    aggregates = {'total': Sum('amount')}
+    for name, since in (periods or {}).items():
+        aggregates[f'period__{name}'] = Sum('amount', filter=Q(timestamp__gte=since))
+    qs = Transaction.objects.filter(user_id=user_id)
+    if types is not None:
+        qs = qs.filter(type__in=list(types))
+    rows = (
+        qs.order_by()
+        .values('type')
+        .annotate(**aggregates)
+    )
+
+    by_type = dict.fromkeys(TransactionType.values, ZERO)
+    period_by_type = {name: dict.fromkeys(TransactionType.values, ZERO) for name in (periods or {})}
+    for row in rows:
+        by_type[row['type']] = row['total'] or ZERO
+        for name in period_by_type:
+            period_by_type[name][row['type']] = row[f'period__{name}'] or ZERO
+
+    def split(values):
+        return {
+            field: sum((values[t] for t in types), ZERO)
+            for field, types in totals_types.items()
+        }
+
+    result = split(by_type)
+    result['by_type'] = by_type
+    result['periods'] = {name: split(values) for name, values in period_by_type.items()}
+    return result
+
+
+def _compute_totals(user_id: int) -> dict:
+    """Full-history sums; only used to backfill ``WalletTotals`` once."""
+    totals = aggregate_transactions(user_id, types=TOTALS_FIELD_BY_TYPE.keys())
+    return {field: totals[field] for field in set(TOTALS_FIELD_BY_TYPE.values())}
+
+
+def _ensure_totals(user_id: int) -> WalletTotals:
+    totals = WalletTotals.objects.filter(pk=user_id).first()
+    if totals is not None:
+        return totals
+    # Backfill under the same user lock every writer holds around ``_ledger``:
+    # a read-path backfill racing an uncommitted entry would otherwise sum the
+    # history without it and then create the row its F() update missed.
+    with transaction.atomic():
+        _select_for_update([user_id])
+        totals, _ = WalletTotals.objects.get_or_create(
+            user_id=user_id, defaults=_compute_totals(user_id),
+        )
+    return totals
+
+
+def _ledger(**fields) -> Transaction:
+    """Write a ledger entry and keep the user's running totals in step."""
+    tx = Transaction.objects.create(**fields)
+    field = TOTALS_FIELD_BY_TYPE.get(tx.type)
+    if field:
+        updated = WalletTotals.objects.filter(pk=tx.user_id).update(**{field: F(field) + tx.amount})
+        if not updated:
+            # First entry since totals were introduced: the backfill
+            # already includes ``tx``.
+            _ensure_totals(tx.user_id)
+    wallet_cache.invalidate_on_commit(tx.user_id)
+    return tx
+
+
 class InsufficientFunds(ValueError):
     pass
 
@@ -80,18 +284,20 @@ class WalletService:
     # --------------- queries ---------------
     @staticmethod
     def get_balance(user) -> dict:
-        u = User.objects.only('balance', 'frozen_balance', 'pending_balance', 'debt_balance').get(pk=user.pk)
-        balance = u.balance or ZERO
-        frozen = u.frozen_balance or ZERO
-        pending = u.pending_balance or ZERO
-        debt = u.debt_balance or ZERO
-        return {
-            'balance': balance,
-            'frozen_balance': frozen,
-            'pending_balance': pending,
-            'debt_balance': debt,
-            'available_balance': balance - frozen,
-        }
+        def load():
+            u = User.objects.only('balance', 'frozen_balance', 'pending_balance', 'debt_balance').get(pk=user.pk)
+            balance = u.balance or ZERO
+            frozen = u.frozen_balance or ZERO
+            pending = u.pending_balance or ZERO
+            debt = u.debt_balance or ZERO
+            return {
+                'balance': balance,
+                'frozen_balance': frozen,
+                'pending_balance': pending,
+                'debt_balance': debt,
+                'available_balance': balance - frozen,
+            }
+        return wallet_cache.get_snapshot(user.pk, 'balance', load)
 
     @staticmethod
     def get_transactions(user, *, limit: int = 100, types: Optional[Iterable[str]] = None):
@@ -102,18 +308,14 @@ class WalletService:
 
     @staticmethod
     def get_stats(user) -> dict:
-        qs = Transaction.objects.filter(user=user)
-        total_topup = qs.filter(type=TransactionType.TOPUP).aggregate(s=Sum('amount'))['s'] or ZERO
-        total_spent = qs.filter(type__in=[
-            TransactionType.PURCHASE,
-            TransactionType.RELEASE,
-        ]).aggregate(s=Sum('amount'))['s'] or ZERO
-        total_earned = qs.filter(type=TransactionType.PAYOUT).aggregate(s=Sum('amount'))['s'] or ZERO
-        return {
-            'total_topup': total_topup,
-            'total_spent': total_spent,
-            'total_earned': total_earned,
-        }
+        def load():
+            totals = _ensure_totals(user.pk)
+            return {
+                'total_topup': totals.total_topup,
+                'total_spent': totals.total_spent,
+                'total_earned': totals.total_earned,
+            }
+        return wallet_cache.get_snapshot(user.pk, 'stats', load)
 
     # --------------- core operations ---------------
 
@@ -129,7 +331,7 @@ class WalletService:
         u.debt_balance = (u.debt_balance or ZERO) - debt_payment
         u.balance = (u.balance or ZERO) + (amount - debt_payment)
         u.save(update_fields=['balance', 'debt_balance'])
-        return Transaction.objects.create(
+        return _ledger(
             user=u, amount=amount, type=TransactionType.TOPUP, order=order,
             description=description or 'Пополнение баланса',
             payment=payment, balance_after=u.balance,
@@ -150,7 +352,7 @@ class WalletService:
             )
         u.frozen_balance = (u.frozen_balance or ZERO) + amount
         u.save(update_fields=['frozen_balance'])
-        return Transaction.objects.create(
+        return _ledger(
             user=u, amount=amount, type=TransactionType.HOLD, order=order,
             description=description or (f'Заморозка по заказу #{order.id}' if order else 'Заморозка средств'),
             balance_after=u.balance,
@@ -166,7 +368,7 @@ class WalletService:
         u = _lock_user(user.pk)
         u.frozen_balance = max(ZERO, (u.frozen_balance or ZERO) - amount)
         u.save(update_fields=['frozen_balance'])
-        return Transaction.objects.create(
+        return _ledger(
             user=u, amount=amount, type=TransactionType.REFUND, order=order,
             description=description or (f'Возврат по заказу #{order.id}' if order else 'Возврат средств'),
             balance_after=u.balance,
@@ -189,14 +391,10 @@ class WalletService:
         fee = _q(amount * commission_percent / Decimal(100))
         payout = _q(amount - fee)
 
-        sys_user = get_system_account()
-
-        # Lock all three accounts in a stable order to avoid deadlocks.
-        ids = sorted({client.pk, expert.pk, sys_user.pk})
-        locked = {u.pk: u for u in User.objects.select_for_update().filter(pk__in=ids)}
+        locked = lock_accounts(client.pk, expert.pk, commission_for=client.pk)
         c = locked[client.pk]
         e = locked[expert.pk]
-        s = locked[sys_user.pk]
+        s = locked.system
 
         if (c.frozen_balance or ZERO) < amount:
             raise InsufficientFunds('Held amount is less than release amount')
@@ -211,18 +409,18 @@ class WalletService:
         e.save(update_fields=['balance'])
         s.save(update_fields=['balance'])
 
-        t_release = Transaction.objects.create(
+        t_release = _ledger(
             user=c, amount=amount, type=TransactionType.RELEASE, order=order,
             description=description or f'Списание по заказу #{order.id}' if order else 'Списание',
             balance_after=c.balance,
         )
-        Transaction.objects.create(
+        _ledger(
             user=e, amount=payout, type=TransactionType.PAYOUT, order=order,
             description=f'Выплата по заказу #{order.id}' if order else 'Выплата',
             balance_after=e.balance,
         )
         if fee > 0:
-            Transaction.objects.create(
+            _ledger(
                 user=s, amount=fee, type=TransactionType.COMMISSION, order=order,
                 description=f'Комиссия платформы по заказу #{order.id}' if order else 'Комиссия',
                 balance_after=s.balance,
@@ -252,13 +450,10 @@ class WalletService:
             commission_percent = DEFAULT_COMMISSION_PERCENT
         fee = _q(amount * commission_percent / Decimal(100))
         payout = _q(amount - fee)
-        sys_user = get_system_account()
-
-        ids = sorted({payer.pk, recipient.pk, sys_user.pk})
-        locked = {u.pk: u for u in User.objects.select_for_update().filter(pk__in=ids)}
+        locked = lock_accounts(payer.pk, recipient.pk, commission_for=payer.pk)
         p = locked[payer.pk]
         r = locked[recipient.pk]
-        s = locked[sys_user.pk]
+        s = locked.system
 
         available = (p.balance or ZERO) - (p.frozen_balance or ZERO)
         if available < amount:
@@ -269,18 +464,18 @@ class WalletService:
         p.save(update_fields=['balance'])
         r.save(update_fields=['balance'])
         s.save(update_fields=['balance'])
-        t = Transaction.objects.create(
+        t = _ledger(
             user=p, amount=amount, type=purpose, order=order,
             description=description or 'Покупка',
             balance_after=p.balance,
         )
-        Transaction.objects.create(
+        _ledger(
             user=r, amount=payout, type=TransactionType.PAYOUT, order=order,
             description=f'Продажа: {description}' if description else 'Продажа',
             balance_after=r.balance,
         )
         if fee > 0:
-            Transaction.objects.create(
+            _ledger(
                 user=s, amount=fee, type=TransactionType.COMMISSION, order=order,
                 description=description or 'Комиссия платформы',
                 balance_after=s.balance,
@@ -292,23 +487,24 @@ class WalletService:
     def withdraw(user, amount, *, description: str = 'Вывод средств', return_details: bool = False):
         """Debit gross requested amount and return transparent fee breakdown."""
         quote = withdrawal_quote(amount, getattr(user, 'role', 'client'))
-        u = _lock_user(user.pk)
+        locked = lock_accounts(user.pk, commission_for=user.pk if quote['platform_fee'] > 0 else None)
+        u = locked[user.pk]
         available = (u.balance or ZERO) - (u.frozen_balance or ZERO)
         if available < quote['gross']:
             raise InsufficientFunds(f"Not enough funds: need {quote['gross']}, have {available}")
         u.balance = (u.balance or ZERO) - quote['gross']
         u.save(update_fields=['balance'])
-        tx = Transaction.objects.create(
+        tx = _ledger(
             user=u, amount=quote['gross'], type=TransactionType.WITHDRAWAL,
             description=(f"{description}; к выплате {quote['net']} ₽, комиссия платформы "
                          f"{quote['platform_fee']} ₽, эквайринг {quote['acquiring_fee']} ₽"),
             balance_after=u.balance,
         )
         if quote['platform_fee'] > 0:
-            system = _lock_user(get_system_account().pk)
+            system = locked.system
             system.balance = (system.balance or ZERO) + quote['platform_fee']
             system.save(update_fields=['balance'])
-            Transaction.objects.create(
+            _ledger(
                 user=system, amount=quote['platform_fee'], type=TransactionType.COMMISSION,
                 description=f'Комиссия с вывода пользователя #{u.pk}', balance_after=system.balance,
             )
@@ -328,11 +524,13 @@ class WalletService:
         partner = getattr(client, 'partner', None)
         if partner and linked_at and linked_at < timezone.now() - timedelta(days=REFERRAL_LIFETIME_DAYS):
             partner = None
-        fee_recipient = partner or get_system_account()
+        locked = lock_accounts(client.pk, expert.pk, partner.pk if partner else None, commission_for=None if partner else client.pk)
+        c, e = locked[client.pk], locked[expert.pk]
+        r = locked[partner.pk] if partner else locked.system
         lookup = {'order': order} if order is not None else {'purchase': purchase}
         st, _ = Settlement.objects.select_for_update().get_or_create(
             **lookup,
-            defaults={'client': client, 'expert': expert, 'fee_recipient': fee_recipient, 'base_amount': base_amount, 'service_fee': service_fee},
+            defaults={'client': c, 'expert': e, 'fee_recipient': r, 'base_amount': base_amount, 'service_fee': service_fee},
         )
         already = money(st.funded_base + st.funded_service_fee)
         target = min(total, money(already + fund_amount))
@@ -341,9 +539,6 @@ class WalletService:
         delta_base = max(ZERO, target_base - st.funded_base)
         delta_fee = max(ZERO, target_fee - st.funded_service_fee)
         delta = money(delta_base + delta_fee)
-        ids = sorted({client.pk, expert.pk, fee_recipient.pk})
-        locked = {u.pk: u for u in User.objects.select_for_update().filter(pk__in=ids)}
-        c, e, r = locked[client.pk], locked[expert.pk], locked[fee_recipient.pk]
         available = (c.balance or ZERO) - (c.frozen_balance or ZERO)
         if available < delta:
             raise InsufficientFunds(f'Not enough funds: need {delta}, have {available}')
@@ -355,26 +550,24 @@ class WalletService:
         c.save(update_fields=['balance']); e.save(update_fields=['balance','frozen_balance']); r.save(update_fields=['balance','frozen_balance'])
         st.funded_base += delta_base; st.funded_service_fee += delta_fee
         st.save(update_fields=['funded_base','funded_service_fee'])
-        tx = Transaction.objects.create(user=c, amount=delta, type=TransactionType.HOLD, order=order, description=description or 'Распределённый резерв', balance_after=c.balance)
+        tx = _ledger(user=c, amount=delta, type=TransactionType.HOLD, order=order, description=description or 'Распределённый резерв', balance_after=c.balance)
         return {'transaction': tx, 'settlement': st, 'base': delta_base, 'fee': delta_fee}
 
     @staticmethod
     @transaction.atomic
     def release_distributed_escrow(settlement, *, description=''):
-        from apps.wallet.models import Settlement
-        st = Settlement.objects.select_for_update().select_related('client','expert','fee_recipient').get(pk=settlement.pk)
+        st, _ = _lock_settlement(settlement.pk)
         if st.is_released:
             return {'settlement': st, 'already_released': True}
         total = money(st.funded_base + st.funded_service_fee)
-        users = {u.pk:u for u in User.objects.select_for_update().filter(pk__in=sorted({st.expert_id,st.fee_recipient_id}))}
-        e, r = users[st.expert_id], users[st.fee_recipient_id]
+        e, r = st.expert, st.fee_recipient
         if (e.frozen_balance or ZERO) < st.funded_base or (r.frozen_balance or ZERO) < st.funded_service_fee:
             raise InsufficientFunds('Recipient escrow balance is insufficient')
         e.frozen_balance -= st.funded_base; r.frozen_balance -= st.funded_service_fee
         e.save(update_fields=['frozen_balance']); r.save(update_fields=['frozen_balance'])
-        Transaction.objects.create(user=st.client, amount=total, type=TransactionType.RELEASE, order=st.order, description=description or 'Разблокировка распределённого резерва', balance_after=st.client.balance)
-        Transaction.objects.create(user=e, amount=st.funded_base, type=TransactionType.PAYOUT, order=st.order, description=description or 'Выплата автору', balance_after=e.balance)
-        Transaction.objects.create(user=r, amount=st.funded_service_fee, type=TransactionType.PARTNER_PAYOUT if r.role=='partner' else TransactionType.COMMISSION, order=st.order, description='Реферальная комиссия 25%' if r.role=='partner' else 'Комиссия директорам 25%', balance_after=r.balance)
+        _ledger(user=st.client, amount=total, type=TransactionType.RELEASE, order=st.order, description=description or 'Разблокировка распределённого резерва', balance_after=st.client.balance)
+        _ledger(user=e, amount=st.funded_base, type=TransactionType.PAYOUT, order=st.order, description=description or 'Выплата автору', balance_after=e.balance)
+        _ledger(user=r, amount=st.funded_service_fee, type=TransactionType.PARTNER_PAYOUT if r.role=='partner' else TransactionType.COMMISSION, order=st.order, description='Реферальная комиссия 25%' if r.role=='partner' else 'Комиссия директорам 25%', balance_after=r.balance)
         st.is_released=True; st.save(update_fields=['is_released'])
         if r.role=='partner':
             from apps.users.models import PartnerEarning
@@ -386,19 +579,17 @@ class WalletService:
     @staticmethod
     @transaction.atomic
     def refund_distributed_escrow(settlement, amount=None, *, description=''):
-        from apps.wallet.models import Settlement
-        st=Settlement.objects.select_for_update().select_related('client','expert','fee_recipient').get(pk=settlement.pk)
+        st,_=_lock_settlement(settlement.pk)
         if st.is_released: raise ValueError('Released escrow must use clawback')
         funded=money(st.funded_base+st.funded_service_fee); amount=money(funded if amount is None else amount)
         if amount<=0 or amount>funded: raise ValueError('Invalid escrow refund amount')
         base=money(amount*st.funded_base/funded) if funded else ZERO; fee=money(amount-base)
-        users={u.pk:u for u in User.objects.select_for_update().filter(pk__in=sorted({st.client_id,st.expert_id,st.fee_recipient_id}))}
-        c,e,r=users[st.client_id],users[st.expert_id],users[st.fee_recipient_id]
+        c,e,r=st.client,st.expert,st.fee_recipient
         if e.frozen_balance<base or r.frozen_balance<fee: raise InsufficientFunds('Recipient escrow is insufficient')
         e.frozen_balance-=base; e.balance-=base; r.frozen_balance-=fee; r.balance-=fee; c.balance+=amount
         e.save(update_fields=['balance','frozen_balance']); r.save(update_fields=['balance','frozen_balance']); c.save(update_fields=['balance'])
         st.funded_base-=base; st.funded_service_fee-=fee; st.save(update_fields=['funded_base','funded_service_fee'])
-        tx=Transaction.objects.create(user=c,amount=amount,type=TransactionType.REFUND,order=st.order,description=description or 'Возврат распределённого резерва',balance_after=c.balance)
+        tx=_ledger(user=c,amount=amount,type=TransactionType.REFUND,order=st.order,description=description or 'Возврат распределённого резерва',balance_after=c.balance)
         return {'transaction':tx,'refund':amount}
 
     @staticmethod
@@ -411,11 +602,9 @@ class WalletService:
         partner = getattr(client, 'partner', None)
         if partner and linked_at and linked_at < timezone.now() - timedelta(days=REFERRAL_LIFETIME_DAYS):
             partner = None
-        system = get_system_account()
-        recipient = partner or system
-        ids = sorted({client.pk, expert.pk, recipient.pk})
-        locked = {u.pk: u for u in User.objects.select_for_update().filter(pk__in=ids)}
-        c, e, r = locked[client.pk], locked[expert.pk], locked[recipient.pk]
+        locked = lock_accounts(client.pk, expert.pk, partner.pk if partner else None, commission_for=None if partner else client.pk)
+        c, e = locked[client.pk], locked[expert.pk]
+        r = locked[partner.pk] if partner else locked.system
         if (c.frozen_balance or ZERO) < total or (c.balance or ZERO) < total:
             raise InsufficientFunds('Held amount is less than required order allocation')
         c.frozen_balance -= total
@@ -425,9 +614,9 @@ class WalletService:
         c.save(update_fields=['frozen_balance', 'balance'])
         e.save(update_fields=['balance'])
         r.save(update_fields=['balance'])
-        release = Transaction.objects.create(user=c, amount=total, type=TransactionType.RELEASE, order=order, description=description or 'Списание резерва', balance_after=c.balance)
-        Transaction.objects.create(user=e, amount=base_amount, type=TransactionType.PAYOUT, order=order, description=description or 'Выплата автору', balance_after=e.balance)
-        Transaction.objects.create(user=r, amount=service_fee, type=TransactionType.PARTNER_PAYOUT if partner else TransactionType.COMMISSION, order=order, description='Реферальная комиссия 25%' if partner else 'Комиссия директорам 25%', balance_after=r.balance)
+        release = _ledger(user=c, amount=total, type=TransactionType.RELEASE, order=order, description=description or 'Списание резерва', balance_after=c.balance)
+        _ledger(user=e, amount=base_amount, type=TransactionType.PAYOUT, order=order, description=description or 'Выплата автору', balance_after=e.balance)
+        _ledger(user=r, amount=service_fee, type=TransactionType.PARTNER_PAYOUT if partner else TransactionType.COMMISSION, order=order, description='Реферальная комиссия 25%' if partner else 'Комиссия директорам 25%', balance_after=r.balance)
         if partner:
             from apps.users.models import PartnerEarning
             earning, _ = PartnerEarning.objects.get_or_create(
@@ -452,8 +641,7 @@ class WalletService:
     @transaction.atomic
     def clawback_settlement(settlement, refund_percentage, *, description='') -> dict:
         """Refund a released deal. Missing recipient cash becomes explicit debt."""
-        from apps.wallet.models import Settlement
-        st = Settlement.objects.select_for_update().select_related('client', 'expert', 'fee_recipient').get(pk=settlement.pk)
+        st, _ = _lock_settlement(settlement.pk)
         pct = Decimal(str(refund_percentage))
         if pct < 0 or pct > 100:
             raise ValueError('Refund percentage must be between 0 and 100')
@@ -461,9 +649,7 @@ class WalletService:
         target_fee = money(st.service_fee * pct / Decimal('100'))
         base_due = max(ZERO, target_base - st.refunded_base)
         fee_due = max(ZERO, target_fee - st.refunded_service_fee)
-        ids = sorted({st.client_id, st.expert_id, st.fee_recipient_id})
-        locked = {u.pk: u for u in User.objects.select_for_update().filter(pk__in=ids)}
-        client, expert, fee_user = locked[st.client_id], locked[st.expert_id], locked[st.fee_recipient_id]
+        client, expert, fee_user = st.client, st.expert, st.fee_recipient
 
         def debit(user, amount):
             cash = min(user.balance or ZERO, amount)
@@ -471,7 +657,7 @@ class WalletService:
             user.debt_balance = (user.debt_balance or ZERO) + (amount - cash)
             user.save(update_fields=['balance', 'debt_balance'])
             if amount:
-                Transaction.objects.create(user=user, amount=amount, type=TransactionType.CLAWBACK, order=st.order, description=description or 'Списание по возврату', balance_after=user.balance)
+                _ledger(user=user, amount=amount, type=TransactionType.CLAWBACK, order=st.order, description=description or 'Списание по возврату', balance_after=user.balance)
 
         debit(expert, base_due)
         debit(fee_user, fee_due)
@@ -479,7 +665,7 @@ class WalletService:
         client.balance = (client.balance or ZERO) + total
         client.save(update_fields=['balance'])
         if total:
-            Transaction.objects.create(user=client, amount=total, type=TransactionType.REFUND, order=st.order, description=description or 'Возврат после завершения сделки', balance_after=client.balance)
+            _ledger(user=client, amount=total, type=TransactionType.REFUND, order=st.order, description=description or 'Возврат после завершения сделки', balance_after=client.balance)
         st.refunded_base += base_due
         st.refunded_service_fee += fee_due
         st.save(update_fields=['refunded_base', 'refunded_service_fee'])
@@ -522,7 +708,7 @@ class WalletService:
             earning.is_paid = True
             earning.save(update_fields=['is_paid'])
 
-        tx = Transaction.objects.create(
+        tx = _ledger(
             user=u,
             amount=total,
             type=TransactionType.PARTNER_PAYOUT,
@@ -3,6 +3,8 @@ from datetime import timedelta
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum
 from django.test import TestCase, override_settings
 from django.utils import timezone
 from rest_framework import status
@@ -14,8 +16,8 @@ from apps.payments.models import Payment, PaymentStatus
 from apps.payments.services import PaymentService
 from apps.users.models import PartnerEarning
 from apps.users.serializers import CustomRegisterSerializer
-from apps.wallet.models import WithdrawalRequest
-from apps.wallet.services import WalletService, get_system_account
+from apps.wallet.models import WalletTotals, WithdrawalRequest
+from apps.wallet.services import WalletService, commission_balance, commission_shard, get_system_account
 
 User = get_user_model()
 
@@ -187,14 +189,12 @@ class WalletOrderLedgerTests(TestCase):
         order.refresh_from_db()
         self.client_user.refresh_from_db()
         self.expert.refresh_from_db()
-        system_user = get_system_account()
-        system_user.refresh_from_db()
 
         self.assertEqual(order.status, 'completed')
         self.assertEqual(self.client_user.balance, Decimal('0.00'))
         self.assertEqual(self.client_user.frozen_balance, Decimal('0.00'))
         self.assertEqual(self.expert.balance, Decimal('1000.00'))
-        self.assertEqual(system_user.balance, Decimal('250.00'))
+        self.assertEqual(commission_balance(), Decimal('250.00'))
         self.assertTrue(Transaction.objects.filter(order=order, type=TransactionType.RELEASE).exists())
         self.assertTrue(Transaction.objects.filter(order=order, type=TransactionType.PAYOUT).exists())
         self.assertTrue(Transaction.objects.filter(order=order, type=TransactionType.COMMISSION).exists())
@@ -381,15 +381,13 @@ class WalletOrderLedgerTests(TestCase):
         order.refresh_from_db()
         self.client_user.refresh_from_db()
         self.expert.refresh_from_db()
-        system_user = get_system_account()
-        system_user.refresh_from_db()
         partner.refresh_from_db()
 
         self.assertEqual(order.status, 'completed')
         self.assertEqual(self.client_user.balance, Decimal('0.00'))
         self.assertEqual(self.client_user.frozen_balance, Decimal('0.00'))
         self.assertEqual(self.expert.balance, Decimal('1200.00'))
-        self.assertEqual(system_user.balance, Decimal('0.00'))
+        self.assertEqual(commission_balance(), Decimal('0.00'))
         self.assertTrue(Transaction.objects.filter(order=order, type=TransactionType.RELEASE).exists())
         self.assertTrue(Transaction.objects.filter(order=order, type=TransactionType.PAYOUT).exists())
         self.assertTrue(Transaction.objects.filter(order=order, type=TransactionType.PARTNER_PAYOUT).exists())
@@ -512,3 +510,104 @@ class PartnerPayoutTests(TestCase):
         self.partner.refresh_from_db()
         self.assertEqual(self.partner.balance, Decimal('150.00'))
         self.assertEqual(self.partner.pending_balance, Decimal('0.00'))
+
+
+@override_settings(WALLET_CACHE_ENABLED=True)
+class WalletSnapshotCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='wallet_cache_client', email='wallet_cache_client@test.local',
+            password='pwd', role='client',
+        )
+        self.expert = User.objects.create_user(
+            username='wallet_cache_expert', email='wallet_cache_expert@test.local',
+            password='pwd', role='expert',
+        )
+
+    def test_repeated_balance_reads_are_served_from_cache(self):
+        WalletService.get_balance(self.user)
+        with self.assertNumQueries(0):
+            balance = WalletService.get_balance(self.user)
+        self.assertEqual(balance['balance'], Decimal('0.00'))
+
+    def test_wallet_operations_invalidate_cached_balance(self):
+        WalletService.get_balance(self.user)
+        WalletService.topup(self.user, Decimal('1000'))
+        WalletService.hold(self.user, Decimal('400'))
+
+        balance = WalletService.get_balance(self.user)
+        self.assertEqual(balance['balance'], Decimal('1000.00'))
+        self.assertEqual(balance['available_balance'], Decimal('600.00'))
+
+    def test_invalidation_runs_again_after_commit(self):
+        WalletService.get_balance(self.user)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            WalletService.topup(self.user, Decimal('100'))
+        self.assertTrue(callbacks)
+
+    def test_stats_are_running_totals(self):
+        WalletService.topup(self.user, Decimal('1000'))
+        WalletService.hold(self.user, Decimal('500'))
+        WalletService.release_to_expert(client=self.user, expert=self.expert, amount=Decimal('500'))
+
+        totals = WalletTotals.objects.get(pk=self.user.pk)
+        self.assertEqual(totals.total_topup, Decimal('1000.00'))
+        self.assertEqual(totals.total_spent, Decimal('500.00'))
+        self.assertEqual(WalletTotals.objects.get(pk=self.expert.pk).total_earned, Decimal('500.00'))
+
+        WalletService.get_stats(self.user)
+        with self.assertNumQueries(0):
+            stats = WalletService.get_stats(self.user)
+        self.assertEqual(stats['total_spent'], Decimal('500.00'))
+
+    def test_totals_are_backfilled_from_existing_history(self):
+        Transaction.objects.create(user=self.user, amount=Decimal('300'), type=TransactionType.TOPUP)
+
+        WalletService.topup(self.user, Decimal('200'))
+
+        self.assertEqual(WalletService.get_stats(self.user)['total_topup'], Decimal('500.00'))
+
+    def test_read_path_backfill_locks_user_before_summing(self):
+        from apps.wallet import services
+
+        Transaction.objects.create(user=self.user, amount=Decimal('300'), type=TransactionType.TOPUP)
+        calls = []
+        lock = services._select_for_update
+        compute = services._compute_totals
+        with patch.object(services, '_select_for_update', side_effect=lambda ids: calls.append('lock') or lock(ids)), \
+                patch.object(services, '_compute_totals', side_effect=lambda pk: calls.append('sum') or compute(pk)):
+            stats = WalletService.get_stats(self.user)
+
+        self.assertEqual(calls, ['lock', 'sum'])
+        self.assertEqual(stats['total_topup'], Decimal('300.00'))
+
+
+@override_settings(WALLET_COMMISSION_SHARDS=4)
+class CommissionShardTests(TestCase):
+    def setUp(self):
+        self.expert = User.objects.create_user(username='shard_expert', role='expert')
+        self.clients = [
+            User.objects.create_user(username=f'shard_client_{i}', role='client') for i in range(4)
+        ]
+
+    def test_fees_spread_over_shards_and_sum_to_one_total(self):
+        for client in self.clients:
+            WalletService.topup(client, Decimal('1000'))
+            WalletService.direct_transfer(
+                payer=client, recipient=self.expert, amount=Decimal('100'),
+                commission_percent=Decimal('10'),
+            )
+
+        shards = {commission_shard(client.pk) for client in self.clients}
+        for shard in shards:
+            self.assertEqual(
+                get_system_account(shard).balance,
+                Decimal('10.00') * sum(1 for c in self.clients if commission_shard(c.pk) == shard),
+            )
+        self.assertEqual(len(shards), 4)
+        self.assertEqual(commission_balance(), Decimal('40.00'))
+        self.assertEqual(
+            Transaction.objects.filter(type=TransactionType.COMMISSION).aggregate(s=Sum('amount'))['s'],
+            Decimal('40.00'),
+        )
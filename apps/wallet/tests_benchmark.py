@@ -0,0 +1,108 @@
+"""Wallet stats aggregation: correctness and a 100k-transaction benchmark.
+
+The benchmark is opt-in because seeding takes a while:
+    WALLET_BENCHMARK=1 python manage.py test apps.wallet.tests_benchmark -v2
+"""
+import os
+import random
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.orders.models import Transaction, TransactionType
+from apps.users.models import User
+from apps.wallet.services import TOTALS_FIELD_BY_TYPE, aggregate_transactions
+
+BENCHMARK_ROWS = 100_000
+
+
+def _legacy_stats(user, month_start):
+    """Pre-aggregation implementation: one ``Sum`` query per figure."""
+    qs = Transaction.objects.filter(user=user)
+    return {
+        'total_topup': qs.filter(type=TransactionType.TOPUP).aggregate(s=Sum('amount'))['s'] or Decimal('0'),
+        'total_spent': qs.filter(type__in=[
+            TransactionType.PURCHASE, TransactionType.RELEASE,
+        ]).aggregate(s=Sum('amount'))['s'] or Decimal('0'),
+        'total_earned': qs.filter(type=TransactionType.PAYOUT).aggregate(s=Sum('amount'))['s'] or Decimal('0'),
+        'monthly_earned': qs.filter(
+            type=TransactionType.PAYOUT, timestamp__gte=month_start,
+        ).aggregate(s=Sum('amount'))['s'] or Decimal('0'),
+    }
+
+
+def _seed(user, count, *, old_share=0.5):
+    rng = random.Random(42)
+    types = TransactionType.values
+    Transaction.objects.bulk_create(
+        [
+            Transaction(user=user, type=rng.choice(types), amount=Decimal(rng.randint(1, 100000)) / 100)
+            for _ in range(count)
+        ],
+        batch_size=5000,
+    )
+    # Push part of the history out of the current month for period splits.
+    old_ids = list(
+        Transaction.objects.filter(user=user).order_by('pk').values_list('pk', flat=True)[:int(count * old_share)]
+    )
+    Transaction.objects.filter(pk__in=old_ids).update(timestamp=timezone.now() - timedelta(days=90))
+
+
+class TransactionAggregationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='agg-user', role='expert')
+
+    def test_single_query_matches_per_type_sums(self):
+        _seed(self.user, 300)
+        month_start = timezone.now() - timedelta(days=30)
+
+        with self.assertNumQueries(1):
+            totals = aggregate_transactions(self.user.pk, periods={'month': month_start})
+
+        legacy = _legacy_stats(self.user, month_start)
+        self.assertEqual(totals['total_topup'], legacy['total_topup'])
+        self.assertEqual(totals['total_spent'], legacy['total_spent'])
+        self.assertEqual(totals['total_earned'], legacy['total_earned'])
+        self.assertEqual(totals['periods']['month']['total_earned'], legacy['monthly_earned'])
+        for tx_type in TransactionType.values:
+            expected = Transaction.objects.filter(user=self.user, type=tx_type).aggregate(s=Sum('amount'))['s']
+            self.assertEqual(totals['by_type'][tx_type], expected or Decimal('0'))
+
+    def test_empty_history_returns_zeros(self):
+        totals = aggregate_transactions(self.user.pk, periods={'month': timezone.now()})
+        self.assertEqual(totals['total_earned'], Decimal('0'))
+        self.assertEqual(totals['periods']['month']['total_topup'], Decimal('0'))
+
+
+@unittest.skipUnless(os.getenv('WALLET_BENCHMARK'), 'set WALLET_BENCHMARK=1 to run')
+class TransactionAggregationBenchmark(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agg-bench', role='expert')
+        _seed(cls.user, BENCHMARK_ROWS)
+
+    def _best_of(self, fn, repeat=5):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def test_before_and_after_latency(self):
+        month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        before = self._best_of(lambda: _legacy_stats(self.user, month_start))
+        after = self._best_of(lambda: aggregate_transactions(
+            self.user.pk, types=TOTALS_FIELD_BY_TYPE.keys(), periods={'month': month_start},
+        ))
+        everything = self._best_of(lambda: aggregate_transactions(self.user.pk, periods={'month': month_start}))
+        print(
+            f'\n{BENCHMARK_ROWS} transactions: separate Sum queries {before * 1000:.1f} ms, '
+            f'single query {after * 1000:.1f} ms ({before / after:.1f}x), '
+            f'all types {everything * 1000:.1f} ms'
+        )
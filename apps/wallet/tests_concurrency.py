@@ -0,0 +1,89 @@
+"""Concurrent settlement stress test.
+
+Needs a real PostgreSQL (row locks, parallel connections), which is what the
+docker test setup provides:
+    docker compose exec backend python manage.py test apps.wallet.tests_concurrency -v2
+"""
+import random
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import TransactionTestCase
+
+from apps.users.models import User
+from apps.wallet.services import (
+    WalletService, commission_balance, commission_shard, get_system_account_id, lock_accounts,
+)
+
+THREADS = 8
+OPERATIONS = 200
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'needs PostgreSQL row locking')
+class ConcurrentSettlementTests(TransactionTestCase):
+    def setUp(self):
+        self.clients = [
+            User.objects.create_user(username=f'stress-client-{i}', role='client') for i in range(4)
+        ]
+        self.experts = [
+            User.objects.create_user(username=f'stress-expert-{i}', role='expert') for i in range(4)
+        ]
+        for client in self.clients:
+            WalletService.topup(client, Decimal('100000'))
+
+    def _total_money(self):
+        return User.objects.aggregate(s=Sum('balance'))['s']
+
+    def _run(self, seed):
+        rng = random.Random(seed)
+        try:
+            client = rng.choice(self.clients)
+            expert = rng.choice(self.experts)
+            if rng.random() < 0.5:
+                WalletService.hold(client, Decimal('10'))
+                WalletService.release_order_payment(
+                    client=client, expert=expert,
+                    base_amount=Decimal('8'), service_fee=Decimal('2'),
+                )
+            else:
+                # Opposite-direction transfers between the same pair are the
+                # classic lock-order deadlock.
+                payer, recipient = rng.sample(self.clients, 2)
+                WalletService.direct_transfer(
+                    payer=payer, recipient=recipient, amount=Decimal('5'),
+                    commission_percent=Decimal('20'),
+                )
+        finally:
+            connections.close_all()
+
+    def test_parallel_settlements_finish_without_deadlocks(self):
+        before = self._total_money()
+
+        errors = []
+        lock = threading.Lock()
+
+        def worker(seed):
+            try:
+                self._run(seed)
+            except Exception as exc:  # noqa: BLE001
+                with lock:
+                    errors.append(exc)
+
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            list(pool.map(worker, range(OPERATIONS)))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self._total_money(), before)
+        self.assertGreater(commission_balance(), Decimal('0'))
+
+    def test_lock_accounts_locks_rows_in_primary_key_order(self):
+        ids = [u.pk for u in self.experts + self.clients]
+        system_id = get_system_account_id(commission_shard(ids[0]), refresh=True)
+        with transaction.atomic(), self.assertNumQueries(1):
+            locked = lock_accounts(*reversed(ids), commission_for=ids[0])
+        self.assertEqual(list(locked), sorted(set(ids) | {system_id}))
+        self.assertEqual(locked.system_id, system_id)
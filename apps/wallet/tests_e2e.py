@@ -10,7 +10,7 @@ from apps.payments.models import Payment
 from apps.shop.models import Purchase,ReadyWork
 from apps.users.models import PartnerEarning
 from apps.wallet.models import WithdrawalRequest
-from apps.wallet.services import WalletService,get_system_account
+from apps.wallet.services import WalletService,commission_balance
 User=get_user_model()
 
 @override_settings(PAYMENTS_SANDBOX=True,SECURE_SSL_REDIRECT=False)
@@ -37,7 +37,7 @@ class WalletInteractionE2E(TestCase):
  def test_withdraw_fees_by_role(self):
   WalletService.topup(self.e,1000); self.auth(self.e); r=self.api.post('/api/wallet/withdraw/',{'amount':1000,'card_number':'4111111111111111'},format='json')
   self.assertEqual(r.status_code,201,r.content); self.assertEqual([Decimal(r.json()[x]) for x in ('platform_fee','acquiring_fee','amount')],[Decimal('150'),Decimal('15'),Decimal('835')]); self.assertEqual(WithdrawalRequest.objects.get(pk=r.json()['withdrawal_id']).card_number,'**** **** **** 1111')
-  sys=get_system_account(); sys.refresh_from_db(); self.assertEqual(sys.balance,150)
+  self.assertEqual(commission_balance(),150)
   WalletService.topup(self.c,1000); self.auth(self.c); r=self.api.post('/api/wallet/withdraw/',{'amount':1000,'card_number':'5555444433332222'},format='json')
   self.assertEqual(r.status_code,201,r.content); self.assertEqual(Decimal(r.json()['platform_fee']),0); self.assertEqual(Decimal(r.json()['amount']),985)
  def test_order_prepayment_remaining_and_approval(self):
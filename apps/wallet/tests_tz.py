@@ -4,7 +4,7 @@ from django.test import TestCase
 from django.utils import timezone
 from apps.users.models import User, PartnerEarning
 from apps.wallet.policy import order_quote, withdrawal_quote
-from apps.wallet.services import WalletService, get_system_account
+from apps.wallet.services import WalletService, commission_balance
 
 
 class ApprovedFinanceSpecificationTests(TestCase):
@@ -52,9 +52,9 @@ class ApprovedFinanceSpecificationTests(TestCase):
             base_amount=Decimal('1000'), service_fee=Decimal('250'),
             source_key='test:expired',
         )
-        self.partner.refresh_from_db(); system = get_system_account(); system.refresh_from_db()
+        self.partner.refresh_from_db()
         self.assertEqual(self.partner.balance, Decimal('0.00'))
-        self.assertEqual(system.balance, Decimal('250.00'))
+        self.assertEqual(commission_balance(), Decimal('250.00'))
 
     def test_release_is_atomic_when_hold_is_insufficient(self):
         WalletService.topup(self.client, Decimal('1000'))
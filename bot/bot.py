@@ -15,7 +15,7 @@ django.setup()
 from apps.users.models import User
 from django.conf import settings
 from django.core.cache import cache
-from rest_framework_simplejwt.tokens import RefreshToken
+from apps.users.tokens import RefreshToken
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -35,6 +35,26 @@ app.conf.beat_schedule = {
         'task': 'apps.shop.tasks.release_ready_work_holds',
         'schedule': crontab(minute='*/15'),
     },
+    'drain-payment-callbacks': {
+        'task': 'apps.payments.tasks.drain_payment_callbacks',
+        'schedule': crontab(minute='*'),  # Каждую минуту
+    },
+    'reconcile-pending-payments': {
+        'task': 'apps.payments.tasks.reconcile_pending_payments',
+        'schedule': crontab(minute='*/10'),  # Каждые 10 минут
+    },
+    'cleanup-upload-sessions': {
+        'task': 'apps.uploads.tasks.cleanup_upload_sessions',
+        'schedule': crontab(minute='30'),  # Каждый час
+    },
+    'collect-content-garbage': {
+        'task': 'apps.uploads.tasks.collect_content_garbage',
+        'schedule': crontab(hour='5', minute='0'),  # Каждый день в 5:00
+    },
+    'flush-presence': {
+        'task': 'apps.users.tasks.flush_presence',
+        'schedule': crontab(minute='*'),  # Каждую минуту
+    },
 }
 
 @app.task(bind=True)
@@ -0,0 +1,30 @@
+"""
+gunicorn для HTTP-пула (запускается из config.serve).
+
+Воркеры — gthread: REST-вызовы в основном ждут PostgreSQL и Redis, потоки
+закрывают это ожидание без отдельного процесса на каждый запрос. SIGHUP
+перезапускает воркеры по одному с новым кодом (``preload_app`` выключен).
+"""
+import os
+
+from config.serve import http_workers
+
+bind = os.getenv('HTTP_BIND', '0.0.0.0:8000')
+workers = http_workers()
+worker_class = 'gthread'
+threads = int(os.getenv('HTTP_THREADS', 4))
+
+timeout = int(os.getenv('HTTP_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Периодический перезапуск воркеров против роста памяти; разброс — чтобы
+# они не перезапускались одновременно.
+max_requests = int(os.getenv('HTTP_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+# За nginx: доверяем X-Forwarded-* от прокси в той же сети.
+forwarded_allow_ips = '*'
+
+errorlog = '-'
+accesslog = os.getenv('HTTP_ACCESS_LOG') or None
@@ -0,0 +1,246 @@
+"""
+Продакшн-запуск backend: отдельные пулы процессов для HTTP и WebSocket.
+
+    python -m config.serve
+
+- HTTP — gunicorn с ``config/wsgi.py`` (настройки в ``config/gunicorn.conf.py``)
+  на ``HTTP_BIND`` (:8000), ``HTTP_WORKERS`` воркеров, по умолчанию 2×CPU+1.
+- WebSocket — ``WS_WORKERS`` процессов daphne (по умолчанию по числу CPU) на
+  общем сокете ``WS_PORT`` (:8001). Сокет открывает лаунчер и передаёт
+  потомкам, соединения между процессами распределяет ядро.
+
+Каждый daphne дополнительно слушает ``127.0.0.1:<WS_HEALTH_PORT + n>``:
+лаунчер опрашивает на нём ``WS_HEALTH_PATH`` (Host — ``WS_HEALTH_HOST``) и
+перезапускает воркер после ``WS_HEALTH_FAILURES`` неудачных проверок подряд. За воркерами gunicorn следит
+сам gunicorn (``timeout``).
+
+При ``METRICS_DIR`` лаунчер очищает каталог метрик перед запуском процессов.
+
+Сигналы: SIGHUP — плавная перезагрузка (gunicorn перезапускает воркеры сам,
+daphne — по одному: новый процесс поднимается и проходит проверку, затем
+старый останавливается); SIGTERM/SIGINT — остановка всех процессов с
+ожиданием ``GRACEFUL_TIMEOUT`` секунд.
+"""
+import http.client
+import logging
+import math
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger('config.serve')
+
+CGROUP_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+
+
+def cpu_count():
+    """CPU, доступные процессу: affinity с учётом квоты cgroup v2 контейнера."""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+    try:
+        with open(CGROUP_CPU_MAX) as fh:
+            quota, period = fh.read().split()[:2]
+        if quota != 'max':
+            available = min(available, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return available
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def http_workers():
+    return _env_int('HTTP_WORKERS', cpu_count() * 2 + 1)
+
+
+def ws_workers():
+    return _env_int('WS_WORKERS', cpu_count())
+
+
+def _graceful_timeout():
+    return _env_int('GRACEFUL_TIMEOUT', 30)
+
+
+def _listen(port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('0.0.0.0', port))
+    sock.listen(_env_int('WS_BACKLOG', 2048))
+    sock.set_inheritable(True)
+    return sock
+
+
+def _stop(process, timeout):
+    """SIGTERM, ожидание, затем SIGKILL."""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        logger.warning("Процесс %s не завершился за %s с — SIGKILL", process.pid, timeout)
+        process.kill()
+        process.wait()
+
+
+def _clear_metrics_dir():
+    """Файлы метрик прошлого запуска (apps.core.profiling): их pid могли занять другие процессы."""
+    directory = os.getenv('METRICS_DIR')
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(directory, name))
+
+
+def health_probe_headers():
+    """
+    Проверка идёт мимо nginx по HTTP: без ``X-Forwarded-Proto: https``
+    SecurityMiddleware в продакшне (SECURE_SSL_REDIRECT) ответил бы 301.
+    """
+    return {'Host': os.getenv('WS_HEALTH_HOST', '127.0.0.1'), 'X-Forwarded-Proto': 'https'}
+
+
+class WebSocketWorker:
+    """Один процесс daphne пула WebSocket."""
+
+    def __init__(self, slot, generation, sock):
+        self.slot = slot
+        self.generation = generation
+        # Соседние порты для старого и нового процесса одного слота — при
+        # плавной перезагрузке они работают одновременно.
+        self.health_port = _env_int('WS_HEALTH_PORT', 9100) + slot * 2 + generation % 2
+        self.failures = 0
+        self.started_at = time.monotonic()
+        self.process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'daphne',
+                '--fd', str(sock.fileno()),
+                '-e', f'tcp:port={self.health_port}:interface=127.0.0.1',
+                '--proxy-headers',
+                '--application-close-timeout', str(_graceful_timeout()),
+                'config.asgi:application',
+            ],
+            pass_fds=(sock.fileno(),),
+        )
+        logger.info("WS-воркер %s запущен (pid %s, health :%s)", slot, self.process.pid, self.health_port)
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def healthy(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.health_port, timeout=_env_int('WS_HEALTH_TIMEOUT', 5))
+        try:
+            connection.request('GET', os.getenv('WS_HEALTH_PATH', '/api/health/live/'), headers=health_probe_headers())
+            return connection.getresponse().status == 200
+        except OSError:
+            return False
+        finally:
+            connection.close()
+
+    def in_grace_period(self):
+        return time.monotonic() - self.started_at < _env_int('WS_HEALTH_GRACE', 30)
+
+
+class Launcher:
+    def __init__(self):
+        self.running = True
+        self.reload_requested = False
+        self.http = None
+        self.ws_socket = None
+        self.ws = []
+
+    def _on_signal(self, signum, _frame):
+        if signum == signal.SIGHUP:
+            self.reload_requested = True
+        else:
+            self.running = False
+
+    def start(self):
+        _clear_metrics_dir()
+        config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+        self.http = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', config, 'config.wsgi:application'])
+        logger.info("HTTP: gunicorn (pid %s), воркеров: %s", self.http.pid, http_workers())
+
+        self.ws_socket = _listen(_env_int('WS_PORT', 8001))
+        self.ws = [WebSocketWorker(slot, 0, self.ws_socket) for slot in range(ws_workers())]
+        logger.info("WebSocket: %s воркеров daphne на :%s", len(self.ws), _env_int('WS_PORT', 8001))
+
+    def _replace(self, worker):
+        """Поднимает новый процесс слота, дожидается его готовности и останавливает старый."""
+        new = WebSocketWorker(worker.slot, worker.generation + 1, self.ws_socket)
+        deadline = time.monotonic() + _env_int('WS_HEALTH_GRACE', 30)
+        while new.alive and not new.healthy() and time.monotonic() < deadline:
+            time.sleep(0.5)
+        _stop(worker.process, _graceful_timeout())
+        self.ws[worker.slot] = new
+
+    def reload(self):
+        logger.info("Плавная перезагрузка")
+        self.http.send_signal(signal.SIGHUP)
+        for worker in list(self.ws):
+            self._replace(worker)
+
+    def supervise(self):
+        interval = _env_int('WS_HEALTH_INTERVAL', 10)
+        max_failures = _env_int('WS_HEALTH_FAILURES', 3)
+        last_check = time.monotonic()
+        while self.running:
+            if self.http.poll() is not None:
+                logger.error("gunicorn завершился с кодом %s", self.http.returncode)
+                return self.http.returncode or 1
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+
+            check = time.monotonic() - last_check >= interval
+            for worker in list(self.ws):
+                if not worker.alive:
+                    logger.warning("WS-воркер %s завершился (код %s) — перезапуск", worker.slot, worker.process.returncode)
+                    self.ws[worker.slot] = WebSocketWorker(worker.slot, worker.generation + 1, self.ws_socket)
+                elif check and not worker.in_grace_period():
+                    worker.failures = 0 if worker.healthy() else worker.failures + 1
+                    if worker.failures >= max_failures:
+                        logger.error("WS-воркер %s не отвечает на проверку — перезапуск", worker.slot)
+                        self._replace(worker)
+            if check:
+                last_check = time.monotonic()
+            time.sleep(1)
+        return 0
+
+    def shutdown(self):
+        processes = [worker.process for worker in self.ws] + ([self.http] if self.http else [])
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        deadline = time.monotonic() + _graceful_timeout()
+        for process in processes:
+            _stop(process, max(deadline - time.monotonic(), 0.1))
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, self._on_signal)
+        self.start()
+        try:
+            return self.supervise()
+        finally:
+            logger.info("Остановка")
+            self.shutdown()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='[serve] %(levelname)s %(message)s')
+    sys.exit(Launcher().run())
+
+
+if __name__ == '__main__':
+    main()
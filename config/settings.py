@@ -90,11 +90,13 @@ INSTALLED_APPS = [
     'apps.knowledge',
     'apps.payments',
     'apps.wallet',
+    'apps.uploads',
     'apps.regression_tests',
 ]
 
 MIDDLEWARE = [
     'apps.core.error_middleware.ErrorLoggingMiddleware',
+    'apps.core.profiling_middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -201,6 +203,8 @@ elif TESTING:
 else:
     # Production security settings
     SECURE_SSL_REDIRECT = True
+    # Проверки здоровья ходят внутри контейнера по HTTP (config/serve.py, docker).
+    SECURE_REDIRECT_EXEMPT = [r'^api/health/']
     SECURE_HSTS_SECONDS = 31536000
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_PRELOAD = True
@@ -436,6 +440,11 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Уведомления платёжных систем обрабатывает отдельный воркер с ограниченной
+# конкурентностью (сервис celery-payments в docker-compose).
+CELERY_TASK_ROUTES = {
+    'apps.payments.tasks.*': {'queue': 'payments'},
+}
 
 # Media files
 MEDIA_URL = '/media/'
@@ -563,3 +572,117 @@ LOGGING = {
 }
 # Ready-work moderation can be re-enabled later without code changes.
 READY_WORK_MODERATION_ENABLED = os.getenv('READY_WORK_MODERATION_ENABLED', 'False') == 'True'
+
+# Очистка уведомлений (apps.notifications.retention): сроки хранения прочитанных
+# уведомлений в днях по типам ('default' — для остальных типов), размер пакета
+# удаления, пауза между пакетами и общий лимит времени одного запуска.
+NOTIFICATION_RETENTION_DAYS = {
+    'new_order': 30,
+    'order_taken': 90,
+    'order_completed': 180,
+    'review_received': 365,
+    'default': 30,
+}
+NOTIFICATION_CLEANUP_BATCH_SIZE = int(os.getenv('NOTIFICATION_CLEANUP_BATCH_SIZE', 1000))
+NOTIFICATION_CLEANUP_BATCH_SLEEP = float(os.getenv('NOTIFICATION_CLEANUP_BATCH_SLEEP', 0.1))
+NOTIFICATION_CLEANUP_MAX_RUNTIME = int(os.getenv('NOTIFICATION_CLEANUP_MAX_RUNTIME', 1800))
+
+# Кэш снимков кошелька (apps.wallet.cache). В тестах отключён: тестовая БД
+# пересоздаётся, и id пользователей повторяются между прогонами.
+WALLET_CACHE_ENABLED = os.getenv('WALLET_CACHE_ENABLED', 'True') == 'True' and not TESTING
+WALLET_CACHE_TTL = int(os.getenv('WALLET_CACHE_TTL', 300))
+
+# Число счетов-шардов системной комиссии (apps.wallet.services): комиссии
+# распределяются по плательщику, чтобы расчёты не ждали блокировку одной строки.
+WALLET_COMMISSION_SHARDS = int(os.getenv('WALLET_COMMISSION_SHARDS', 8))
+
+# Очередь уведомлений платёжных систем (apps.payments.inbox)
+PAYMENT_CALLBACK_MAX_ATTEMPTS = int(os.getenv('PAYMENT_CALLBACK_MAX_ATTEMPTS', 5))
+PAYMENT_CALLBACK_DRAIN_LIMIT = int(os.getenv('PAYMENT_CALLBACK_DRAIN_LIMIT', 100))
+PAYMENT_CALLBACK_GRACE_SECONDS = int(os.getenv('PAYMENT_CALLBACK_GRACE_SECONDS', 60))
+
+# HTTP-клиенты эквайринга (apps.payments.transport)
+PAYMENT_HTTP_CONNECT_TIMEOUT = float(os.getenv('PAYMENT_HTTP_CONNECT_TIMEOUT', 3.05))
+PAYMENT_HTTP_READ_TIMEOUT = float(os.getenv('PAYMENT_HTTP_READ_TIMEOUT', 15))
+PAYMENT_HTTP_RETRIES = int(os.getenv('PAYMENT_HTTP_RETRIES', 2))
+PAYMENT_HTTP_POOL_SIZE = int(os.getenv('PAYMENT_HTTP_POOL_SIZE', 10))
+PAYMENT_HTTP_BREAKER_THRESHOLD = int(os.getenv('PAYMENT_HTTP_BREAKER_THRESHOLD', 5))
+PAYMENT_HTTP_BREAKER_COOLDOWN = int(os.getenv('PAYMENT_HTTP_BREAKER_COOLDOWN', 30))
+
+# Сверка зависших платежей (apps.payments.reconciliation)
+PAYMENT_RECONCILE_STALE_MINUTES = int(os.getenv('PAYMENT_RECONCILE_STALE_MINUTES', 15))
+PAYMENT_RECONCILE_MAX_AGE_DAYS = int(os.getenv('PAYMENT_RECONCILE_MAX_AGE_DAYS', 3))
+PAYMENT_RECONCILE_PAGE_SIZE = int(os.getenv('PAYMENT_RECONCILE_PAGE_SIZE', 200))
+PAYMENT_RECONCILE_CONCURRENCY = int(os.getenv('PAYMENT_RECONCILE_CONCURRENCY', 4))
+PAYMENT_RECONCILE_MAX_PER_RUN = int(os.getenv('PAYMENT_RECONCILE_MAX_PER_RUN', 2000))
+
+# Отдача защищённых файлов (apps.core.file_delivery): при включённом режиме
+# Django отвечает X-Accel-Redirect, а файл из MEDIA_ROOT отдаёт nginx через
+# internal-location FILE_DELIVERY_ACCEL_PREFIX. В dev файл стримится из процесса.
+FILE_DELIVERY_ACCEL_REDIRECT = os.getenv('FILE_DELIVERY_ACCEL_REDIRECT', 'False') == 'True'
+FILE_DELIVERY_ACCEL_PREFIX = os.getenv('FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/')
+
+# Загрузка файлов по частям (apps.uploads): размер части, каталог
+# недокачанных файлов, время жизни брошенной сессии и собранного файла.
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))
+UPLOAD_PARTIAL_DIR = os.getenv('UPLOAD_PARTIAL_DIR', str(MEDIA_ROOT / 'uploads' / 'partial'))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv('UPLOAD_SESSION_TTL_HOURS', 24))
+UPLOAD_BLOB_RETENTION_DAYS = int(os.getenv('UPLOAD_BLOB_RETENTION_DAYS', 7))
+
+# Контентно-адресуемое хранилище (apps.uploads.storage): mark-and-sweep не
+# трогает файлы моложе этого срока — их запись могла ещё не сохраниться.
+CONTENT_STORAGE_GC_GRACE_HOURS = int(os.getenv('CONTENT_STORAGE_GC_GRACE_HOURS', 24))
+
+# Миниатюры изображений (apps.uploads.thumbnails): формат (WEBP, при
+# отсутствии поддержки в Pillow — JPEG) и качество сжатия.
+THUMBNAIL_FORMAT = os.getenv('THUMBNAIL_FORMAT', 'WEBP')
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', 80))
+
+# Присутствие онлайн (apps.users.presence): окно «онлайн», минимальный
+# интервал отметок от одного WebSocket, размер пачки записи в БД и срок
+# хранения отметок в Redis.
+PRESENCE_ONLINE_SECONDS = int(os.getenv('PRESENCE_ONLINE_SECONDS', 15 * 60))
+PRESENCE_TOUCH_INTERVAL = int(os.getenv('PRESENCE_TOUCH_INTERVAL', 30))
+PRESENCE_FLUSH_BATCH = int(os.getenv('PRESENCE_FLUSH_BATCH', 1000))
+PRESENCE_RETENTION_HOURS = int(os.getenv('PRESENCE_RETENTION_HOURS', 24))
+
+# Авторизация WebSocket по claims JWT (apps.users.ws_auth): время жизни
+# снимка пользователя в локальном LRU процесса и в Redis (не меньше
+# REFRESH_TOKEN_LIFETIME, даже если задано меньше), размер LRU.
+WS_AUTH_LOCAL_TTL = int(os.getenv('WS_AUTH_LOCAL_TTL', 5))
+WS_AUTH_LOCAL_SIZE = int(os.getenv('WS_AUTH_LOCAL_SIZE', 10000))
+WS_AUTH_SNAPSHOT_TTL = int(os.getenv('WS_AUTH_SNAPSHOT_TTL', 600))
+
+# Индикатор набора текста (apps.chat.typing_indicator): окно троттлинга,
+# тайм-аут «перестал печатать» и транспорт ('layer' — через channel layer,
+# 'local' — только consumers своего процесса, для одного ASGI-процесса).
+TYPING_THROTTLE_SECONDS = float(os.getenv('TYPING_THROTTLE_SECONDS', 3))
+TYPING_STOP_SECONDS = float(os.getenv('TYPING_STOP_SECONDS', 6))
+TYPING_TRANSPORT = os.getenv('TYPING_TRANSPORT', 'layer')
+
+# Outbox real-time событий (apps.chat.realtime_outbox): сколько событий за
+# один запрос или задачу считается нормой; сверх — предупреждение в лог.
+REALTIME_EVENT_BUDGET = int(os.getenv('REALTIME_EVENT_BUDGET', 50))
+
+# Readiness-проверка (apps.core.health): тайм-аут каждой проверки
+# зависимости и время кэширования результата в процессе.
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 2))
+HEALTH_CACHE_SECONDS = float(os.getenv('HEALTH_CACHE_SECONDS', 1))
+
+# Профилирование запросов (apps.core.profiling_middleware): порог и доля
+# медленных запросов для лога, сколько самых долгих SQL в записи, токен
+# для сбора /api/metrics/ без учётной записи персонала. METRICS_DIR —
+# общий каталог процессов контейнера: /api/metrics/ отдаёт счётчики всех
+# воркеров gunicorn и daphne, а не только ответившего (пусто — только свои).
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True') == 'True'
+PROFILING_SLOW_MS = int(os.getenv('PROFILING_SLOW_MS', 1000))
+PROFILING_SLOW_SAMPLE_RATE = float(os.getenv('PROFILING_SLOW_SAMPLE_RATE', 1.0))
+PROFILING_TOP_QUERIES = int(os.getenv('PROFILING_TOP_QUERIES', 5))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 10))
+
+# Детектор N+1 (apps.core.profiling_middleware): 'off', 'log' или 'raise';
+# сколько повторов одного вида SQL за запрос считается N+1.
+NPLUSONE_MODE = os.getenv('NPLUSONE_MODE', 'log' if DEBUG else 'off')
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', 5))
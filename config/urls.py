@@ -20,7 +20,8 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from apps.core.health import health_check
+from apps.core.health import health_check, readiness_check
+from apps.core.profiling import metrics
 from apps.users.views import public_stats_view
 from apps.core.seo import robots_txt, sitemap_xml, prerender
 
@@ -28,6 +29,9 @@ urlpatterns = [
     path('django-admin/', admin.site.urls),  # Изменили с admin/ на django-admin/
     path('hijack/', include('hijack.urls')),
     path('api/health/', health_check, name='health_check'),
+    path('api/health/live/', health_check, name='health_live'),
+    path('api/health/ready/', readiness_check, name='health_ready'),
+    path('api/metrics/', metrics, name='metrics'),
     path('robots.txt', robots_txt, name='robots_txt'),
     path('sitemap.xml', sitemap_xml, name='sitemap_xml'),
     path('api/seo/prerender', prerender, name='seo_prerender'),
@@ -46,6 +50,7 @@ urlpatterns = [
     path('api/knowledge/', include('apps.knowledge.urls')),
     path('api/payments/', include('apps.payments.urls')),
     path('api/wallet/', include('apps.wallet.urls')),
+    path('api/uploads/', include('apps.uploads.urls')),
     path("api/accounts/", include("allauth.urls")),
 ]
 
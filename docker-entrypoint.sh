@@ -35,5 +35,13 @@ if [ "$#" -gt 0 ]; then
   exec "$@"
 fi
 
+# SERVER_MODE=split: HTTP (gunicorn, :8000) и WebSocket (пул daphne, :8001)
+# в отдельных пулах процессов, число воркеров — по CPU (config/serve.py).
+# По умолчанию — один процесс Daphne на обоих портах.
+if [ "${SERVER_MODE:-daphne}" = "split" ]; then
+  echo "Starting HTTP and WebSocket worker pools..."
+  exec python -m config.serve
+fi
+
 echo "Starting Daphne (ASGI server)..."
-exec daphne -b 0.0.0.0 -p 8000 config.asgi:application
+exec daphne -b 0.0.0.0 -p 8000 -e tcp:port=8001:interface=0.0.0.0 config.asgi:application
@@ -145,8 +145,12 @@ export const arbitrationApi = {
     return response.data;
   },
 
-  getActivityFeed: async (caseId: number) => {
-    const response = await apiClient.get(API_ENDPOINTS.admin.arbitration.cases.activityFeed(caseId));
+  // Последняя страница ленты; более ранние — по before=first_cursor, пока has_more.
+  // Полная лента одним файлом — activity-feed/export.
+  getActivityFeed: async (caseId: number, before?: string) => {
+    const response = await apiClient.get(API_ENDPOINTS.admin.arbitration.cases.activityFeed(caseId), {
+      params: before ? { before } : undefined,
+    });
     return response.data;
   },
 };
@@ -137,6 +137,8 @@ export const ArbitrationSection: React.FC<ArbitrationSectionProps> = ({
   const [selectedCase, setSelectedCase] = useState<ArbitrationCase | null>(null);
   const [detailData, setDetailData] = useState<any | null>(null);
   const [feedData, setFeedData] = useState<any[]>([]);
+  const [feedCursor, setFeedCursor] = useState<string | null>(null);
+  const [feedEarlierLoading, setFeedEarlierLoading] = useState(false);
   const [modalOpen, setModalOpen] = useState(false);
   const [detailLoading, setDetailLoading] = useState(false);
   const [messageText, setMessageText] = useState('');
@@ -292,6 +294,7 @@ export const ArbitrationSection: React.FC<ArbitrationSectionProps> = ({
       );
       const feed = await arbitrationApi.getActivityFeed(detail.id);
       setFeedData(feed.feed || []);
+      setFeedCursor(feed.has_more ? feed.first_cursor : null);
     } catch {
       message.error('Не удалось загрузить дело');
     } finally {
@@ -299,11 +302,26 @@ export const ArbitrationSection: React.FC<ArbitrationSectionProps> = ({
     }
   };
 
+  const loadEarlierFeed = async () => {
+    if (!detailData?.id || !feedCursor) return;
+    try {
+      setFeedEarlierLoading(true);
+      const page = await arbitrationApi.getActivityFeed(detailData.id, feedCursor);
+      setFeedData((current) => [...(page.feed || []), ...current]);
+      setFeedCursor(page.has_more ? page.first_cursor : null);
+    } catch {
+      message.error('Не удалось загрузить более ранние сообщения');
+    } finally {
+      setFeedEarlierLoading(false);
+    }
+  };
+
   const closeModal = () => {
     setModalOpen(false);
     setSelectedCase(null);
     setDetailData(null);
     setFeedData([]);
+    setFeedCursor(null);
     setMessageText('');
   };
 
@@ -793,6 +811,11 @@ export const ArbitrationSection: React.FC<ArbitrationSectionProps> = ({
 
             <Card size="small" title="Переписка и история">
               <Space direction="vertical" size={12} style={{ width: '100%' }}>
+                {feedCursor && (
+                  <Button size="small" block onClick={loadEarlierFeed} loading={feedEarlierLoading}>
+                    Загрузить более ранние
+                  </Button>
+                )}
                 {feedData.length === 0 ? (
                   <Empty description="История пока пуста" image={Empty.PRESENTED_IMAGE_SIMPLE} />
                 ) : (
@@ -105,9 +105,11 @@ export const supportRequestsApi = {
     );
   },
 
-  async getActivity(type: SupportConversationType, id: number): Promise<SupportActivityResponse> {
+  async getActivity(type: SupportConversationType, id: number, before?: string): Promise<SupportActivityResponse> {
     if (type === 'arbitration_case') {
-      const response = await apiClient.get(`/arbitration/cases/${id}/activity-feed/`);
+      const response = await apiClient.get(`/arbitration/cases/${id}/activity-feed/`, {
+        params: before ? { before } : undefined,
+      });
       return response.data;
     }
 
@@ -73,6 +73,7 @@ export const SupportCenterPanel: React.FC<SupportCenterPanelProps> = ({
   const [detailsOpen, setDetailsOpen] = React.useState(false);
   const [activity, setActivity] = React.useState<SupportActivityResponse | null>(null);
   const [activityLoading, setActivityLoading] = React.useState(false);
+  const [earlierLoading, setEarlierLoading] = React.useState(false);
   const [reply, setReply] = React.useState('');
   const [sending, setSending] = React.useState(false);
 
@@ -107,6 +108,29 @@ export const SupportCenterPanel: React.FC<SupportCenterPanelProps> = ({
     }
   }, []);
 
+  const loadEarlierActivity = async () => {
+    if (!selectedItem || !activity?.first_cursor) {
+      return;
+    }
+
+    try {
+      setEarlierLoading(true);
+      const page = await supportRequestsApi.getActivity(selectedItem.type, selectedItem.id, activity.first_cursor);
+      setActivity((current) => current && {
+        ...current,
+        feed: [...(page.feed || []), ...current.feed],
+        messages: [...(page.messages || []), ...current.messages],
+        activities: [...(page.activities || []), ...current.activities],
+        has_more: page.has_more,
+        first_cursor: page.first_cursor,
+      });
+    } catch {
+      message.error('Не удалось загрузить более ранние сообщения');
+    } finally {
+      setEarlierLoading(false);
+    }
+  };
+
   React.useEffect(() => {
     if (!active) {
       return;
@@ -201,12 +225,19 @@ export const SupportCenterPanel: React.FC<SupportCenterPanelProps> = ({
       (item) => !(item.kind === 'activity' && ['message', 'message_sent'].includes(String(item.activity_type || '')))
     ) ?? [];
 
-      if (!feedItems.length) {
+      if (!feedItems.length && !activity?.has_more) {
         return <div className={styles.feedEmpty}><Empty description="История обращения пока пуста" /></div>;
       }
 
     return (
       <div className={styles.feedList}>
+        {activity?.has_more && (
+          <div style={{ textAlign: 'center' }}>
+            <Button size="small" onClick={loadEarlierActivity} loading={earlierLoading}>
+              Загрузить более ранние
+            </Button>
+          </div>
+        )}
         {feedItems.map((item) => {
           if (item.kind === 'message') {
             const author = `${item.sender?.first_name ?? ''} ${item.sender?.last_name ?? ''}`.trim()
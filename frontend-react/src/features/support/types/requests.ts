@@ -68,6 +68,8 @@ export interface SupportActivityResponse {
   messages: SupportFeedItem[];
   activities: SupportFeedItem[];
   feed: SupportFeedItem[];
+  has_more?: boolean;
+  first_cursor?: string | null;
 }
 
 export interface CreateSupportRequestPayload {
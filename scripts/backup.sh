@@ -34,12 +34,16 @@ cp -a deploy/systemd "$STAGE/config/" 2>/dev/null || true
 install -m 600 .env "$STAGE/config/app.env"
 
 # Restic deduplicates media/config, so unchanged files consume almost no extra space.
+# Order/chat/shop files live once per content under media/cas/ (apps.uploads.storage);
+# in-flight temp files and unfinished chunked uploads are not worth backing up.
 restic backup \
   "$STAGE" \
   /var/lib/docker/volumes/okoznaniy_media_files/_data \
   /etc/letsencrypt \
   /etc/systemd/system/okoznaniy-monitor.service \
   /etc/systemd/system/okoznaniy-monitor.timer \
+  --exclude '/var/lib/docker/volumes/okoznaniy_media_files/_data/cas/tmp' \
+  --exclude '/var/lib/docker/volumes/okoznaniy_media_files/_data/uploads/partial' \
   --tag okoznaniy --tag production --host "$(hostname)" >> "$LOG" 2>&1
 
 # GFS retention: 7 daily + 4 weekly + 6 monthly. Compact but useful.
@@ -0,0 +1,35 @@
+#!/bin/sh
+set -eu
+ROOT=${OKO_ROOT:-/root/OkoZnaniy}
+WORKER_COUNTS=${WORKER_COUNTS:-"1 2 4"}
+CONNECTIONS=${CONNECTIONS:-500}
+DURATION=${DURATION:-60s}
+PING_MS=${PING_MS:-100}
+cd "$ROOT"
+# Recreate the backend with each WS_WORKERS value and load its daphne pool
+# through the same network namespace (port 8001 is not published).
+for WORKERS in $WORKER_COUNTS; do
+  WS_WORKERS=$WORKERS docker compose up -d --no-deps --force-recreate backend >/dev/null
+  CONTAINER=$(docker compose ps -q backend)
+  for _ in $(seq 60); do
+    [ "$(docker inspect -f '{{.State.Health.Status}}' "$CONTAINER")" = healthy ] && break
+    sleep 5
+  done
+  TOKEN=$(docker compose exec -T backend python manage.py shell -c "from django.contrib.auth import get_user_model; from rest_framework_simplejwt.tokens import AccessToken; U=get_user_model(); u=U.objects.filter(is_active=True).first(); print(str(AccessToken.for_user(u)))" 2>/dev/null | tail -1)
+  [ -n "$TOKEN" ] || { echo 'Could not mint load-test token' >&2; exit 1; }
+  SUMMARY="/tmp/ws_scaling_$WORKERS.json"
+  docker run --rm --network "container:$CONTAINER" \
+    -e TOKEN="$TOKEN" -e CONNECTIONS="$CONNECTIONS" -e DURATION="$DURATION" -e PING_MS="$PING_MS" \
+    -v "$ROOT/tests/load:/scripts:ro" -v /tmp:/out \
+    grafana/k6:latest run --quiet --summary-export "/out/ws_scaling_$WORKERS.json" /scripts/ws_scaling.js || true
+  python3 - "$WORKERS" "$SUMMARY" <<'PY'
+import json, sys
+workers, path = sys.argv[1:]
+metrics = json.load(open(path))['metrics']
+print(f"WS_WORKERS={workers}: {metrics['ws_pongs']['rate']:.0f} pongs/s, "
+      f"rtt p95 {metrics['ws_rtt']['p(95)']:.1f} ms, "
+      f"connect failures {metrics['ws_connect_failed']['value']:.2%}")
+PY
+done
+# Restore the default worker count.
+docker compose up -d --no-deps --force-recreate backend >/dev/null
@@ -0,0 +1,57 @@
+import ws from 'k6/ws';
+import { check } from 'k6';
+import { Counter, Rate, Trend } from 'k6/metrics';
+
+// Ping/pong over ws/stream/ from many sockets at once. Run it against the
+// daphne pool with different WS_WORKERS (scripts/ws_scaling_test.sh):
+// pongs/s should grow and RTT p95 should drop as workers are added until
+// the CPU limit is reached.
+
+const rtt = new Trend('ws_rtt', true);
+const pongs = new Counter('ws_pongs');
+const connectFailed = new Rate('ws_connect_failed');
+
+const url = __ENV.WS_URL || 'ws://127.0.0.1:8001/ws/stream/';
+const token = __ENV.TOKEN || '';
+const origin = __ENV.ORIGIN || 'http://localhost';
+const sessionMs = Number(__ENV.SESSION_SECONDS || 30) * 1000;
+const pingMs = Number(__ENV.PING_MS || 100);
+
+export const options = {
+  scenarios: {
+    sockets: {
+      executor: 'constant-vus',
+      vus: Number(__ENV.CONNECTIONS || 500),
+      duration: __ENV.DURATION || '60s',
+    },
+  },
+  thresholds: {
+    ws_connect_failed: ['rate<0.01'],
+  },
+};
+
+export default function () {
+  const response = ws.connect(`${url}?token=${token}`, { headers: { Origin: origin } }, (socket) => {
+    let sentAt = 0;
+
+    socket.on('open', () => {
+      socket.setInterval(() => {
+        sentAt = Date.now();
+        socket.send(JSON.stringify({ action: 'ping' }));
+      }, pingMs);
+      socket.setTimeout(() => socket.close(), sessionMs);
+    });
+
+    socket.on('message', (raw) => {
+      const message = JSON.parse(raw);
+      if (message.type === 'pong' && sentAt) {
+        rtt.add(Date.now() - sentAt);
+        pongs.add(1);
+        sentAt = 0;
+      }
+    });
+  });
+
+  const ok = check(response, { 'status is 101': (r) => r && r.status === 101 });
+  connectFailed.add(!ok);
+}